@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Concurrent notebooks on simulated kernels: thread vs asyncio scheduler.
+
+    PYTHONPATH=. python benchmarks/bench_async.py
+
+Every notebook runs CELLS cells taking CELL_TIME seconds each on a kernel
+simulated by tests/fake_gateway.py, executed by the Jupyter executor. The
+thread scheduler holds a worker thread and a kernel I/O thread per running
+notebook, while the asyncio scheduler awaits the cells on its event loop
+(execute_task_async). Kernels are started and the output schema is loaded
+before timing, so that only the execution of the notebooks is measured.
+Each configuration runs in its own process so that the reported peak RSS
+is not polluted by previous runs.
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from threading import Lock
+
+import nbformat
+
+from enterprise_scheduler.async_scheduler import AsyncScheduler
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.scheduler import Scheduler
+from tests.fake_gateway import FakeGateway
+
+CELLS = 5
+CELL_TIME = 0.05
+CONCURRENCY = (10, 100, 1000)
+ENDPOINT = 'localhost:8888'
+KERNELSPEC = 'python3'
+
+
+class TimedJupyterExecutor(JupyterExecutor):
+    """Jupyter executor recording the latency of every notebook since its submission"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.latencies = []
+        self.lock = Lock()
+
+    def execute_task(self, task):
+        result = super().execute_task(task)
+        self._done(task)
+        return result
+
+    async def execute_task_async(self, task):
+        result = await super().execute_task_async(task)
+        self._done(task)
+        return result
+
+    def _done(self, task):
+        with self.lock:
+            self.latencies.append(time.monotonic() - task['submitted_at'])
+
+
+def notebook():
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+        dict(cell_type='code', source='x = {}'.format(i), metadata={}, outputs=[], execution_count=None)
+        for i in range(CELLS)])
+
+
+def run(mode, concurrency):
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        executor, elapsed = _run(mode, concurrency)
+
+    latencies = sorted(executor.latencies)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print('{:>8} {:>12} {:>10.2f} {:>10.1f} {:>10.3f} {:>10.3f}'.format(
+        mode, concurrency, elapsed, rss,
+        latencies[int(0.50 * (len(latencies) - 1))],
+        latencies[int(0.99 * (len(latencies) - 1))]))
+
+
+def _run(mode, concurrency):
+    gateway = FakeGateway(probes_until_ready=0, execution_time=CELL_TIME)
+    pool = KernelPool(min_size=concurrency, max_size=concurrency, readiness_interval=0.001,
+                      launcher_factory=gateway)
+    pool.prewarm(ENDPOINT, KERNELSPEC)
+    # the output schema is loaded on first use, by every thread creating an output at that time
+    nbformat.v4.new_output('stream', name='stdout', text='')
+    # in thread mode, every running notebook waits for its cells on a kernel I/O thread
+    executor = TimedJupyterExecutor(kernel_pool=pool, io_threads=concurrency)
+    if mode == 'asyncio':
+        scheduler = AsyncScheduler(max_concurrency=concurrency)
+    else:
+        scheduler = Scheduler(number_of_threads=concurrency)
+        executor.execute_task_async = None
+    scheduler.executors[JupyterExecutor.TYPE] = executor
+    scheduler.start()
+
+    start = time.monotonic()
+    for i in range(concurrency):
+        scheduler.schedule_task(dict(executor=JupyterExecutor.TYPE,
+                                     endpoint=ENDPOINT,
+                                     kernelspec=KERNELSPEC,
+                                     notebook=notebook(),
+                                     submitted_at=time.monotonic()))
+    scheduler.stop()
+
+    return executor, time.monotonic() - start
+
+
+def main():
+    if len(sys.argv) == 3:
+        run(sys.argv[1], int(sys.argv[2]))
+        return
+
+    print('{:>8} {:>12} {:>10} {:>10} {:>10} {:>10}'.format(
+        'mode', 'notebooks', 'wall (s)', 'rss (MB)', 'p50 (s)', 'p99 (s)'))
+    sys.stdout.flush()
+    for concurrency in CONCURRENCY:
+        for mode in ('thread', 'asyncio'):
+            subprocess.check_call([sys.executable, __file__, mode, str(concurrency)],
+                                  stderr=subprocess.DEVNULL)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""10k single task POSTs vs one batched POST on /scheduler/tasks.
+
+    PYTHONPATH=. python benchmarks/bench_batch_submission.py
+
+Requests go through the Flask test client, so this measures the API and
+scheduler overhead without network round trips (which only widen the gap).
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+_directory = tempfile.mkdtemp()
+os.environ['EGS_TASK_STORE'] = os.path.join(_directory, 'tasks.db')
+
+from enterprise_scheduler import scheduler_resource
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.scheduler_application import create_app
+
+TASKS = 10000
+NOTEBOOK = os.path.join(os.path.dirname(__file__), '..', 'tests', 'resources', 'simple.ipynb')
+
+
+def main():
+    with open(NOTEBOOK) as f:
+        task = dict(executor='jupyter', notebook=json.load(f))
+
+    client = create_app('localhost:8888', 'python3').test_client()
+    results = []
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            # tasks are only queued, nothing is executed
+            scheduler_resource.scheduler = Scheduler()
+
+            start = time.perf_counter()
+            for i in range(TASKS):
+                assert client.post('/scheduler/tasks', data=json.dumps(task)).status_code == 201
+            results.append(('single', time.perf_counter() - start))
+
+            scheduler_resource.scheduler = Scheduler()
+
+            start = time.perf_counter()
+            response = client.post('/scheduler/tasks', data=json.dumps([task] * TASKS))
+            assert len(response.get_json()['ids']) == TASKS
+            results.append(('json array', time.perf_counter() - start))
+
+            scheduler_resource.scheduler = Scheduler()
+
+            start = time.perf_counter()
+            body = '\n'.join(json.dumps(task) for i in range(TASKS))
+            response = client.post('/scheduler/tasks', data=body, content_type='application/x-ndjson')
+            assert len(response.get_json()['ids']) == TASKS
+            results.append(('ndjson', time.perf_counter() - start))
+    finally:
+        shutil.rmtree(_directory)
+
+    print('{:>12} {:>10} {:>12}'.format('submission', 'time (s)', 'tasks/s'))
+    for name, elapsed in results:
+        print('{:>12} {:>10.2f} {:>12.0f}'.format(name, elapsed, TASKS / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Throughput of 1, 2 and 4 scheduler node processes sharing a SQLite task store, and the cost of claiming.
+
+    PYTHONPATH=. python benchmarks/bench_cluster.py
+
+Each node (tests/cluster_node.py) executes tasks on 2 threads, cells take
+CELL_TIME seconds on simulated kernels. TASKS tasks are submitted before the
+nodes start, the wall clock runs until every task succeeded. The claim cost
+is measured on a queue of QUEUED tasks, claiming CLAIM_SIZE at a time.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from enterprise_scheduler.cluster_scheduler import ClusterScheduler
+from enterprise_scheduler.task import TaskEnvelope
+from enterprise_scheduler.task_store import SharedTaskStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TASKS = 400
+CELL_TIME = 0.05
+QUEUED = 100000
+CLAIM_SIZE = 4
+
+
+def task():
+    notebook = dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+        dict(cell_type='code', source='x = 1', metadata={}, outputs=[], execution_count=None)])
+    return dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook=notebook)
+
+
+def throughput(directory, nodes):
+    path = os.path.join(directory, 'cluster-{}.db'.format(nodes))
+    store = SharedTaskStore(path, node='client')
+    ClusterScheduler(task_store=store, heartbeat_interval=0.2).schedule_tasks([task() for i in range(TASKS)])
+
+    processes = [subprocess.Popen([sys.executable, '-m', 'tests.cluster_node', path, 'node-{}'.format(i),
+                                   str(CELL_TIME)], cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  universal_newlines=True) for i in range(nodes)]
+    for process in processes:
+        process.stdout.readline()
+    start = time.perf_counter()
+    while store.counts().get('succeeded', 0) < TASKS:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+        process.stdout.close()
+    store.close()
+    return elapsed
+
+
+def claims(directory):
+    store = SharedTaskStore(os.path.join(directory, 'claims.db'), node='node')
+    for batch in range(0, QUEUED, 10000):
+        store.add_many([TaskEnvelope(dict(task(), id=uuid.uuid4()), priority=i % 3) for i in range(10000)])
+    start = time.perf_counter()
+    count = 0
+    while count < 5000:
+        count += len(store.claim(CLAIM_SIZE))
+    elapsed = time.perf_counter() - start
+    store.close()
+    return elapsed / (count / CLAIM_SIZE)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print('{:>6} {:>10} {:>10}'.format('nodes', 'seconds', 'tasks/s'))
+        for nodes in (1, 2, 4):
+            elapsed = throughput(directory, nodes)
+            print('{:>6} {:>10.2f} {:>10.1f}'.format(nodes, elapsed, TASKS / elapsed))
+        print('claim of {} tasks from a queue of {} tasks: {:.2f} ms'.format(CLAIM_SIZE, QUEUED,
+                                                                             claims(directory) * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Wall clock of sequential vs 'dag' execution of synthetic notebooks with sleep-heavy independent cells.
+
+    PYTHONPATH=. python benchmarks/bench_dag.py
+
+Kernels are simulated (tests/fake_gateway.py): every cell takes CELL_TIME
+seconds. Each notebook has a shared import cell followed by SECTIONS
+independent sections of CELLS_PER_SECTION dependent cells.
+"""
+
+import os
+import time
+from contextlib import redirect_stdout
+
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from tests.fake_gateway import FakeGateway
+
+CELL_TIME = 0.05
+CELLS_PER_SECTION = 3
+
+
+def notebook(sections):
+    cells = [dict(cell_type='code', source='import time', metadata={}, outputs=[], execution_count=None)]
+    for section in range(sections):
+        for i in range(CELLS_PER_SECTION):
+            source = 'time.sleep({})\ns{} = {}'.format(CELL_TIME, section, i) if i == 0 else \
+                'time.sleep({})\ns{} += {}'.format(CELL_TIME, section, i)
+            cells.append(dict(cell_type='code', source=source, metadata={}, outputs=[], execution_count=None))
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=cells)
+
+
+def run(sections, mode):
+    gateway = FakeGateway(execution_time=CELL_TIME)
+    executor = JupyterExecutor(kernel_pool=KernelPool(max_size=sections, readiness_interval=0.001,
+                                                      launcher_factory=gateway))
+    task = dict(endpoint='localhost:8888', kernelspec='python3', notebook=notebook(sections),
+                execution_mode=mode)
+    # warm the pool so both modes only measure execution
+    executor.execute_task(dict(task, execution_mode='dag'))
+
+    start = time.perf_counter()
+    executor.execute_task(task)
+    elapsed = time.perf_counter() - start
+    executor.shutdown()
+    return elapsed
+
+
+def main():
+    results = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for sections in (2, 4, 8, 16):
+            results.append((sections, run(sections, 'sequential'), run(sections, 'dag')))
+
+    print('{:>9} {:>7} {:>16} {:>10} {:>9}'.format('sections', 'cells', 'sequential (s)', 'dag (s)', 'speedup'))
+    for sections, sequential, dag in results:
+        print('{:>9} {:>7} {:>16.2f} {:>10.2f} {:>8.1f}x'.format(
+            sections, 1 + sections * CELLS_PER_SECTION, sequential, dag, sequential / dag))
+
+
+if __name__ == '__main__':
+    main()
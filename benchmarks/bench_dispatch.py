@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Idle CPU and enqueue-to-start latency of the scheduler dispatch engine.
+
+    PYTHONPATH=. python benchmarks/bench_dispatch.py
+"""
+
+import os
+import time
+from contextlib import redirect_stdout
+from threading import Event
+
+from enterprise_scheduler.scheduler import Scheduler
+
+IDLE_SECONDS = 2.0
+SAMPLES = 200
+
+
+class NoopExecutor:
+    TYPE = 'noop'
+
+    def __init__(self):
+        self.started = Event()
+
+    def execute_task(self, task):
+        self.started.set()
+
+
+def run(number_of_threads):
+    executor = NoopExecutor()
+    scheduler = Scheduler(number_of_threads=number_of_threads)
+    scheduler.executors[NoopExecutor.TYPE] = executor
+    scheduler.start()
+
+    cpu_start = time.process_time()
+    time.sleep(IDLE_SECONDS)
+    idle_cpu = (time.process_time() - cpu_start) / IDLE_SECONDS * 100
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for i in range(SAMPLES):
+            executor.started.clear()
+            scheduler.schedule_task(dict(executor=NoopExecutor.TYPE,
+                                         endpoint='localhost:8888',
+                                         kernelspec='python3',
+                                         notebook={'cells': []}))
+            executor.started.wait()
+
+    latency = scheduler.dispatch_latency()
+    scheduler.stop()
+
+    print('{:>7} {:>12.2f} {:>12.1f} {:>12.1f} {:>12.1f}'.format(
+        number_of_threads, idle_cpu,
+        latency['p50'] * 1e6, latency['p99'] * 1e6, latency['max'] * 1e6))
+
+
+def main():
+    print('{:>7} {:>12} {:>12} {:>12} {:>12}'.format(
+        'workers', 'idle cpu %', 'p50 (us)', 'p99 (us)', 'max (us)'))
+    for number_of_threads in (1, 5, 50):
+        run(number_of_threads)
+
+
+if __name__ == '__main__':
+    main()
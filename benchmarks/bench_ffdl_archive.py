@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""FfDL model archive build time and temporary directory growth: the former
+directory + zip_directory approach vs the in-memory ArchiveBuilder.
+
+    PYTHONPATH=. python benchmarks/bench_ffdl_archive.py
+"""
+
+import json
+import os
+import random
+import shlex
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from contextlib import redirect_stdout
+
+from enterprise_scheduler.ffdl_archive import ArchiveBuilder
+
+TASKS = 20
+NOTEBOOK = {'cells': [dict(cell_type='code', source='print(1)', metadata={}, outputs=[], execution_count=None)],
+            'metadata': {}, 'nbformat': 4, 'nbformat_minor': 2}
+
+
+def dependencies(size):
+    rows = '\n'.join('{},{},{}'.format(i, random.random(), random.random()) for i in range(size // 40))
+    return {'train.csv': rows, 'test.csv': rows[:len(rows) // 4],
+            'weights.npz': os.urandom(size // 4)}
+
+
+def legacy_build(task, workdir, runtime_dir):
+    """The archive build as done before ArchiveBuilder: files are written to a directory, then zipped"""
+    task_directory = os.path.join(workdir, 'ffdl-' + str(task['id'])[:8])
+    os.makedirs(task_directory)
+
+    def write(name, contents):
+        with open(os.path.join(task_directory, name), 'w') as f:
+            f.write(str(contents))
+
+    write('notebook.ipynb', json.dumps(task['notebook']))
+    for name, contents in task['dependencies'].items():
+        write(name, contents)
+    write('env.sh', '\n'.join(['#!/usr/bin/env bash\n'] + ['export {}={}'.format(shlex.quote(k), shlex.quote(v))
+                                                          for k, v in task['env'].items()]) + '\n')
+    for name in ('start.sh', 'run_notebook.py'):
+        shutil.copyfile(os.path.join(runtime_dir, name), os.path.join(task_directory, name))
+
+    zip_name = os.path.join(workdir, 'ffdl-' + str(task['id'])[:8] + '.zip')
+    with zipfile.ZipFile(zip_name, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for root, dirs, files in os.walk(task_directory):
+            for file in files:
+                print('> Adding file to job archive: ' + file)
+                archive.write(os.path.join(root, file), file)
+    return zip_name
+
+
+def disk_usage(directory):
+    return sum(os.path.getsize(os.path.join(root, file)) for root, dirs, files in os.walk(directory) for file in files)
+
+
+def main():
+    builder = ArchiveBuilder()
+    workdir = tempfile.mkdtemp()
+    results = []
+
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for size in (1024 * 1024, 8 * 1024 * 1024, 32 * 1024 * 1024):
+                task = dict(notebook=NOTEBOOK, env={'MODEL': 'resnet'}, dependencies=dependencies(size))
+                tasks = [dict(task, id=uuid.uuid4()) for i in range(TASKS)]
+
+                before = disk_usage(workdir)
+                start = time.perf_counter()
+                for t in tasks:
+                    legacy_build(t, workdir, builder.runtime_dir)
+                legacy = (time.perf_counter() - start) / TASKS
+                legacy_growth = disk_usage(workdir) - before
+
+                tempfile.tempdir = workdir
+                before = disk_usage(workdir)
+                start = time.perf_counter()
+                for t in tasks:
+                    with builder.build(t) as buffer:
+                        buffer.read()
+                in_memory = (time.perf_counter() - start) / TASKS
+                in_memory_growth = disk_usage(workdir) - before
+                tempfile.tempdir = None
+
+                results.append((size, legacy, legacy_growth, in_memory, in_memory_growth))
+    finally:
+        shutil.rmtree(workdir)
+
+    print('{:>10} {:>14} {:>16} {:>16} {:>18}'.format('payload', 'legacy (ms)', 'legacy tmp (MB)',
+                                                      'in-memory (ms)', 'in-memory tmp (MB)'))
+    for size, legacy, legacy_growth, in_memory, in_memory_growth in results:
+        print('{:>8}MB {:>14.1f} {:>16.1f} {:>16.1f} {:>18.1f}'.format(
+            size // (1024 * 1024), legacy * 1000, legacy_growth / 1024 / 1024,
+            in_memory * 1000, in_memory_growth / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
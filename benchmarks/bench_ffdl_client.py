@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""FfDL submissions/sec against a local mock FfDL server: a new client (and
+connection) per submission vs the pooled keep-alive clients.
+
+    PYTHONPATH=. python benchmarks/bench_ffdl_client.py
+"""
+
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from ffdl.client import Config
+
+from enterprise_scheduler.ffdl_client import FfDLClientPool, StreamingFfDLClient
+from tests.ffdl_server import FfDLServer
+
+SUBMISSIONS = 1000
+USER_INFO = 'bluemix-instance-id=test-user'
+ARCHIVE = os.urandom(64 * 1024)
+
+
+def files():
+    return {'model_definition': ('model.zip', io.BytesIO(ARCHIVE)),
+            'manifest': ('manifest.yml', io.BytesIO(b'name: manifest\n'))}
+
+
+def submit_with_new_client(endpoint):
+    config = Config(api_endpoint=endpoint, user='user', password='temporary', user_info=USER_INFO)
+    return StreamingFfDLClient(config).post('/models', **files())
+
+
+def run(submit, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(lambda i: submit(), range(SUBMISSIONS)))
+        elapsed = time.perf_counter() - start
+    assert all('model_id' in result for result in results)
+    return SUBMISSIONS / elapsed
+
+
+def main():
+    server = FfDLServer().start()
+    rows = []
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for threads in (1, 4, 16):
+                before = run(lambda: submit_with_new_client(server.endpoint), threads)
+
+                pool = FfDLClientPool(max_concurrency=threads)
+                after = run(lambda: pool.client(server.endpoint, 'user', USER_INFO).post('/models', **files()),
+                            threads)
+                pool.close()
+                rows.append((threads, before, after))
+    finally:
+        server.stop()
+
+    print('{:>8} {:>20} {:>17} {:>9}'.format('threads', 'new client (sub/s)', 'pooled (sub/s)', 'speedup'))
+    for threads, before, after in rows:
+        print('{:>8} {:>20.0f} {:>17.0f} {:>8.1f}x'.format(threads, before, after, after / before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Import time of the scheduler modules, from `python -X importtime` in fresh interpreters.
+
+    PYTHONPATH=. python benchmarks/bench_import.py
+
+Reports the median cumulative import time of every module over RUNS runs,
+and exits with an error when the modules needed to start the server import
+executor dependencies (they are only loaded when a task first needs them)
+or requests (loaded to fetch the first remote notebook).
+"""
+
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+
+MODULES = (
+    'enterprise_scheduler.scheduler',
+    'enterprise_scheduler.scheduler_application',
+    'enterprise_scheduler.jupyter_executor',
+    'enterprise_scheduler.ffdl_executor',
+)
+
+# must not be imported by the modules starting the server
+STARTUP_MODULES = ('enterprise_scheduler.scheduler', 'enterprise_scheduler.scheduler_application')
+EXECUTOR_DEPENDENCIES = ('nbformat', 'yaml', 'ffdl', 'enterprise_gateway', 'pkg_resources', 'requests')
+
+
+def import_times(module):
+    """Cumulative import time (microseconds) of every module imported by importing module"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            self_time, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    failures = []
+    print('{:<45} {:>10}'.format('module', 'ms'))
+    for module in MODULES:
+        runs = [import_times(module) for i in range(RUNS)]
+        print('{:<45} {:>10.1f}'.format(module, statistics.median(run[module] for run in runs) / 1000))
+        if module in STARTUP_MODULES:
+            imported = sorted(name for name in runs[0] if name.split('.')[0] in EXECUTOR_DEPENDENCIES)
+            failures.extend('{} imports {}'.format(module, name) for name in imported if '.' not in name)
+
+    for failure in failures:
+        print('FAIL: ' + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Per-task logging overhead of Jupyter executions of a notebook with large cells and outputs.
+
+    PYTHONPATH=. python benchmarks/bench_logging.py
+
+Kernels are simulated (tests/fake_gateway.py) and execute instantly, so the
+time per task is dominated by logging. 'synchronous' writes every record,
+untruncated, from the executing thread, the way the former print calls did.
+"""
+
+import logging
+import tempfile
+import time
+
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.log import configure_logging, shutdown_logging
+from tests.fake_gateway import FakeGateway
+
+CELLS = 50
+CELL_SIZE = 64 * 1024
+TASKS = 50
+
+
+def notebook():
+    source = '# ' + 'x' * CELL_SIZE
+    cells = [dict(cell_type='code', source=source, metadata={}, outputs=[], execution_count=None)
+             for i in range(CELLS)]
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=cells)
+
+
+def run(executor, task):
+    start = time.perf_counter()
+    for i in range(TASKS):
+        executor.execute_task(dict(task, id=i))
+    return (time.perf_counter() - start) / TASKS
+
+
+def synchronous(stream, level):
+    logger = logging.getLogger('enterprise_scheduler')
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return lambda: (logger.removeHandler(handler), setattr(logger, 'propagate', True))
+
+
+def main():
+    executor = JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.001, launcher_factory=FakeGateway()))
+    task = dict(endpoint='localhost:8888', kernelspec='python3', notebook=notebook())
+    executor.execute_task(task)
+
+    configurations = [
+        ('none', 'WARNING', lambda stream: synchronous(stream, 'WARNING')),
+        ('synchronous', 'DEBUG', lambda stream: synchronous(stream, 'DEBUG')),
+        ('queued', 'DEBUG', lambda stream: configure_logging(level='DEBUG', levels='', stream=stream)
+         and shutdown_logging),
+        ('queued', 'INFO', lambda stream: configure_logging(level='INFO', levels='', stream=stream)
+         and shutdown_logging),
+    ]
+
+    print('{} tasks of {} cells of {} KB'.format(TASKS, CELLS, CELL_SIZE // 1024))
+    print('{:>12} {:>7} {:>14} {:>12}'.format('handler', 'level', 'ms per task', 'log bytes'))
+    for name, level, configure in configurations:
+        with tempfile.TemporaryFile('w+') as stream:
+            stop = configure(stream)
+            elapsed = run(executor, task)
+            stop()
+            size = stream.tell()
+        print('{:>12} {:>7} {:>14.2f} {:>12}'.format(name, level, elapsed * 1000, size))
+
+    executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Time and peak memory of loading large notebooks with embedded images, per task.
+
+    PYTHONPATH=. python benchmarks/bench_notebook_loading.py
+
+Notebooks of 10 to 50 MB hold one IMAGE_SIZE base64 PNG output per code
+cell. For a remote notebook read from the notebook cache:
+
+- roundtrip: json.loads on submission, then nbformat.reads(json.dumps(...))
+  in the executor (the previous path);
+- first load: NotebookLoader.load of content never seen before;
+- cached load: NotebookLoader.load of content already loaded, as for every
+  task but the first submitting the same notebook.
+
+Executors then use the loaded notebook as is (load_notebook returns it).
+"""
+
+import base64
+import json
+import os
+import time
+import tracemalloc
+
+import nbformat
+
+from enterprise_scheduler.notebook import NotebookLoader, load_notebook
+
+IMAGE_SIZE = 1024 * 1024
+RUNS = 3
+
+
+def notebook_content(megabytes):
+    image = base64.b64encode(os.urandom(IMAGE_SIZE * 3 // 4)).decode('ascii')
+    cells = []
+    for i in range(megabytes):
+        cells.append(dict(cell_type='markdown', source=['## Plot {}\n'.format(i), 'Some text'], metadata={}))
+        cells.append(dict(cell_type='code', source=['import matplotlib\n', 'plot({})'.format(i)], metadata={},
+                          execution_count=i + 1,
+                          outputs=[dict(output_type='display_data', metadata={},
+                                        data={'image/png': image, 'text/plain': ['<Figure>']})]))
+    return json.dumps(dict(nbformat=4, nbformat_minor=2, metadata={}, cells=cells))
+
+
+def roundtrip(content, loader):
+    notebook = json.loads(content)
+    return nbformat.reads(json.dumps(notebook), as_version=4)
+
+
+def load(content, loader):
+    return load_notebook(loader.load(content))
+
+
+def measure(function, content, cached=False):
+    """Best time and peak memory of function, given a fresh loader or one that already loaded content"""
+    def loader():
+        notebook_loader = NotebookLoader()
+        if cached:
+            notebook_loader.load(content)
+        return notebook_loader
+
+    times = []
+    for i in range(RUNS):
+        notebook_loader = loader()
+        start = time.perf_counter()
+        function(content, notebook_loader)
+        times.append(time.perf_counter() - start)
+
+    notebook_loader = loader()
+    tracemalloc.start()
+    function(content, notebook_loader)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    print('{:>6} {:>12} {:>10} {:>14}'.format('MB', 'path', 'ms', 'peak MB'))
+    for megabytes in (10, 25, 50):
+        content = notebook_content(megabytes)
+        for name, function, cached in (('roundtrip', roundtrip, False), ('first load', load, False),
+                                       ('cached load', load, True)):
+            elapsed, peak = measure(function, content, cached)
+            print('{:>6.0f} {:>12} {:>10.1f} {:>14.1f}'.format(len(content) / 1024 / 1024, name, elapsed * 1000,
+                                                               peak / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Enqueue/dequeue throughput of task envelopes in the scheduler priority queue.
+
+    PYTHONPATH=. python benchmarks/bench_priority_queue.py
+
+The per operation cost should only grow logarithmically with the queue size.
+"""
+
+import queue
+import random
+import time
+
+from enterprise_scheduler.task import TaskEnvelope
+
+SIZES = (1000, 10000, 100000)
+
+
+def run(size):
+    random.seed(size)
+    tasks = [dict(id=i, priority=random.randint(0, 9)) for i in range(size)]
+
+    task_queue = queue.PriorityQueue()
+    start = time.perf_counter()
+    for task in tasks:
+        task_queue.put(TaskEnvelope.from_task(task))
+    enqueue = time.perf_counter() - start
+
+    start = time.perf_counter()
+    previous = None
+    while not task_queue.empty():
+        envelope = task_queue.get()
+        assert previous is None or not envelope < previous
+        previous = envelope
+    dequeue = time.perf_counter() - start
+
+    print('{:>8} {:>14.0f} {:>14.0f} {:>12.2f} {:>12.2f}'.format(
+        size, size / enqueue, size / dequeue, enqueue / size * 1e6, dequeue / size * 1e6))
+
+
+def main():
+    print('{:>8} {:>14} {:>14} {:>12} {:>12}'.format(
+        'tasks', 'enqueue/s', 'dequeue/s', 'put (us)', 'get (us)'))
+    for size in SIZES:
+        run(size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Memory held by 10k and 100k queued tasks, with payloads kept in memory vs spilled to the blob store.
+
+    PYTHONPATH=. python benchmarks/bench_queue_memory.py
+
+Every task embeds a distinct notebook with PAYLOAD_SIZE bytes of outputs.
+Each configuration runs in a fresh interpreter, which submits the tasks in
+batches of BATCH_SIZE to a scheduler that is never started (so tasks stay
+queued) and reports its peak RSS growth and the submission throughput.
+Payloads are spilled from SPILL_THRESHOLD bytes (lowered from the default
+for the benchmark to fit in memory at 100k tasks).
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import time
+
+PAYLOAD_SIZE = 8 * 1024
+SPILL_THRESHOLD = 4 * 1024
+BATCH_SIZE = 1000
+
+
+def run(count, spill):
+    from enterprise_scheduler.scheduler import Scheduler
+
+    scheduler = Scheduler(spill_threshold=SPILL_THRESHOLD if spill else 0, max_queued=0)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for batch in range(0, count, BATCH_SIZE):
+        tasks = []
+        for i in range(batch, batch + BATCH_SIZE):
+            notebook = dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+                dict(cell_type='code', source='run = {}'.format(i), metadata={}, execution_count=1,
+                     outputs=[dict(output_type='stream', name='stdout', text=str(i) * (PAYLOAD_SIZE // len(str(i))))])])
+            tasks.append(dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook=notebook))
+        scheduler.schedule_tasks(tasks)
+    elapsed = time.perf_counter() - start
+    growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    blobs = scheduler.blob_store.stats()
+    scheduler.blob_store.close()
+    print(json.dumps(dict(rss_mb=growth / 1024, tasks_per_second=count / elapsed, blob_mb=blobs['bytes'] / 1024 / 1024)))
+
+
+def main():
+    print('{:>8} {:>10} {:>10} {:>10} {:>10}'.format('tasks', 'payloads', 'RSS MB', 'disk MB', 'tasks/s'))
+    for count in (10000, 100000):
+        for spill in (False, True):
+            output = subprocess.check_output([sys.executable, __file__, str(count), str(int(spill))],
+                                             universal_newlines=True)
+            result = json.loads(output.strip().splitlines()[-1])
+            print('{:>8} {:>10} {:>10.0f} {:>10.0f} {:>10.0f}'.format(
+                count, 'spilled' if spill else 'in memory', result['rss_mb'], result['blob_mb'],
+                result['tasks_per_second']))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        run(int(sys.argv[1]), bool(int(sys.argv[2])))
+    else:
+        main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Schedule registration and firing throughput of ScheduleManager, and the
+effect of jitter on the peak submission rate of schedules sharing a fire time.
+
+    PYTHONPATH=. python benchmarks/bench_schedules.py
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from threading import Condition
+
+from enterprise_scheduler.schedules import ScheduleManager, SQLiteScheduleStore
+
+TASK = dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook={'cells': []})
+
+
+class Recorder:
+    def __init__(self):
+        self.times = []
+        self.condition = Condition()
+
+    def validate_task(self, task):
+        pass
+
+    def schedule_task(self, task):
+        with self.condition:
+            self.times.append(time.time())
+            self.condition.notify_all()
+
+    def wait_for(self, count):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.times) >= count, 60)
+
+
+def run(count, jitter, store):
+    recorder = Recorder()
+    manager = ScheduleManager(recorder, store)
+    manager.start()
+
+    fire_at = time.time() + 2
+    start = time.perf_counter()
+    for i in range(count):
+        manager.add(dict(task=TASK, run_at=fire_at, jitter=jitter))
+    add_rate = count / (time.perf_counter() - start)
+
+    recorder.wait_for(count)
+    manager.stop()
+    fire_rate = count / (max(recorder.times) - min(recorder.times) or 1e-9)
+    peak = max(Counter(int(t * 10) for t in recorder.times).values()) * 10
+    return add_rate, fire_rate, peak
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    rows = []
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for count in (10000, 50000):
+                for persistent in (False, True):
+                    for jitter in (0, 10):
+                        store = SQLiteScheduleStore(os.path.join(directory, 'schedules-{}-{}.db'.format(
+                            count, jitter))) if persistent else None
+                        rows.append((count, 'sqlite' if persistent else 'memory', jitter) + run(count, jitter, store))
+                        if store is not None:
+                            store.close()
+    finally:
+        shutil.rmtree(directory)
+
+    print('{:>9} {:>8} {:>8} {:>12} {:>13} {:>17}'.format(
+        'schedules', 'store', 'jitter', 'adds/s', 'fires/s', 'peak submits/s'))
+    for count, store, jitter, add_rate, fire_rate, peak in rows:
+        print('{:>9} {:>8} {:>7}s {:>12.0f} {:>13.0f} {:>17.0f}'.format(
+            count, store, jitter, add_rate, fire_rate, peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Load test of task submissions to the REST API: throughput and latency of POST /scheduler/tasks.
+
+    PYTHONPATH=. python benchmarks/bench_server.py
+    PYTHONPATH=. python benchmarks/bench_server.py --url http://scheduler:5000 --clients 64
+
+Without --url, the Flask development server (what main() used to run) and
+SchedulerServer are started in process, with tasks executed by a no-op
+executor, and loaded in turn. Clients run in separate processes so they do
+not compete with the server for the GIL; every client keeps its connection
+alive and submits tasks back to back for --duration seconds.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+os.environ.setdefault('EGS_TASK_STORE', os.path.join(tempfile.mkdtemp(), 'tasks.db'))
+
+CLIENT_PROCESSES = 4
+
+
+class NoopExecutor:
+    TYPE = 'noop'
+
+    def execute_task(self, task):
+        pass
+
+
+def client_process(url, threads, duration, executor, results):
+    """Submit tasks from threads sessions until the duration expires, reporting the latencies"""
+    body = json.dumps(dict(executor=executor, notebook=dict(cells=[], metadata={}, nbformat=4, nbformat_minor=2)))
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.post(url + '/scheduler/tasks', data=body)
+                ok = response.status_code == 201
+            except requests.RequestException:
+                ok = False
+            (latencies if ok else errors).append(time.perf_counter() - start)
+
+    clients = [threading.Thread(target=client) for i in range(threads)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    results.put((latencies, len(errors)))
+
+
+def load(url, clients, duration, executor):
+    processes = min(CLIENT_PROCESSES, clients)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=client_process,
+                                       args=(url, clients // processes + (i < clients % processes), duration,
+                                             executor, results))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    latencies, errors = [], 0
+    for worker in workers:
+        worker_latencies, worker_errors = results.get()
+        latencies.extend(worker_latencies)
+        errors += worker_errors
+    for worker in workers:
+        worker.join()
+
+    latencies.sort()
+    if not latencies:
+        return 0, 0, 0, 0, errors
+
+    def percentile(p):
+        return latencies[int(p * (len(latencies) - 1))] * 1000
+
+    return len(latencies) / duration, percentile(0.5), percentile(0.95), percentile(0.99), errors
+
+
+def serve_in_process(development, threads):
+    """Start a server of the REST API on a free port, returning its url and a function stopping it"""
+    from werkzeug.serving import make_server
+
+    from enterprise_scheduler import scheduler_resource
+    from enterprise_scheduler.scheduler_application import create_app
+    from enterprise_scheduler.server import SchedulerServer
+
+    scheduler_resource.start_scheduler().executors[NoopExecutor.TYPE] = NoopExecutor()
+    app = create_app('localhost:8888', 'python3')
+
+    if development:
+        # what app.run() starts: a thread per request
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return 'http://127.0.0.1:{}'.format(server.server_port), server.shutdown
+
+    server = SchedulerServer(app, port=0, threads=threads).start()
+    return server.url(), server.stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='scheduler to load, instead of in process servers')
+    parser.add_argument('--executor', default=NoopExecutor.TYPE, help='executor of the submitted tasks')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=32, help='SchedulerServer threads')
+    args = parser.parse_args()
+
+    if args.url:
+        targets = [(args.url, args.url, None)]
+    else:
+        targets = [(name,) + serve_in_process(name == 'development', args.threads)
+                   for name in ('development', 'production')]
+
+    print('{:>12} {:>8} {:>10} {:>9} {:>9} {:>9} {:>7}'.format(
+        'server', 'clients', 'req/s', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'errors'))
+    for name, url, stop in targets:
+        for clients in args.clients:
+            throughput, p50, p95, p99, errors = load(url, clients, args.duration, args.executor)
+            print('{:>12} {:>8} {:>10.0f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7}'.format(
+                name, clients, throughput, p50, p95, p99, errors))
+        if stop is not None:
+            stop()
+
+
+if __name__ == '__main__':
+    main()
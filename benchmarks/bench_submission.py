@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Submission latency of tasks referencing a notebook_location on a slow notebook server.
+
+    PYTHONPATH=. python benchmarks/bench_submission.py
+
+Compares resolving notebooks inline in schedule_task (prefetch_threads=0)
+with the prefetch stage. Every task uses a distinct URL so that the notebook
+cache does not hide the slow server.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from enterprise_scheduler.notebook_cache import NotebookCache
+from enterprise_scheduler.scheduler import Scheduler
+from tests.notebook_server import NotebookServer
+
+CLIENTS = 8
+TASKS = 200
+SERVER_DELAY = 0.2
+NOTEBOOK = json.dumps(dict(cells=[], metadata={}, nbformat=4, nbformat_minor=2))
+
+
+class NoopExecutor:
+    TYPE = 'noop'
+
+    def execute_task(self, task):
+        pass
+
+
+def run(name, server, prefetch_threads):
+    scheduler = Scheduler(prefetch_threads=prefetch_threads,
+                          notebook_cache=NotebookCache(pool_size=max(prefetch_threads, CLIENTS)))
+    scheduler.executors[NoopExecutor.TYPE] = NoopExecutor()
+    scheduler.start()
+
+    def submit(i):
+        start = time.perf_counter()
+        scheduler.schedule_task(dict(executor=NoopExecutor.TYPE,
+                                     endpoint='localhost:8888',
+                                     kernelspec='python3',
+                                     notebook_location=server.url('/notebook.ipynb?{}-{}'.format(name, i))))
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as clients:
+        latencies = sorted(clients.map(submit, range(TASKS)))
+    submitted = time.perf_counter() - start
+    scheduler.stop()
+
+    return (name, TASKS / submitted,
+            latencies[int(0.50 * (len(latencies) - 1))] * 1000,
+            latencies[int(0.99 * (len(latencies) - 1))] * 1000)
+
+
+def main():
+    server = NotebookServer(delay=SERVER_DELAY).start()
+    # serve every query string variant of the notebook
+    server.notebooks = _AnyQuery(NOTEBOOK)
+    results = []
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            results.append(run('inline', server, 0))
+            results.append(run('prefetch', server, 32))
+    finally:
+        server.stop()
+
+    print('{:>10} {:>14} {:>10} {:>10}'.format('mode', 'submits/s', 'p50 (ms)', 'p99 (ms)'))
+    for name, throughput, p50, p99 in results:
+        print('{:>10} {:>14.0f} {:>10.2f} {:>10.2f}'.format(name, throughput, p50, p99))
+
+
+class _AnyQuery(dict):
+    def __init__(self, content):
+        super().__init__()
+        self.content = content
+
+    def get(self, path, default=None):
+        return self.content
+
+
+if __name__ == '__main__':
+    main()
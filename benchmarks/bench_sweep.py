@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Wall clock of running a notebook with RUNS parameter sets as separate tasks vs one sweep task.
+
+    PYTHONPATH=. python benchmarks/bench_sweep.py
+
+Kernels are simulated (tests/fake_gateway.py): every cell takes CELL_TIME
+seconds and a kernel takes STARTUP_PROBES readiness probes to start.
+Separate tasks run one at a time, the way a single worker pool processes
+them; the sweep fans out over PARALLELISM pooled kernels.
+"""
+
+import time
+
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from tests.fake_gateway import FakeGateway
+
+CELL_TIME = 0.005
+CELLS = 10
+STARTUP_PROBES = 20
+PARALLELISM = 8
+
+
+def notebook():
+    cells = [dict(cell_type='code', source='lr = 0.1', metadata=dict(tags=['parameters']), outputs=[],
+                  execution_count=None)]
+    cells.extend(dict(cell_type='code', source='x{} = lr * {}'.format(i, i), metadata={}, outputs=[],
+                      execution_count=None) for i in range(CELLS))
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=cells)
+
+
+def executor():
+    gateway = FakeGateway(probes_until_ready=STARTUP_PROBES, execution_time=CELL_TIME)
+    return JupyterExecutor(kernel_pool=KernelPool(max_size=PARALLELISM, readiness_interval=0.001,
+                                                  launcher_factory=gateway))
+
+
+def separate(runs):
+    jupyter = executor()
+    task = dict(endpoint='localhost:8888', kernelspec='python3', notebook=notebook())
+    start = time.perf_counter()
+    for run in range(runs):
+        jupyter.execute_task(dict(task, parameters=dict(lr=run)))
+    elapsed = time.perf_counter() - start
+    jupyter.shutdown()
+    return elapsed
+
+
+def sweep(runs):
+    jupyter = executor()
+    task = dict(endpoint='localhost:8888', kernelspec='python3', notebook=notebook(),
+                sweep=dict(lr=list(range(runs))), sweep_parallelism=PARALLELISM)
+    start = time.perf_counter()
+    jupyter.execute_task(task)
+    elapsed = time.perf_counter() - start
+    jupyter.shutdown()
+    return elapsed
+
+
+def main():
+    print('{:>6} {:>14} {:>10} {:>9}'.format('runs', 'separate (s)', 'sweep (s)', 'speedup'))
+    for runs in (8, 32, 128):
+        separate_time, sweep_time = separate(runs), sweep(runs)
+        print('{:>6} {:>14.2f} {:>10.2f} {:>8.1f}x'.format(runs, separate_time, sweep_time,
+                                                          separate_time / sweep_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Task submission throughput with durability off (in-memory) and on (SQLite).
+
+    PYTHONPATH=. python benchmarks/bench_task_store.py
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.task_store import SQLiteTaskStore, TaskStore
+
+TASKS = 20000
+NOTEBOOK = os.path.join(os.path.dirname(__file__), '..', 'tests', 'resources', 'simple.ipynb')
+
+
+def run(name, task_store, notebook):
+    scheduler = Scheduler(task_store=task_store)
+
+    start = time.perf_counter()
+    for i in range(TASKS):
+        scheduler.schedule_task(dict(executor='jupyter',
+                                     endpoint='localhost:8888',
+                                     kernelspec='python3',
+                                     notebook=notebook))
+    submitted = time.perf_counter() - start
+    task_store.flush()
+    committed = time.perf_counter() - start
+
+    return name, TASKS / submitted, TASKS / committed
+
+
+def main():
+    with open(NOTEBOOK) as f:
+        notebook = json.load(f)
+
+    directory = tempfile.mkdtemp()
+    results = []
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            results.append(run('memory', TaskStore(), notebook))
+            store = SQLiteTaskStore(os.path.join(directory, 'tasks.db'))
+            results.append(run('sqlite', store, notebook))
+            store.close()
+    finally:
+        shutil.rmtree(directory)
+
+    print('{:>8} {:>16} {:>16}'.format('store', 'submitted/s', 'committed/s'))
+    for name, submitted, committed in results:
+        print('{:>8} {:>16.0f} {:>16.0f}'.format(name, submitted, committed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Throughput of a scheduler whose workers are all taken by hanging notebooks.
+
+    PYTHONPATH=. python benchmarks/bench_timeouts.py
+
+THREADS hanging tasks (a cell that never returns) are submitted ahead of
+TASKS short ones. Kernels are simulated (tests/fake_gateway.py), every cell
+takes CELL_TIME seconds. Without a timeout the hanging tasks hold every
+worker, and no short task completes within WINDOW seconds; with a cell
+timeout, or when the hanging tasks are cancelled, their workers are freed
+right away while the kernels are interrupted in the background.
+"""
+
+import logging
+import time
+
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.scheduler import Scheduler
+from tests.fake_gateway import FakeGateway
+
+THREADS = 4
+TASKS = 200
+CELL_TIME = 0.005
+CELL_TIMEOUT = 0.25
+WINDOW = 2
+
+
+def task(source, **properties):
+    cells = [dict(cell_type='code', source=source, metadata={}, outputs=[], execution_count=None)] * 3
+    return dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3',
+                notebook=dict(nbformat=4, nbformat_minor=2, metadata={}, cells=cells), **properties)
+
+
+def run(mode):
+    gateway = FakeGateway(probes_until_ready=0, execution_time=CELL_TIME, hang_on='hang()')
+    scheduler = Scheduler(number_of_threads=THREADS, pool_sizes={})
+    scheduler.register_executor(JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.001,
+                                                                       launcher_factory=gateway)))
+    properties = dict(cell_timeout=CELL_TIMEOUT) if mode == 'cell timeout' else {}
+    hanging = scheduler.schedule_tasks([task('hang()', priority=1, **properties) for i in range(THREADS)])
+    short = scheduler.schedule_tasks([task('x = 1') for i in range(TASKS)])
+
+    start = time.perf_counter()
+    scheduler.start()
+    if mode == 'cancel':
+        time.sleep(CELL_TIMEOUT)
+        for task_id in hanging:
+            scheduler.cancel_task(task_id)
+
+    while time.perf_counter() - start < WINDOW:
+        completed = sum(scheduler.task_store.get(task_id)['state'] == 'succeeded' for task_id in short)
+        if completed == TASKS:
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    for task_id in hanging:
+        scheduler.cancel_task(task_id)
+    scheduler.stop()
+    return completed, elapsed, len(gateway.started)
+
+
+def main():
+    # every timed out task is logged as an error
+    logging.getLogger('enterprise_scheduler').setLevel(logging.CRITICAL)
+    print('{:>14} {:>10} {:>10} {:>8}'.format('hanging tasks', 'completed', 'seconds', 'kernels'))
+    for mode in ('no timeout', 'cell timeout', 'cancel'):
+        completed, elapsed, kernels = run(mode)
+        print('{:>14} {:>10} {:>10.2f} {:>8}'.format(mode, '{}/{}'.format(completed, TASKS), elapsed, kernels))
+
+
+if __name__ == '__main__':
+    main()
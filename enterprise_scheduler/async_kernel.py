@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import logging
+import os
+from uuid import uuid4
+
+from tornado.escape import json_decode, json_encode, utf8
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import websocket_connect
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv('EGS_KERNEL_CONNECT_TIMEOUT', 20))
+
+
+class _Execution:
+    """Outputs of an execute request, resolved once both its reply and the idle status are received"""
+
+    __slots__ = ('result', 'text', 'has_error', 'replied', 'idle')
+
+    def __init__(self, result):
+        self.result = result
+        self.text = []
+        self.has_error = False
+        self.replied = False
+        self.idle = False
+
+    def add(self, message):
+        # parsed like the Enterprise Gateway KernelClient does
+        msg_type = message['msg_type']
+        content = message['content']
+        if msg_type == 'error' or (msg_type == 'execute_reply' and content.get('status') == 'error'):
+            self.has_error = True
+            self.text.append('{}:{}:{}'.format(content.get('ename'), content.get('evalue'), content.get('traceback')))
+        elif msg_type == 'stream':
+            self.text.append(content['text'])
+        elif msg_type in ('execute_result', 'display_data'):
+            data = content.get('data', {})
+            if 'text/plain' in data:
+                self.text.append(data['text/plain'])
+            elif 'text/html' in data:
+                self.text.append(data['text/html'])
+
+        if msg_type == 'execute_reply':
+            self.replied = True
+        elif msg_type == 'status' and content.get('execution_state') == 'idle':
+            self.idle = True
+        if self.replied and self.idle and not self.result.done():
+            self.result.set_result((''.join(self.text), self.has_error))
+
+
+class AsyncKernelConnection:
+    """Websocket connection to the channels of a gateway kernel, executing cells as coroutines.
+
+    Responses are read by a single coroutine and routed to the pending
+    executions by the id of their request, so executing a cell holds no
+    thread while the kernel runs it."""
+
+    def __init__(self, url, connect_timeout=DEFAULT_CONNECT_TIMEOUT):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self._socket = None
+        self._reader = None
+        self._pending = {}
+
+    async def connect(self):
+        self._socket = await websocket_connect(HTTPRequest(self.url, connect_timeout=self.connect_timeout))
+        self._reader = asyncio.ensure_future(self._read())
+        return self
+
+    async def execute(self, code):
+        """Execute code on the kernel, returning its (text, has_error) output like KernelClient.execute"""
+        if self._socket is None or self._reader.done():
+            raise ConnectionError('Not connected to kernel channels {}'.format(self.url))
+        msg_id = uuid4().hex
+        execution = self._pending[msg_id] = _Execution(asyncio.get_event_loop().create_future())
+        try:
+            await self._socket.write_message(self._execute_request(msg_id, code))
+            return await execution.result
+        finally:
+            self._pending.pop(msg_id, None)
+
+    def close(self):
+        """Close the connection, failing the pending executions at once"""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._reader is not None:
+            self._reader.cancel()
+
+    async def _read(self):
+        socket = self._socket
+        try:
+            while True:
+                raw_message = await socket.read_message()
+                if raw_message is None:
+                    break
+                message = json_decode(utf8(raw_message))
+                execution = self._pending.get((message.get('parent_header') or {}).get('msg_id'))
+                if execution is not None:
+                    execution.add(message)
+        except Exception as error:
+            logger.warning('Error reading from kernel channels %s: %s', self.url, error)
+        finally:
+            for execution in self._pending.values():
+                if not execution.result.done():
+                    execution.result.set_exception(
+                        ConnectionError('Connection to kernel channels {} closed'.format(self.url)))
+
+    @staticmethod
+    def _execute_request(msg_id, code):
+        return json_encode({
+            'header': {'username': '', 'version': '5.0', 'session': '', 'msg_id': msg_id,
+                       'msg_type': 'execute_request'},
+            'parent_header': {},
+            'channel': 'shell',
+            'content': {'code': code, 'silent': False, 'store_history': False, 'user_expressions': {},
+                        'allow_stdin': False},
+            'metadata': {},
+            'buffers': {},
+        })
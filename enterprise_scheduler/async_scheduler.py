@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event, Lock, Thread
+
+from enterprise_scheduler import metrics
+from enterprise_scheduler.executor import TaskCancelled
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.worker_pool import DEFAULT_MAX_QUEUED, SchedulerBusy, _SHUTDOWN
+
+logger = logging.getLogger(__name__)
+
+
+class _AsyncTaskQueue(asyncio.PriorityQueue):
+    """Priority queue of task envelopes of the event loop, from which queued tasks can be removed"""
+
+    def remove(self, task_id):
+        """Remove the envelope of a queued task, returning it or None when not queued"""
+        task_id = str(task_id)
+        for index, item in enumerate(self._queue):
+            if item is not _SHUTDOWN and str(item.id) == task_id:
+                last = self._queue.pop()
+                if index < len(self._queue):
+                    self._queue[index] = last
+                    heapq.heapify(self._queue)
+                self.task_done()
+                return item
+        return None
+
+
+class AsyncScheduler(Scheduler):
+    """Scheduler running every task as a coroutine on a single event loop.
+
+    Executors providing an ``execute_task_async`` coroutine are driven directly
+    by the loop, so the number of concurrent notebooks is bounded by
+    max_concurrency and the per gateway endpoint gateway_capacity rather than
+    by the number of OS threads. The Jupyter executor executes the cells of
+    linear notebooks over the kernel websockets this way. Executors only
+    providing the blocking ``execute_task`` (the FfDL executor), as well as
+    Jupyter sweeps and DAG notebooks, run on a thread pool of max_concurrency
+    threads and take a thread per running task."""
+
+    def __init__(self, default_gateway_host=None, default_kernelspec=None,
+                 max_concurrency=100, gateway_capacity=None, task_store=None, result_store=None,
+                 max_queued=DEFAULT_MAX_QUEUED):
+        super().__init__(default_gateway_host, default_kernelspec,
+                         number_of_threads=max_concurrency, task_store=task_store, result_store=result_store,
+                         pool_sizes={}, max_queued=max_queued)
+        self.max_concurrency = max_concurrency
+        self.gateway_capacity = gateway_capacity
+
+        self.loop = None
+        self._thread_pool = None
+        self._loop_thread = None
+        self._async_queue = None
+        self._gateway_semaphores = {}
+        self._loop_lock = Lock()
+
+    def start(self):
+        self._recover_tasks()
+        ready = Event()
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self._thread_pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self.loop.set_default_executor(self._thread_pool)
+
+        self._loop_thread = Thread(target=self._run_loop, args=(ready,))
+        self._loop_thread.daemon = True
+        self._loop_thread.start()
+        ready.wait()
+
+    def stop(self, drain=True):
+        """Stop the event loop, executing queued tasks first when drain is True"""
+        self.running = False
+        self._stop_prefetch(drain)
+        if self._loop_thread is None:
+            return
+
+        with self._loop_lock:
+            self.loop.call_soon_threadsafe(self._shutdown_workers, drain)
+
+        self._loop_thread.join()
+        self._loop_thread = None
+        self._thread_pool.shutdown(wait=True)
+        self._thread_pool = None
+        self.loop.close()
+        self.loop = None
+        self._shutdown_executors()
+        self.task_store.flush()
+        self.blob_store.close()
+
+    def _reserve(self, envelopes):
+        if not self.max_queued:
+            return
+        with self._loop_lock:
+            queued = self._async_queue.qsize() if self._async_queue is not None else self.queue.qsize()
+        if queued + len(envelopes) > self.max_queued:
+            raise SchedulerBusy('The scheduler has reached its limit of {} queued tasks'.format(self.max_queued))
+
+    def _enqueue(self, envelope):
+        with self._loop_lock:
+            if self.loop is not None and self.loop.is_running():
+                self.loop.call_soon_threadsafe(self._async_queue.put_nowait, envelope)
+            else:
+                # not started yet, the envelope is moved to the loop queue on start
+                self.queue.put(item=envelope)
+
+    def _enqueue_many(self, envelopes):
+        with self._loop_lock:
+            if self.loop is not None and self.loop.is_running():
+                self.loop.call_soon_threadsafe(self._put_many, envelopes)
+            else:
+                self.queue.put_many(envelopes)
+
+    def _put_many(self, envelopes):
+        for envelope in envelopes:
+            self._async_queue.put_nowait(envelope)
+
+    def _remove_queued(self, task_id):
+        with self._loop_lock:
+            if self.loop is None or not self.loop.is_running():
+                return super()._remove_queued(task_id)
+            if self._loop_thread is threading.current_thread():
+                return self._async_queue.remove(task_id)
+            # the loop queue is only accessed from the loop thread
+            removed = Future()
+            self.loop.call_soon_threadsafe(lambda: removed.set_result(self._async_queue.remove(task_id)))
+        return removed.result()
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._serve(ready))
+
+    async def _serve(self, ready):
+        with self._loop_lock:
+            self._async_queue = _AsyncTaskQueue()
+            while not self.queue.empty():
+                self._async_queue.put_nowait(self.queue.get_nowait())
+                self.queue.task_done()
+
+        workers = [asyncio.ensure_future(self._worker()) for i in range(self.max_concurrency)]
+        ready.set()
+        await asyncio.gather(*workers)
+
+    async def _worker(self):
+        while True:
+            envelope = await self._async_queue.get()
+            try:
+                if envelope is _SHUTDOWN:
+                    return
+                if self._dispatch(envelope):
+                    started = time.monotonic()
+                    result = await self._execute_task_async(envelope.task)
+                    metrics.observe_stage(metrics.TASK_EXECUTION, time.monotonic() - started)
+                    self._complete(envelope, result=result)
+            except TaskCancelled as cancelled:
+                logger.info('%s', cancelled)
+                self._complete(envelope, error=cancelled)
+            except BaseException as base:
+                logger.error('Error executing task [%s]: %s', envelope.id, base)
+                self._complete(envelope, error=base)
+                if isinstance(base, asyncio.CancelledError):
+                    # the loop is shutting down
+                    raise
+            finally:
+                self._async_queue.task_done()
+
+    async def _execute_task_async(self, task):
+        executor_type = task['executor'].lower()  # Jupyter, Docker, FfDL
+        executor = self.executors[executor_type]
+
+        semaphore = self._gateway_semaphore(task.get('endpoint'))
+        if semaphore is None:
+            return await self._run_executor(executor, task)
+        async with semaphore:
+            return await self._run_executor(executor, task)
+
+    async def _run_executor(self, executor, task):
+        execute_task_async = getattr(executor, 'execute_task_async', None)
+        if execute_task_async is not None:
+            return await execute_task_async(task)
+        return await self.loop.run_in_executor(None, executor.execute_task, task)
+
+    def _gateway_semaphore(self, endpoint):
+        if not self.gateway_capacity:
+            return None
+        semaphore = self._gateway_semaphores.get(endpoint)
+        if semaphore is None:
+            semaphore = self._gateway_semaphores[endpoint] = asyncio.Semaphore(self.gateway_capacity)
+        return semaphore
+
+    def _shutdown_workers(self, drain):
+        if not drain:
+            while not self._async_queue.empty():
+                self._async_queue.get_nowait()
+                self._async_queue.task_done()
+
+        for i in range(self.max_concurrency):
+            self._async_queue.put_nowait(_SHUTDOWN)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import uuid
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_DIR = os.getenv('EGS_BLOB_DIR', os.path.join(tempfile.gettempdir(), 'enterprise_scheduler', 'blobs'))
+# payloads smaller than this stay in memory with their task
+DEFAULT_SPILL_THRESHOLD = int(os.getenv('EGS_SPILL_THRESHOLD', 16 * 1024))
+
+# binary payload contents, spilled dependencies are loaded back as memory maps
+BINARY_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+class BlobStore:
+    """Content-addressed store of task payloads on local disk.
+
+    Blobs are named after the SHA-256 of their content, so payloads shared
+    by several queued tasks are written once, and reference counted: a blob
+    is removed once every task holding it has been started. Blobs are read
+    back memory-mapped.
+
+    The store keeps its blobs in a directory of its own, created under
+    directory on the first write and removed by close(): queued tasks are
+    recovered from the task store, not from blobs, after a restart."""
+
+    def __init__(self, directory=DEFAULT_BLOB_DIR):
+        self.directory = directory
+        self.writes = 0
+        self.deduplicated = 0
+
+        self._path = None
+        self._references = {}
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = Lock()
+
+    def put(self, data, key=None):
+        """Store data, or take another reference on the identical blob, and return its key.
+
+        key, when given, must be the SHA-256 hex digest of data."""
+        key = key or hashlib.sha256(data).hexdigest()
+        if self.retain(key):
+            return key
+
+        path = self._blob_path(key)
+        temporary = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        with open(temporary, 'wb') as f:
+            f.write(data)
+
+        with self._lock:
+            # blobs are only renamed into place and removed with the lock held
+            if key in self._references:
+                self.deduplicated += 1
+                os.remove(temporary)
+            else:
+                self.writes += 1
+                os.replace(temporary, path)
+                self._sizes[key] = len(data)
+                self._total_bytes += len(data)
+            self._references[key] = self._references.get(key, 0) + 1
+        return key
+
+    def retain(self, key):
+        """Take another reference on a stored blob, returning False when there is none"""
+        with self._lock:
+            if key not in self._references:
+                return False
+            self._references[key] += 1
+            self.deduplicated += 1
+            return True
+
+    def get(self, key):
+        """Return the content of a blob, memory-mapped read only"""
+        with open(self._blob_path(key), 'rb') as f:
+            if self._sizes.get(key) == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def release(self, key):
+        """Drop a reference on a blob, removing it once unreferenced"""
+        with self._lock:
+            references = self._references.get(key, 0) - 1
+            if references > 0:
+                self._references[key] = references
+                return
+            if self._references.pop(key, None) is None:
+                return
+            self._total_bytes -= self._sizes.pop(key, 0)
+            try:
+                # mapped blobs stay readable until unmapped
+                os.remove(os.path.join(self._path, key))
+            except OSError as error:
+                logger.warning('Error removing blob %s: %s', key, error)
+
+    def stats(self):
+        with self._lock:
+            return dict(blobs=len(self._references), bytes=self._total_bytes, writes=self.writes,
+                        deduplicated=self.deduplicated)
+
+    def close(self):
+        with self._lock:
+            path, self._path = self._path, None
+            self._references.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+        if path is not None:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _blob_path(self, key):
+        if self._path is None:
+            with self._lock:
+                if self._path is None:
+                    if not os.path.exists(self.directory):
+                        os.makedirs(self.directory, exist_ok=True)
+                    self._path = tempfile.mkdtemp(prefix='store-', dir=self.directory)
+        return os.path.join(self._path, key)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import os
+import time
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
+
+from enterprise_scheduler.executor import TaskCancelled
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.task import TaskEnvelope
+from enterprise_scheduler.task_store import SharedTaskStore, CANCELLED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEARTBEAT_INTERVAL = float(os.getenv('EGS_HEARTBEAT_INTERVAL', 5))
+# seconds between two claims of a node finding the shared queue empty
+DEFAULT_POLL_INTERVAL = float(os.getenv('EGS_POLL_INTERVAL', 0.5))
+# tasks a node claims beyond its threads, so they never wait for the shared queue
+DEFAULT_CLAIM_AHEAD = int(os.getenv('EGS_CLAIM_AHEAD', 2))
+
+
+class ClusterScheduler(Scheduler):
+    """Scheduler node executing the tasks of a queue shared with other nodes.
+
+    Submitted tasks are added to the shared task store, from which every node
+    claims as many tasks as its threads can execute (plus claim_ahead), so the
+    backlog stays in the shared queue for any idle node to pull from. A node
+    finding the queue empty steals tasks another node claimed but has not
+    started yet. Leases of the claimed tasks are renewed every
+    heartbeat_interval seconds; tasks of a node which stops sending heartbeats
+    are queued again once their lease expires. Tasks running in the background
+    (FfDL trainings) stay claimed without counting against the node capacity.
+
+    Results and output streams are kept by the node which executed the task,
+    the other nodes only know which node that is."""
+
+    def __init__(self, default_gateway_host=None, default_kernelspec=None, number_of_threads=5, task_store=None,
+                 claim_ahead=DEFAULT_CLAIM_AHEAD, heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+                 poll_interval=DEFAULT_POLL_INTERVAL, **kwargs):
+        task_store = task_store or SharedTaskStore()
+        if heartbeat_interval >= task_store.lease_seconds:
+            raise ValueError('The heartbeat interval ({}s) must be shorter than the lease ({}s)'.format(
+                heartbeat_interval, task_store.lease_seconds))
+        # the shared queue already keeps the payloads out of memory
+        kwargs.setdefault('spill_threshold', 0)
+        super().__init__(default_gateway_host, default_kernelspec, number_of_threads, task_store, **kwargs)
+        self.node = task_store.node
+        self.claim_ahead = claim_ahead
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+
+        self.claimed = 0
+        self.stolen = 0
+        self.lost = 0
+        self.requeued = 0
+
+        # ids of the tasks claimed by this node and not completed yet
+        self._held = set()
+        # ids of the held tasks running in the background (e.g. FfDL trainings), which use no worker thread
+        self._background = set()
+        # ids of the held tasks whose executor was already told they were cancelled through another node
+        self._signalled = set()
+        self._cluster_lock = Lock()
+        # held while claiming, so no task is claimed once the node is stopping
+        self._claim_lock = Lock()
+        self._wakeup = Event()
+        self._stopped = Event()
+        self._coordinator = None
+
+    @property
+    def capacity(self):
+        return sum(pool.size for pool in self.pools.values()) + self.claim_ahead
+
+    def start(self):
+        super().start()
+        self._stopped.clear()
+        self._coordinator = Thread(target=self._coordinate, name='cluster-{}'.format(self.node))
+        self._coordinator.daemon = True
+        self._coordinator.start()
+
+    def stop(self, drain=True):
+        """Stop claiming tasks, then stop the node as Scheduler.stop() does and give the tasks it
+        claimed but did not execute back to the shared queue"""
+        with self._claim_lock:
+            self.running = False
+
+        # leases are renewed until the tasks being drained are executed
+        super().stop(drain)
+        self._stopped.set()
+        self._wakeup.set()
+        if self._coordinator is not None:
+            self._coordinator.join()
+            self._coordinator = None
+
+        released = self.task_store.release()
+        if released:
+            logger.info('Node %s released %d tasks', self.node, released)
+
+    def cancel_task(self, task_id):
+        cancelled = super().cancel_task(task_id)
+        with self._cluster_lock:
+            held = str(task_id) in self._held
+        if not held:
+            # cancelled in the shared store, its holder (if any) is notified by its heartbeat
+            with self._cancel_lock:
+                self._cancelled.discard(str(task_id))
+        return cancelled
+
+    def cluster_stats(self):
+        with self._cluster_lock:
+            held = len(self._held)
+            background = len(self._background)
+        return dict(nodes=len(self.task_store.nodes()), held=held, background=background,
+                    capacity=self.capacity, claimed=self.claimed,
+                    stolen=self.stolen, lost=self.lost, requeued=self.requeued)
+
+    def _recover_tasks(self):
+        if self._recovered:
+            return
+        self._recovered = True
+        # tasks held by a previous process of this node are not waited for until their lease expires
+        released = self.task_store.release(running=True)
+        if released:
+            logger.info('Node %s queued again %d tasks of its previous process', self.node, released)
+
+    def _enqueue(self, envelope):
+        with self._cluster_lock:
+            held = str(envelope.id) in self._held
+        if held:
+            super()._enqueue(envelope)
+        else:
+            # submitted to this node, and resolved: any node may execute it
+            self.task_store.publish(envelope)
+            self._wakeup.set()
+
+    def _enqueue_many(self, envelopes):
+        # already queued in the shared store by task_store.add_many()
+        self._wakeup.set()
+
+    def _dispatch(self, envelope):
+        if not self.task_store.start(envelope.id):
+            logger.info('Skipping task [%s]: taken over by another node', envelope.id)
+            self._release_payloads(envelope)
+            self._forget(envelope.id)
+            return False
+        return super()._dispatch(envelope)
+
+    def _complete(self, envelope, result=None, error=None):
+        super()._complete(envelope, result, error)
+        if isinstance(result, Future):
+            # still held, its lease renewed, until the future is resolved, without taking a claim slot
+            with self._cluster_lock:
+                if str(envelope.id) in self._held and not result.done():
+                    self._background.add(str(envelope.id))
+            self._wakeup.set()
+        else:
+            self._forget(envelope.id)
+
+    def _forget(self, task_id):
+        with self._cluster_lock:
+            self._held.discard(str(task_id))
+            self._background.discard(str(task_id))
+            self._signalled.discard(str(task_id))
+        self._wakeup.set()
+
+    def _coordinate(self):
+        next_heartbeat = 0
+        while not self._stopped.is_set():
+            try:
+                if time.monotonic() >= next_heartbeat:
+                    next_heartbeat = time.monotonic() + self.heartbeat_interval
+                    self._heartbeat()
+                if self._claim():
+                    continue
+            except Exception as ex:
+                logger.error('Error coordinating node %s: %s', self.node, ex)
+            self._wakeup.wait(min(self.poll_interval, max(next_heartbeat - time.monotonic(), 0)))
+            self._wakeup.clear()
+
+    def _claim(self):
+        """Claim tasks up to the node capacity, returning whether any was claimed"""
+        with self._claim_lock:
+            if not self.running:
+                return False
+            return self._claim_tasks()
+
+    def _claim_tasks(self):
+        with self._cluster_lock:
+            count = self.capacity - len(self._held) + len(self._background)
+        if count <= 0:
+            return False
+
+        tasks = self.task_store.claim(count)
+        stolen = False
+        if not tasks and not any(pool.queue.qsize() for pool in self.pools.values()):
+            tasks = self.task_store.steal(count)
+            stolen = True
+
+        for task in tasks:
+            envelope = TaskEnvelope.from_task(task)
+            with self._cluster_lock:
+                self._held.add(str(envelope.id))
+                self.claimed += 1
+                if stolen:
+                    self.stolen += 1
+            if self._needs_resolution(task):
+                # submitted to a node lost while downloading its notebook
+                self._prefetch(envelope)
+            else:
+                super()._enqueue(envelope)
+        return bool(tasks)
+
+    def _heartbeat(self):
+        with self._cluster_lock:
+            held = set(self._held)
+        states, requeued = self.task_store.heartbeat(len(held))
+        self.requeued += requeued
+
+        for task_id in held.difference(states):
+            # taken over by another node: stolen, or queued again after the lease of this node expired
+            envelope = self._remove_queued(task_id)
+            self._forget(task_id)
+            if envelope is not None:
+                self._release_payloads(envelope)
+                with self._cluster_lock:
+                    self.lost += 1
+
+        for task_id, state in states.items():
+            if state == CANCELLED:
+                self._cancel_held(task_id)
+
+    def _cancel_held(self, task_id):
+        """Stop a task this node holds which was cancelled through another node"""
+        with self._cancel_lock:
+            executor_type = self._running_tasks.get(task_id)
+        if executor_type is not None:
+            with self._cluster_lock:
+                # reported by every heartbeat until the task stops
+                if task_id in self._signalled or task_id not in self._held:
+                    return
+                self._signalled.add(task_id)
+            self.executors[executor_type].cancel_dispatched_task(task_id)
+            return
+
+        envelope = self._remove_queued(task_id)
+        error = TaskCancelled('Task [{}] was cancelled'.format(task_id))
+        if envelope is not None:
+            self._release_payloads(envelope)
+            self._complete(envelope, error=error)
+        else:
+            self.task_store.set_state(task_id, CANCELLED, error)
+            self._forget(task_id)
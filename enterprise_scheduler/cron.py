@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Triggers computing the fire times of recurring and delayed tasks.
+
+Times are epoch seconds; cron expressions are evaluated in UTC."""
+
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+MONTHS = dict((name, index + 1) for index, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')))
+DAYS = dict((name, index) for index, name in enumerate(('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat')))
+
+# cron expressions that never match (e.g. February 30th) are given up after this many years
+MAX_YEARS = 8
+
+
+def _parse_field(field, low, high, names=None):
+    values = set()
+    for part in field.lower().split(','):
+        expression, separator, step = part.partition('/')
+        if separator and (not step.isdigit() or int(step) == 0):
+            raise ValueError('Invalid step "{}"'.format(part))
+        step = int(step) if separator else 1
+
+        if expression == '*':
+            start, end = low, high
+        else:
+            start, dash, end = expression.partition('-')
+            start = _parse_value(start, low, high, names)
+            end = _parse_value(end, low, high, names) if dash else (high if separator else start)
+            if start > end:
+                raise ValueError('Invalid range "{}"'.format(part))
+
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def _parse_value(value, low, high, names):
+    if names and value in names:
+        return names[value]
+    if not value.isdigit() or not low <= int(value) <= high:
+        raise ValueError('Invalid value "{}", expected {}-{}'.format(value, low, high))
+    return int(value)
+
+
+class CronTrigger:
+    """Fires on the minutes matching a 5 field cron expression
+    (minute hour day-of-month month day-of-week) or one of its @aliases"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError('Invalid cron expression "{}": expected 5 fields'.format(expression))
+
+        try:
+            self.minutes = _parse_field(fields[0], 0, 59)
+            self.hours = _parse_field(fields[1], 0, 23)
+            self.days = frozenset(_parse_field(fields[2], 1, 31))
+            self.months = frozenset(_parse_field(fields[3], 1, 12, MONTHS))
+            # 7 is an alias of sunday
+            self.weekdays = frozenset(day % 7 for day in _parse_field(fields[4], 0, 7, DAYS))
+        except ValueError as error:
+            raise ValueError('Invalid cron expression "{}": {}'.format(expression, error))
+
+        # when both days of month and of week are restricted, either one matches
+        self._any_day = fields[2].startswith('*') or fields[4].startswith('*')
+        self._all_days = fields[2].startswith('*') and fields[4].startswith('*')
+
+    def next_after(self, timestamp):
+        """Return the first fire time strictly after timestamp, or None"""
+        t = datetime.fromtimestamp(math.floor(timestamp / 60) * 60, timezone.utc) + timedelta(minutes=1)
+        limit = t.year + MAX_YEARS
+
+        while t.year <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            index = bisect_left(self.hours, t.hour)
+            if index == len(self.hours):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if self.hours[index] != t.hour:
+                t = t.replace(hour=self.hours[index], minute=0)
+
+            index = bisect_left(self.minutes, t.minute)
+            if index == len(self.minutes):
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            return t.replace(minute=self.minutes[index]).timestamp()
+
+        return None
+
+    def last_before(self, timestamp):
+        """Return the last fire time strictly before timestamp, or None"""
+        t = datetime.fromtimestamp(math.ceil(timestamp / 60) * 60, timezone.utc) - timedelta(minutes=1)
+        limit = t.year - MAX_YEARS
+
+        while t.year >= limit:
+            if t.month not in self.months:
+                t = t.replace(day=1, hour=23, minute=59) - timedelta(days=1)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=23, minute=59) - timedelta(days=1)
+                continue
+
+            index = bisect_right(self.hours, t.hour) - 1
+            if index < 0:
+                t = t.replace(hour=23, minute=59) - timedelta(days=1)
+                continue
+            if self.hours[index] != t.hour:
+                t = t.replace(hour=self.hours[index], minute=59)
+
+            index = bisect_right(self.minutes, t.minute) - 1
+            if index < 0:
+                t = t.replace(minute=59) - timedelta(hours=1)
+                continue
+            return t.replace(minute=self.minutes[index]).timestamp()
+
+        return None
+
+    def _day_matches(self, t):
+        if self._all_days:
+            return True
+        in_month = t.day in self.days
+        in_week = (t.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return in_month and in_week
+        return in_month or in_week
+
+    def __repr__(self):
+        return 'cron({})'.format(self.expression)
+
+
+class IntervalTrigger:
+    """Fires every interval seconds, on multiples of interval after start"""
+
+    def __init__(self, interval, start):
+        if not interval or interval <= 0:
+            raise ValueError('Invalid interval: {}'.format(interval))
+        self.interval = float(interval)
+        self.start = float(start)
+
+    def next_after(self, timestamp):
+        if timestamp < self.start:
+            return self.start
+        return self.start + (math.floor((timestamp - self.start) / self.interval) + 1) * self.interval
+
+    def last_before(self, timestamp):
+        if timestamp <= self.start:
+            return None
+        return self.start + (math.ceil((timestamp - self.start) / self.interval) - 1) * self.interval
+
+    def __repr__(self):
+        return 'interval({}s)'.format(self.interval)
+
+
+class DateTrigger:
+    """Fires once, at run_at"""
+
+    def __init__(self, run_at):
+        self.run_at = float(run_at)
+
+    def next_after(self, timestamp):
+        return self.run_at if timestamp < self.run_at else None
+
+    def last_before(self, timestamp):
+        return self.run_at if self.run_at < timestamp else None
+
+    def __repr__(self):
+        return 'at({})'.format(self.run_at)
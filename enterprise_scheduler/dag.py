@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Split notebook cells into independent groups that can run on separate kernels.
+
+Two code cells belong to the same group when a cell uses a name defined by
+an earlier cell, or when both carry the same 'group:<name>' tag. Cells that
+cannot be analyzed (e.g. IPython magics or star imports) conservatively merge
+every group. Cells only made of import statements are not used to link
+groups, instead they are repeated in every group using the names they import.
+"""
+import ast
+
+GROUP_TAG_PREFIX = 'group:'
+
+
+class _CellAnalysis:
+    __slots__ = ('defines', 'uses', 'imports_only')
+
+    def __init__(self, defines, uses, imports_only):
+        self.defines = defines
+        self.uses = uses
+        self.imports_only = imports_only
+
+
+def analyze_cell(source):
+    """Return the names defined and used by a cell, or None when it cannot be analyzed"""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    defines = set()
+    uses = set()
+    imports_only = bool(tree.body)
+    for statement in tree.body:
+        if not isinstance(statement, (ast.Import, ast.ImportFrom)):
+            imports_only = False
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                uses.add(node.id)
+            else:
+                defines.add(node.id)
+                if isinstance(node.ctx, ast.Del):
+                    # deleting a name requires it to exist
+                    uses.add(node.id)
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+            # x += 1 reads x before assigning it
+            uses.add(node.target.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defines.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == '*':
+                    return None
+                defines.add(alias.asname or alias.name.split('.')[0])
+        elif isinstance(node, ast.Global):
+            uses.update(node.names)
+
+    return _CellAnalysis(defines, uses, imports_only)
+
+
+def build_groups(cells):
+    """Group the code cells of a notebook.
+
+    Returns a list of groups, each being the ordered list of cell indexes
+    to execute on one kernel. Groups are ordered by their first cell."""
+    code = [(index, cell) for index, cell in enumerate(cells) if cell.get('cell_type') == 'code']
+
+    parents = {index: index for index, cell in code}
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    def union(first, second):
+        first, second = find(first), find(second)
+        if first != second:
+            parents[max(first, second)] = min(first, second)
+
+    analyses = {}
+    definitions = {}     # name -> index of the last regular cell defining it
+    import_cells = {}    # name -> indexes of the import only cells defining it
+    tagged = {}          # group tag -> first cell index carrying it
+    needs = {}           # cell index -> import only cells it needs
+
+    for index, cell in code:
+        analysis = analyze_cell(_source(cell))
+        analyses[index] = analysis
+
+        for tag in cell.get('metadata', {}).get('tags', []):
+            if tag.startswith(GROUP_TAG_PREFIX):
+                union(index, tagged.setdefault(tag, index))
+
+        if analysis is None:
+            # unknown dependencies, everything runs on a single kernel
+            for other in parents:
+                union(index, other)
+            continue
+
+        if analysis.imports_only:
+            for name in analysis.defines:
+                import_cells.setdefault(name, []).append(index)
+            continue
+
+        for name in analysis.uses:
+            if name in definitions:
+                union(index, definitions[name])
+            for import_index in import_cells.get(name, []):
+                needs.setdefault(index, set()).add(import_index)
+
+        for name in analysis.defines:
+            definitions[name] = index
+
+    groups = {}
+    for index, cell in code:
+        groups.setdefault(find(index), set()).add(index)
+
+    # import only cells not linked to other cells are repeated where needed instead
+    for root in list(groups):
+        members = groups[root]
+        if len(members) == 1 and analyses[root] is not None and analyses[root].imports_only:
+            del groups[root]
+
+    for root, members in groups.items():
+        for index in list(members):
+            members.update(needs.get(index, ()))
+
+    ordered = [sorted(members) for root, members in sorted(groups.items())]
+
+    # import cells nobody depends on still run once
+    scheduled = set(index for group in ordered for index in group)
+    for index, cell in code:
+        if index not in scheduled:
+            if ordered:
+                ordered[0] = sorted(ordered[0] + [index])
+            else:
+                ordered.append([index])
+
+    return ordered
+
+
+def _source(cell):
+    source = cell.get('source', '')
+    if isinstance(source, list):
+        return ''.join(source)
+    return source
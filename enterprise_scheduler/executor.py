@@ -14,23 +14,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import os
-import json
-import tempfile
-import time
-import yaml
-import requests
-import nbformat
-import shlex
-import pkg_resources
-
-from ffdl.client import Config
-from ffdl.client import FfDLClient
-from shutil import copyfile
-from requests.auth import HTTPBasicAuth
-from enterprise_gateway.client.gateway_client import GatewayClient
-from enterprise_scheduler.util import zip_directory
-from urllib.parse import urlparse
+"""Executors run the tasks of a given type ('executor' task property).
+
+Executors are looked up in an ExecutorRegistry: the built-in ones and those
+advertised by installed packages under the 'enterprise_scheduler.executors'
+entry point group (name = module:Class) are only imported and created when a
+task first needs them, along with their dependencies."""
+
+import importlib
+import logging
+from threading import RLock
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = 'enterprise_scheduler.executors'
+
+BUILTIN_EXECUTORS = {
+    'jupyter': 'enterprise_scheduler.jupyter_executor:JupyterExecutor',
+    'ffdl': 'enterprise_scheduler.ffdl_executor:FfDLExecutor',
+}
+
+
+class TaskTimeout(RuntimeError):
+    """Raised when a task, or one of its cells, runs longer than its timeout"""
+
+
+class TaskCancelled(RuntimeError):
+    """Raised when a running task is cancelled"""
 
 
 class Executor:
@@ -41,180 +51,131 @@ class Executor:
     def __init__(self, default_gateway_host=None, default_kernelspec=None):
         self.default_gateway_host = default_gateway_host
         self.default_kernelspec = default_kernelspec
-
-
-class JupyterExecutor(Executor):
-    TYPE = "jupyter"
-
-    def execute_task(self, task):
-        # start notebook
-        print('')
-        print('Start notebook execution...')
-        print('Starting kernel...')
-
-        launcher = GatewayClient(task['endpoint'])
-        kernel = launcher.start_kernel(task['kernelspec'])
-
-        time.sleep(10)
-
-        # execute all cells
-        try:
-            print('reading notebook contents')
-            notebook = nbformat.reads(json.dumps(task['notebook']), as_version=4)
-
-            print('Starting cell execution')
-            for cell in notebook.cells:
-                print('Executing cell\n{}'.format(cell.source))
-                response = kernel.execute(cell.source)
-                print('Response\n{}'.format(response))
-                outputs = []
-                outputs.append(response)
-                cell['outputs'] = outputs
-
-        except BaseException as base:
-            print('Error executing notebook cells: {}'.format(base))
-
-        finally:
-            print('Starting kernel shutdown')
-            # shutdown notebook
-            launcher.shutdown_kernel(kernel)
-
-        print('Notebook execution done')
-        print('')
-
-
-class FfDLExecutor(Executor):
-    """FFDL Executor Supports :
-        - TensorFlow
-        - Keras
-        - Caffe
-        - Caffe 2
-        - PyTorch"""
-    TYPE = "ffdl"
-
-    def __init__(self):
-        self.workdir = os.path.join(tempfile.gettempdir(), str(FfDLExecutor.TYPE))
-        if not os.path.exists(self.workdir):
-            os.makedirs(self.workdir)
-
-        rootdir = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
-        self.runtimedir = pkg_resources.resource_filename('enterprise_scheduler', 'resources/ffdl')
-        print('Resources dir: {} '.format(self.runtimedir))
-
-    def execute_task(self, task):
-        config = Config(api_endpoint=task['endpoint'],
-                        user=task['user'],
-                        password="temporary",
-                        user_info=task['userinfo'])
-
-        ffdl_zip = self._create_ffdl_zip(task)
-        ffdl_manifest = self._create_manifest(task)
-        ffdl_ui_port = "32263"  ## FFDL UI hosting can vary
-
-        files = {'model_definition': ffdl_zip,
-                 'manifest': ffdl_manifest }
-
-        client = FfDLClient(config)
-
-        result = client.post('/models', **files)
-
-        if 'model_id' in result:
-            print("Training URL : http://{}:{}/#/trainings/{}/show"
-                  .format(urlparse(config.api_endpoint).netloc.split(":")[0],
-                          ffdl_ui_port,
-                          result['model_id']))
-        elif 'message' in result:
-            # Catches server-side FFDL errors returned with a 200 code
-            print("FFDL Job Submission Request Failed: {}".format(
-                result['message']))
-        elif 'error' in result:
-            # Catches HTTP errors returned by the FFDL server
-            print("FFDL Job Submission Request Failed: {}".format(
-                result['error']))
-        else:
-            # Cases with no error but the submission was unsuccessful
-            print("FFDL Job Submission Failed")
-
-    def _create_manifest(self, task):
-        file_name = 'manifest-' + str(task['id'])[:8]
-        file_location = self.workdir + '/' + file_name + ".yml"
-
-        task_description = 'Train Jupyter Notebook'
-        if 'notebook_name' in task:
-            task_description += ': ' + task['notebook_name']
-
-        manifest_dict = dict(
-            name=file_name,
-            description=task_description,
-            version="1.0",
-            gpus=task['gpus'],
-            cpus=task['cpus'],
-            memory=task['memory'],
-            learners=1,
-            data_stores= [dict(
-                id='sl-internal-os',
-                type='mount_cos',
-                training_data= dict(
-                    container=task['cos_bucket_in']
-                ),
-                training_results= dict(
-                    container=task['cos_bucket_out']
-                ),
-                connection= dict(
-                    auth_url=task['cos_endpoint'],
-                    user_name=task['cos_user'],
-                    password=task['cos_password']
-                )
-            )],
-            framework= dict(
-                name=task['framework'],
-                version='1.5.0-py3',
-                command='./start.sh'    ## Run the start script for EG and kernel
-            )
-        )
-
-        with open(file_location, 'w') as outfile:
-            yaml.dump(manifest_dict, outfile, default_flow_style=False)
-
-        return file_location
-
-    def _create_ffdl_zip(self, task):
-        unique_id = 'ffdl-' + str(task['id'])[:8]
-        task_directory = os.path.join(self.workdir, unique_id)
-        os.makedirs(task_directory)
-
-        self._write_file(task_directory, "notebook.ipynb", json.dumps(task['notebook']))
-
-        if 'dependencies' in task:
-            for dependency in task['dependencies']:
-                self._write_file(task_directory, dependency, task['dependencies'][dependency])
-
-        self._create_env_sh(task, task_directory)
-
-        copyfile(os.path.join(self.runtimedir, "start.sh"),
-                 os.path.join(task_directory, "start.sh"))
-
-        copyfile(os.path.join(self.runtimedir, "run_notebook.py"),
-                 os.path.join(task_directory, "run_notebook.py"))
-
-        zip_file = os.path.join(self.workdir, '{}.zip'.format(unique_id))
-        # print('>>> {}'.format(zip_file))
-        # print('>>> {}'.format(task_directory))
-        zip_directory(zip_file, task_directory)
-
-        return zip_file
-
-    def _create_env_sh(self, task, task_directory):
-        lines = ["#!/usr/bin/env bash\n"]
-        for key, value in task['env'].items():
-            lines.append("export {}={}".format(shlex.quote(key),
-                                               shlex.quote(value)))
-
-        contents = "\n".join(lines) + "\n"
-        self._write_file(task_directory, "env.sh", contents)
-
-    @staticmethod
-    def _write_file(directory, filename, contents):
-        filename = os.path.join(directory, filename)
-        with open(filename, 'w') as f:
-            f.write(str(contents))
+        # receives outputs as they are produced, see OutputBroker
+        self.output_listener = None
+        # keeps what a task needs to be resumed rather than restarted, see TaskStore.update_task
+        self.task_store = None
+
+    def _publish_output(self, task, event):
+        if self.output_listener is not None:
+            self.output_listener.publish(task['id'], event)
+
+    def _checkpoint(self, task, **properties):
+        """Add properties to the task, also given to its execution when recovered after a restart"""
+        task.update(properties)
+        if self.task_store is not None:
+            self.task_store.update_task(task['id'], properties)
+
+    def cancel_task(self, task_id):
+        """Interrupt a running task, which then raises TaskCancelled. Returns False when not supported"""
+        return False
+
+    def cancel_dispatched_task(self, task_id):
+        """Cancel a task the scheduler dispatched to this executor, which may not have started executing it
+        yet. Returns False when the task already finished or cancellation is not supported"""
+        return self.cancel_task(task_id)
+
+    def shutdown(self):
+        """Release any resource held by the executor"""
+        pass
+
+
+def load_factory(reference):
+    """Import the 'module:attribute' reference"""
+    module_name, separator, attribute = reference.partition(':')
+    if not separator:
+        raise ValueError('Invalid executor reference "{}", expected module:attribute'.format(reference))
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _entry_points():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python < 3.8
+        return []
+    found = entry_points()
+    if hasattr(found, 'select'):
+        return found.select(group=ENTRY_POINT_GROUP)
+    return found.get(ENTRY_POINT_GROUP, [])
+
+
+class ExecutorRegistry:
+    """Executors by type, created on first use from their factory.
+
+    Factories are callables taking no arguments, or 'module:attribute'
+    references, registered explicitly, advertised as entry points or built in
+    (in that order of precedence). on_create is called with every executor
+    created. registry[type] creates the executor on first access, while
+    type in registry only checks that a factory or executor is available
+    and loaded() only returns the executors created so far."""
+
+    def __init__(self, factories=BUILTIN_EXECUTORS, on_create=None, entry_points=True):
+        self.on_create = on_create
+        self._factories = dict(factories)
+        self._registered = set()
+        self._executors = {}
+        self._discover = entry_points
+        self._lock = RLock()
+
+    def register(self, executor_type, factory):
+        """Make executor_type available, created by factory when first needed"""
+        with self._lock:
+            self._factories[executor_type] = factory
+            self._registered.add(executor_type)
+
+    def __setitem__(self, executor_type, executor):
+        with self._lock:
+            self._executors[executor_type] = executor
+
+    def __getitem__(self, executor_type):
+        executor = self._executors.get(executor_type)
+        if executor is not None:
+            return executor
+        with self._lock:
+            executor = self._executors.get(executor_type)
+            if executor is None:
+                self._discover_entry_points()
+                factory = self._factories[executor_type]
+                if isinstance(factory, str):
+                    factory = load_factory(factory)
+                elif hasattr(factory, 'load'):
+                    factory = factory.load()
+                logger.info('Creating [%s] executor', executor_type)
+                executor = factory()
+                if self.on_create is not None:
+                    self.on_create(executor)
+                self._executors[executor_type] = executor
+            return executor
+
+    def __contains__(self, executor_type):
+        if executor_type in self._executors:
+            return True
+        with self._lock:
+            self._discover_entry_points()
+            return executor_type in self._factories
+
+    def types(self):
+        """Every available executor type, created or not"""
+        with self._lock:
+            self._discover_entry_points()
+            return sorted(set(self._factories) | set(self._executors))
+
+    def loaded(self):
+        """The executors created so far, by type"""
+        with self._lock:
+            return dict(self._executors)
+
+    def _discover_entry_points(self):
+        if not self._discover:
+            return
+        self._discover = False
+        for entry_point in _entry_points():
+            if entry_point.name not in self._registered:
+                self._factories[entry_point.name] = entry_point
+
+
+def __getattr__(name):
+    # executors used to be defined here, import them on demand
+    if name in ('JupyterExecutor', 'FfDLExecutor'):
+        return load_factory(BUILTIN_EXECUTORS[name[:-len('Executor')].lower()])
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import shlex
+import tempfile
+import zipfile
+from threading import Lock
+
+from enterprise_scheduler.blob_store import BINARY_TYPES
+from enterprise_scheduler.notebook import notebook_json
+
+DEFAULT_COMPRESSION_LEVEL = int(os.getenv('EGS_FFDL_COMPRESSION_LEVEL', 6))
+DEFAULT_SPOOL_SIZE = int(os.getenv('EGS_FFDL_SPOOL_SIZE', 64 * 1024 * 1024))
+
+# dependencies with these extensions are already compressed and stored as is
+STORED_EXTENSIONS = frozenset((
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.lz4', '.zst', '.7z', '.jar', '.whl', '.egg',
+    '.npz', '.h5', '.hdf5', '.parquet', '.png', '.jpg', '.jpeg', '.gif', '.mp3', '.mp4',
+))
+
+RUNTIME_FILES = ('start.sh', 'run_notebook.py')
+
+
+class ArchiveBuilder:
+    """Builds FfDL model definition archives without touching the file system.
+
+    Archive entries are streamed into a spooled buffer which stays in memory
+    up to spool_size bytes (larger archives spill to an anonymous temporary
+    file that is removed as soon as it is closed). The runtime scripts are
+    read once and shared by every archive."""
+
+    def __init__(self, runtime_dir=None, compression_level=DEFAULT_COMPRESSION_LEVEL,
+                 spool_size=DEFAULT_SPOOL_SIZE):
+        self.runtime_dir = runtime_dir or os.path.join(os.path.dirname(__file__), 'resources', 'ffdl')
+        self.compression_level = compression_level
+        self.spool_size = spool_size
+        self._runtime_files = None
+        self._lock = Lock()
+
+    def runtime_files(self):
+        """Contents of the runtime scripts, read on first use"""
+        with self._lock:
+            if self._runtime_files is None:
+                files = {}
+                for name in RUNTIME_FILES:
+                    with open(os.path.join(self.runtime_dir, name), 'rb') as f:
+                        files[name] = f.read()
+                self._runtime_files = files
+            return self._runtime_files
+
+    def build(self, task):
+        """Return a buffer, positioned at its start, holding the model definition archive of the task"""
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.compression_level) as archive:
+                self._write(archive, 'notebook.ipynb', notebook_json(task['notebook']))
+
+                for name, contents in task.get('dependencies', {}).items():
+                    self._write(archive, name, contents)
+
+                self._write(archive, 'env.sh', self.create_env_sh(task))
+
+                for name, contents in self.runtime_files().items():
+                    self._write(archive, name, contents)
+        except BaseException:
+            buffer.close()
+            raise
+
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def create_env_sh(task):
+        lines = ["#!/usr/bin/env bash\n"]
+        for key, value in task['env'].items():
+            lines.append("export {}={}".format(shlex.quote(key),
+                                               shlex.quote(value)))
+
+        return "\n".join(lines) + "\n"
+
+    def _write(self, archive, name, contents):
+        if not isinstance(contents, BINARY_TYPES):
+            contents = str(contents).encode('utf-8')
+
+        info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+        info.external_attr = (0o755 if name.endswith('.sh') or name.endswith('.py') else 0o644) << 16
+        if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS or not self.compression_level:
+            info.compress_type = zipfile.ZIP_STORED
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+
+        archive.writestr(info, contents, compresslevel=self.compression_level)
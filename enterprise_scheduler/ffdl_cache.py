@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+
+from enterprise_scheduler.blob_store import BINARY_TYPES
+from enterprise_scheduler.notebook import notebook_digest
+
+DEFAULT_CACHE_DIR = os.getenv('EGS_FFDL_CACHE_DIR',
+                              os.path.join(tempfile.gettempdir(), 'enterprise_scheduler', 'ffdl'))
+DEFAULT_MAX_BYTES = int(os.getenv('EGS_FFDL_CACHE_SIZE', 1024 * 1024 * 1024))
+DEFAULT_MAX_MANIFESTS = int(os.getenv('EGS_FFDL_MANIFEST_CACHE_SIZE', 1024))
+# partial archives left untouched this long were interrupted, younger ones may still be copied by another process
+STALE_PARTIAL_SECONDS = 3600
+
+
+def archive_key(task, compression_level):
+    """Content hash of everything a task model definition archive is built from"""
+    digest = hashlib.sha256()
+    # the notebook is hashed once per submitted content, not serialized again for every task
+    digest.update(json.dumps(dict(notebook=notebook_digest(task['notebook']), env=task['env'],
+                                  framework=task.get('framework'), compression_level=compression_level),
+                             sort_keys=True).encode('utf-8'))
+    for name, contents in sorted(task.get('dependencies', {}).items()):
+        if not isinstance(contents, BINARY_TYPES):
+            contents = str(contents).encode('utf-8')
+        digest.update('\0{}\0{}\0'.format(name, len(contents)).encode('utf-8'))
+        digest.update(contents)
+    return digest.hexdigest()
+
+
+def manifest_key(manifest):
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ArchiveCache:
+    """Content-addressed cache of FfDL model definition archives and manifests.
+
+    Archives are kept as <key>.zip files in cache_dir and evicted least
+    recently used first once they exceed max_bytes; the recency survives
+    restarts through the file modification times. Rendered manifests hold
+    object storage credentials, so they are only cached in memory."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_manifests=DEFAULT_MAX_MANIFESTS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_manifests = max_manifests
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.manifest_hits = 0
+        self.manifest_misses = 0
+
+        self._archives = OrderedDict()
+        self._total_bytes = 0
+        self._manifests = OrderedDict()
+        self._lock = Lock()
+        self._load()
+
+    def open_archive(self, key):
+        """Return the cached archive opened for reading, or None"""
+        with self._lock:
+            if key in self._archives:
+                try:
+                    archive = open(self._path(key), 'rb')
+                except OSError:
+                    self._forget(key)
+                else:
+                    self._archives.move_to_end(key)
+                    self.hits += 1
+                    self._touch(key)
+                    return archive
+            self.misses += 1
+            return None
+
+    def put_archive(self, key, buffer):
+        """Copy the archive held by buffer into the cache, buffer is left positioned at its start"""
+        buffer.seek(0)
+        path = self._path(key)
+        partial = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        with open(partial, 'wb') as f:
+            shutil.copyfileobj(buffer, f)
+        buffer.seek(0)
+        size = os.path.getsize(partial)
+
+        if size > self.max_bytes:
+            os.remove(partial)
+            return
+
+        with self._lock:
+            os.replace(partial, path)
+            if key in self._archives:
+                self._total_bytes -= self._archives.pop(key)
+            self._archives[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def get_manifest(self, key):
+        with self._lock:
+            manifest = self._manifests.get(key)
+            if manifest is None:
+                self.manifest_misses += 1
+            else:
+                self._manifests.move_to_end(key)
+                self.manifest_hits += 1
+            return manifest
+
+    def put_manifest(self, key, manifest):
+        with self._lock:
+            self._manifests[key] = manifest
+            self._manifests.move_to_end(key)
+            while len(self._manifests) > self.max_manifests:
+                self._manifests.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(entries=len(self._archives), bytes=self._total_bytes, hits=self.hits,
+                        misses=self.misses, evictions=self.evictions, manifests=len(self._manifests),
+                        manifest_hits=self.manifest_hits, manifest_misses=self.manifest_misses)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._archives):
+                self._forget(key)
+            self._manifests.clear()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._archives:
+            key = next(iter(self._archives))
+            self._forget(key)
+            self.evictions += 1
+
+    def _forget(self, key):
+        self._total_bytes -= self._archives.pop(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _load(self):
+        """Index the archives left by a previous process, oldest first"""
+        entries = []
+        stale = time.time() - STALE_PARTIAL_SECONDS
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp'):
+                try:
+                    if os.stat(path).st_mtime < stale:
+                        # interrupted copy
+                        os.remove(path)
+                except OSError:
+                    pass  # completed or removed by another process meanwhile
+            elif name.endswith('.zip'):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-len('.zip')], stat.st_size))
+
+        for mtime, key, size in sorted(entries):
+            self._archives[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.zip')
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import logging
+import os
+import time
+from threading import BoundedSemaphore, Lock
+
+import requests
+
+from ffdl.client import Config
+from ffdl.client import FfDLClient
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('EGS_FFDL_MAX_CONCURRENCY', 8))
+DEFAULT_MAX_RETRIES = int(os.getenv('EGS_FFDL_MAX_RETRIES', 3))
+DEFAULT_RETRY_BACKOFF = float(os.getenv('EGS_FFDL_RETRY_BACKOFF', 0.5))
+DEFAULT_SUBMISSION_RATE = float(os.getenv('EGS_FFDL_SUBMISSION_RATE', 0))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv('EGS_FFDL_CONNECT_TIMEOUT', 10))
+DEFAULT_READ_TIMEOUT = float(os.getenv('EGS_FFDL_READ_TIMEOUT', 300))
+
+# responses telling the request was not processed and may be retried
+RETRY_STATUSES = (429, 502, 503)
+
+
+class FfDLSubmissionError(RuntimeError):
+    """Raised when the FfDL server rejects a request, with the HTTP status and body of its response"""
+
+    def __init__(self, endpoint, status, body):
+        super().__init__('FfDL request to {} failed with HTTP {}: {}'.format(endpoint, status, body))
+        self.status = status
+        self.body = body
+
+
+class StreamingFfDLClient(FfDLClient):
+    """FfDL client submitting in-memory files.
+
+    Unlike FfDLClient.post, which opens the given file paths, post accepts
+    (filename, file object) pairs so archives never need to be written to disk."""
+
+    def post(self, url, **files):
+        """
+        Submit a post request to a FfDL server
+        :param url: the api url path
+        :param files: (filename, file object) pairs to submit with the post request
+        :return: a json payload with the api result
+        :raises FfDLSubmissionError: when the server answers with an error status or a non JSON body,
+            connection errors and timeouts are raised as requests exceptions
+        """
+        # validate that proper configuration has been provided
+        self.config.is_valid()
+
+        # accomodate provided strings starting with '/'
+        if url.startswith('/'):
+            url = url[1:]
+
+        endpoint = self._create_ffdl_endpoint(url)
+
+        headers = {'accept': 'application/json',
+                   'X-Watson-Userinfo': self.config.user_info}
+
+        response = self._send(endpoint, headers, files)
+        if response.status_code >= 400:
+            raise FfDLSubmissionError(endpoint, response.status_code, response.text)
+        try:
+            return response.json()
+        except ValueError:
+            raise FfDLSubmissionError(endpoint, response.status_code, response.text)
+
+    def _send(self, endpoint, headers, files):
+        return requests.post(endpoint,
+                             auth=HTTPBasicAuth(self.config.user, self.config.password),
+                             headers=headers,
+                             files=files)
+
+
+class RateLimiter:
+    """Token bucket allowing rate acquisitions per second, with bursts of up to burst"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PooledFfDLClient(StreamingFfDLClient):
+    """FfDL client shared by every submission to one endpoint.
+
+    Requests go through a keep-alive session, at most max_concurrency at a
+    time and no more than the rate limiter allows. Connection failures and
+    responses telling the server is unavailable (429, 502, 503) are retried
+    up to max_retries times with exponential backoff; Retry-After is honored."""
+
+    def __init__(self, config, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_RETRY_BACKOFF, rate_limiter=None,
+                 timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), slots=None):
+        super().__init__(config)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self.timeout = timeout
+        self.retries = 0
+
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(config.user, config.password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots = slots or BoundedSemaphore(max_concurrency)
+
+    def _send(self, endpoint, headers, files):
+        attempt = 0
+        while True:
+            for name, (filename, file) in files.items():
+                file.seek(0)
+
+            self.rate_limiter.acquire()
+            try:
+                with self._slots:
+                    response = self.session.post(endpoint, headers=headers, files=files, timeout=self.timeout)
+            except requests.exceptions.ConnectionError:
+                # read timeouts are not ConnectionErrors and are not retried, the model may have been created
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response) or self.backoff * 2 ** attempt
+
+            attempt += 1
+            self.retries += 1
+            logger.warning('Retrying FfDL submission to %s in %.2fs (attempt %d)', endpoint, delay, attempt)
+            time.sleep(delay)
+
+    def model(self, model_id):
+        """Return the details of a model, including its training status"""
+        endpoint = self._create_ffdl_endpoint('models/{}'.format(model_id))
+        response = self.session.get(endpoint,
+                                    headers={'accept': 'application/json',
+                                             'X-Watson-Userinfo': self.config.user_info},
+                                    timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+class FfDLClientPool:
+    """Reusable FfDL clients keyed by (endpoint, user, user info).
+
+    Clients of one endpoint share its concurrency limit and submission rate
+    (submission_rate per second, 0 for unlimited)."""
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_RETRY_BACKOFF, submission_rate=DEFAULT_SUBMISSION_RATE,
+                 timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.submission_rate = submission_rate
+        self.timeout = timeout
+        self._clients = {}
+        self._limits = {}
+        self._lock = Lock()
+
+    def client(self, endpoint, user, user_info, password="temporary"):
+        key = (endpoint, user, user_info)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                limits = self._limits.get(endpoint)
+                if limits is None:
+                    limits = self._limits[endpoint] = (RateLimiter(self.submission_rate, burst=self.max_concurrency),
+                                                       BoundedSemaphore(self.max_concurrency))
+                config = Config(api_endpoint=endpoint, user=user, password=password, user_info=user_info)
+                client = self._clients[key] = PooledFfDLClient(config,
+                                                               max_concurrency=self.max_concurrency,
+                                                               max_retries=self.max_retries,
+                                                               backoff=self.backoff,
+                                                               rate_limiter=limits[0],
+                                                               timeout=self.timeout,
+                                                               slots=limits[1])
+            return client
+
+    def stats(self):
+        with self._lock:
+            return dict(clients=len(self._clients),
+                        retries=sum(client.retries for client in self._clients.values()))
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
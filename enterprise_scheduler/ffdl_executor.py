@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import io
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import yaml
+
+from enterprise_scheduler import metrics
+from enterprise_scheduler.executor import Executor
+from enterprise_scheduler.ffdl_archive import ArchiveBuilder
+from enterprise_scheduler.ffdl_cache import ArchiveCache, archive_key, manifest_key
+from enterprise_scheduler.ffdl_client import FfDLClientPool
+from enterprise_scheduler.ffdl_results import CosResultFetcher
+from enterprise_scheduler.ffdl_tracker import TrainingTracker
+
+logger = logging.getLogger(__name__)
+
+
+class FfDLExecutor(Executor):
+    """FFDL Executor Supports :
+        - TensorFlow
+        - Keras
+        - Caffe
+        - Caffe 2
+        - PyTorch"""
+    TYPE = "ffdl"
+
+    def __init__(self, archive_builder=None, archive_cache=None, client_pool=None, tracker=None):
+        super().__init__()
+        self.archive_builder = archive_builder or ArchiveBuilder()
+        self.archive_cache = archive_cache or ArchiveCache()
+        self.client_pool = client_pool or FfDLClientPool()
+        self.tracker = tracker or TrainingTracker()
+        self.tracker.status_listener = self._publish_status
+        if self.tracker.result_fetcher is None:
+            # results of completed trainings are read from the task output bucket
+            self.tracker.result_fetcher = CosResultFetcher()
+        self._submissions = ThreadPoolExecutor(max_workers=self.client_pool.max_concurrency)
+        logger.info('Resources dir: %s', self.archive_builder.runtime_dir)
+
+    def execute_task(self, task):
+        """Submit the training in the background and return a Future resolved once it ends,
+        so scheduler threads are not held by submissions or running trainings"""
+        future = Future()
+        self._submissions.submit(self._submit_and_track, task, future)
+        return future
+
+    def _submit_and_track(self, task, future):
+        try:
+            if task.get('ffdl_model_id'):
+                # recovered after a restart: the training was already submitted
+                logger.info('Resuming tracking of FFDL training %s of task [%s]', task['ffdl_model_id'], task['id'])
+                client = self.client_pool.client(task['endpoint'], task['user'], task['userinfo'])
+                self.tracker.track(client, task['ffdl_model_id'], task, future)
+                return
+            client, result = self.submit_training(task)
+            self._checkpoint(task, ffdl_model_id=result['model_id'])
+            self.tracker.track(client, result['model_id'], task, future)
+        except BaseException as base:
+            logger.error('Error submitting task [%s]: %s', task['id'], base)
+            future.set_exception(base)
+
+    def _publish_status(self, task, model_id, status):
+        logger.info('FFDL training %s of task [%s]: %s', model_id, task['id'], status)
+        self._publish_output(task, dict(model_id=model_id, status=status))
+
+    def submit_training(self, task):
+        """Submit the task training to FFDL, returning the client used and the submission result"""
+        client = self.client_pool.client(task['endpoint'], task['user'], task['userinfo'])
+
+        unique_id = str(task['id'])[:8]
+        ffdl_manifest = self._create_manifest(task)
+        ffdl_zip = self._create_ffdl_zip(task)
+        ffdl_ui_port = "32263"  ## FFDL UI hosting can vary
+
+        files = {'model_definition': ('ffdl-{}.zip'.format(unique_id), ffdl_zip),
+                 'manifest': ('manifest-{}.yml'.format(unique_id), io.BytesIO(ffdl_manifest))}
+
+        try:
+            with metrics.time_stage(metrics.FFDL_SUBMISSION):
+                result = client.post('/models', **files)
+        finally:
+            ffdl_zip.close()
+
+        if 'model_id' in result:
+            logger.info("Training URL : http://%s:%s/#/trainings/%s/show",
+                        urlparse(client.config.api_endpoint).netloc.split(":")[0],
+                        ffdl_ui_port,
+                        result['model_id'])
+        elif 'message' in result:
+            # Catches server-side FFDL errors returned with a 200 code
+            raise RuntimeError("FFDL Job Submission Request Failed: {}".format(
+                result['message']))
+        elif 'error' in result:
+            # Catches errors returned by the FFDL server with a 200 code
+            raise RuntimeError("FFDL Job Submission Request Failed: {}".format(
+                result['error']))
+        else:
+            # Cases with no error but the submission was unsuccessful
+            raise RuntimeError("FFDL Job Submission Failed")
+
+        return client, result
+
+    def _create_ffdl_zip(self, task):
+        """Return the model definition archive of the task, reusing the one of identical previous tasks"""
+        key = archive_key(task, self.archive_builder.compression_level)
+        archive = self.archive_cache.open_archive(key)
+        if archive is None:
+            with metrics.time_stage(metrics.ARCHIVE_BUILD):
+                archive = self.archive_builder.build(task)
+            self.archive_cache.put_archive(key, archive)
+        return archive
+
+    def _create_manifest(self, task):
+        task_description = 'Train Jupyter Notebook'
+        if 'notebook_name' in task:
+            task_description += ': ' + task['notebook_name']
+
+        manifest_dict = dict(
+            description=task_description,
+            version="1.0",
+            gpus=task['gpus'],
+            cpus=task['cpus'],
+            memory=task['memory'],
+            learners=1,
+            data_stores= [dict(
+                id='sl-internal-os',
+                type='mount_cos',
+                training_data= dict(
+                    container=task['cos_bucket_in']
+                ),
+                training_results= dict(
+                    container=task['cos_bucket_out']
+                ),
+                connection= dict(
+                    auth_url=task['cos_endpoint'],
+                    user_name=task['cos_user'],
+                    password=task['cos_password']
+                )
+            )],
+            framework= dict(
+                name=task['framework'],
+                version='1.5.0-py3',
+                command='./start.sh'    ## Run the start script for EG and kernel
+            )
+        )
+
+        key = manifest_key(manifest_dict)
+        manifest = self.archive_cache.get_manifest(key)
+        if manifest is None:
+            # manifests are named after their content so identical ones can be shared
+            manifest_dict['name'] = 'manifest-' + key[:8]
+            manifest = yaml.dump(manifest_dict, default_flow_style=False).encode('utf-8')
+            self.archive_cache.put_manifest(key, manifest)
+        return manifest
+
+    def shutdown(self):
+        self._submissions.shutdown(wait=True)
+        self.tracker.shutdown()
+        if isinstance(self.tracker.result_fetcher, CosResultFetcher):
+            self.tracker.result_fetcher.close()
+        self.client_pool.close()
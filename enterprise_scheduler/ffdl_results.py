@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import xml.etree.ElementTree as ElementTree
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# region the HMAC credentials of the object storage are scoped to, tasks may override it with 'cos_region'
+DEFAULT_COS_REGION = os.getenv('EGS_COS_REGION', 'us-standard')
+# training outputs of at most this many bytes are downloaded, larger ones are only listed
+DEFAULT_MAX_OUTPUT_BYTES = int(os.getenv('EGS_FFDL_MAX_OUTPUT_BYTES', 1024 * 1024))
+DEFAULT_COS_TIMEOUT = float(os.getenv('EGS_COS_TIMEOUT', 30))
+
+
+def _hmac(key, message):
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def sign_request(method, url, headers, access_key, secret_key, region, payload=b'', now=None):
+    """Add the AWS signature version 4 headers, used by the S3 API of the object storage, to headers"""
+    now = now or datetime.datetime.utcnow()
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    parts = urlsplit(url)
+    payload_hash = hashlib.sha256(payload).hexdigest()
+    headers.update({'Host': parts.netloc, 'X-Amz-Date': amz_date, 'X-Amz-Content-Sha256': payload_hash})
+
+    canonical_headers = sorted((name.lower(), ' '.join(str(value).split())) for name, value in headers.items())
+    signed_headers = ';'.join(name for name, value in canonical_headers)
+    query = '&'.join('{}={}'.format(quote(name, safe='-_.~'), quote(value, safe='-_.~'))
+                     for name, value in sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    canonical_request = '\n'.join([method, parts.path or '/', query,
+                                   ''.join('{}:{}\n'.format(name, value) for name, value in canonical_headers),
+                                   signed_headers, payload_hash])
+
+    scope = '{}/{}/s3/aws4_request'.format(amz_date[:8], region)
+    string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope,
+                                hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()])
+    key = ('AWS4' + secret_key).encode('utf-8')
+    for part in (amz_date[:8], region, 's3', 'aws4_request'):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    headers['Authorization'] = 'AWS4-HMAC-SHA256 Credential={}/{}, SignedHeaders={}, Signature={}'.format(
+        access_key, scope, signed_headers, signature)
+    return headers
+
+
+def _fields(element):
+    """Text of the children of an S3 response element by unqualified name, 'Contents' listing the objects"""
+    fields = dict(Contents=[])
+    for child in element:
+        name = child.tag.rsplit('}', 1)[-1]
+        if name == 'Contents':
+            fields['Contents'].append(_fields(child))
+        else:
+            fields[name] = child.text
+    return fields
+
+
+class CosClient:
+    """Client of the S3 API of an object storage endpoint, limited to what reading training outputs needs.
+
+    Buckets are addressed by path (endpoint/bucket/key), as custom endpoints require."""
+
+    def __init__(self, session, endpoint, access_key, secret_key, region=DEFAULT_COS_REGION,
+                 timeout=DEFAULT_COS_TIMEOUT):
+        self.session = session
+        self.endpoint = endpoint.rstrip('/')
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+
+    def list_objects(self, bucket, prefix=''):
+        """Return the (key, size) of the objects of bucket whose key starts with prefix"""
+        objects = []
+        query = {'list-type': '2', 'prefix': prefix}
+        while True:
+            listing = _fields(ElementTree.fromstring(self._get('/' + quote(bucket), query).content))
+            objects.extend((fields['Key'], int(fields.get('Size') or 0)) for fields in listing['Contents'])
+            if listing.get('IsTruncated') != 'true' or not listing.get('NextContinuationToken'):
+                return objects
+            query['continuation-token'] = listing['NextContinuationToken']
+
+    def get_object(self, bucket, key):
+        return self._get('/{}/{}'.format(quote(bucket), quote(key, safe='/~')), {}).content
+
+    def _get(self, path, query):
+        url = self.endpoint + path + ('?' + urlencode(sorted(query.items()), quote_via=quote) if query else '')
+        headers = sign_request('GET', url, {}, self.access_key, self.secret_key, self.region)
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+
+class CosResultFetcher:
+    """Result fetcher of TrainingTracker collecting the outputs of completed FfDL trainings.
+
+    FfDL stores the logs and outputs of a training under the '<model id>/'
+    prefix of the task output bucket ('cos_bucket_out'), read with the task
+    object storage credentials. Every object is listed, and the UTF-8 ones of
+    at most max_bytes are downloaded. Requests share a pooled HTTP session."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_OUTPUT_BYTES, region=DEFAULT_COS_REGION):
+        self.max_bytes = max_bytes
+        self.region = region
+        self.session = requests.Session()
+
+    def __call__(self, task, model):
+        client = CosClient(self.session, task['cos_endpoint'], task['cos_user'], task['cos_password'],
+                           region=task.get('cos_region', self.region))
+        bucket = task['cos_bucket_out']
+        # the id the training was submitted and tracked with
+        model_id = task.get('ffdl_model_id') or model['model_id']
+        outputs = []
+        for key, size in client.list_objects(bucket, '{}/'.format(model_id)):
+            output = dict(key=key, size=size)
+            if size <= self.max_bytes:
+                try:
+                    output['text'] = client.get_object(bucket, key).decode('utf-8')
+                except UnicodeDecodeError:
+                    pass  # binary outputs, e.g. saved models, are only listed
+            outputs.append(output)
+        logger.info('Fetched %d outputs of FFDL training %s from bucket %s', len(outputs), model_id, bucket)
+        return outputs
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Thread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL = float(os.getenv('EGS_FFDL_POLL_MIN_INTERVAL', 5))
+DEFAULT_MAX_INTERVAL = float(os.getenv('EGS_FFDL_POLL_MAX_INTERVAL', 300))
+DEFAULT_POLL_THREADS = int(os.getenv('EGS_FFDL_POLL_THREADS', 8))
+
+# FfDL training statuses ending a training, and whether it succeeded
+TERMINAL_STATUSES = {'COMPLETED': True, 'FAILED': False, 'HALTED': False}
+
+
+class TrainingFailed(RuntimeError):
+    """Raised when a tracked training ends unsuccessfully"""
+
+
+class _Training:
+    __slots__ = ('client', 'model_id', 'task', 'future', 'status', 'interval', 'errors')
+
+    def __init__(self, client, model_id, task, interval, future):
+        self.client = client
+        self.model_id = model_id
+        self.task = task
+        self.future = future
+        self.status = None
+        self.interval = interval
+        self.errors = 0
+
+
+class TrainingTracker:
+    """Follows the status of submitted FfDL trainings until they end.
+
+    Trainings are kept in a heap ordered by their next poll time; a single
+    thread hands due polls to poll_threads workers, so thousands of trainings
+    only cost a heap entry each. The polling interval starts at min_interval
+    and grows by backoff (up to max_interval) while the status is unchanged,
+    so long trainings are polled less often.
+
+    track() returns a Future resolved with the final training details, which
+    result_fetcher(task, model) can complete with the training outputs (the
+    FfDL executor reads them from object storage, see CosResultFetcher). A
+    training whose outputs cannot be fetched still completes, with an
+    'outputs_error' reported next to its empty outputs."""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL, backoff=1.5,
+                 poll_threads=DEFAULT_POLL_THREADS, max_errors=5, status_listener=None, result_fetcher=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_errors = max_errors
+        self.status_listener = status_listener
+        self.result_fetcher = result_fetcher
+        self.tracking = 0
+        self.polls = 0
+        self.completed = 0
+        self.failed = 0
+
+        self._poll_threads = poll_threads
+        self._pool = None
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = Condition()
+        self._thread = None
+        self._stopped = False
+
+    def track(self, client, model_id, task=None, future=None):
+        """Poll the training model_id through client until it ends, returning the Future
+        (a new one unless given) resolved with its outcome"""
+        training = _Training(client, model_id, task, self.min_interval, future or Future())
+        self._start()
+        with self._condition:
+            self.tracking += 1
+        self._schedule(training)
+        return training.future
+
+    def stats(self):
+        with self._condition:
+            return dict(tracking=self.tracking, polls=self.polls, completed=self.completed, failed=self.failed)
+
+    def shutdown(self):
+        """Stop polling, trainings still in flight are left unresolved"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def _start(self):
+        with self._condition:
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._poll_threads)
+                self._thread = Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _schedule(self, training):
+        # spread polls of trainings submitted together
+        due = time.monotonic() + training.interval * random.uniform(0.9, 1.1)
+        with self._condition:
+            heapq.heappush(self._heap, (due, next(self._sequence), training))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if self._stopped:
+                    return
+                due, sequence, training = heapq.heappop(self._heap)
+            self._pool.submit(self._poll, training)
+
+    def _poll(self, training):
+        with self._condition:
+            self.polls += 1
+        try:
+            model = training.client.model(training.model_id)
+            status = model['training']['training_status']['status']
+        except Exception as ex:
+            training.errors += 1
+            if training.errors >= self.max_errors:
+                self._finish(training, error=RuntimeError('Error polling FfDL training {}: {}'.format(
+                    training.model_id, ex)))
+                return
+            training.interval = min(training.interval * self.backoff, self.max_interval)
+            self._schedule(training)
+            return
+
+        training.errors = 0
+        if status != training.status:
+            training.status = status
+            training.interval = self.min_interval
+            if self.status_listener is not None:
+                self.status_listener(training.task, training.model_id, status)
+        else:
+            training.interval = min(training.interval * self.backoff, self.max_interval)
+
+        if status not in TERMINAL_STATUSES:
+            self._schedule(training)
+        elif not TERMINAL_STATUSES[status]:
+            self._finish(training, error=TrainingFailed('FfDL training {} {}: {}'.format(
+                training.model_id, status.lower(),
+                model['training']['training_status'].get('error_message') or 'no details')))
+        else:
+            result = dict(model_id=training.model_id, status=status, model=model)
+            if self.result_fetcher is not None:
+                try:
+                    result['outputs'] = self.result_fetcher(training.task, model)
+                except Exception as ex:
+                    # the training completed all the same, only its outputs are missing
+                    logger.warning('Error fetching the outputs of FfDL training %s: %s', training.model_id, ex)
+                    result.update(outputs=[], outputs_error=str(ex))
+            self._finish(training, result=result)
+
+    def _finish(self, training, result=None, error=None):
+        with self._condition:
+            self.tracking -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if error is None:
+            training.future.set_result(result)
+        else:
+            training.future.set_exception(error)
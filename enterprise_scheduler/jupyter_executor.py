@@ -0,0 +1,524 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, FIRST_EXCEPTION, Future, InvalidStateError, ThreadPoolExecutor, wait
+from threading import Lock
+
+import nbformat
+
+from enterprise_scheduler import metrics
+from enterprise_scheduler.async_kernel import AsyncKernelConnection
+from enterprise_scheduler.dag import build_groups
+from enterprise_scheduler.executor import Executor, TaskCancelled, TaskTimeout
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.notebook import load_notebook
+from enterprise_scheduler.parameters import INJECTED_PARAMETERS_TAG, injection_index, parameter_sets, \
+    parameters_source, without_injected_parameters
+from enterprise_scheduler.task_store import FAILED, SUCCEEDED
+
+logger = logging.getLogger(__name__)
+
+# seconds, 0 for no timeout; tasks may override them with their 'cell_timeout' and 'timeout' properties
+DEFAULT_CELL_TIMEOUT = float(os.getenv('EGS_CELL_TIMEOUT', 0))
+DEFAULT_TASK_TIMEOUT = float(os.getenv('EGS_TASK_TIMEOUT', 0))
+# seconds an interrupted kernel has to finish its cell before being discarded rather than reset
+DEFAULT_INTERRUPT_TIMEOUT = float(os.getenv('EGS_INTERRUPT_TIMEOUT', 10))
+DEFAULT_KERNEL_IO_THREADS = int(os.getenv('EGS_KERNEL_IO_THREADS', 64))
+# finished tasks remembered so that a late cancellation is refused rather than kept for a task never to come
+MAX_FINISHED_TASKS = 1024
+# threads resetting released kernels, and interrupting those of timed out or cancelled cells
+# apart from the I/O threads these cells hold
+DEFAULT_KERNEL_RECOVERY_THREADS = int(os.getenv('EGS_KERNEL_RECOVERY_THREADS', 4))
+
+
+class CellExecutionError(RuntimeError):
+    """Raised when the code of a cell fails on the kernel"""
+
+
+class _TaskControl:
+    """Deadline of a task, and the error aborting it (cancellation or failure), shared by its cell executions"""
+
+    __slots__ = ('deadline', 'cell_timeout', 'aborted')
+
+    def __init__(self, timeout, cell_timeout):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.cell_timeout = cell_timeout or None
+        # resolved with the error to raise in every execution of the task
+        self.aborted = Future()
+
+    def abort(self, error):
+        try:
+            self.aborted.set_result(error)
+        except InvalidStateError:
+            pass  # already aborted
+
+    def remaining(self):
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def check(self):
+        """Raise when the task was aborted or has run out of time"""
+        if self.aborted.done():
+            error = self.aborted.result()
+            raise type(error)(str(error))
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            metrics.TIMEOUTS.labels('task').inc()
+            raise TaskTimeout('Task ran longer than its timeout')
+
+
+class JupyterExecutor(Executor):
+    """Executes notebooks on pooled kernels.
+
+    Cells are executed on kernel I/O threads while the task thread waits for
+    them, up to the cell and task timeouts, or until the task is cancelled.
+    The task thread is then released at once, while the kernel is
+    interrupted and reset (or discarded when unresponsive) in the background.
+    Kernels of completed tasks are likewise reset in the background, and
+    only returned to the pool once ready.
+
+    execute_task_async() runs the cells of linear notebooks as coroutines
+    over the websocket of the kernel channels, holding no thread while the
+    kernel executes them; sweeps and DAG notebooks still run on a thread."""
+    TYPE = "jupyter"
+
+    def __init__(self, default_gateway_host=None, default_kernelspec=None, kernel_pool=None,
+                 cell_timeout=DEFAULT_CELL_TIMEOUT, task_timeout=DEFAULT_TASK_TIMEOUT,
+                 interrupt_timeout=DEFAULT_INTERRUPT_TIMEOUT, io_threads=DEFAULT_KERNEL_IO_THREADS,
+                 recovery_threads=DEFAULT_KERNEL_RECOVERY_THREADS):
+        super().__init__(default_gateway_host, default_kernelspec)
+        self.kernel_pool = kernel_pool or KernelPool()
+        self.cell_timeout = cell_timeout
+        self.task_timeout = task_timeout
+        self.interrupt_timeout = interrupt_timeout
+        self._io = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='kernel-io')
+        # resets and recoveries never wait for an I/O thread, all of them may be held by hung cells
+        self._recovery = ThreadPoolExecutor(max_workers=recovery_threads, thread_name_prefix='kernel-recovery')
+        # recoveries of the kernels of execute_task_async(), referenced until done
+        self._recoveries = set()
+        # controls of the running tasks by id
+        self._controls = {}
+        # ids of the last tasks which finished executing, the scheduler may still cancel them until it records them
+        self._finished = OrderedDict()
+        self._lock = Lock()
+
+    def execute_task(self, task):
+        control = self._register(task)
+        try:
+            return self._execute_notebook(task, control)
+        finally:
+            self._unregister(task)
+
+    async def execute_task_async(self, task):
+        if 'sweep' in task or task.get('execution_mode') == 'dag':
+            # runs are executed concurrently on threads of their own
+            return await asyncio.get_event_loop().run_in_executor(None, self.execute_task, task)
+        control = self._register(task)
+        try:
+            return await self._execute_notebook_async(task, control)
+        finally:
+            self._unregister(task)
+
+    def _register(self, task):
+        control = _TaskControl(task.get('timeout', self.task_timeout), task.get('cell_timeout', self.cell_timeout))
+        task_id = task.get('id')
+        if task_id is not None:
+            with self._lock:
+                # the scheduler may cancel a task it dispatched before it gets here
+                cancelled = self._controls.get(str(task_id))
+                if cancelled is not None:
+                    control.abort(cancelled.aborted.result())
+                self._controls[str(task_id)] = control
+                self._finished.pop(str(task_id), None)
+        return control
+
+    def _unregister(self, task):
+        task_id = task.get('id')
+        if task_id is not None:
+            with self._lock:
+                self._controls.pop(str(task_id), None)
+                self._finished[str(task_id)] = True
+                while len(self._finished) > MAX_FINISHED_TASKS:
+                    self._finished.popitem(last=False)
+
+    def cancel_task(self, task_id):
+        return self._cancel(task_id, dispatched=False)
+
+    def cancel_dispatched_task(self, task_id):
+        return self._cancel(task_id, dispatched=True)
+
+    def _cancel(self, task_id, dispatched):
+        with self._lock:
+            control = self._controls.get(str(task_id))
+            if control is None:
+                if not dispatched or str(task_id) in self._finished:
+                    return False
+                # dispatched but not started yet, aborted as soon as it starts
+                control = self._controls[str(task_id)] = _TaskControl(None, None)
+        logger.info('Cancelling task [%s]', task_id)
+        control.abort(TaskCancelled('Task [{}] was cancelled'.format(task_id)))
+        return True
+
+    def _execute_notebook(self, task, control):
+        logger.info('Start notebook execution of task [%s]', task.get('id'))
+        # normalized when the task was submitted, the notebook is shared and never modified
+        notebook = load_notebook(task['notebook'])
+        cells = notebook['cells']
+
+        if 'sweep' in task:
+            summary = self._execute_sweep(task, control, cells)
+            logger.info('Sweep of task [%s] done: %d runs succeeded, %d failed',
+                        task.get('id'), summary['succeeded'], summary['failed'])
+            return summary
+
+        cells = self._with_parameters(task, cells)
+        if task.get('execution_mode') == 'dag':
+            results = self._execute_dag(task, control, cells)
+        else:
+            code = [index for index, cell in enumerate(cells) if cell['cell_type'] == 'code']
+            results = [self._execute_cells(task, control, self._sources(cells, code), set(code))]
+
+        logger.info('Notebook execution of task [%s] done', task.get('id'))
+
+        return self._result(notebook, cells, results)
+
+    async def _execute_notebook_async(self, task, control):
+        logger.info('Start notebook execution of task [%s]', task.get('id'))
+        notebook = load_notebook(task['notebook'])
+        cells = self._with_parameters(task, notebook['cells'])
+        code = [index for index, cell in enumerate(cells) if cell['cell_type'] == 'code']
+        results = [await self._execute_cells_async(task, control, self._sources(cells, code), set(code))]
+
+        logger.info('Notebook execution of task [%s] done', task.get('id'))
+
+        return self._result(notebook, cells, results)
+
+    @staticmethod
+    def _with_parameters(task, cells):
+        """The cells of the notebook with the parameters of the task injected"""
+        if not task.get('parameters'):
+            return cells
+        cell = nbformat.v4.new_code_cell(parameters_source(task['parameters']),
+                                         metadata=dict(tags=[INJECTED_PARAMETERS_TAG]))
+        cells = without_injected_parameters(cells)
+        cells.insert(injection_index(cells), cell)
+        return cells
+
+    def _execute_sweep(self, task, control, cells):
+        """Run the notebook, parsed once, with every parameter set of the sweep on pooled kernels,
+        returning the summary of the runs"""
+        runs = parameter_sets(task['sweep'])
+        cells = without_injected_parameters(cells)
+        code = [index for index, cell in enumerate(cells) if cell['cell_type'] == 'code']
+        sources = self._sources(cells, code)
+        # code cells running before the injected parameters
+        split = len([index for index in code if index < injection_index(cells)])
+
+        parallelism = min(len(runs), int(task.get('sweep_parallelism', self.kernel_pool.max_size))) or 1
+        logger.info('Executing %d runs of task [%s], %d at a time', len(runs), task.get('id'), parallelism)
+        with ThreadPoolExecutor(max_workers=parallelism) as pool:
+            futures = [pool.submit(self._execute_run, task, control, run, parameters,
+                                   sources[:split] + [(None, parameters_source(parameters))] + sources[split:])
+                       for run, parameters in enumerate(runs)]
+            summaries = [future.result() for future in futures]
+
+        # runs are independent, only a cancellation fails the whole sweep
+        if control.aborted.done():
+            control.check()
+
+        failed = len([summary for summary in summaries if summary['state'] == FAILED])
+        if failed == len(summaries):
+            raise RuntimeError('Every run of the sweep failed, first error: {}'.format(summaries[0]['error']))
+        return dict(runs=summaries, succeeded=len(summaries) - failed, failed=failed)
+
+    def _execute_run(self, task, control, run, parameters, sources):
+        """Execute one run of a sweep, returning its summary"""
+        start = time.monotonic()
+        summary = dict(run=run, parameters=parameters, state=SUCCEEDED, error=None, outputs=[])
+        try:
+            outputs = self._execute_cells(task, control, sources,
+                                          set(index for index, source in sources if index is not None), run=run)
+            summary['outputs'] = [dict(cell=index, output=outputs[index])
+                                  for index, source in sources if index is not None]
+        except Exception as error:
+            summary.update(state=FAILED, error=str(error))
+        summary['duration'] = time.monotonic() - start
+        return summary
+
+    def _execute_dag(self, task, control, cells):
+        """Run independent groups of cells concurrently, each on its own kernel, returning their outputs"""
+        groups = build_groups(cells)
+        logger.info('Executing %d independent cell groups of task [%s]', len(groups), task.get('id'))
+
+        # cells repeated in several groups (imports) report the outputs of their first group
+        owners = {}
+        for group_index, group in enumerate(groups):
+            for index in group:
+                owners.setdefault(index, group_index)
+
+        max_kernels = min(len(groups), int(task.get('max_kernels', self.kernel_pool.max_size))) or 1
+        with ThreadPoolExecutor(max_workers=max_kernels) as pool:
+            futures = [pool.submit(self._execute_cells, task, control, self._sources(cells, group),
+                                   set(index for index in group if owners[index] == group_index))
+                       for group_index, group in enumerate(groups)]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = [future for future in done if future.exception() is not None]
+            if failed:
+                # stop the other groups right away, reporting the error of the first failed one
+                control.abort(failed[0].exception())
+                raise failed[0].exception()
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _sources(cells, indexes):
+        return [(index, cells[index]['source']) for index in indexes]
+
+    def _execute_cells(self, task, control, sources, published, run=None):
+        """Execute the given (cell index, source) pairs, in order, on a single pooled kernel and return
+        their outputs by cell index. Outputs of the published cells are sent to the output listener."""
+        control.check()
+        logger.debug('Acquiring kernel for task [%s]', task.get('id'))
+        pooled = self.kernel_pool.acquire(task['endpoint'], task['kernelspec'], timeout=control.remaining())
+        kernel = pooled.kernel
+        healthy = True
+        execution = None
+        outputs = {}
+
+        try:
+            for index, source in sources:
+                control.check()
+                logger.debug('Executing cell %s of task [%s]\n%s', index, task.get('id'), source)
+                with metrics.time_stage(metrics.CELL_EXECUTION):
+                    execution = self._io.submit(kernel.execute, source)
+                    response = self._wait(task, control, index, execution)
+                self._add_output(task, index, response, outputs, published, run)
+
+        except CellExecutionError as error:
+            # the kernel itself is fine, it is reset as it is released
+            logger.info('%s', error)
+            raise
+
+        except TaskCancelled:
+            healthy = False
+            raise
+
+        except BaseException as base:
+            logger.error('Error executing notebook cells of task [%s]: %s', task.get('id'), base)
+            healthy = False
+            raise
+
+        finally:
+            if execution is not None and not execution.done():
+                # timed out or cancelled: the kernel is still busy with the cell
+                self._recovery.submit(self._recover_kernel, pooled, execution)
+            else:
+                # the task goes on while the kernel is reset (or shut down) and returned to the pool
+                self.kernel_pool.release(pooled, discard=not healthy, executor=self._recovery)
+
+        return outputs
+
+    async def _execute_cells_async(self, task, control, sources, published):
+        """Coroutine version of _execute_cells(), executing the cells over the kernel channels"""
+        control.check()
+        logger.debug('Acquiring kernel for task [%s]', task.get('id'))
+        pooled = await self.kernel_pool.acquire_async(task['endpoint'], task['kernelspec'],
+                                                      timeout=control.remaining())
+        kernel = pooled.kernel
+        aborted = self._aborted_async(control)
+        healthy = True
+        connection = None
+        execution = None
+        outputs = {}
+
+        try:
+            connection = await self._connect(kernel)
+            for index, source in sources:
+                control.check()
+                logger.debug('Executing cell %s of task [%s]\n%s', index, task.get('id'), source)
+                with metrics.time_stage(metrics.CELL_EXECUTION):
+                    execution = self._execute_async(kernel, connection, source)
+                    response = await self._wait_async(task, control, index, execution, aborted)
+                self._add_output(task, index, response, outputs, published)
+
+        except CellExecutionError as error:
+            logger.info('%s', error)
+            raise
+
+        except TaskCancelled:
+            healthy = False
+            raise
+
+        except BaseException as base:
+            logger.error('Error executing notebook cells of task [%s]: %s', task.get('id'), base)
+            healthy = False
+            raise
+
+        finally:
+            if execution is not None and not execution.done():
+                # the connection stays open until the interrupted cell is done
+                recovery = asyncio.ensure_future(self._recover_kernel_async(pooled, execution, connection))
+                self._recoveries.add(recovery)
+                recovery.add_done_callback(self._recoveries.discard)
+            else:
+                if connection is not None:
+                    connection.close()
+                self.kernel_pool.release(pooled, discard=not healthy, executor=self._recovery)
+
+        return outputs
+
+    async def _connect(self, kernel):
+        """Connect to the channels of a gateway kernel, None when the kernel client executes coroutines itself
+        or has no websocket endpoint"""
+        url = getattr(kernel, 'kernel_ws_api_endpoint', None)
+        if getattr(kernel, 'execute_async', None) is not None or url is None:
+            return None
+        return await AsyncKernelConnection(url).connect()
+
+    def _execute_async(self, kernel, connection, source):
+        if connection is not None:
+            return asyncio.ensure_future(connection.execute(source))
+        execute_async = getattr(kernel, 'execute_async', None)
+        if execute_async is not None:
+            return asyncio.ensure_future(execute_async(source))
+        return asyncio.wrap_future(self._io.submit(kernel.execute, source))
+
+    @staticmethod
+    def _aborted_async(control):
+        """Future of the running loop resolved once the task is aborted"""
+        loop = asyncio.get_event_loop()
+        aborted = loop.create_future()
+
+        def resolve(future):
+            try:
+                loop.call_soon_threadsafe(lambda: aborted.done() or aborted.set_result(None))
+            except RuntimeError:
+                pass  # the loop is closed
+        control.aborted.add_done_callback(resolve)
+        return aborted
+
+    def _add_output(self, task, index, response, outputs, published, run=None):
+        """Record the output of a cell and publish it, raising when the cell failed"""
+        logger.debug('Response of cell %s of task [%s]\n%s', index, task.get('id'), response)
+        output = self._create_output(response)
+        outputs[index] = output
+        if index in published:
+            event = dict(cell=index, output=output)
+            if run is not None:
+                event['run'] = run
+            self._publish_output(task, event)
+        if output['name'] == 'stderr':
+            raise CellExecutionError('Cell {} of task [{}] failed: {}'.format(index, task.get('id'), output['text']))
+
+    @staticmethod
+    def _timeout(control):
+        """The kind of the timeout bounding the next cell execution, 'cell' or 'task', and its value"""
+        remaining = control.remaining()
+        cell_timeout = control.cell_timeout
+        if remaining is not None and (cell_timeout is None or remaining < cell_timeout):
+            return 'task', max(remaining, 0)
+        return 'cell', cell_timeout
+
+    @staticmethod
+    def _timed_out(task, control, index, kind):
+        """The error of a cell which did not complete in time, raising the error of an aborted task instead"""
+        control.check()
+        metrics.TIMEOUTS.labels(kind).inc()
+        if kind == 'cell':
+            return TaskTimeout('Cell {} of task [{}] ran longer than {}s'.format(
+                index, task.get('id'), control.cell_timeout))
+        return TaskTimeout('Task [{}] ran longer than its timeout'.format(task.get('id')))
+
+    @classmethod
+    def _wait(cls, task, control, index, execution):
+        """Wait for the execution of a cell, up to the cell and task timeouts or until the task is aborted"""
+        kind, timeout = cls._timeout(control)
+        done, pending = wait((execution, control.aborted), timeout=timeout, return_when=FIRST_COMPLETED)
+        if execution in done:
+            return execution.result()
+        raise cls._timed_out(task, control, index, kind)
+
+    @classmethod
+    async def _wait_async(cls, task, control, index, execution, aborted):
+        """Coroutine version of _wait()"""
+        kind, timeout = cls._timeout(control)
+        done, pending = await asyncio.wait((execution, aborted), timeout=timeout,
+                                           return_when=asyncio.FIRST_COMPLETED)
+        if execution in done:
+            return execution.result()
+        raise cls._timed_out(task, control, index, kind)
+
+    def _recover_kernel(self, pooled, execution):
+        """Interrupt a kernel still executing a cell, then reset it or discard it when it does not respond"""
+        if execution.cancel():
+            # the cell never started
+            self.kernel_pool.release(pooled)
+            return
+
+        healthy = True
+        try:
+            pooled.kernel.interrupt()
+            execution.result(timeout=self.interrupt_timeout)
+        except Exception as error:
+            logger.warning('Interrupted kernel %s is discarded: %s',
+                           getattr(pooled.kernel, 'kernel_id', None), error or type(error).__name__)
+            healthy = False
+        self.kernel_pool.release(pooled, discard=not healthy)
+
+    async def _recover_kernel_async(self, pooled, execution, connection):
+        """Coroutine version of _recover_kernel(), the kernel is interrupted on a recovery thread"""
+        healthy = True
+        try:
+            await asyncio.get_event_loop().run_in_executor(self._recovery, pooled.kernel.interrupt)
+            await asyncio.wait_for(execution, self.interrupt_timeout)
+        except Exception as error:
+            logger.warning('Interrupted kernel %s is discarded: %s',
+                           getattr(pooled.kernel, 'kernel_id', None), error or type(error).__name__)
+            healthy = False
+        finally:
+            if connection is not None:
+                connection.close()
+        self.kernel_pool.release(pooled, discard=not healthy, executor=self._recovery)
+
+    @staticmethod
+    def _result(notebook, cells, results):
+        """The executed notebook: cells are shallow copies holding their outputs, the notebook is left as is"""
+        outputs = {}
+        for result in reversed(results):
+            outputs.update(result)
+        executed = nbformat.NotebookNode(notebook)
+        executed['cells'] = [nbformat.NotebookNode(cell, outputs=[outputs[index]]) if index in outputs
+                             else nbformat.NotebookNode(cell) for index, cell in enumerate(cells)]
+        return executed
+
+    @staticmethod
+    def _create_output(response):
+        # gateway clients return either the response text or a (text, has_error) tuple
+        has_error = False
+        if isinstance(response, tuple):
+            response, has_error = response
+        return nbformat.v4.new_output('stream',
+                                      name='stderr' if has_error else 'stdout',
+                                      text=str(response))
+
+    def shutdown(self):
+        self.kernel_pool.shutdown()
+        # kernels still being interrupted are shut down as they are released
+        self._io.shutdown(wait=False)
+        self._recovery.shutdown(wait=False)
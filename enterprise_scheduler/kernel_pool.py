@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, Event, Thread
+
+from enterprise_gateway.client.gateway_client import GatewayClient
+
+from enterprise_scheduler import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = int(os.getenv('EGS_KERNEL_POOL_MIN', 0))
+DEFAULT_MAX_SIZE = int(os.getenv('EGS_KERNEL_POOL_MAX', 4))
+DEFAULT_IDLE_TIMEOUT = float(os.getenv('EGS_KERNEL_POOL_IDLE_TIMEOUT', 600))
+DEFAULT_READINESS_TIMEOUT = float(os.getenv('EGS_KERNEL_READINESS_TIMEOUT', 60))
+
+READY_STATES = ('idle',)
+DEAD_STATES = ('dead',)
+
+
+class PooledKernel:
+    """A kernel started by the pool, along with the launcher that owns it"""
+
+    __slots__ = ('key', 'launcher', 'kernel', 'last_used')
+
+    def __init__(self, key, launcher, kernel):
+        self.key = key
+        self.launcher = launcher
+        self.kernel = kernel
+        self.last_used = time.monotonic()
+
+
+class _KernelSlot:
+    """Idle kernels and number of live kernels for one (endpoint, kernelspec), along with the number
+    of kernels being reset in the background and of callers waiting for a kernel"""
+
+    __slots__ = ('idle', 'size', 'resetting', 'waiting')
+
+    def __init__(self):
+        self.idle = deque()
+        self.size = 0
+        self.resetting = 0
+        self.waiting = 0
+
+
+class KernelPool:
+    """Pool of warm kernels keyed by (endpoint, kernelspec).
+
+    Kernels are probed for readiness once started, reset (restarted) when
+    returned to the pool, health checked and evicted after being idle for
+    idle_timeout seconds while keeping at least min_size kernels per key.
+    At most max_size kernels are alive per key; acquire() waits for a kernel
+    to be released when that limit is reached."""
+
+    def __init__(self,
+                 min_size=DEFAULT_MIN_SIZE,
+                 max_size=DEFAULT_MAX_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 readiness_timeout=DEFAULT_READINESS_TIMEOUT,
+                 readiness_interval=0.5,
+                 maintenance_interval=30,
+                 reset_kernels=True,
+                 launcher_factory=GatewayClient):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('Invalid kernel pool size: min={} max={}'.format(min_size, max_size))
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.readiness_timeout = readiness_timeout
+        self.readiness_interval = readiness_interval
+        self.maintenance_interval = maintenance_interval
+        self.reset_kernels = reset_kernels
+        self.launcher_factory = launcher_factory
+
+        self._slots = {}
+        self._launchers = {}
+        self._condition = Condition()
+        # futures of the coroutines waiting for a kernel, by event loop
+        self._async_waiters = {}
+        self._stopped = Event()
+        self._maintenance_thread = None
+
+    def acquire(self, endpoint, kernelspec, timeout=None):
+        """Return a ready kernel for the endpoint and kernelspec, starting one if needed"""
+        key = (endpoint, kernelspec)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        self._start_maintenance()
+        with self._condition:
+            slot = self._slot(key)
+            while not slot.idle:
+                # a kernel being reset is ready sooner than a new one, unless other callers wait for it
+                if slot.size < self.max_size and slot.resetting <= slot.waiting:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise RuntimeError('Timed out waiting for a [{}] kernel on {}'.format(kernelspec, endpoint))
+                slot.waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    slot.waiting -= 1
+
+            if slot.idle:
+                return slot.idle.pop()
+
+            # reserve the slot, the kernel itself is started outside of the lock
+            slot.size += 1
+
+        try:
+            return self._start_kernel(key)
+        except BaseException:
+            self._forget(key)
+            raise
+
+    async def acquire_async(self, endpoint, kernelspec, timeout=None):
+        """Coroutine version of acquire(): waiting for a kernel holds no thread,
+        a new kernel is started on the default executor of the loop"""
+        key = (endpoint, kernelspec)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        loop = asyncio.get_event_loop()
+
+        self._start_maintenance()
+        while True:
+            with self._condition:
+                slot = self._slot(key)
+                if slot.idle:
+                    return slot.idle.pop()
+                if slot.size < self.max_size and slot.resetting <= slot.waiting:
+                    # reserve the slot, the kernel itself is started outside of the lock
+                    slot.size += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise RuntimeError('Timed out waiting for a [{}] kernel on {}'.format(kernelspec, endpoint))
+                slot.waiting += 1
+                waiter = loop.create_future()
+                self._async_waiters[waiter] = loop
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._condition:
+                    slot.waiting -= 1
+                    self._async_waiters.pop(waiter, None)
+
+        start = loop.run_in_executor(None, self._start_kernel, key)
+        try:
+            return await asyncio.shield(start)
+        except asyncio.CancelledError:
+            # the kernel is still starting, it is pooled once ready
+            start.add_done_callback(lambda future: self._pool_started(key, future))
+            raise
+        except BaseException:
+            self._forget(key)
+            raise
+
+    def release(self, pooled, discard=False, executor=None):
+        """Return a kernel to the pool, discarding it when it may no longer be usable.
+
+        Given an executor (e.g. a thread pool), the kernel is reset there and
+        release() returns at once; the kernel becomes available once ready."""
+        if executor is not None:
+            with self._condition:
+                self._slot(pooled.key).resetting += 1
+            try:
+                executor.submit(self._release, pooled, discard, True)
+                return
+            except RuntimeError:
+                # the executor is shut down
+                pass
+        self._release(pooled, discard, executor is not None)
+
+    def _release(self, pooled, discard, background=False):
+        if not discard and not self._stopped.is_set() and self.reset_kernels:
+            try:
+                with metrics.time_stage(metrics.KERNEL_RESET):
+                    pooled.kernel.restart()
+                    self._wait_until_ready(pooled.kernel)
+            except BaseException as base:
+                logger.warning('Error resetting kernel %s: %s', self._kernel_id(pooled), base)
+                discard = True
+
+        if discard or self._stopped.is_set():
+            self._shutdown_kernel(pooled)
+            with self._condition:
+                slot = self._slot(pooled.key)
+                slot.size -= 1
+                if background:
+                    slot.resetting -= 1
+                self._notify()
+            return
+
+        with self._condition:
+            if background:
+                self._slot(pooled.key).resetting -= 1
+            pooled.last_used = time.monotonic()
+            self._slot(pooled.key).idle.append(pooled)
+            self._notify()
+
+    @contextmanager
+    def kernel(self, endpoint, kernelspec, timeout=None):
+        """Context manager acquiring a kernel and releasing it once done,
+        discarding it if the block raised an error"""
+        pooled = self.acquire(endpoint, kernelspec, timeout)
+        try:
+            yield pooled.kernel
+        except BaseException:
+            self.release(pooled, discard=True)
+            raise
+        self.release(pooled)
+
+    def prewarm(self, endpoint, kernelspec):
+        """Start kernels for the endpoint and kernelspec until min_size are available"""
+        key = (endpoint, kernelspec)
+        while True:
+            with self._condition:
+                slot = self._slot(key)
+                if slot.size >= self.min_size:
+                    return
+                slot.size += 1
+            try:
+                pooled = self._start_kernel(key)
+            except BaseException as base:
+                self._forget(key)
+                logger.error('Error starting [%s] kernel on %s: %s', kernelspec, endpoint, base)
+                return
+            with self._condition:
+                slot.idle.append(pooled)
+                self._notify()
+
+    def maintain(self):
+        """Evict idle kernels, discard unhealthy ones and replenish the pool to min_size"""
+        now = time.monotonic()
+        candidates = []
+        with self._condition:
+            for key, slot in self._slots.items():
+                keep = []
+                while slot.idle:
+                    pooled = slot.idle.popleft()
+                    if now - pooled.last_used > self.idle_timeout and slot.size > self.min_size:
+                        slot.size -= 1
+                        candidates.append((pooled, False))
+                    else:
+                        keep.append(pooled)
+                for pooled in keep:
+                    candidates.append((pooled, True))
+            keys = list(self._slots.keys())
+
+        for pooled, keep in candidates:
+            if keep and self._healthy(pooled.kernel):
+                with self._condition:
+                    self._slot(pooled.key).idle.append(pooled)
+                    self._notify()
+                continue
+            self._shutdown_kernel(pooled)
+            if keep:
+                self._forget(pooled.key)
+
+        for endpoint, kernelspec in keys:
+            self.prewarm(endpoint, kernelspec)
+
+    def stats(self):
+        """Number of live and idle kernels per (endpoint, kernelspec)"""
+        with self._condition:
+            return {key: dict(size=slot.size, idle=len(slot.idle)) for key, slot in self._slots.items()}
+
+    def shutdown(self):
+        """Shut down every idle kernel, busy kernels are shut down once released"""
+        self._stopped.set()
+        with self._condition:
+            idle = []
+            for slot in self._slots.values():
+                idle.extend(slot.idle)
+                slot.size -= len(slot.idle)
+                slot.idle.clear()
+            self._notify(every=True)
+
+        for pooled in idle:
+            self._shutdown_kernel(pooled)
+
+        if self._maintenance_thread:
+            self._maintenance_thread.join()
+            self._maintenance_thread = None
+
+    def _slot(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _KernelSlot()
+        return slot
+
+    def _pool_started(self, key, future):
+        if future.cancelled() or future.exception() is not None:
+            self._forget(key)
+            return
+        if self._stopped.is_set():
+            self._shutdown_kernel(future.result())
+            self._forget(key)
+            return
+        with self._condition:
+            self._slot(key).idle.append(future.result())
+            self._notify()
+
+    def _notify(self, every=False):
+        """Wake up the callers waiting for a kernel, called with the condition held"""
+        if every:
+            self._condition.notify_all()
+        else:
+            self._condition.notify()
+        # coroutines check the pool again on their own loop
+        for waiter, loop in self._async_waiters.items():
+            try:
+                loop.call_soon_threadsafe(self._wake, waiter)
+            except RuntimeError:
+                pass  # the loop is closed
+        self._async_waiters.clear()
+
+    @staticmethod
+    def _wake(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _forget(self, key):
+        with self._condition:
+            self._slot(key).size -= 1
+            self._notify()
+
+    def _launcher(self, endpoint):
+        with self._condition:
+            launcher = self._launchers.get(endpoint)
+            if launcher is None:
+                launcher = self._launchers[endpoint] = self.launcher_factory(endpoint)
+            return launcher
+
+    def _start_kernel(self, key):
+        endpoint, kernelspec = key
+        launcher = self._launcher(endpoint)
+        with metrics.time_stage(metrics.KERNEL_START):
+            kernel = launcher.start_kernel(kernelspec)
+            pooled = PooledKernel(key, launcher, kernel)
+            try:
+                self._wait_until_ready(kernel)
+            except BaseException:
+                self._shutdown_kernel(pooled)
+                raise
+        return pooled
+
+    def _wait_until_ready(self, kernel):
+        get_state = getattr(kernel, 'get_state', None)
+        if get_state is None:
+            # clients without a state api: an execution only completes once the kernel is idle
+            kernel.execute('')
+            return
+
+        deadline = time.monotonic() + self.readiness_timeout
+        while True:
+            try:
+                state = get_state()
+            except BaseException:
+                state = None
+            if state in READY_STATES:
+                return
+            if state in DEAD_STATES or time.monotonic() > deadline:
+                raise RuntimeError('Kernel {} did not become ready (state: {})'.format(
+                    getattr(kernel, 'kernel_id', ''), state))
+            time.sleep(self.readiness_interval)
+
+    @staticmethod
+    def _healthy(kernel):
+        get_state = getattr(kernel, 'get_state', None)
+        if get_state is None:
+            return True
+        try:
+            return get_state() not in DEAD_STATES
+        except BaseException:
+            return False
+
+    @staticmethod
+    def _kernel_id(pooled):
+        return getattr(pooled.kernel, 'kernel_id', '')
+
+    def _shutdown_kernel(self, pooled):
+        try:
+            with metrics.time_stage(metrics.KERNEL_SHUTDOWN):
+                pooled.launcher.shutdown_kernel(pooled.kernel)
+        except BaseException as base:
+            logger.warning('Error shutting down kernel %s: %s', self._kernel_id(pooled), base)
+
+    def _start_maintenance(self):
+        if self._maintenance_thread is not None or self._stopped.is_set():
+            return
+        with self._condition:
+            if self._maintenance_thread is None:
+                self._maintenance_thread = Thread(target=self._maintenance_loop)
+                self._maintenance_thread.daemon = True
+                self._maintenance_thread.start()
+
+    def _maintenance_loop(self):
+        while not self._stopped.wait(self.maintenance_interval):
+            try:
+                self.maintain()
+            except BaseException as base:
+                logger.exception('Error maintaining kernel pool: %s', base)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Logging of the scheduler.
+
+Modules log through `logging.getLogger(__name__)`; configure_logging() routes
+the 'enterprise_scheduler' loggers through a queue drained by a background
+thread, so logging never blocks task processing on stdout. Messages are
+truncated and secrets redacted before they are queued."""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER = 'enterprise_scheduler'
+
+DEFAULT_LEVEL = os.getenv('EGS_LOG_LEVEL', 'INFO')
+# per subsystem levels, e.g. 'executor=DEBUG,kernel_pool=WARNING'
+DEFAULT_LEVELS = os.getenv('EGS_LOG_LEVELS', '')
+# 'text' or 'json' (one object per line)
+DEFAULT_FORMAT = os.getenv('EGS_LOG_FORMAT', 'text')
+DEFAULT_MAX_LENGTH = int(os.getenv('EGS_LOG_MAX_LENGTH', '2048'))
+DEFAULT_QUEUE_SIZE = int(os.getenv('EGS_LOG_QUEUE_SIZE', '10000'))
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+REDACTED = '***'
+
+_SECRET_KEY = re.compile(r'(password|passwd|secret|token|api[_-]?key|authorization|credentials?)', re.IGNORECASE)
+_SECRET_VALUE = re.compile(r'''((?:password|passwd|secret|token|api[_-]?key|authorization|credentials?)['"]?'''
+                           r'''\s*[:=]\s*)(['"]?)[^'",\s}]+''', re.IGNORECASE)
+# substring checks are much cheaper than the regex on text without any secret
+_SECRET_HINTS = ('pass', 'secret', 'token', 'key', 'authorization', 'credential')
+
+_listener = None
+_handler = None
+
+
+def parse_levels(value):
+    """Parse 'subsystem=LEVEL,...' into a dict of logger name to level"""
+    levels = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, separator, level = item.partition('=')
+        level = level.strip().upper()
+        if not separator or not isinstance(logging.getLevelName(level), int):
+            raise ValueError('Invalid log level "{}", expected subsystem=LEVEL'.format(item))
+        name = name.strip()
+        if not name.startswith(ROOT_LOGGER):
+            name = '{}.{}'.format(ROOT_LOGGER, name)
+        levels[name] = level
+    return levels
+
+
+def redact(value):
+    """Replace the values of secret looking keys, in nested dicts and lists or in text"""
+    if isinstance(value, str):
+        lowered = value.lower()
+        if not any(hint in lowered for hint in _SECRET_HINTS):
+            return value
+        return _SECRET_VALUE.sub(r'\1\2' + REDACTED, value)
+    return _redact_keys(value)
+
+
+def _redact_keys(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if isinstance(key, str) and _SECRET_KEY.search(key) else _redact_keys(item)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_redact_keys(item) for item in value)
+    return value
+
+
+def truncate(text, max_length):
+    if max_length and len(text) > max_length:
+        return '{}... [{} more characters]'.format(text[:max_length], len(text) - max_length)
+    return text
+
+
+class SafeQueueHandler(QueueHandler):
+    """Queue handler rendering redacted and truncated messages, dropping records when the queue is full
+    rather than blocking the logging thread"""
+
+    def __init__(self, log_queue, max_length=DEFAULT_MAX_LENGTH):
+        super().__init__(log_queue)
+        self.max_length = max_length
+        self.dropped = 0
+
+    def prepare(self, record):
+        args = record.args
+        if args:
+            if isinstance(args, dict):
+                args = _redact_keys(args)
+            else:
+                args = tuple(self._shorten(_redact_keys(arg)) for arg in args)
+            record.msg = record.msg % args
+        record.msg = redact(truncate(str(record.msg), self.max_length))
+        record.args = None
+        if record.exc_info:
+            # render the traceback now so queued records do not keep the frames alive
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def _shorten(self, arg):
+        # large payloads (notebooks, cell sources, responses) are cut before being rendered
+        if not self.max_length or isinstance(arg, (int, float)):
+            return arg
+        return truncate(arg if isinstance(arg, str) else str(arg), self.max_length)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with the task id when logged with extra={'task_id': ...}"""
+
+    def format(self, record):
+        entry = dict(time=round(record.created, 3), level=record.levelname, logger=record.name,
+                     message=record.getMessage())
+        task_id = getattr(record, 'task_id', None)
+        if task_id is not None:
+            entry['task_id'] = str(task_id)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry)
+
+
+def configure_logging(level=DEFAULT_LEVEL, levels=DEFAULT_LEVELS, log_format=DEFAULT_FORMAT,
+                      max_length=DEFAULT_MAX_LENGTH, queue_size=DEFAULT_QUEUE_SIZE, stream=None):
+    """Route the scheduler loggers through a background queue listener writing to stream (stderr by default).
+
+    Calling it again replaces the previous configuration."""
+    global _listener, _handler
+    shutdown_logging()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if log_format == 'json':
+        handler.setFormatter(JSONFormatter())
+    elif log_format == 'text':
+        formatter = logging.Formatter(TEXT_FORMAT)
+        formatter.converter = time.gmtime
+        handler.setFormatter(formatter)
+    else:
+        raise ValueError('Invalid log format "{}", expected text or json'.format(log_format))
+
+    queue_handler = SafeQueueHandler(queue.Queue(queue_size), max_length)
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+    for name, subsystem_level in (parse_levels(levels) if isinstance(levels, str) else levels).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+
+    _listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+    _handler = queue_handler
+    return queue_handler
+
+
+def shutdown_logging():
+    """Write every queued record, stop the background listener and detach it from the scheduler loggers"""
+    global _listener, _handler
+    if _listener is not None:
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.removeHandler(_handler)
+        logger.propagate = True
+        _listener.stop()
+        _listener = _handler = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Prometheus metrics of the scheduler.
+
+Stage timings and task counters are recorded as tasks are processed; gauges
+(queue depth, tasks by state, pool utilization, caches) are collected from
+the scheduler when the metrics are rendered."""
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+
+# stages timed by STAGE_SECONDS
+NOTEBOOK_FETCH = 'notebook_fetch'
+NOTEBOOK_VALIDATION = 'notebook_validation'
+QUEUE_WAIT = 'queue_wait'
+TASK_EXECUTION = 'task_execution'
+KERNEL_START = 'kernel_start'
+KERNEL_RESET = 'kernel_reset'
+CELL_EXECUTION = 'cell_execution'
+KERNEL_SHUTDOWN = 'kernel_shutdown'
+ARCHIVE_BUILD = 'archive_build'
+FFDL_SUBMISSION = 'ffdl_submission'
+
+# kept apart from the default registry, which other libraries in the process may populate
+REGISTRY = CollectorRegistry()
+
+STAGE_SECONDS = Histogram('egs_stage_duration_seconds', 'Duration of the task processing stages',
+                          ['stage'], registry=REGISTRY,
+                          buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600,
+                                   1800, 3600))
+
+TASKS_SUBMITTED = Counter('egs_tasks_submitted', 'Tasks submitted to the scheduler', ['executor'],
+                          registry=REGISTRY)
+
+TASKS_COMPLETED = Counter('egs_tasks_completed', 'Tasks completed by the scheduler', ['executor', 'state'],
+                          registry=REGISTRY)
+
+# kind is 'cell' or 'task'
+TIMEOUTS = Counter('egs_timeouts', 'Cells and tasks interrupted for running longer than their timeout', ['kind'],
+                   registry=REGISTRY)
+
+# state is the state of the task when cancelled, e.g. 'queued' or 'running'
+TASKS_CANCELLED = Counter('egs_tasks_cancelled', 'Tasks cancelled', ['state'], registry=REGISTRY)
+
+
+def time_stage(stage):
+    """Context manager recording the duration of its block as the given stage"""
+    return STAGE_SECONDS.labels(stage).time()
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+class SchedulerCollector:
+    """Collects the current state of a scheduler and of the executors it uses"""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    def collect(self):
+        scheduler = self.scheduler
+
+        states = GaugeMetricFamily('egs_tasks', 'Known tasks by state', labels=['state'])
+        for state, count in sorted(scheduler.task_store.counts().items()):
+            states.add_metric([state], count)
+        yield states
+
+        pool_stats = scheduler.pool_stats()
+        gauges = dict(queued=GaugeMetricFamily('egs_pool_queue_depth', 'Tasks waiting in the pool queue',
+                                               labels=['pool']),
+                      threads=GaugeMetricFamily('egs_pool_threads', 'Threads of the pool', labels=['pool']),
+                      busy=GaugeMetricFamily('egs_pool_busy_threads', 'Threads executing a task', labels=['pool']),
+                      utilization=GaugeMetricFamily('egs_pool_utilization',
+                                                    'Fraction of the pool thread time spent executing tasks',
+                                                    labels=['pool']))
+        executed = CounterMetricFamily('egs_pool_executed', 'Tasks executed by the pool', labels=['pool'])
+        for name, stats in sorted(pool_stats['pools'].items()):
+            for key, gauge in gauges.items():
+                gauge.add_metric([name], stats[key])
+            executed.add_metric([name], stats['executed'])
+        for gauge in gauges.values():
+            yield gauge
+        yield executed
+
+        running = GaugeMetricFamily('egs_endpoint_running', 'Tasks running against the endpoint',
+                                    labels=['endpoint'])
+        parked = GaugeMetricFamily('egs_endpoint_parked', 'Tasks waiting for an endpoint slot', labels=['endpoint'])
+        for endpoint, stats in sorted(pool_stats['endpoints'].items(), key=lambda item: str(item[0])):
+            running.add_metric([str(endpoint)], stats['running'])
+            parked.add_metric([str(endpoint)], stats['parked'])
+        yield running
+        yield parked
+
+        yield self._stats('egs_notebook_cache', 'Notebook cache', scheduler.notebook_cache.stats())
+        yield self._stats('egs_notebook_loader', 'Notebooks parsed and validated by content hash',
+                          scheduler.notebook_loader.stats())
+        yield self._stats('egs_blob_store', 'Payloads of queued tasks spilled to disk', scheduler.blob_store.stats())
+        yield self._stats('egs_results', 'Result store', scheduler.results.stats())
+
+        cluster_stats = getattr(scheduler, 'cluster_stats', None)
+        if cluster_stats is not None:
+            yield self._stats('egs_cluster', 'Tasks claimed, stolen and lost by this node, and live nodes',
+                              cluster_stats())
+
+        kernels = GaugeMetricFamily('egs_kernels', 'Live (size) and idle kernels of the kernel pools',
+                                    labels=['executor', 'endpoint', 'kernelspec', 'kind'])
+        for executor_type, executor in sorted(scheduler.executors.loaded().items()):
+            kernel_pool = getattr(executor, 'kernel_pool', None)
+            if kernel_pool is not None:
+                for (endpoint, kernelspec), stats in sorted(kernel_pool.stats().items(), key=str):
+                    for kind, value in sorted(stats.items()):
+                        kernels.add_metric([executor_type, str(endpoint), str(kernelspec), kind], value)
+        yield kernels
+
+        for executor_type, executor in sorted(scheduler.executors.loaded().items()):
+            for name in ('archive_cache', 'client_pool', 'tracker'):
+                component = getattr(executor, name, None)
+                stats = getattr(component, 'stats', None)
+                if stats is not None:
+                    yield self._stats('egs_{}_{}'.format(executor_type, name),
+                                      '{} {} statistics'.format(executor_type, name.replace('_', ' ')), stats())
+
+    @staticmethod
+    def _stats(name, documentation, stats):
+        """Gauge of the numeric entries of a stats() dict, labelled by key"""
+        gauge = GaugeMetricFamily(name, documentation, labels=['stat'])
+        for key, value in sorted(stats.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauge.add_metric([key], value)
+        return gauge
+
+
+def render(scheduler):
+    """Return the metrics of the scheduler in the Prometheus text format, along with its content type"""
+    registry = CollectorRegistry()
+    registry.register(SchedulerCollector(scheduler))
+    return generate_latest(REGISTRY) + generate_latest(registry), CONTENT_TYPE_LATEST
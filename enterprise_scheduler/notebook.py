@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Normalized notebooks, created once when a task is submitted.
+
+A `Notebook` is the nbformat 4 JSON structure as plain dicts and lists, with
+cell sources joined into strings. It is shared read only by every task
+submitted with the same content: executors build their results next to it
+instead of modifying or copying it."""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+
+NBFORMAT = 4
+CELL_TYPES = ('code', 'markdown', 'raw')
+
+DEFAULT_MAX_BYTES = int(os.getenv('EGS_NOTEBOOK_LOADER_SIZE', 256 * 1024 * 1024))
+
+
+class Notebook(dict):
+    """Normalized notebook, to be treated as read only"""
+    __slots__ = ('_json', '_digest')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._json = None
+        self._digest = None
+
+    def json(self):
+        """The notebook serialized as JSON bytes, computed once"""
+        if self._json is None:
+            self._json = json.dumps(self).encode('utf-8')
+        return self._json
+
+    def digest(self):
+        """Content hash of the notebook, computed once"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.json()).hexdigest()
+        return self._digest
+
+    def __reduce__(self):
+        # pickled as a plain dict subclass, without the cached serialization
+        return Notebook, (dict(self),)
+
+
+def notebook_json(notebook):
+    """JSON bytes of a notebook, serialized once for normalized notebooks"""
+    if isinstance(notebook, Notebook):
+        return notebook.json()
+    return json.dumps(notebook).encode('utf-8')
+
+
+def notebook_digest(notebook):
+    """Content hash of a notebook"""
+    if isinstance(notebook, Notebook):
+        return notebook.digest()
+    return hashlib.sha256(notebook_json(notebook)).hexdigest()
+
+
+def load_notebook(content, location=None, strip_outputs=False):
+    """Return the normalized notebook of content, a dict, or JSON str or bytes.
+
+    Normalized notebooks are returned as is, so executors can call this on
+    tasks whether or not they went through the scheduler submission."""
+    if isinstance(content, Notebook) and not strip_outputs:
+        return content
+
+    # cells parsed here are owned by the notebook, those of a dict are copied before being normalized
+    parsed = isinstance(content, (str, bytes, bytearray))
+    if parsed:
+        try:
+            content = json.loads(content)
+        except ValueError as error:
+            raise ValueError('Notebook "{}" is not valid JSON: {}'.format(location or 'embedded', error))
+
+    if not isinstance(content, dict):
+        raise ValueError('Notebook "{}" is not a JSON object'.format(location or 'embedded'))
+
+    version = content.get('nbformat', NBFORMAT)
+    if isinstance(version, int) and version < NBFORMAT:
+        content = _upgrade(content)
+        parsed = True
+
+    notebook = Notebook(content)
+    cells = notebook.get('cells')
+    if not isinstance(cells, list):
+        raise ValueError('Notebook "{}" does not contain notebook cells'.format(location or 'embedded'))
+
+    if strip_outputs or not parsed:
+        cells = notebook['cells'] = [dict(cell) if isinstance(cell, dict) else cell for cell in cells]
+
+    for index, cell in enumerate(cells):
+        _normalize_cell(cell, index, location, strip_outputs)
+
+    return notebook
+
+
+def _normalize_cell(cell, index, location, strip_outputs):
+    if not isinstance(cell, dict) or cell.get('cell_type') not in CELL_TYPES:
+        raise ValueError('Notebook "{}" cell {} is not a code, markdown or raw cell'.format(
+            location or 'embedded', index))
+    source = cell.get('source', '')
+    if isinstance(source, list):
+        # multiline strings are stored as lists of lines
+        if not all(isinstance(line, str) for line in source):
+            raise ValueError('Notebook "{}" cell {} source is not text'.format(location or 'embedded', index))
+        cell['source'] = ''.join(source)
+    elif not isinstance(source, str):
+        raise ValueError('Notebook "{}" cell {} source is not text'.format(location or 'embedded', index))
+
+    if 'metadata' not in cell:
+        cell['metadata'] = {}
+    if cell['cell_type'] == 'code':
+        if strip_outputs or 'outputs' not in cell:
+            cell['outputs'] = []
+            cell['execution_count'] = None
+
+
+def _upgrade(content):
+    """Convert notebooks older than nbformat 4, with nbformat (only imported for them)"""
+    import nbformat
+    try:
+        return json.loads(nbformat.writes(nbformat.convert(nbformat.from_dict(content), NBFORMAT)))
+    except Exception as error:
+        raise ValueError('Notebook cannot be converted to nbformat {}: {}'.format(NBFORMAT, error))
+
+
+class NotebookLoader:
+    """Loads notebooks submitted as JSON text, memoized by content hash.
+
+    Tasks submitted with the same notebook content (e.g. a remote notebook
+    served from the notebook cache, or a schedule firing) share the notebook
+    parsed and validated the first time. Entries are evicted least recently
+    used first once the content they were loaded from exceeds max_bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = Lock()
+
+    def load(self, content, location=None, strip_outputs=False):
+        """Return the normalized notebook of content, a dict, or JSON str or bytes"""
+        if not isinstance(content, (str, bytes, bytearray)):
+            # already parsed, e.g. embedded in a JSON request, validation is linear in the number of cells
+            return load_notebook(content, location, strip_outputs)
+
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        key = (hashlib.sha256(data).hexdigest(), bool(strip_outputs))
+        size = len(data)
+        del data
+        notebook = self._cached(key)
+        if notebook is None:
+            notebook = load_notebook(content, location, strip_outputs)
+            self._cache(key, notebook, size)
+        return notebook
+
+    def load_blob(self, key, blob_store):
+        """Return the normalized notebook stored in blob_store, key being the hash of its content"""
+        notebook = self._cached((key, False))
+        if notebook is None:
+            blob = blob_store.get(key)
+            notebook = load_notebook(blob[:])
+            self._cache((key, False), notebook, len(blob))
+        return notebook
+
+    def _cached(self, key):
+        with self._lock:
+            notebook = self._entries.get(key)
+            if notebook is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return notebook
+
+    def _cache(self, key, notebook, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = notebook
+                self._sizes[key] = size
+                self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                evicted, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted)
+
+    def stats(self):
+        with self._lock:
+            return dict(entries=len(self._entries), bytes=self._total_bytes, hits=self.hits, misses=self.misses)
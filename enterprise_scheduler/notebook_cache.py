@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('EGS_NOTEBOOK_CACHE_SIZE', 256))
+DEFAULT_TTL = float(os.getenv('EGS_NOTEBOOK_CACHE_TTL', 300))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv('EGS_NOTEBOOK_CONNECT_TIMEOUT', 5))
+DEFAULT_READ_TIMEOUT = float(os.getenv('EGS_NOTEBOOK_READ_TIMEOUT', 30))
+DEFAULT_CACHE_DIR = os.getenv('EGS_NOTEBOOK_CACHE_DIR')
+
+
+class _CachedNotebook:
+    __slots__ = ('url', 'content', 'etag', 'last_modified', 'fetched_at')
+
+    def __init__(self, url, content, etag=None, last_modified=None, fetched_at=None):
+        self.url = url
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+
+
+class NotebookCache:
+    """Bounded LRU cache of remote notebooks keyed by URL.
+
+    Entries are served from memory for ttl seconds, then revalidated with a
+    conditional request (If-None-Match / If-Modified-Since) so unchanged
+    notebooks are not downloaded again. Requests share a pooled HTTP session.
+    When cache_dir is set, entries are also persisted on disk and revalidated
+    before their first use after a restart."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 cache_dir=DEFAULT_CACHE_DIR, pool_size=10):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache_dir = cache_dir
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.pool_size = pool_size
+        self._session = None
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def session(self):
+        """Pooled HTTP session, created (and requests imported) on the first remote notebook"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def get(self, url):
+        """Return the content of the notebook at url"""
+        if urlparse(url).scheme not in ('http', 'https'):
+            # e.g. file:// locations, read directly
+            with urlopen(url, timeout=self.timeout[1]) as response:
+                return response.read().decode()
+
+        entry = self._lookup(url)
+        if entry is not None and time.monotonic() - entry.fetched_at < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return entry.content
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if entry is not None and response.status_code == 304:
+            entry.fetched_at = time.monotonic()
+            with self._lock:
+                self.hits += 1
+                self.revalidations += 1
+            self._store(entry, persist=False)
+            return entry.content
+
+        response.raise_for_status()
+        # notebooks are UTF-8 JSON, whatever charset the server advertises (or guesses)
+        entry = _CachedNotebook(url, response.content.decode('utf-8'),
+                                etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'))
+        with self._lock:
+            self.misses += 1
+        self._store(entry, persist=True)
+        return entry.content
+
+    def stats(self):
+        with self._lock:
+            return dict(entries=len(self._entries), hits=self.hits, misses=self.misses,
+                        revalidations=self.revalidations)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                return entry
+
+        entry = self._load(url)
+        if entry is not None:
+            self._store(entry, persist=False)
+        return entry
+
+    def _store(self, entry, persist):
+        with self._lock:
+            self._entries[entry.url] = entry
+            self._entries.move_to_end(entry.url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if persist and self.cache_dir and (entry.etag or entry.last_modified):
+            path = self._path(entry.url)
+            # concurrent writers of the same entry each use their own temporary file
+            descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                    json.dump(dict(url=entry.url, content=entry.content,
+                                   etag=entry.etag, last_modified=entry.last_modified), f)
+                os.replace(temporary, path)
+            except BaseException:
+                os.remove(temporary)
+                raise
+
+    def _load(self, url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # always revalidate entries loaded from disk
+        return _CachedNotebook(data['url'], data['content'], data.get('etag'), data.get('last_modified'),
+                               fetched_at=time.monotonic() - self.ttl)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
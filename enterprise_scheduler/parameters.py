@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Notebook parameters, injected the way papermill does.
+
+Parameters are assigned in a cell tagged 'injected-parameters' inserted
+right after the cell tagged 'parameters' (holding the defaults), or at the
+top of the notebook when there is none. Cells injected by a previous run
+are replaced. Values are written as Python
+literals, so parameterized notebooks must run on Python kernels."""
+
+import itertools
+import os
+
+PARAMETERS_TAG = 'parameters'
+INJECTED_PARAMETERS_TAG = 'injected-parameters'
+
+DEFAULT_MAX_SWEEP_RUNS = int(os.getenv('EGS_MAX_SWEEP_RUNS', 1000))
+
+
+def parameters_source(parameters):
+    """Source of the cell assigning the parameters"""
+    lines = ['# Parameters']
+    for name, value in parameters.items():
+        lines.append('{} = {!r}'.format(name, value))
+    return '\n'.join(lines) + '\n'
+
+
+def without_injected_parameters(cells):
+    """Cells of a notebook without those of previously injected parameters"""
+    return [cell for cell in cells if INJECTED_PARAMETERS_TAG not in cell.get('metadata', {}).get('tags', ())]
+
+
+def injection_index(cells):
+    """Index at which the parameters cell is inserted: after the cell tagged 'parameters', or 0"""
+    for index, cell in enumerate(cells):
+        if PARAMETERS_TAG in cell.get('metadata', {}).get('tags', ()):
+            return index + 1
+    return 0
+
+
+def validate_parameters(parameters):
+    if not isinstance(parameters, dict):
+        raise ValueError('Task parameters must be an object of name to value')
+    for name in parameters:
+        if not isinstance(name, str) or not name.isidentifier():
+            raise ValueError('Invalid parameter name: {}'.format(name))
+    return parameters
+
+
+def parameter_sets(sweep, max_runs=DEFAULT_MAX_SWEEP_RUNS):
+    """Expand a sweep into the parameters of every run.
+
+    A sweep is either a list of parameter objects, or an object of parameter
+    name to the list of its values, every combination of which is run (grid)."""
+    if isinstance(sweep, list):
+        runs = [validate_parameters(parameters) for parameters in sweep]
+    elif isinstance(sweep, dict):
+        validate_parameters(sweep)
+        for name, values in sweep.items():
+            if not isinstance(values, list) or not values:
+                raise ValueError('Sweep values of parameter {} must be a non empty list'.format(name))
+        count = 1
+        for values in sweep.values():
+            count *= len(values)
+        if count > max_runs:
+            raise ValueError('Sweep has {} runs, more than the limit of {}'.format(count, max_runs))
+        runs = [dict(zip(sweep.keys(), values)) for values in itertools.product(*sweep.values())]
+    else:
+        raise ValueError('Task sweep must be a list of parameters or an object of parameter values')
+
+    if not runs:
+        raise ValueError('Task sweep has no runs')
+    if len(runs) > max_runs:
+        raise ValueError('Sweep has {} runs, more than the limit of {}'.format(len(runs), max_runs))
+    return runs
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import logging
+import os
+import zlib
+from collections import OrderedDict, deque
+from threading import Condition, Lock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RESULT_BYTES = int(os.getenv('EGS_MAX_RESULT_BYTES', 16 * 1024 * 1024))
+DEFAULT_MAX_TOTAL_BYTES = int(os.getenv('EGS_MAX_TOTAL_RESULT_BYTES', 256 * 1024 * 1024))
+
+
+class ResultStore:
+    """Bounded, compressed store of task results (e.g. executed notebooks).
+
+    Results are kept as zlib compressed JSON. When a compressed result exceeds
+    max_result_bytes the cell outputs are dropped (and the notebook metadata
+    flags it), and least recently used results are evicted once the store
+    holds more than max_total_bytes."""
+
+    def __init__(self, max_result_bytes=DEFAULT_MAX_RESULT_BYTES, max_total_bytes=DEFAULT_MAX_TOTAL_BYTES,
+                 compression_level=6):
+        self.max_result_bytes = max_result_bytes
+        self.max_total_bytes = max_total_bytes
+        self.compression_level = compression_level
+        self.evictions = 0
+
+        self._results = OrderedDict()
+        self._total_bytes = 0
+        self._lock = Lock()
+
+    def put(self, task_id, result):
+        if result is None:
+            return
+
+        data = self._compress(result)
+        if len(data) > self.max_result_bytes:
+            data = self._compress(self._without_outputs(result))
+            if len(data) > self.max_result_bytes:
+                logger.warning('Discarding result of task [%s]: %d bytes exceed the result limit', task_id, len(data))
+                return
+
+        key = str(task_id)
+        with self._lock:
+            previous = self._results.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= len(previous)
+            self._results[key] = data
+            self._total_bytes += len(data)
+
+            while self._total_bytes > self.max_total_bytes and len(self._results) > 1:
+                evicted_key, evicted = self._results.popitem(last=False)
+                self._total_bytes -= len(evicted)
+                self.evictions += 1
+
+    def get(self, task_id):
+        """Return the result of a task or None when it is unknown or has been evicted"""
+        with self._lock:
+            data = self._results.get(str(task_id))
+            if data is None:
+                return None
+            self._results.move_to_end(str(task_id))
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+
+    def stats(self):
+        with self._lock:
+            return dict(results=len(self._results), bytes=self._total_bytes, evictions=self.evictions)
+
+    def _compress(self, result):
+        return zlib.compress(json.dumps(result, default=str).encode('utf-8'), self.compression_level)
+
+    @staticmethod
+    def _without_outputs(result):
+        if not isinstance(result, dict) or 'cells' not in result:
+            return dict(truncated=True)
+
+        stripped = dict(result)
+        stripped['cells'] = [dict(cell, outputs=[]) if 'outputs' in cell else cell for cell in result['cells']]
+        metadata = dict(stripped.get('metadata', {}))
+        metadata['enterprise_scheduler'] = dict(outputs_truncated=True)
+        stripped['metadata'] = metadata
+        return stripped
+
+
+class _OutputStream:
+    __slots__ = ('events', 'offset', 'closed', 'condition')
+
+    def __init__(self, max_events):
+        self.events = deque(maxlen=max_events)
+        self.offset = 0
+        self.closed = False
+        self.condition = Condition()
+
+
+class OutputBroker:
+    """Publishes the outputs of running tasks to any number of subscribers.
+
+    Only the last max_events outputs of each running task are buffered;
+    subscribers falling further behind skip the outputs already dropped."""
+
+    def __init__(self, max_events=1000, max_closed=10000):
+        self.max_events = max_events
+        self.max_closed = max_closed
+        self._streams = {}
+        self._closed = OrderedDict()
+        self._lock = Lock()
+
+    def publish(self, task_id, event):
+        stream = self._stream(str(task_id))
+        if stream is None:
+            # late outputs (e.g. of an aborted cell) of a completed task
+            logger.debug('Dropping output of closed task [%s]', task_id)
+            return
+        with stream.condition:
+            if len(stream.events) == stream.events.maxlen:
+                stream.offset += 1
+            stream.events.append(event)
+            stream.condition.notify_all()
+
+    def close(self, task_id):
+        """Mark the end of the outputs of a task"""
+        key = str(task_id)
+        with self._lock:
+            stream = self._streams.pop(key, None)
+            self._closed[key] = True
+            while len(self._closed) > self.max_closed:
+                self._closed.popitem(last=False)
+
+        if stream is not None:
+            with stream.condition:
+                stream.closed = True
+                stream.condition.notify_all()
+
+    def subscribe(self, task_id, keepalive=15):
+        """Return a generator of the task outputs, yielding None every keepalive seconds
+        without output, or None when the outputs of the task have already been closed"""
+        stream = self._stream(str(task_id))
+        if stream is None:
+            return None
+        return self._follow(stream, keepalive)
+
+    def _stream(self, key):
+        """The stream of a task, None once closed"""
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                if key in self._closed:
+                    return None
+                stream = self._streams[key] = _OutputStream(self.max_events)
+            return stream
+
+    @staticmethod
+    def _follow(stream, keepalive):
+        position = 0
+        while True:
+            with stream.condition:
+                if position >= stream.offset + len(stream.events) and not stream.closed:
+                    stream.condition.wait(keepalive)
+                position = max(position, stream.offset)
+                events = list(stream.events)[position - stream.offset:]
+                closed = stream.closed
+
+            if not events and not closed:
+                yield None
+            for event in events:
+                yield event
+            position += len(events)
+
+            if closed and not events:
+                return
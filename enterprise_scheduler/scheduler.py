@@ -15,77 +15,560 @@
 # limitations under the License.
 #
 
-import queue
+import logging
+import time
 import uuid
-from threading import Thread
-from urllib.request import urlopen
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
 
-from enterprise_scheduler.executor import JupyterExecutor, FfDLExecutor
+from enterprise_scheduler import metrics
+from enterprise_scheduler.blob_store import BINARY_TYPES, DEFAULT_SPILL_THRESHOLD, BlobStore
+from enterprise_scheduler.executor import ExecutorRegistry, TaskCancelled
+from enterprise_scheduler.notebook import NotebookLoader, notebook_digest, notebook_json
+from enterprise_scheduler.notebook_cache import NotebookCache
+from enterprise_scheduler.parameters import parameter_sets, validate_parameters
+from enterprise_scheduler.results import OutputBroker, ResultStore
+from enterprise_scheduler.task import TaskEnvelope
+from enterprise_scheduler.task_store import TaskStore, RESOLVING, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED, \
+    TERMINAL_STATES
+from enterprise_scheduler.worker_pool import DEFAULT_POOL, DEFAULT_POOL_SIZES, DEFAULT_ENDPOINT_CONCURRENCY, \
+    DEFAULT_MAX_QUEUED, EndpointLimiter, WorkerPool, _SHUTDOWN
+
+logger = logging.getLogger(__name__)
+
+
+class BatchValidationError(ValueError):
+    """Raised when tasks submitted together are invalid, errors holds (index, message) pairs"""
+
+    def __init__(self, errors):
+        super().__init__('Invalid tasks: {}'.format(
+            '; '.join('[{}] {}'.format(index, message) for index, message in errors)))
+        self.errors = errors
 
 
 class Scheduler:
+    """Executes submitted tasks on pools of threads.
+
+    Executor types listed in pool_sizes (executor -> threads) get a pool and
+    queue of their own, so e.g. long notebook executions cannot starve FfDL
+    submissions; other executors share the default pool of number_of_threads
+    threads. At most endpoint_concurrency tasks (0 for unlimited) run against
+    any endpoint at once, and submissions are rejected with SchedulerBusy once
+    a pool holds max_queued waiting tasks (0 for unbounded)."""
 
-    def __init__(self, default_gateway_host=None, default_kernelspec=None, number_of_threads=5):
+    def __init__(self, default_gateway_host=None, default_kernelspec=None, number_of_threads=5, task_store=None,
+                 result_store=None, notebook_cache=None, prefetch_threads=4, pool_sizes=None,
+                 endpoint_concurrency=DEFAULT_ENDPOINT_CONCURRENCY, max_queued=DEFAULT_MAX_QUEUED,
+                 notebook_loader=None, blob_store=None, spill_threshold=DEFAULT_SPILL_THRESHOLD):
         self.default_gateway_host = default_gateway_host
         self.default_kernelspec = default_kernelspec
         self.number_of_threads = number_of_threads
+        # remote notebooks are resolved by prefetch_threads threads, or inline by schedule_task when 0
+        self.prefetch_threads = prefetch_threads
+        self.task_store = task_store or TaskStore()
+        self.results = result_store or ResultStore()
+        self.outputs = OutputBroker()
+        self.notebook_cache = notebook_cache or NotebookCache()
+        self.notebook_loader = notebook_loader or NotebookLoader()
+        # queued tasks keep payloads of spill_threshold bytes or more in the blob store (0 to disable)
+        self.blob_store = blob_store or BlobStore()
+        self.spill_threshold = spill_threshold
 
-        self.executors = {}
-        self.executors[JupyterExecutor.TYPE] = JupyterExecutor()
-        self.executors[FfDLExecutor.TYPE] = FfDLExecutor()
+        # executors are created when first needed by a task
+        self.executors = ExecutorRegistry(on_create=self._attach_executor)
 
-        self.queue = queue.PriorityQueue()
-        self.executor_threads = []
+        self.pools = {DEFAULT_POOL: WorkerPool(DEFAULT_POOL, number_of_threads, max_queued)}
+        for executor_type, size in (DEFAULT_POOL_SIZES if pool_sizes is None else pool_sizes).items():
+            self.pools[executor_type] = WorkerPool(executor_type, size, max_queued)
+        self.endpoint_limiter = EndpointLimiter(endpoint_concurrency)
+        self.max_queued = max_queued
+        # held from the check of the queue limits until the accepted tasks are queued
+        self._admission_lock = Lock()
+        # queue of the default pool
+        self.queue = self.pools[DEFAULT_POOL].queue
         self.running = False
+        self._recovered = False
+        self._prefetch_pool = None
+        self._prefetch_lock = Lock()
+
+        # schedule_task -> execution start latency of recently dispatched tasks
+        self._dispatch_latencies = deque(maxlen=1024)
+        self._latency_lock = Lock()
+
+        # executor type of the running tasks, and ids of the cancelled tasks not yet dequeued
+        self._running_tasks = {}
+        self._cancelled = set()
+        self._cancel_lock = Lock()
+
+    def register_executor(self, executor):
+        """Make the executor available to tasks with a matching 'executor' property"""
+        self._attach_executor(executor)
+        self.executors[executor.TYPE] = executor
+
+    def _attach_executor(self, executor):
+        executor.output_listener = self.outputs
+        executor.task_store = self.task_store
+
+    @property
+    def executor_threads(self):
+        return [t for pool in self.pools.values() for t in pool.threads]
+
+    def _executor(self, pool):
+        while True:
+            # block until a task (or the shutdown sentinel) is available
+            envelope = pool.queue.get()
+            try:
+                if envelope is _SHUTDOWN:
+                    return
+                endpoint = envelope.task.get('endpoint')
+                if not self.endpoint_limiter.acquire(endpoint, envelope, pool):
+                    # resumed once a task running against the endpoint completes
+                    continue
+                try:
+                    with pool.busy():
+                        self._run(envelope)
+                finally:
+                    self._release_endpoint(endpoint)
+            finally:
+                pool.queue.task_done()
+
+    def _run(self, envelope):
+        try:
+            if self._dispatch(envelope):
+                with metrics.time_stage(metrics.TASK_EXECUTION):
+                    result = self._execute_task(envelope.task)
+                self._complete(envelope, result=result)
+        except TaskCancelled as cancelled:
+            logger.info('%s', cancelled)
+            self._complete(envelope, error=cancelled)
+        except BaseException as base:
+            logger.error('Error executing task [%s]: %s', envelope.id, base)
+            self._complete(envelope, error=base)
+
+    def _release_endpoint(self, endpoint):
+        # the first parked task of the endpoint, if any, is queued again
+        self.endpoint_limiter.release(endpoint)
+
+    def _dispatch(self, envelope):
+        """Record the dispatch of a dequeued task, returning whether it should be executed"""
+        latency = time.monotonic() - envelope.enqueued_at
+        metrics.observe_stage(metrics.QUEUE_WAIT, latency)
+        with self._latency_lock:
+            self._dispatch_latencies.append(latency)
+
+        if envelope.expired():
+            logger.info('Skipping task [%s]: deadline has expired', envelope.id)
+            self._release_payloads(envelope)
+            self._complete(envelope, error='deadline expired')
+            return False
+
+        with self._cancel_lock:
+            cancelled = str(envelope.id) in self._cancelled
+            if not cancelled:
+                self._running_tasks[str(envelope.id)] = str(envelope.task['executor']).lower()
+        if cancelled:
+            logger.info('Skipping task [%s]: cancelled', envelope.id)
+            self._release_payloads(envelope)
+            self._complete(envelope, error=TaskCancelled('Task [{}] was cancelled'.format(envelope.id)))
+            return False
+
+        self._load_payloads(envelope)
+        self.task_store.set_state(envelope.id, RUNNING)
+        return True
+
+    def _complete(self, envelope, result=None, error=None):
+        """Record the outcome of an executed task.
+
+        Executors running tasks in the background (e.g. FfDL trainings) return
+        a Future, the task is then completed once the future is resolved."""
+        if isinstance(result, Future):
+            result.add_done_callback(lambda future: self._complete_future(envelope, future))
+            return
+
+        with self._cancel_lock:
+            self._running_tasks.pop(str(envelope.id), None)
+            self._cancelled.discard(str(envelope.id))
 
-    def _executor(self):
-        while self.running:
-            if not self.queue.empty():
-                task = self.queue.get()
-                self._execute_task(task)
-                self.queue.task_done()
+        state = CANCELLED if isinstance(error, TaskCancelled) else FAILED if error else SUCCEEDED
+        self.results.put(envelope.id, result)
+        self.task_store.set_state(envelope.id, state, str(error) if state == CANCELLED else error)
+        metrics.TASKS_COMPLETED.labels(str(envelope.task.get('executor')).lower(), state).inc()
+        self.outputs.close(envelope.id)
+
+    def _complete_future(self, envelope, future):
+        error = future.exception()
+        if error is not None:
+            logger.error('Error executing task [%s]: %s', envelope.id, error)
+            self._complete(envelope, error=error)
+        else:
+            self._complete(envelope, result=future.result())
+
+    def cancel_task(self, task_id):
+        """Cancel a task, returning False when it is unknown, completed or cannot be cancelled.
+
+        Queued tasks are removed from their queue, running tasks are interrupted
+        by their executor; either way the task ends in the 'cancelled' state
+        and its worker thread is free for the next task."""
+        record = self.task_store.get(task_id)
+        if record is None or record['state'] in TERMINAL_STATES:
+            return False
+
+        with self._cancel_lock:
+            executor_type = self._running_tasks.get(str(task_id))
+            if executor_type is None:
+                # dropped when dequeued if not removed from its queue below
+                self._cancelled.add(str(task_id))
+
+        if executor_type is not None:
+            if not self.executors[executor_type].cancel_dispatched_task(task_id):
+                return False
+            logger.info('Cancelling running task [%s]', task_id)
+            metrics.TASKS_CANCELLED.labels(RUNNING).inc()
+            return True
+
+        logger.info('Cancelling %s task [%s]', record['state'], task_id)
+        metrics.TASKS_CANCELLED.labels(record['state']).inc()
+        envelope = self._remove_queued(task_id)
+        if envelope is not None:
+            self._release_payloads(envelope)
+            self._complete(envelope, error=TaskCancelled('Task [{}] was cancelled'.format(task_id)))
+        else:
+            self.task_store.set_state(task_id, CANCELLED, 'Task [{}] was cancelled'.format(task_id))
+        return True
+
+    def _remove_queued(self, task_id):
+        """Remove a task from the queues, returning its envelope or None when not queued"""
+        for pool in self.pools.values():
+            envelope = pool.queue.remove(task_id)
+            if envelope is not None:
+                return envelope
+        return self.endpoint_limiter.remove(task_id)
+
+    def pool_stats(self):
+        """Queue depth and utilization of each pool, and the load of each endpoint"""
+        return dict(pools={name: pool.stats() for name, pool in self.pools.items()},
+                    endpoints=self.endpoint_limiter.stats())
+
+    def dispatch_latency(self):
+        """Summary (in seconds) of the delay between schedule_task and execution start
+        for the most recently dispatched tasks."""
+        with self._latency_lock:
+            samples = sorted(self._dispatch_latencies)
+
+        if not samples:
+            return dict(count=0, p50=None, p99=None, max=None)
+
+        return dict(count=len(samples),
+                    p50=samples[int(0.50 * (len(samples) - 1))],
+                    p99=samples[int(0.99 * (len(samples) - 1))],
+                    max=samples[-1])
 
     def _execute_task(self, task):
         executor_type = task['executor'].lower()  # Jupyter, Docker, FfDL
         executor = self.executors[executor_type]
-        executor.execute_task(task)
+        return executor.execute_task(task)
 
     def schedule_task(self, task):
+        """Submit a task and return its id.
+
+        Only cheap checks are done synchronously: tasks referencing a
+        notebook_location are queued once the notebook has been downloaded
+        and validated by the prefetch threads."""
         id = uuid.uuid4()
         task['id'] = id
 
-        if 'notebook_location' in task.keys():
-            notebook_location = task['notebook_location']
-            task['notebook'] = self._read_remote_notebook_content(notebook_location)
+        self.validate_task(task)
+        envelope = TaskEnvelope.from_task(task)
 
-        self._validate_task(task)
+        if self._needs_resolution(task) and not self.prefetch_threads:
+            self._resolve_notebook(task)
 
-        print('adding task [{}] to queue:\n {}'.format(id, str(task)))
-        self.queue.put(item=task)
+        self._submit([envelope])
         return id
 
+    def schedule_tasks(self, tasks):
+        """Submit several tasks at once and return their ids.
+
+        Every task is validated before any is accepted: when some are invalid
+        a BatchValidationError listing all of them is raised and nothing is
+        queued. Otherwise all tasks are recorded and queued in one operation."""
+        envelopes = []
+        errors = []
+        for index, task in enumerate(tasks):
+            try:
+                if not isinstance(task, dict):
+                    raise ValueError('Submitted task is not a JSON object')
+                task['id'] = uuid.uuid4()
+                self.validate_task(task)
+                envelopes.append(TaskEnvelope.from_task(task))
+            except ValueError as error:
+                errors.append((index, str(error)))
+
+        if errors:
+            raise BatchValidationError(errors)
+
+        if not self.prefetch_threads:
+            for envelope in envelopes:
+                if self._needs_resolution(envelope.task):
+                    self._resolve_notebook(envelope.task)
+
+        self._submit(envelopes)
+        return [envelope.id for envelope in envelopes]
+
+    def _submit(self, envelopes):
+        with self._admission_lock:
+            self._reserve(envelopes)
+            self._accept(envelopes)
+
+    def _accept(self, envelopes):
+        for envelope in envelopes:
+            metrics.TASKS_SUBMITTED.labels(str(envelope.task['executor']).lower()).inc()
+        resolving = [envelope for envelope in envelopes if self._needs_resolution(envelope.task)]
+        ready = [envelope for envelope in envelopes if not self._needs_resolution(envelope.task)]
+
+        if len(envelopes) == 1:
+            envelope = envelopes[0]
+            if resolving:
+                logger.info('resolving task [%s] notebook %s', envelope.id, envelope.task['notebook_location'])
+            else:
+                self._log_queued(envelope)
+        else:
+            logger.info('adding %d tasks to queue (%d resolving notebooks)', len(envelopes), len(resolving))
+
+        if resolving:
+            self.task_store.add_many(resolving, RESOLVING)
+        if ready:
+            self.task_store.add_many(ready)
+            for envelope in ready:
+                self._spill(envelope)
+            self._enqueue_many(ready)
+
+        for envelope in resolving:
+            self._prefetch(envelope)
+
+    def _pool(self, task):
+        return self.pools.get(str(task['executor']).lower()) or self.pools[DEFAULT_POOL]
+
+    def _reserve(self, envelopes):
+        """Apply backpressure: raise SchedulerBusy when a pool cannot take its share of the tasks"""
+        counts = {}
+        for envelope in envelopes:
+            pool = self._pool(envelope.task)
+            counts[pool] = counts.get(pool, 0) + 1
+        for pool, count in counts.items():
+            pool.reserve(count, self.endpoint_limiter.parked(pool))
+
+    def _enqueue(self, envelope):
+        self._pool(envelope.task).queue.put(item=envelope)
+
+    def _enqueue_many(self, envelopes):
+        by_pool = {}
+        for envelope in envelopes:
+            by_pool.setdefault(self._pool(envelope.task), []).append(envelope)
+        for pool, pool_envelopes in by_pool.items():
+            pool.queue.put_many(pool_envelopes)
+
+    @staticmethod
+    def _log_queued(envelope):
+        logger.info('adding task [%s] to queue', envelope.id)
+        if logger.isEnabledFor(logging.DEBUG):
+            # embedded notebooks are left out, secrets are redacted by the log handler
+            logger.debug('task [%s]: %s', envelope.id,
+                         {key: value for key, value in envelope.task.items() if key != 'notebook'})
+
+    @staticmethod
+    def _needs_resolution(task):
+        return 'notebook_location' in task.keys() and 'notebook' not in task.keys()
+
+    def _prefetch(self, envelope):
+        with self._prefetch_lock:
+            if self._prefetch_pool is None:
+                self._prefetch_pool = ThreadPoolExecutor(max_workers=self.prefetch_threads)
+            self._prefetch_pool.submit(self._prefetch_task, envelope)
+
+    def _prefetch_task(self, envelope):
+        try:
+            self._resolve_notebook(envelope.task)
+        except BaseException as base:
+            logger.error('Error resolving task [%s]: %s', envelope.id, base)
+            self._complete(envelope, error=base)
+            return
+
+        self._log_queued(envelope)
+        self.task_store.set_state(envelope.id, QUEUED)
+        with self._cancel_lock:
+            cancelled = str(envelope.id) in self._cancelled
+        if cancelled:
+            self._complete(envelope, error=TaskCancelled('Task [{}] was cancelled'.format(envelope.id)))
+            return
+        self._spill(envelope)
+        self._enqueue(envelope)
+
+    def _resolve_notebook(self, task):
+        """Download and validate the notebook referenced by the task notebook_location"""
+        with metrics.time_stage(metrics.NOTEBOOK_FETCH):
+            content = self._read_remote_notebook_content(task['notebook_location'])
+        self._load_notebook(task, content, task['notebook_location'])
+
+    def _load_notebook(self, task, content, location=None):
+        """Validate and normalize the task notebook, once: executors use it as is"""
+        with metrics.time_stage(metrics.NOTEBOOK_VALIDATION):
+            task['notebook'] = self.notebook_loader.load(content, location,
+                                                         strip_outputs=bool(task.get('strip_outputs', False)))
+
+    def _spill(self, envelope):
+        """Move the large payloads of a task about to be queued to the blob store"""
+        if not self.spill_threshold:
+            return
+        task = envelope.task
+        payloads = {}
+
+        notebook = task.get('notebook')
+        if isinstance(notebook, dict):
+            data = notebook_json(notebook)
+            if len(data) >= self.spill_threshold:
+                payloads['notebook'] = self.blob_store.put(data, notebook_digest(notebook))
+
+        dependencies = task.get('dependencies')
+        if isinstance(dependencies, dict):
+            # (name, blob key or None when kept inline) pairs, in order
+            spilled = []
+            for name, contents in dependencies.items():
+                data = contents if isinstance(contents, BINARY_TYPES) else str(contents).encode('utf-8')
+                spilled.append((name, self.blob_store.put(data) if len(data) >= self.spill_threshold else None))
+            if any(key for name, key in spilled):
+                payloads['dependencies'] = spilled
+
+        if payloads:
+            # the submitted task dict is left as is, the queue only holds the metadata
+            metadata = dict(task)
+            if 'notebook' in payloads:
+                del metadata['notebook']
+            if 'dependencies' in payloads:
+                metadata['dependencies'] = {name: dependencies[name] for name, key in spilled if key is None}
+            envelope.task = metadata
+            envelope.payloads = payloads
+
+    def _load_payloads(self, envelope):
+        """Load the spilled payloads of a task about to be executed back into it"""
+        if not envelope.payloads:
+            return
+        try:
+            task = dict(envelope.task)
+            if 'notebook' in envelope.payloads:
+                task['notebook'] = self.notebook_loader.load_blob(envelope.payloads['notebook'], self.blob_store)
+            if 'dependencies' in envelope.payloads:
+                inline = task['dependencies']
+                # spilled dependencies are memory-mapped, and stay readable once released
+                task['dependencies'] = {name: self.blob_store.get(key) if key else inline[name]
+                                        for name, key in envelope.payloads['dependencies']}
+            envelope.task = task
+        finally:
+            self._release_payloads(envelope)
+
+    def _release_payloads(self, envelope):
+        payloads, envelope.payloads = envelope.payloads, None
+        if not payloads:
+            return
+        if 'notebook' in payloads:
+            self.blob_store.release(payloads['notebook'])
+        for name, key in payloads.get('dependencies', ()):
+            if key:
+                self.blob_store.release(key)
+
+    def _stop_prefetch(self, drain):
+        """Wait for in-flight notebook downloads, pending ones are only completed when draining"""
+        with self._prefetch_lock:
+            pool, self._prefetch_pool = self._prefetch_pool, None
+
+        if pool is not None:
+            # tasks whose download is cancelled stay 'resolving' and are recovered on restart
+            pool.shutdown(wait=True, cancel_futures=not drain)
+
     def start(self):
+        self._recover_tasks()
         self.running = True
-        for i in range(1, self.number_of_threads):
-            t = Thread(target=self._executor)
-            t.daemon = True
-
-            self.executor_threads.append(t)
+        self.pools[DEFAULT_POOL].size = self.number_of_threads
+        for pool in self.pools.values():
+            pool.start(self._executor)
 
-            t.start()
+    def stop(self, drain=True):
+        """Stop the executor threads.
 
-    def stop(self):
-        #self.queue.join()
+        When drain is True (the default) every task already queued is executed
+        before the threads exit, otherwise pending tasks are discarded and only
+        the tasks currently running are allowed to finish."""
         self.running = False
+        self._stop_prefetch(drain)
 
-        for t in self.executor_threads:
-            t.join()
+        if drain and all(pool.threads for pool in self.pools.values()):
+            self._drain_pools()
+        elif not drain:
+            self._discard_pending_tasks()
 
-    @staticmethod
-    def _validate_task(task):
+        for pool in self.pools.values():
+            pool.stop()
+
+        for pool in self.pools.values():
+            pool.join()
+
+        # tasks parked or handed back to a pool while it was stopping are left for recovery
+        discarded = self._discard_pending_tasks()
+        if discarded:
+            logger.warning('%d tasks were not executed before the scheduler stopped', discarded)
+
+        self._shutdown_executors()
+        self.task_store.flush()
+        # tasks left queued are recovered from the task store, with their payloads
+        self.blob_store.close()
+
+    def _recover_tasks(self):
+        """Re-queue the tasks left queued or running by a previous scheduler process"""
+        if self._recovered:
+            return
+        self._recovered = True
+
+        for task in self.task_store.pending():
+            logger.info('recovering task [%s]', task['id'])
+            envelope = TaskEnvelope.from_task(task)
+            if self._needs_resolution(task) and self.prefetch_threads:
+                self.task_store.set_state(task['id'], RESOLVING)
+                self._prefetch(envelope)
+            else:
+                self.task_store.set_state(task['id'], QUEUED)
+                self._spill(envelope)
+                self._enqueue(envelope)
+
+    def _shutdown_executors(self):
+        for executor in self.executors.loaded().values():
+            shutdown = getattr(executor, 'shutdown', None)
+            if shutdown:
+                shutdown()
+
+    def _drain_pools(self):
+        """Wait until every queued task, including the parked ones, has been executed"""
+        while True:
+            for pool in self.pools.values():
+                pool.queue.join()
+            if self.endpoint_limiter.settled(self.pools.values()):
+                return
+
+    def _discard_pending_tasks(self):
+        """Drop the queued and parked tasks, returning how many were dropped"""
+        discarded = len(self.endpoint_limiter.discard_parked())
+        for pool in self.pools.values():
+            discarded += pool.discard_pending()
+        return discarded
+
+    def validate_task(self, task):
+        """Raise a ValueError when task is not a valid task of this scheduler"""
         if 'executor' not in task.keys():
             raise ValueError('Submitted task is missing [executor] information')
 
+        if str(task['executor']).lower() not in self.executors:
+            raise ValueError('Submitted task has unknown [executor] information: {}'.format(task['executor']))
+
         if 'endpoint' not in task.keys():
             raise ValueError('Submitted task is missing [endpoint] information')
 
@@ -95,11 +578,29 @@ class Scheduler:
         if 'notebook_location' not in task.keys() and 'notebook' not in task.keys():
             raise ValueError('Submitted task is missing notebook information (either notebook_location or notebook)')
 
+        if 'notebook' in task.keys():
+            self._load_notebook(task, task['notebook'])
 
-    @staticmethod
-    def _read_remote_notebook_content(notebook_location):
+        if 'parameters' in task.keys():
+            validate_parameters(task['parameters'])
+
+        if 'sweep' in task.keys():
+            parameter_sets(task['sweep'])
+
+        for name in ('timeout', 'cell_timeout'):
+            timeout = task.get(name)
+            if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                                        or timeout <= 0):
+                raise ValueError('Submitted task has invalid [{}] information: {}'.format(name, timeout))
+
+        for name in ('sweep_parallelism', 'max_kernels'):
+            count = task.get(name)
+            if count is not None and (isinstance(count, bool) or not isinstance(count, int) or count <= 0):
+                raise ValueError('Submitted task has invalid [{}] information: {}'.format(name, count))
+
+    def _read_remote_notebook_content(self, notebook_location):
         try:
-            notebook_content = urlopen(notebook_location).read().decode()
+            notebook_content = self.notebook_cache.get(notebook_location)
             return notebook_content
         except BaseException as base:
             raise Exception('Error reading notebook source "{}": {}'.format(notebook_location, base))
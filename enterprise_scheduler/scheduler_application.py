@@ -17,6 +17,7 @@
 
 """Enterprise Scheduler - Schedule Notebook execution."""
 import os
+import signal
 import sys
 
 import asyncio
@@ -24,32 +25,66 @@ import click
 from flask import Flask
 from flask_restful import Api
 
-from enterprise_scheduler.scheduler_resource import SchedulerResource
+from enterprise_scheduler import scheduler_resource
+from enterprise_scheduler.scheduler_resource import SchedulerResource, TaskResource, TaskResultResource, \
+    TaskOutputsResource, SchedulesResource, ScheduleResource, MetricsResource
+from enterprise_scheduler.log import configure_logging
+from enterprise_scheduler.server import DEFAULT_SERVER_THREADS, SchedulerServer
 from enterprise_scheduler.util import fix_asyncio_event_loop_policy
 
 server_name = os.getenv('SERVER_NAME','127.0.0.1:5000')
 
+
+def create_app(gateway_host, kernelspec):
+    """Create the Flask application exposing the scheduler REST API"""
+    app = Flask('Notebook Scheduler')
+    api = Api(app)
+
+    api.add_resource(SchedulerResource, '/scheduler/tasks',
+                     resource_class_kwargs={ 'default_gateway_host': gateway_host, 'default_kernelspec': kernelspec })
+    api.add_resource(TaskResource, '/scheduler/tasks/<task_id>')
+    api.add_resource(TaskResultResource, '/scheduler/tasks/<task_id>/result')
+    api.add_resource(TaskOutputsResource, '/scheduler/tasks/<task_id>/outputs')
+    api.add_resource(SchedulesResource, '/scheduler/schedules',
+                     resource_class_kwargs={ 'default_gateway_host': gateway_host, 'default_kernelspec': kernelspec })
+    api.add_resource(ScheduleResource, '/scheduler/schedules/<schedule_id>')
+    api.add_resource(MetricsResource, '/metrics')
+
+    return app
+
+
 @click.command()
 @click.option('--gateway_host', default='lresende-elyra:8888', help='Jupyter Enterprise Gateway host information')
 @click.option('--kernelspec', default='python2', help='Jupyter Notebook kernelspec to use while executing notebook')
-def main(gateway_host, kernelspec):
+@click.option('--threads', default=DEFAULT_SERVER_THREADS, help='Number of threads serving requests')
+@click.option('--development', is_flag=True, help='Use the Flask development server, with the debugger enabled')
+def main(gateway_host, kernelspec, threads, development):
     """Jupyter Enterprise Scheduler - Schedule Notebook execution."""
     click.echo('Starting Scheduler at {} using Gateway at {} with default kernelspec {}'.format(server_name, gateway_host, kernelspec))
     click.echo('Add new tasks via post commands to http://{}/scheduler/tasks '.format(server_name))
 
     fix_asyncio_event_loop_policy(asyncio)
+    configure_logging()
 
-    app = Flask('Notebook Scheduler')
-    api = Api(app)
-
-    api.add_resource(SchedulerResource, '/scheduler/tasks',
-                     resource_class_kwargs={ 'default_gateway_host': gateway_host, 'default_kernelspec': kernelspec })
-
-    print('Add new tasks via http://{}/scheduler/tasks '.format(server_name))
+    scheduler_resource.start_scheduler()
+    app = create_app(gateway_host, kernelspec)
 
     server_parts = server_name.split(':')
 
-    app.run(host=server_parts[0], port=int(server_parts[1]), debug=True, use_reloader=False)
+    if development:
+        app.run(host=server_parts[0], port=int(server_parts[1]), debug=True, use_reloader=False)
+        return 0
+
+    # stop gracefully on SIGTERM as on Ctrl+C, pending tasks are recovered on restart
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = SchedulerServer(app, server_parts[0], int(server_parts[1]), threads=threads)
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.stop()
+        scheduler_resource.stop_scheduler()
 
     return 0
 
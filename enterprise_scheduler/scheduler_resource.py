@@ -15,21 +15,106 @@
 # limitations under the License.
 #
 
-from flask import Response, request
+import io
+import json
+import os
+
+from flask import Response, request, stream_with_context
 from flask_restful import Resource
 
-from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler import metrics
+from enterprise_scheduler.async_scheduler import AsyncScheduler
+from enterprise_scheduler.cluster_scheduler import ClusterScheduler
+from enterprise_scheduler.scheduler import BatchValidationError, Scheduler
+from enterprise_scheduler.schedules import ScheduleManager, SQLiteScheduleStore
+from enterprise_scheduler.task_store import DEFAULT_NODE_ID, DEFAULT_TASK_STORE_PATH, SQLiteTaskStore, \
+    SharedTaskStore, TERMINAL_STATES
+from enterprise_scheduler.worker_pool import SchedulerBusy
+
+# the scheduler used by the resources, created by start_scheduler()
+task_store = None
+scheduler = None
+schedule_manager = None
+
+
+def start_scheduler():
+    """Create and start the scheduler and schedules served by the resources, unless already started"""
+    global task_store, scheduler, schedule_manager
+    mode = os.getenv('EGS_SCHEDULER_MODE', 'thread')
+    if scheduler is None:
+        # 'thread' (default) runs tasks on a pool of threads, 'asyncio' as coroutines on a single event loop
+        # (executors with blocking clients, e.g. jupyter and ffdl, still take a thread of its pool per task)
+        # and 'cluster' on a pool of threads, sharing the queue with the other nodes using the same EGS_TASK_STORE
+        path = os.getenv('EGS_TASK_STORE', DEFAULT_TASK_STORE_PATH)
+        if mode == 'cluster':
+            task_store = SharedTaskStore(path)
+            scheduler = ClusterScheduler(task_store=task_store)
+        else:
+            # queued and running tasks are persisted to EGS_TASK_STORE and recovered on restart
+            task_store = SQLiteTaskStore(path)
+            if mode == 'asyncio':
+                scheduler = AsyncScheduler(task_store=task_store)
+            else:
+                scheduler = Scheduler(task_store=task_store)
+        scheduler.start()
+
+    if schedule_manager is None:
+        # recurring and delayed tasks, persisted to EGS_SCHEDULE_STORE (by default along with the tasks);
+        # schedules fire on the node they were created on, so cluster nodes keep their own store
+        path = os.getenv('EGS_SCHEDULE_STORE')
+        if path is None:
+            path = os.path.join(os.path.dirname(task_store.path), 'schedules-{}.db'.format(DEFAULT_NODE_ID)) \
+                if mode == 'cluster' else task_store.path
+        schedule_manager = ScheduleManager(scheduler, SQLiteScheduleStore(path))
+        schedule_manager.start()
+    return scheduler
+
+
+def stop_scheduler(drain=False):
+    """Stop the schedules and the scheduler started by start_scheduler()"""
+    global task_store, scheduler, schedule_manager
+    if schedule_manager is not None:
+        schedule_manager.stop()
+        schedule_manager.store.close()
+        schedule_manager = None
+    if scheduler is not None:
+        scheduler.stop(drain=drain)
+        scheduler = None
+    if task_store is not None:
+        task_store.close()
+        task_store = None
 
-scheduler = Scheduler()
-scheduler.start()
 
 class SchedulerResource(Resource):
     """
     Scheduler REST API used to submit Jupyter Notebooks for batch executions
 
     curl -X POST -v http://localhost:5000/scheduler/tasks -d "{\"notebook_location\":\"http://home.apache.org/~lresende/notebooks/notebook-brunel.ipynb\"}"
+
+    Tasks may optionally provide a 'priority' (integer, higher values run first, defaults to 0)
+    and a 'deadline' (UNIX timestamp after which the task is no longer executed).
+
+    An embedded 'notebook' is either the notebook JSON object or its JSON text. With 'strip_outputs'
+    the outputs saved in the notebook are dropped when the task is submitted.
+
+    Jupyter tasks may provide 'parameters' (an object of name to value) assigned in a cell inserted
+    after the cell tagged 'parameters', as papermill does. A 'sweep' runs the notebook once per
+    parameter set, given as a list of parameter objects or as an object of parameter name to its
+    list of values (every combination is run), at most 'sweep_parallelism' runs at once; the result
+    is then the summary of the runs.
+
+    A 'timeout' bounds the execution of the whole task and a 'cell_timeout' that of each cell (in
+    seconds, defaulting to EGS_TASK_TIMEOUT and EGS_CELL_TIMEOUT): the kernel is then interrupted and
+    the task fails.
+
+    Several tasks can be submitted at once either as a JSON array or as newline delimited JSON
+    (Content-Type: application/x-ndjson), all tasks are validated before any is queued:
+
+    curl -X POST -v http://localhost:5000/scheduler/tasks -H "Content-Type: application/x-ndjson" --data-binary @tasks.ndjson
     """
 
+    NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+
     def __init__(self, default_gateway_host, default_kernelspec):
         self.default_gateway_host = default_gateway_host
         self.default_kernelspec = default_kernelspec
@@ -41,16 +126,236 @@ class SchedulerResource(Resource):
 
     def post(self):
         global scheduler
+        if request.mimetype in self.NDJSON_MIMETYPES:
+            try:
+                return self._post_batch(self._read_ndjson())
+            except ValueError as error:
+                return {'message': 'Invalid NDJSON payload: {}'.format(error)}, 400
+
         task = request.get_json(force=True)
+        if isinstance(task, list):
+            return self._post_batch(task)
+        if not isinstance(task, dict):
+            return {'message': 'A task must be a JSON object, not {}'.format(type(task).__name__)}, 400
+
+        self._apply_defaults(task)
+
+        try:
+            id = scheduler.schedule_task(task)
+        except SchedulerBusy as error:
+            return self._busy(error)
+        except ValueError as error:
+            return {'message': str(error)}, 400
+
+        return {'id': str(id)}, 201
+
+    def _post_batch(self, tasks):
+        for task in tasks:
+            if isinstance(task, dict):
+                self._apply_defaults(task)
+
+        try:
+            ids = scheduler.schedule_tasks(tasks)
+        except BatchValidationError as error:
+            return {'errors': [{'index': index, 'message': message} for index, message in error.errors]}, 400
+        except SchedulerBusy as error:
+            return self._busy(error)
 
+        return {'ids': [str(id) for id in ids]}, 201
+
+    @staticmethod
+    def _busy(error):
+        # the queue is full, clients should retry later
+        return {'message': str(error)}, 503, {'Retry-After': '1'}
+
+    @staticmethod
+    def _read_ndjson():
+        tasks = []
+        # parse tasks as they are read instead of buffering the whole payload
+        for line in io.BufferedReader(request.stream, buffer_size=64 * 1024):
+            if line.strip():
+                tasks.append(json.loads(line))
+        return tasks
+
+    def _apply_defaults(self, task):
         if 'endpoint' not in task.keys():
             task['endpoint'] = self.default_gateway_host
 
         if 'kernelspec' not in task.keys():
             task['kernelspec'] = self.default_kernelspec
 
-        scheduler.schedule_task(task)
 
-        return 'submitted', 201
+class TaskResource(Resource):
+    """
+    Status of a submitted task, and its cancellation: queued tasks are removed
+    from the queue, running notebooks are interrupted
+
+    curl http://localhost:5000/scheduler/tasks/<id>
+    curl -X DELETE http://localhost:5000/scheduler/tasks/<id>
+    """
+
+    def get(self, task_id):
+        record = scheduler.task_store.get(task_id)
+        if record is None:
+            return {'message': 'Task {} not found'.format(task_id)}, 404
+
+        return record
+
+    def delete(self, task_id):
+        record = scheduler.task_store.get(task_id)
+        if record is None:
+            return {'message': 'Task {} not found'.format(task_id)}, 404
+
+        if not scheduler.cancel_task(task_id):
+            return {'message': 'Task {} is {} and cannot be cancelled'.format(
+                task_id, scheduler.task_store.get(task_id)['state'])}, 409
+
+        return scheduler.task_store.get(task_id), 202
+
+
+def _held_by_another_node(task_id, record):
+    """Error response for a task of another cluster node, which alone keeps its result and outputs, or None"""
+    node = record.get('node')
+    if node is None or node == getattr(scheduler, 'node', None):
+        return None
+    return {'message': 'Task {} is held by node {}, its result and outputs are only available from that node'.format(
+        task_id, node), 'node': node}, 409
+
+
+class TaskResultResource(Resource):
+    """
+    Result of a completed task (the executed notebook for Jupyter tasks)
+
+    curl http://localhost:5000/scheduler/tasks/<id>/result
+    """
+
+    def get(self, task_id):
+        record = scheduler.task_store.get(task_id)
+        if record is None:
+            return {'message': 'Task {} not found'.format(task_id)}, 404
+
+        if record['state'] not in TERMINAL_STATES:
+            return {'message': 'Task {} is {}'.format(task_id, record['state'])}, 409
 
+        elsewhere = _held_by_another_node(task_id, record)
+        if elsewhere is not None:
+            return elsewhere
+
+        result = scheduler.results.get(task_id)
+        if result is None:
+            return {'message': 'Result of task {} is not available'.format(task_id)}, 404
+
+        return result
+
+
+class TaskOutputsResource(Resource):
+    """
+    Server-sent events stream of the cell outputs of a task as they are produced,
+    ending with an 'end' event once the task completes
+
+    curl -N http://localhost:5000/scheduler/tasks/<id>/outputs
+    """
+
+    def get(self, task_id):
+        record = scheduler.task_store.get(task_id)
+        if record is None:
+            return {'message': 'Task {} not found'.format(task_id)}, 404
+
+        elsewhere = _held_by_another_node(task_id, record)
+        if elsewhere is not None:
+            return elsewhere
+
+        events = None
+        if record['state'] not in TERMINAL_STATES:
+            events = scheduler.outputs.subscribe(task_id)
+        if events is None:
+            # already completed, replay the outputs of the stored result
+            events = self._result_outputs(task_id)
+
+        return Response(stream_with_context(self._server_sent_events(task_id, events)),
+                        mimetype='text/event-stream')
+
+    @staticmethod
+    def _result_outputs(task_id):
+        result = scheduler.results.get(task_id) or {}
+        for index, cell in enumerate(result.get('cells', [])):
+            for output in cell.get('outputs', []):
+                yield dict(cell=index, output=output)
+        # summary of a sweep
+        for run in result.get('runs', []):
+            for event in run['outputs']:
+                yield dict(event, run=run['run'])
+
+    @staticmethod
+    def _server_sent_events(task_id, events):
+        for event in events:
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield 'data: {}\n\n'.format(json.dumps(event))
+
+        yield 'event: end\ndata: {}\n\n'.format(json.dumps(scheduler.task_store.get(task_id)))
+
+
+class SchedulesResource(Resource):
+    """
+    Recurring and delayed tasks: the task is submitted on every fire of the schedule, given
+    as a 'cron' expression (UTC), an 'interval' in seconds (optionally from 'start') or a
+    single 'run_at' time (epoch seconds or ISO 8601). A 'jitter' (seconds) spreads schedules
+    firing together, and 'misfire' (skip, run_once or run_all) handles runs missed while the
+    scheduler was down.
+
+    curl -X POST http://localhost:5000/scheduler/schedules -d '{"cron": "0 * * * *", "jitter": 60, "task": {...}}'
+    """
+
+    def __init__(self, default_gateway_host, default_kernelspec):
+        self.default_gateway_host = default_gateway_host
+        self.default_kernelspec = default_kernelspec
+
+    def get(self):
+        return schedule_manager.list()
+
+    def post(self):
+        definition = request.get_json(force=True)
+        if isinstance(definition, dict) and isinstance(definition.get('task'), dict):
+            definition['task'].setdefault('endpoint', self.default_gateway_host)
+            definition['task'].setdefault('kernelspec', self.default_kernelspec)
+
+        try:
+            schedule = schedule_manager.add(definition)
+        except ValueError as error:
+            return {'message': str(error)}, 400
+
+        return schedule.to_dict(), 201
+
+
+class ScheduleResource(Resource):
+    """
+    Details of a schedule, or its removal
+
+    curl -X DELETE http://localhost:5000/scheduler/schedules/<id>
+    """
+
+    def get(self, schedule_id):
+        schedule = schedule_manager.get(schedule_id)
+        if schedule is None:
+            return {'message': 'Schedule {} not found'.format(schedule_id)}, 404
+        return schedule
+
+    def delete(self, schedule_id):
+        if not schedule_manager.remove(schedule_id):
+            return {'message': 'Schedule {} not found'.format(schedule_id)}, 404
+        return '', 204
+
+
+class MetricsResource(Resource):
+    """
+    Scheduler metrics in the Prometheus text format: queue depth, tasks by state, pool
+    utilization and the duration of each task processing stage
+
+    curl http://localhost:5000/metrics
+    """
 
+    def get(self):
+        data, content_type = metrics.render(scheduler)
+        return Response(data, content_type=content_type)
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import copy
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from threading import Condition, Lock, Thread
+
+from enterprise_scheduler.cron import CronTrigger, DateTrigger, IntervalTrigger
+from enterprise_scheduler.task_store import DEFAULT_TASK_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+SKIP = 'skip'
+RUN_ONCE = 'run_once'
+RUN_ALL = 'run_all'
+
+MISFIRE_POLICIES = (SKIP, RUN_ONCE, RUN_ALL)
+
+DEFAULT_SCHEDULE_STORE_PATH = os.getenv('EGS_SCHEDULE_STORE', DEFAULT_TASK_STORE_PATH)
+DEFAULT_MAX_CATCHUP = int(os.getenv('EGS_SCHEDULE_MAX_CATCHUP', 100))
+
+
+def _timestamp(value):
+    """Epoch seconds from a number or an ISO 8601 string (UTC unless an offset is given)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError('Invalid time "{}": expected epoch seconds or ISO 8601'.format(value))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    raise ValueError('Invalid time {!r}: expected epoch seconds or ISO 8601'.format(value))
+
+
+class Schedule:
+    """A task submitted on every fire of its trigger"""
+
+    __slots__ = ('id', 'task', 'trigger', 'jitter', 'misfire', 'definition', 'next_run', 'last_run', 'runs',
+                 'version')
+
+    def __init__(self, id, task, trigger, jitter, misfire, definition):
+        self.id = id
+        self.task = task
+        self.trigger = trigger
+        self.jitter = jitter
+        self.misfire = misfire
+        self.definition = definition
+        self.next_run = None
+        self.last_run = None
+        self.runs = 0
+        self.version = 0
+
+    @classmethod
+    def from_definition(cls, definition, now=None):
+        """Build a schedule from its definition: a 'task' along with exactly one of
+        'cron', 'interval' (seconds, optionally from 'start') or 'run_at', an optional
+        'jitter' (seconds) and 'misfire' policy."""
+        if not isinstance(definition, dict):
+            raise ValueError('Schedule definition is not a JSON object')
+        if not isinstance(definition.get('task'), dict):
+            raise ValueError('Schedule is missing its [task]')
+
+        triggers = [key for key in ('cron', 'interval', 'run_at') if definition.get(key) is not None]
+        if len(triggers) != 1:
+            raise ValueError('Schedule requires exactly one of [cron], [interval] or [run_at]')
+
+        definition = dict(definition)
+        definition.setdefault('id', str(uuid.uuid4()))
+        if 'cron' in triggers:
+            if not isinstance(definition['cron'], str):
+                raise ValueError('Invalid cron expression: {!r}'.format(definition['cron']))
+            trigger = CronTrigger(definition['cron'])
+        elif 'interval' in triggers:
+            interval = definition['interval']
+            if not isinstance(interval, (int, float)) or isinstance(interval, bool):
+                raise ValueError('Invalid interval: {!r}'.format(interval))
+            definition['start'] = _timestamp(definition.get('start', time.time() if now is None else now))
+            trigger = IntervalTrigger(interval, definition['start'])
+        else:
+            definition['run_at'] = _timestamp(definition['run_at'])
+            trigger = DateTrigger(definition['run_at'])
+
+        jitter = definition.get('jitter', 0)
+        if not isinstance(jitter, (int, float)) or isinstance(jitter, bool) or jitter < 0:
+            raise ValueError('Invalid jitter: {!r}'.format(jitter))
+
+        misfire = definition.get('misfire', SKIP)
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError('Invalid misfire policy "{}", expected one of {}'.format(
+                misfire, ', '.join(MISFIRE_POLICIES)))
+
+        return cls(definition['id'], definition['task'], trigger, jitter, misfire, definition)
+
+    def to_dict(self):
+        record = {key: value for key, value in self.definition.items() if key != 'task'}
+        record.update(next_run=self.next_run, last_run=self.last_run, runs=self.runs)
+        return record
+
+
+class ScheduleStore:
+    """Keeps schedules in memory only, they are lost when the process exits.
+    Durable stores override the same interface."""
+
+    def save_many(self, schedules):
+        pass
+
+    def delete(self, schedule_id):
+        pass
+
+    def load(self):
+        """Return the (definition, next_run, last_run, runs) of the stored schedules"""
+        return []
+
+    def close(self):
+        pass
+
+
+class SQLiteScheduleStore(ScheduleStore):
+    """Durable schedule store, by default in the task store database"""
+
+    def __init__(self, path=DEFAULT_SCHEDULE_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS schedules ('
+                                 'id TEXT PRIMARY KEY, definition TEXT NOT NULL, next_run REAL, last_run REAL, '
+                                 'runs INTEGER)')
+        self._connection.commit()
+        self._lock = Lock()
+
+    def save_many(self, schedules):
+        rows = [(schedule.id, json.dumps(schedule.definition, default=str), schedule.next_run, schedule.last_run,
+                 schedule.runs) for schedule in schedules]
+        with self._lock:
+            self._connection.executemany('INSERT OR REPLACE INTO schedules (id, definition, next_run, last_run, runs) '
+                                         'VALUES (?, ?, ?, ?, ?)', rows)
+            self._connection.commit()
+
+    def delete(self, schedule_id):
+        with self._lock:
+            self._connection.execute('DELETE FROM schedules WHERE id = ?', (schedule_id,))
+            self._connection.commit()
+
+    def load(self):
+        with self._lock:
+            rows = self._connection.execute('SELECT definition, next_run, last_run, runs FROM schedules '
+                                            'ORDER BY rowid').fetchall()
+        return [(json.loads(row[0]), row[1], row[2], row[3]) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ScheduleManager:
+    """Submits the tasks of recurring and delayed schedules to a scheduler.
+
+    Pending fires are kept in a heap, so adding, removing (lazily, through the
+    schedule version) and firing schedules costs O(log n). Each fire is
+    delayed by a random 0-jitter seconds to spread schedules sharing a fire
+    time. Runs missed while the process was down are handled, on start, by
+    the schedule misfire policy: skip them, run once, or run all of them (up
+    to max_catchup)."""
+
+    def __init__(self, scheduler, store=None, max_catchup=DEFAULT_MAX_CATCHUP):
+        self.scheduler = scheduler
+        self.store = store or ScheduleStore()
+        self.max_catchup = max_catchup
+        self.fired = 0
+        self.failed = 0
+        self.missed = 0
+
+        self._schedules = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = Condition()
+        self._thread = None
+        self._stopped = False
+
+    def add(self, definition):
+        """Validate and register a schedule, returning it"""
+        now = time.time()
+        schedule = Schedule.from_definition(definition, now)
+        self.scheduler.validate_task(dict(schedule.task))
+
+        schedule.next_run = schedule.trigger.next_after(now)
+        if schedule.next_run is None:
+            if not isinstance(schedule.trigger, DateTrigger):
+                raise ValueError('Schedule {} never fires'.format(schedule.trigger))
+            # delayed task whose time has already come
+            schedule.next_run = now
+
+        with self._condition:
+            if schedule.id in self._schedules:
+                raise ValueError('Schedule {} already exists'.format(schedule.id))
+            self._schedules[schedule.id] = schedule
+            self._push(schedule)
+        self.store.save_many([schedule])
+        return schedule
+
+    def remove(self, schedule_id):
+        """Unregister a schedule, returning whether it existed"""
+        with self._condition:
+            schedule = self._schedules.pop(schedule_id, None)
+            if schedule is None:
+                return False
+            # its heap entry is skipped once popped
+            schedule.version += 1
+        self.store.delete(schedule_id)
+        return True
+
+    def get(self, schedule_id):
+        with self._condition:
+            schedule = self._schedules.get(schedule_id)
+            return schedule.to_dict() if schedule else None
+
+    def list(self):
+        with self._condition:
+            return [schedule.to_dict() for schedule in self._schedules.values()]
+
+    def stats(self):
+        with self._condition:
+            return dict(schedules=len(self._schedules), fired=self.fired, failed=self.failed, missed=self.missed)
+
+    def start(self):
+        self._recover()
+        self._stopped = False
+        self._thread = Thread(target=self._run, name='schedule-timer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _push(self, schedule):
+        fire_at = schedule.next_run + (random.uniform(0, schedule.jitter) if schedule.jitter else 0)
+        heapq.heappush(self._heap, (fire_at, next(self._sequence), schedule, schedule.version))
+        if self._heap[0][2] is schedule:
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._heap or self._heap[0][0] > time.time()):
+                    self._condition.wait(self._heap[0][0] - time.time() if self._heap else None)
+                if self._stopped:
+                    return
+
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now and len(due) < 1000:
+                    fire_at, sequence, schedule, version = heapq.heappop(self._heap)
+                    if version == schedule.version:
+                        due.append(schedule)
+
+            self._fire_due(due, now)
+
+    def _fire_due(self, due, now):
+        active = []
+        finished = []
+        for schedule in due:
+            self._fire(schedule, schedule.next_run)
+            with self._condition:
+                # runs the engine fell behind on are not caught up
+                schedule.next_run = schedule.trigger.next_after(max(now, schedule.next_run))
+                if self._schedules.get(schedule.id) is not schedule:
+                    # removed while firing
+                    continue
+                if schedule.next_run is None:
+                    del self._schedules[schedule.id]
+                    finished.append(schedule)
+                else:
+                    self._push(schedule)
+                    active.append(schedule)
+
+        # one transaction for every schedule fired together
+        self.store.save_many(active)
+        for schedule in finished:
+            self.store.delete(schedule.id)
+
+    def _fire(self, schedule, scheduled_for):
+        task = copy.deepcopy(schedule.task)
+        task['schedule_id'] = schedule.id
+        try:
+            self.scheduler.schedule_task(task)
+        except Exception as ex:
+            logger.error('Error submitting task of schedule [%s]: %s', schedule.id, ex)
+            with self._condition:
+                self.failed += 1
+            return
+
+        with self._condition:
+            schedule.last_run = scheduled_for
+            schedule.runs += 1
+            self.fired += 1
+
+    def _recover(self):
+        """Register the schedules of a previous process, applying their misfire policy"""
+        now = time.time()
+        recovered = []
+        for definition, next_run, last_run, runs in self.store.load():
+            try:
+                schedule = Schedule.from_definition(definition)
+            except ValueError as error:
+                logger.warning('Ignoring invalid schedule [%s]: %s', definition.get('id'), error)
+                continue
+            schedule.next_run, schedule.last_run, schedule.runs = next_run, last_run, runs or 0
+
+            if schedule.next_run is not None and schedule.next_run < now:
+                self._misfire(schedule, now)
+            if schedule.next_run is None:
+                self.store.delete(schedule.id)
+                continue
+
+            with self._condition:
+                self._schedules[schedule.id] = schedule
+                self._push(schedule)
+            recovered.append(schedule)
+
+        if recovered:
+            logger.info('recovered %d schedules', len(recovered))
+            self.store.save_many(recovered)
+
+    def _misfire(self, schedule, now):
+        missed = []
+        fire_time = schedule.next_run
+        while fire_time is not None and fire_time < now and len(missed) < self.max_catchup:
+            missed.append(fire_time)
+            fire_time = schedule.trigger.next_after(fire_time)
+        # runs beyond max_catchup are not enumerated, they count as one more missed run
+        count = len(missed) + (1 if fire_time is not None and fire_time < now else 0)
+
+        if schedule.misfire == RUN_ALL:
+            runs = missed
+        elif schedule.misfire == RUN_ONCE:
+            latest = schedule.trigger.last_before(now)
+            runs = [latest] if latest is not None else []
+        else:
+            runs = []
+
+        with self._condition:
+            self.missed += count - len(runs)
+        for fire_time in runs:
+            self._fire(schedule, fire_time)
+        schedule.next_run = schedule.trigger.next_after(now)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import logging
+import os
+from threading import Thread
+
+from cheroot import wsgi
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_THREADS = int(os.getenv('EGS_SERVER_THREADS', 32))
+DEFAULT_SERVER_BACKLOG = int(os.getenv('EGS_SERVER_BACKLOG', 1024))
+DEFAULT_SERVER_TIMEOUT = float(os.getenv('EGS_SERVER_TIMEOUT', 30))
+
+
+class SchedulerServer:
+    """Production HTTP server of the REST API: a pool of request threads in the process hosting the scheduler.
+
+    The scheduler keeps its queues, running tasks and results in memory, so
+    requests are served by threads of a single process sharing it rather than
+    by forked workers, each of which would run a scheduler of its own."""
+
+    def __init__(self, app, host='127.0.0.1', port=5000, threads=DEFAULT_SERVER_THREADS,
+                 backlog=DEFAULT_SERVER_BACKLOG, timeout=DEFAULT_SERVER_TIMEOUT):
+        if threads < 1:
+            raise ValueError('Invalid number of server threads {}'.format(threads))
+        # every thread is started upfront, long lived event streams hold one thread each
+        self._server = wsgi.Server((host, port), app, numthreads=threads, max=threads,
+                                   request_queue_size=backlog, timeout=timeout,
+                                   server_name='enterprise-scheduler')
+        self.threads = threads
+        self._thread = None
+
+    @property
+    def address(self):
+        """The (host, port) the server listens on, once started"""
+        return self._server.bind_addr
+
+    def url(self, path=''):
+        return 'http://{}:{}{}'.format(self.address[0], self.address[1], path)
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until stop() or an interrupt"""
+        logger.info('Serving on %s with %d threads', self._server.bind_addr, self.threads)
+        self._server.start()
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._server.prepare()
+        self._thread = Thread(target=self._server.serve, name='scheduler-server')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
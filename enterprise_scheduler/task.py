@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import itertools
+import time
+
+DEFAULT_PRIORITY = 0
+
+_NO_DEADLINE = float('inf')
+
+
+class TaskEnvelope:
+    """Queue entry wrapping a submitted task.
+
+    Envelopes are ordered by priority (higher first), then deadline (earliest
+    first, tasks without a deadline last) and finally by submission sequence,
+    so tasks with the same priority and deadline are executed in FIFO order.
+
+    While queued, large payloads (notebook, dependencies) can be spilled to a
+    blob store: task then only holds the task metadata, and payloads the keys
+    of the spilled payloads until they are loaded back."""
+
+    __slots__ = ('task', 'priority', 'deadline', 'sequence', 'enqueued_at', 'payloads', '_key')
+
+    _sequence = itertools.count()
+
+    def __init__(self, task, priority=DEFAULT_PRIORITY, deadline=None):
+        self.task = task
+        self.priority = priority
+        self.deadline = deadline
+        self.sequence = next(TaskEnvelope._sequence)
+        self.enqueued_at = time.monotonic()
+        self.payloads = None
+        self._key = (-priority, _NO_DEADLINE if deadline is None else deadline, self.sequence)
+
+    @classmethod
+    def from_task(cls, task):
+        """Create an envelope using the optional 'priority' and 'deadline' task properties"""
+        priority = task.get('priority', DEFAULT_PRIORITY)
+        deadline = task.get('deadline')
+
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise ValueError('Submitted task has invalid [priority] information: {}'.format(priority))
+
+        if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))):
+            raise ValueError('Submitted task has invalid [deadline] information: {}'.format(deadline))
+
+        return cls(task, priority, deadline)
+
+    @property
+    def id(self):
+        return self.task.get('id')
+
+    def expired(self, now=None):
+        """True when the task has a deadline (UNIX timestamp) that has already passed"""
+        if self.deadline is None:
+            return False
+        return (time.time() if now is None else now) > self.deadline
+
+    def __lt__(self, other):
+        if not isinstance(other, TaskEnvelope):
+            return NotImplemented
+        return self._key < other._key
+
+    def __repr__(self):
+        return 'TaskEnvelope(id={}, priority={}, deadline={}, sequence={})'.format(
+            self.id, self.priority, self.deadline, self.sequence)
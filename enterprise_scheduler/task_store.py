@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from threading import Condition, Lock, Thread
+
+from enterprise_scheduler.notebook import Notebook
+
+logger = logging.getLogger(__name__)
+
+RESOLVING = 'resolving'
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+TERMINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+_TERMINAL_STATES_SQL = ', '.join("'{}'".format(state) for state in TERMINAL_STATES)
+
+
+DEFAULT_TASK_STORE_PATH = os.getenv('EGS_TASK_STORE',
+                                    os.path.join(tempfile.gettempdir(), 'enterprise_scheduler', 'tasks.db'))
+
+# seconds completed tasks are kept in a durable store, and how many of them at most
+DEFAULT_TASK_RETENTION = float(os.getenv('EGS_TASK_RETENTION', 7 * 24 * 3600))
+DEFAULT_MAX_COMPLETED_TASKS = int(os.getenv('EGS_MAX_COMPLETED_TASKS', 100000))
+# seconds between two prunings of the completed tasks
+DEFAULT_PRUNE_INTERVAL = float(os.getenv('EGS_PRUNE_INTERVAL', 60))
+
+# identifies the scheduler process among the nodes sharing a task store, keep it stable across restarts
+DEFAULT_NODE_ID = os.getenv('EGS_NODE_ID') or '{}-{}'.format(socket.gethostname(), os.getpid())
+# seconds a node holds the tasks it claimed without renewing their lease
+DEFAULT_LEASE_SECONDS = float(os.getenv('EGS_LEASE_SECONDS', 30))
+# executions of a task interrupted by the loss of its node before it is failed
+DEFAULT_MAX_ATTEMPTS = int(os.getenv('EGS_MAX_ATTEMPTS', 3))
+
+
+def task_payload(task):
+    """The task serialized as JSON, reusing the serialization of its normalized notebook"""
+    notebook = task.get('notebook')
+    if not isinstance(notebook, Notebook):
+        return json.dumps(task, default=str)
+    properties = json.dumps({key: value for key, value in task.items() if key != 'notebook'}, default=str)
+    return '{{"notebook": {}{}'.format(notebook.json().decode('utf-8'),
+                                       '}' if properties == '{}' else ', ' + properties[1:])
+
+
+class TaskStore:
+    """In-memory task store keeping the state of the most recent tasks.
+
+    Nothing is persisted, so pending tasks are lost when the process exits.
+    Durable stores override the same interface."""
+
+    def __init__(self, max_tasks=10000):
+        self.max_tasks = max_tasks
+        self._tasks = OrderedDict()
+        self._lock = Lock()
+
+    def add(self, envelope, state=QUEUED):
+        """Record a newly submitted task"""
+        self.add_many([envelope], state)
+
+    def add_many(self, envelopes, state=QUEUED):
+        now = time.time()
+        with self._lock:
+            for envelope in envelopes:
+                self._tasks[str(envelope.id)] = dict(id=str(envelope.id), state=state, error=None,
+                                                     created_at=now, updated_at=now)
+            while len(self._tasks) > self.max_tasks:
+                self._tasks.popitem(last=False)
+
+    def set_state(self, task_id, state, error=None):
+        """Record a task state transition, completed (e.g. cancelled) tasks are never resumed"""
+        with self._lock:
+            record = self._tasks.get(str(task_id))
+            if record is not None and (state in TERMINAL_STATES or record['state'] not in TERMINAL_STATES):
+                record.update(state=state, error=error, updated_at=time.time())
+
+    def update_task(self, task_id, properties):
+        """Merge properties into the payload of a task which has not completed, so it is recovered with them"""
+        pass
+
+    def get(self, task_id):
+        """Return the state record of a task or None when unknown"""
+        with self._lock:
+            record = self._tasks.get(str(task_id))
+            return dict(record) if record else None
+
+    def counts(self):
+        """Number of known tasks by state"""
+        with self._lock:
+            return dict(Counter(record['state'] for record in self._tasks.values()))
+
+    def pending(self):
+        """Tasks that were resolving, queued or running, in submission order, to be recovered on startup"""
+        return []
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteTaskStore(TaskStore):
+    """Durable task store backed by SQLite in WAL mode.
+
+    Writes are buffered and committed in batches by a background thread every
+    commit_interval seconds (or as soon as batch_size writes are pending), so
+    a crash may lose at most the last commit_interval worth of transitions.
+    Resolving, queued and running tasks are returned by pending() to be re-queued when the
+    scheduler starts again. Completed tasks are pruned every prune_interval
+    seconds once older than retention seconds or beyond the max_completed
+    most recent ones."""
+
+    def __init__(self, path=DEFAULT_TASK_STORE_PATH, batch_size=1000, commit_interval=0.05,
+                 retention=DEFAULT_TASK_RETENTION, max_completed=DEFAULT_MAX_COMPLETED_TASKS,
+                 prune_interval=DEFAULT_PRUNE_INTERVAL):
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.retention = retention
+        self.max_completed = max_completed
+        self.prune_interval = prune_interval
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS tasks ('
+                                 'id TEXT PRIMARY KEY, state TEXT NOT NULL, payload TEXT, error TEXT, '
+                                 'created_at REAL, updated_at REAL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (updated_at) '
+                                 'WHERE state IN ({})'.format(_TERMINAL_STATES_SQL))
+        self._connection.commit()
+        self._next_prune = time.monotonic() + prune_interval
+
+        self._writes = []
+        self._condition = Condition()
+        self._write_lock = Lock()
+        self._closed = False
+
+        self._writer_thread = Thread(target=self._writer)
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+
+    def add_many(self, envelopes, state=QUEUED):
+        now = time.time()
+        writes = [('add', str(envelope.id), state, task_payload(envelope.task), now)
+                  for envelope in envelopes]
+        self._submit(writes)
+
+    def set_state(self, task_id, state, error=None):
+        error = None if error is None else str(error)
+        self._submit([('state', str(task_id), state, error, time.time())])
+
+    def update_task(self, task_id, properties):
+        # committed right away: the task may start remote work which must not be started twice
+        self._submit([('update', str(task_id), json.dumps(properties, default=str))])
+        self.flush()
+
+    def get(self, task_id):
+        self.flush()
+        with self._write_lock:
+            row = self._connection.execute('SELECT id, state, error, created_at, updated_at FROM tasks '
+                                           'WHERE id = ?', (str(task_id),)).fetchone()
+        if row is None:
+            return None
+        return dict(id=row[0], state=row[1], error=row[2], created_at=row[3], updated_at=row[4])
+
+    def counts(self):
+        self.flush()
+        with self._write_lock:
+            rows = self._connection.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state').fetchall()
+        return dict(rows)
+
+    def pending(self):
+        self.flush()
+        with self._write_lock:
+            rows = self._connection.execute('SELECT payload FROM tasks WHERE state IN (?, ?, ?) '
+                                            'ORDER BY rowid', (RESOLVING, QUEUED, RUNNING)).fetchall()
+        tasks = []
+        for row in rows:
+            task = json.loads(row[0])
+            task['id'] = uuid.UUID(task['id'])
+            tasks.append(task)
+        return tasks
+
+    def prune(self):
+        """Delete the completed tasks past the retention limits, returning how many were deleted"""
+        self.flush()
+        with self._write_lock:
+            cutoff = time.time() - self.retention
+            row = self._connection.execute('SELECT updated_at FROM tasks WHERE state IN ({}) '
+                                           'ORDER BY updated_at DESC LIMIT 1 OFFSET ?'.format(_TERMINAL_STATES_SQL),
+                                           (self.max_completed,)).fetchone()
+            if row is not None:
+                cutoff = max(cutoff, row[0] + 1e-6)
+            cursor = self._connection.execute('DELETE FROM tasks WHERE state IN ({}) AND updated_at < ?'.format(
+                _TERMINAL_STATES_SQL), (cutoff,))
+            self._connection.commit()
+        if cursor.rowcount:
+            logger.debug('Pruned %d completed tasks from task store %s', cursor.rowcount, self.path)
+        return cursor.rowcount
+
+    def flush(self):
+        """Commit every buffered write"""
+        with self._write_lock:
+            with self._condition:
+                writes, self._writes = self._writes, []
+            if writes:
+                self._commit(writes)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._writer_thread.join()
+        self.flush()
+        self._connection.close()
+
+    def _submit(self, writes):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Task store {} is closed'.format(self.path))
+            first = not self._writes
+            self._writes.extend(writes)
+            if first or len(self._writes) >= self.batch_size:
+                self._condition.notify()
+
+    def _writer(self):
+        while True:
+            with self._condition:
+                while not self._writes and not self._closed:
+                    self._condition.wait()
+                if not self._closed and len(self._writes) < self.batch_size:
+                    # give concurrent submissions a chance to join the batch
+                    self._condition.wait(self.commit_interval)
+                closed = self._closed
+            try:
+                self.flush()
+                if not closed and time.monotonic() >= self._next_prune:
+                    self._next_prune = time.monotonic() + self.prune_interval
+                    self.prune()
+            except BaseException as base:
+                logger.exception('Error writing to task store %s: %s', self.path, base)
+            if closed:
+                return
+
+    def _commit(self, writes):
+        cursor = self._connection.cursor()
+        for write in writes:
+            if write[0] == 'add':
+                cursor.execute('INSERT OR REPLACE INTO tasks (id, state, payload, created_at, updated_at) '
+                               'VALUES (?, ?, ?, ?, ?)', write[1:] + (write[4],))
+            elif write[0] == 'update':
+                cursor.execute('UPDATE tasks SET payload = json_patch(payload, ?) '
+                               'WHERE id = ? AND payload IS NOT NULL', (write[2], write[1]))
+            elif write[2] in TERMINAL_STATES:
+                # notebook payloads are only kept while the task may need to be recovered
+                cursor.execute('UPDATE tasks SET state = ?, error = ?, updated_at = ?, payload = NULL '
+                               'WHERE id = ?', write[2:] + (write[1],))
+            else:
+                cursor.execute('UPDATE tasks SET state = ?, error = ?, updated_at = ? '
+                               'WHERE id = ? AND state NOT IN ({})'.format(', '.join('?' * len(TERMINAL_STATES))),
+                               write[2:] + (write[1],) + TERMINAL_STATES)
+        self._connection.commit()
+
+
+class SharedTaskStore(SQLiteTaskStore):
+    """Task store and task queue shared by the scheduler nodes of a cluster through one SQLite file.
+
+    Nodes claim queued tasks, by priority, under a lease which they renew with
+    heartbeat() while holding the tasks. Once the lease of a task expires (its
+    node died or hung) the task is queued again, up to max_attempts times for
+    tasks that had started: tasks are executed at least once. A node may steal
+    the tasks another node claimed but has not started yet, start() tells a
+    node whether it still holds a task before executing it.
+
+    Terminal states and queue operations are written synchronously, other
+    state transitions are batched as in SQLiteTaskStore. Nothing is returned
+    by pending(): tasks of a stopped node are recovered through their lease."""
+
+    _COLUMNS = (('priority', 'INTEGER NOT NULL DEFAULT 0'), ('deadline', 'REAL'), ('node', 'TEXT'),
+                ('lease_until', 'REAL'), ('attempts', 'INTEGER NOT NULL DEFAULT 0'))
+
+    def __init__(self, path=DEFAULT_TASK_STORE_PATH, node=DEFAULT_NODE_ID, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, **kwargs):
+        super().__init__(path, **kwargs)
+        self.node = node
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        with self._write_lock:
+            # other nodes may be writing, wait for them rather than failing
+            self._connection.execute('PRAGMA busy_timeout = 30000')
+            columns = set(row[1] for row in self._connection.execute('PRAGMA table_info(tasks)'))
+            for column, definition in self._COLUMNS:
+                if column not in columns:
+                    try:
+                        self._connection.execute('ALTER TABLE tasks ADD COLUMN {} {}'.format(column, definition))
+                    except sqlite3.OperationalError:
+                        pass  # added by another node starting at the same time
+            self._connection.execute("CREATE INDEX IF NOT EXISTS tasks_queue ON tasks (priority DESC, deadline) "
+                                     "WHERE node IS NULL AND state IN ('{}', '{}')".format(QUEUED, RESOLVING))
+            self._connection.execute('CREATE INDEX IF NOT EXISTS tasks_leases ON tasks (node) '
+                                     'WHERE lease_until IS NOT NULL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS nodes ('
+                                     'node TEXT PRIMARY KEY, heartbeat_at REAL, held INTEGER)')
+            self._connection.commit()
+
+    def add_many(self, envelopes, state=QUEUED):
+        now = time.time()
+        # tasks being resolved stay with the submitting node until published
+        node, lease_until = (self.node, now + self.lease_seconds) if state == RESOLVING else (None, None)
+        # tasks without a deadline are claimed last, as they are dequeued
+        rows = [(str(envelope.id), state, task_payload(envelope.task), envelope.priority,
+                 float('inf') if envelope.deadline is None else envelope.deadline, node, lease_until, now, now)
+                for envelope in envelopes]
+        with self._transaction() as cursor:
+            cursor.executemany('INSERT OR REPLACE INTO tasks (id, state, payload, priority, deadline, node, '
+                               'lease_until, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def set_state(self, task_id, state, error=None):
+        if state not in TERMINAL_STATES:
+            return super().set_state(task_id, state, error)
+
+        # the lease is given up by the holder of the task, another node cancelling it leaves it to the holder
+        with self._transaction() as cursor:
+            cursor.execute('UPDATE tasks SET state = ?, error = ?, updated_at = ?, payload = NULL, '
+                           'lease_until = CASE WHEN node = ? THEN NULL ELSE lease_until END WHERE id = ?',
+                           (state, None if error is None else str(error), time.time(), self.node, str(task_id)))
+
+    def get(self, task_id):
+        self.flush()
+        with self._write_lock:
+            row = self._connection.execute('SELECT id, state, error, created_at, updated_at, node, attempts '
+                                           'FROM tasks WHERE id = ?', (str(task_id),)).fetchone()
+        if row is None:
+            return None
+        return dict(id=row[0], state=row[1], error=row[2], created_at=row[3], updated_at=row[4], node=row[5],
+                    attempts=row[6])
+
+    def pending(self):
+        return []
+
+    def publish(self, envelope):
+        """Queue a task resolved by this node for any node to claim"""
+        with self._transaction() as cursor:
+            cursor.execute('UPDATE tasks SET state = ?, payload = ?, node = NULL, lease_until = NULL, '
+                           'updated_at = ? WHERE id = ? AND state NOT IN ({})'.format(self._terminal()),
+                           (QUEUED, task_payload(envelope.task), time.time(), str(envelope.id)))
+
+    def claim(self, count):
+        """Claim up to count queued tasks, highest priority and earliest deadline first, returning them"""
+        with self._transaction() as cursor:
+            # in index order: the planner would rather sort every queued task by priority
+            rows = cursor.execute("SELECT id, payload FROM tasks INDEXED BY tasks_queue "
+                                  "WHERE node IS NULL AND state IN ('{}', '{}') "
+                                  "ORDER BY priority DESC, deadline, rowid LIMIT ?"
+                                  .format(QUEUED, RESOLVING), (count,)).fetchall()
+            self._lease(cursor, rows)
+        return [self._task(payload) for task_id, payload in rows]
+
+    def steal(self, count):
+        """Claim up to count of the tasks the most backlogged node claimed but has not started, at most
+        half of them, taking those it would run last"""
+        with self._transaction() as cursor:
+            victim = cursor.execute('SELECT node, COUNT(*) FROM tasks WHERE lease_until IS NOT NULL AND node != ? '
+                                    'AND state = ? GROUP BY node ORDER BY COUNT(*) DESC LIMIT 1',
+                                    (self.node, QUEUED)).fetchone()
+            if victim is None or victim[1] < 2:
+                return []
+            rows = cursor.execute('SELECT id, payload FROM tasks WHERE lease_until IS NOT NULL AND node = ? '
+                                  'AND state = ? ORDER BY priority, deadline DESC, rowid DESC '
+                                  'LIMIT ?', (victim[0], QUEUED, min(count, victim[1] // 2))).fetchall()
+            self._lease(cursor, rows)
+        if rows:
+            logger.info('Node %s took %d tasks over from node %s', self.node, len(rows), victim[0])
+        return [self._task(payload) for task_id, payload in rows]
+
+    def start(self, task_id):
+        """Mark a claimed task as running, returning False when the node no longer holds it"""
+        with self._transaction() as cursor:
+            cursor.execute('UPDATE tasks SET state = ?, updated_at = ? WHERE id = ? AND node = ? '
+                           'AND lease_until IS NOT NULL AND state IN (?, ?)',
+                           (RUNNING, time.time(), str(task_id), self.node, QUEUED, RESOLVING))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, held=0):
+        """Renew the leases of this node and queue again the tasks whose lease has expired.
+
+        Returns the ids of the tasks this node holds along with their state, and the number of
+        tasks queued again."""
+        now = time.time()
+        terminal = self._terminal()
+        with self._transaction() as cursor:
+            cursor.execute('UPDATE tasks SET lease_until = ? WHERE node = ? AND lease_until IS NOT NULL '
+                           'AND state NOT IN ({})'.format(terminal), (now + self.lease_seconds, self.node))
+            cursor.execute('INSERT OR REPLACE INTO nodes (node, heartbeat_at, held) VALUES (?, ?, ?)',
+                           (self.node, now, held))
+
+            cursor.execute('UPDATE tasks SET state = ?, error = ?, updated_at = ?, payload = NULL, '
+                           'lease_until = NULL, attempts = attempts + 1 WHERE lease_until < ? AND state = ? '
+                           'AND attempts + 1 >= ?', (FAILED, 'Node lost {} times while running the task'.format(
+                               self.max_attempts), now, now, RUNNING, self.max_attempts))
+            failed = cursor.rowcount
+            cursor.execute('UPDATE tasks SET attempts = attempts + (state = ?), state = CASE WHEN state = ? THEN ? '
+                           'ELSE state END, node = NULL, lease_until = NULL, updated_at = ? '
+                           'WHERE lease_until < ? AND state NOT IN ({})'.format(terminal),
+                           (RUNNING, RUNNING, QUEUED, now, now))
+            requeued = cursor.rowcount
+            # cancelled by another node while held by a node which is gone
+            cursor.execute('UPDATE tasks SET lease_until = NULL WHERE lease_until < ?', (now,))
+
+            held = dict(cursor.execute('SELECT id, state FROM tasks WHERE node = ? AND lease_until IS NOT NULL',
+                                       (self.node,)).fetchall())
+        if requeued or failed:
+            logger.warning('Queued again %d tasks and failed %d tasks of lost nodes', requeued, failed)
+        return held, requeued
+
+    def release(self, running=False):
+        """Give the tasks this node claimed but has not started (and running ones when running is True,
+        e.g. left by a previous process of the node) back to the queue"""
+        states = (QUEUED, RESOLVING, RUNNING) if running else (QUEUED, RESOLVING)
+        with self._transaction() as cursor:
+            cursor.execute('UPDATE tasks SET state = CASE WHEN state = ? THEN ? ELSE state END, node = NULL, '
+                           'lease_until = NULL, updated_at = ? WHERE node = ? AND lease_until IS NOT NULL '
+                           'AND state IN ({})'.format(', '.join('?' * len(states))),
+                           (RUNNING, QUEUED, time.time(), self.node) + states)
+            released = cursor.rowcount
+            if not running:
+                cursor.execute('DELETE FROM nodes WHERE node = ?', (self.node,))
+        return released
+
+    def nodes(self, max_age=None):
+        """Nodes which sent a heartbeat in the last max_age seconds (by default, twice the lease)"""
+        since = time.time() - (2 * self.lease_seconds if max_age is None else max_age)
+        self.flush()
+        with self._write_lock:
+            rows = self._connection.execute('SELECT node, heartbeat_at, held FROM nodes WHERE heartbeat_at >= ? '
+                                            'ORDER BY node', (since,)).fetchall()
+        return [dict(node=node, heartbeat_at=heartbeat_at, held=held) for node, heartbeat_at, held in rows]
+
+    @contextmanager
+    def _transaction(self):
+        """Immediate transaction, committed after the batched writes of this node so they keep their order"""
+        with self._write_lock:
+            with self._condition:
+                writes, self._writes = self._writes, []
+            if writes:
+                self._commit(writes)
+            cursor = self._connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+            except BaseException:
+                self._connection.rollback()
+                raise
+            self._connection.commit()
+
+    def _lease(self, cursor, rows):
+        lease_until = time.time() + self.lease_seconds
+        cursor.executemany('UPDATE tasks SET node = ?, lease_until = ? WHERE id = ?',
+                           [(self.node, lease_until, task_id) for task_id, payload in rows])
+
+    @staticmethod
+    def _task(payload):
+        task = json.loads(payload)
+        task['id'] = uuid.UUID(task['id'])
+        return task
+
+    @staticmethod
+    def _terminal():
+        return ', '.join("'{}'".format(state) for state in TERMINAL_STATES)
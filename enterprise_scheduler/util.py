@@ -14,9 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import os
 import asyncio
-import zipfile
 
 
 def fix_asyncio_event_loop_policy(asyncio):
@@ -39,15 +37,3 @@ def fix_asyncio_event_loop_policy(asyncio):
                 return loop
 
     asyncio.set_event_loop_policy(PatchedDefaultEventLoopPolicy())
-
-def zip_directory(zip_name, directory):
-    zip_file = zipfile.ZipFile(zip_name, 'w', zipfile.ZIP_DEFLATED)
-
-    print('> Processing resources from: ' + directory)
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            print('> Adding file to job archive: ' + file)
-            zip_file.write(os.path.join(root, file), file)
-
-    zip_file.close()
-
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2019 Luciano Resende
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import heapq
+import os
+import queue
+import time
+from collections import defaultdict
+from threading import Lock, Thread
+
+DEFAULT_POOL = 'default'
+
+
+def parse_pool_sizes(value):
+    """Parse 'executor=threads,...' (e.g. 'jupyter=8,ffdl=2') into a dict"""
+    sizes = {}
+    for item in filter(None, (item.strip() for item in (value or '').split(','))):
+        name, separator, size = item.partition('=')
+        if not separator or not size.strip().isdigit() or int(size) < 1:
+            raise ValueError('Invalid executor pool size "{}", expected <executor>=<threads>'.format(item))
+        sizes[name.strip().lower()] = int(size)
+    return sizes
+
+
+DEFAULT_POOL_SIZES = parse_pool_sizes(os.getenv('EGS_EXECUTOR_THREADS', 'ffdl=2'))
+DEFAULT_ENDPOINT_CONCURRENCY = int(os.getenv('EGS_ENDPOINT_CONCURRENCY', 0))
+DEFAULT_MAX_QUEUED = int(os.getenv('EGS_MAX_QUEUED_TASKS', 0))
+
+
+class _Shutdown:
+    """Queue sentinel used to stop executor threads.
+
+    The sentinel always orders after any queued task, so a worker only
+    receives it once every task submitted before :meth:`Scheduler.stop`
+    has been dispatched."""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return not isinstance(other, _Shutdown)
+
+
+_SHUTDOWN = _Shutdown()
+
+
+class TaskQueue(queue.PriorityQueue):
+    """Priority queue of task envelopes supporting atomic insertion of several tasks"""
+
+    def put_many(self, items):
+        with self.not_full:
+            for item in items:
+                self._put(item)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify(len(items))
+
+    def remove(self, task_id):
+        """Remove the envelope of a queued task, returning it or None when not queued"""
+        task_id = str(task_id)
+        with self.mutex:
+            for index, item in enumerate(self.queue):
+                if item is not _SHUTDOWN and str(item.id) == task_id:
+                    last = self.queue.pop()
+                    if index < len(self.queue):
+                        self.queue[index] = last
+                        heapq.heapify(self.queue)
+                    self.unfinished_tasks -= 1
+                    if not self.unfinished_tasks:
+                        self.all_tasks_done.notify_all()
+                    self.not_full.notify()
+                    return item
+        return None
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a pool already holds as many queued tasks as it accepts"""
+
+
+class WorkerPool:
+    """Threads executing the tasks of their own priority queue.
+
+    Accepts at most max_queued waiting tasks (0 for unbounded) and keeps
+    track of how busy its threads are."""
+
+    def __init__(self, name, size, max_queued=DEFAULT_MAX_QUEUED):
+        self.name = name
+        self.size = size
+        self.max_queued = max_queued
+        self.queue = TaskQueue()
+        self.threads = []
+        self.executed = 0
+
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started_at = None
+        self._lock = Lock()
+
+    def reserve(self, count, parked=0):
+        """Ensure count more tasks may be queued along with the queued ones and the parked ones of the pool,
+        raising SchedulerBusy otherwise"""
+        if self.max_queued and self.queue.qsize() + parked + count > self.max_queued:
+            raise SchedulerBusy('The [{}] pool has reached its limit of {} queued tasks'.format(
+                self.name, self.max_queued))
+
+    def start(self, target):
+        self._started_at = time.monotonic()
+        for i in range(self.size):
+            t = Thread(target=target, args=(self,), name='{}-worker-{}'.format(self.name, i))
+            t.daemon = True
+            self.threads.append(t)
+            t.start()
+
+    def stop(self):
+        for t in self.threads:
+            self.queue.put(item=_SHUTDOWN)
+
+    def join(self):
+        for t in self.threads:
+            t.join()
+        self.threads = []
+
+    def discard_pending(self):
+        """Drop the queued tasks, returning how many were dropped"""
+        discarded = 0
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return discarded
+            discarded += item is not _SHUTDOWN
+            self.queue.task_done()
+
+    def busy(self):
+        """Context manager accounting a thread as busy while in the block"""
+        return _Busy(self)
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0
+            return dict(threads=len(self.threads), queued=self.queue.qsize(), max_queued=self.max_queued,
+                        busy=self._busy, executed=self.executed,
+                        utilization=self._busy_seconds / (elapsed * len(self.threads))
+                        if elapsed and self.threads else 0.0)
+
+
+class _Busy:
+    __slots__ = ('pool', 'started_at')
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        self.started_at = time.monotonic()
+        with self.pool._lock:
+            self.pool._busy += 1
+
+    def __exit__(self, *exc_info):
+        with self.pool._lock:
+            self.pool._busy -= 1
+            self.pool.executed += 1
+            self.pool._busy_seconds += time.monotonic() - self.started_at
+
+
+class EndpointLimiter:
+    """Caps the number of tasks running against each endpoint.
+
+    Tasks beyond the limit are parked, in priority order, rather than holding
+    a thread, and handed back to their pool as running tasks finish."""
+
+    def __init__(self, limit=DEFAULT_ENDPOINT_CONCURRENCY):
+        self.limit = limit
+        self._running = defaultdict(int)
+        self._parked = defaultdict(list)
+        # parked tasks by pool name
+        self._pool_parked = defaultdict(int)
+        self._lock = Lock()
+
+    def acquire(self, endpoint, envelope, pool):
+        """Return whether the task may run now, otherwise it is parked"""
+        if not self.limit:
+            return True
+        with self._lock:
+            if self._running[endpoint] < self.limit:
+                self._running[endpoint] += 1
+                return True
+            heapq.heappush(self._parked[endpoint], (envelope, pool))
+            self._pool_parked[pool.name] += 1
+            return False
+
+    def release(self, endpoint):
+        """Free a slot of the endpoint, handing its first parked task back to its pool.
+        Returns the resumed envelope if any"""
+        if not self.limit:
+            return None
+        with self._lock:
+            self._running[endpoint] -= 1
+            parked = self._parked.get(endpoint)
+            if not parked:
+                return None
+            envelope, pool = heapq.heappop(parked)
+            self._pool_parked[pool.name] -= 1
+            # queued while locked, so the task is always either parked or queued (see settled())
+            pool.queue.put(item=envelope)
+            return envelope
+
+    def remove(self, task_id):
+        """Remove the envelope of a parked task, returning it or None when not parked"""
+        task_id = str(task_id)
+        with self._lock:
+            for parked in self._parked.values():
+                for index, (envelope, pool) in enumerate(parked):
+                    if str(envelope.id) == task_id:
+                        parked[index] = parked[-1]
+                        parked.pop()
+                        heapq.heapify(parked)
+                        self._pool_parked[pool.name] -= 1
+                        return envelope
+        return None
+
+    def parked(self, pool):
+        """Number of parked tasks of the pool"""
+        with self._lock:
+            return self._pool_parked.get(pool.name, 0)
+
+    def settled(self, pools):
+        """Return whether no task is parked, nor queued or running on any of the pools"""
+        with self._lock:
+            return not any(self._pool_parked.values()) and not any(pool.queue.unfinished_tasks for pool in pools)
+
+    def discard_parked(self):
+        """Drop every parked task, returning their envelopes"""
+        with self._lock:
+            envelopes = [envelope for parked in self._parked.values() for envelope, pool in parked]
+            self._parked.clear()
+            self._pool_parked.clear()
+        return envelopes
+
+    def stats(self):
+        with self._lock:
+            endpoints = set(self._running) | set(self._parked)
+            return {endpoint: dict(running=self._running[endpoint], parked=len(self._parked.get(endpoint, ())))
+                    for endpoint in endpoints}
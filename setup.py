@@ -22,6 +22,9 @@ requirements = [
     'requests >= 2.8, < 3.0',
     'ffdl-client>=0.1.2',
     'flask-restful>=0.3.6',
+    'cheroot>=6.5.4',
+    'prometheus_client>=0.7.0',
+    'tornado>=5.0',
     'jupyter_enterprise_gateway>=1.0.0'
 ]
 
@@ -37,15 +40,19 @@ setup(
         'Intended Audience :: Developers',
         'License :: OSI Approved :: Apache Software License',
         'Natural Language :: English',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
     ],
     description="Python Boilerplate contains all the boilerplate you need to create a Python package.",
     entry_points={
         'console_scripts': [
             'enterprise_scheduler=enterprise_scheduler.scheduler_application:main',
         ],
+        'enterprise_scheduler.executors': [
+            'jupyter=enterprise_scheduler.jupyter_executor:JupyterExecutor',
+            'ffdl=enterprise_scheduler.ffdl_executor:FfDLExecutor',
+        ],
     },
     install_requires=requirements,
     license='Apache License, Version 2.0',
@@ -54,6 +61,7 @@ setup(
     keywords='enterprise_scheduler',
     name='enterprise_scheduler',
     packages=find_packages(include=['enterprise_scheduler']),
+    python_requires='>=3.9',
     setup_requires=setup_requirements,
     test_suite='tests',
     tests_require=test_requirements,
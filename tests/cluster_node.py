@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""Scheduler node process of the multi-node tests, executing notebooks on simulated kernels until stdin is closed.
+
+    python -m tests.cluster_node <task store> <node> [<seconds per cell>]
+"""
+
+import sys
+
+from enterprise_scheduler.cluster_scheduler import ClusterScheduler
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.task_store import SharedTaskStore
+from tests.fake_gateway import FakeGateway
+
+LEASE_SECONDS = 1
+HEARTBEAT_INTERVAL = 0.2
+
+
+def main(path, node, execution_time=0):
+    store = SharedTaskStore(path, node=node, lease_seconds=LEASE_SECONDS)
+    scheduler = ClusterScheduler(number_of_threads=2, task_store=store, pool_sizes={}, claim_ahead=1,
+                                 heartbeat_interval=HEARTBEAT_INTERVAL, poll_interval=0.05)
+    gateway = FakeGateway(execution_time=float(execution_time))
+    scheduler.register_executor(JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01,
+                                                                       launcher_factory=gateway)))
+    scheduler.start()
+    print('started', flush=True)
+    sys.stdin.read()
+    scheduler.stop(drain=False)
+    store.close()
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Local HTTP server stand-in for the S3 API of an object storage, checking request signatures."""
+
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+from enterprise_scheduler.ffdl_results import sign_request
+
+NAMESPACE = 'http://s3.amazonaws.com/doc/2006-03-01/'
+
+
+class CosServer:
+    """Serves the objects registered in `objects` ((bucket, key) -> bytes) to clients signing their
+    requests with access_key and secret_key; listings return at most page_size objects per request"""
+
+    def __init__(self, access_key='cos-user', secret_key='cos-password', region='us-standard', page_size=1000):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.page_size = page_size
+        self.objects = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:{}'.format(self.httpd.server_address[1])
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handle(self, request):
+        with self._lock:
+            self.requests += 1
+        if not self._authorized(request):
+            self._send(request, 403, b'<Error><Code>SignatureDoesNotMatch</Code></Error>')
+            return
+
+        parts = urlsplit(request.path)
+        bucket, _, key = unquote(parts.path).lstrip('/').partition('/')
+        if key:
+            content = self.objects.get((bucket, key))
+            if content is None:
+                self._send(request, 404, b'<Error><Code>NoSuchKey</Code></Error>')
+            else:
+                self._send(request, 200, content)
+            return
+
+        query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+        keys = sorted(key for (name, key) in self.objects if name == bucket and key.startswith(query.get('prefix', '')))
+        start = int(query.get('continuation-token', 0))
+        page = keys[start:start + self.page_size]
+        truncated = start + self.page_size < len(keys)
+        body = '<ListBucketResult xmlns="{}"><IsTruncated>{}</IsTruncated>{}{}</ListBucketResult>'.format(
+            NAMESPACE, 'true' if truncated else 'false',
+            '<NextContinuationToken>{}</NextContinuationToken>'.format(start + self.page_size) if truncated else '',
+            ''.join('<Contents><Key>{}</Key><Size>{}</Size></Contents>'.format(
+                escape(key), len(self.objects[(bucket, key)])) for key in page))
+        self._send(request, 200, body.encode('utf-8'))
+
+    def _authorized(self, request):
+        authorization = request.headers.get('Authorization', '')
+        if 'Credential={}/'.format(self.access_key) not in authorization:
+            return False
+        signed = authorization.split('SignedHeaders=')[1].split(',')[0].split(';')
+        headers = {name: request.headers[name] for name in signed
+                   if name not in ('host', 'x-amz-date', 'x-amz-content-sha256')}
+        now = datetime.datetime.strptime(request.headers['X-Amz-Date'], '%Y%m%dT%H%M%SZ')
+        expected = sign_request('GET', 'http://{}{}'.format(request.headers['Host'], request.path), headers,
+                                self.access_key, self.secret_key, self.region, now=now)
+        return expected['Authorization'] == authorization
+
+    @staticmethod
+    def _send(request, status, body):
+        request.send_response(status)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
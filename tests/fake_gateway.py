@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""In-process stand-in for the Enterprise Gateway client used by tests."""
+
+import asyncio
+import itertools
+import threading
+import time
+
+
+class FakeKernel:
+    """Kernel client stand-in reporting 'starting' for a few probes before becoming idle"""
+
+    def __init__(self, gateway, kernel_id, kernelspec):
+        self.gateway = gateway
+        self.kernel_id = kernel_id
+        self.kernelspec = kernelspec
+        self.state = 'starting'
+        self.probes_until_ready = gateway.probes_until_ready
+        self.restarts = 0
+        self.interrupts = 0
+        self.executed = []
+        # set by interrupt() or shutdown to end a hanging cell
+        self._stopped = threading.Event()
+
+    def get_state(self):
+        if self.state == 'starting':
+            if self.probes_until_ready <= 0:
+                self.state = 'idle'
+            self.probes_until_ready -= 1
+        return self.state
+
+    def execute(self, code, timeout=None):
+        if self.state == 'dead':
+            raise RuntimeError('kernel {} is dead'.format(self.kernel_id))
+        time.sleep(self.gateway.execution_time)
+        if self.gateway.hang_on and self.gateway.hang_on in code:
+            self._stopped.wait(30)
+            self._stopped.clear()
+        return self._executed(code)
+
+    async def execute_async(self, code):
+        if self.state == 'dead':
+            raise RuntimeError('kernel {} is dead'.format(self.kernel_id))
+        await asyncio.sleep(self.gateway.execution_time)
+        if self.gateway.hang_on and self.gateway.hang_on in code:
+            deadline = time.monotonic() + 30
+            while not self._stopped.is_set() and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            self._stopped.clear()
+        return self._executed(code)
+
+    def _executed(self, code):
+        self.executed.append(code)
+        if self.gateway.fail_on and self.gateway.fail_on in code:
+            return 'error: {}'.format(code), True
+        return 'executed: {}'.format(code), False
+
+    def restart(self):
+        time.sleep(self.gateway.restart_time)
+        self.restarts += 1
+        self.executed = []
+        self.state = 'starting'
+        self.probes_until_ready = self.gateway.probes_until_ready
+
+    def interrupt(self):
+        self.interrupts += 1
+        if self.gateway.interruptible:
+            self._stopped.set()
+
+
+class FakeGateway:
+    """Launcher stand-in for `GatewayClient`, shared by every endpoint"""
+
+    def __init__(self, probes_until_ready=1, execution_time=0, hang_on=None, interruptible=True, fail_on=None,
+                 restart_time=0):
+        self.probes_until_ready = probes_until_ready
+        self.execution_time = execution_time
+        self.restart_time = restart_time
+        # cells containing hang_on run until interrupted (or shut down when not interruptible)
+        self.hang_on = hang_on
+        self.interruptible = interruptible
+        # cells containing fail_on report an error, as a raised exception does
+        self.fail_on = fail_on
+        self.started = []
+        self.shutdown = []
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def __call__(self, endpoint):
+        # used as the launcher factory
+        return self
+
+    def start_kernel(self, kernelspec):
+        with self._lock:
+            kernel = FakeKernel(self, 'kernel-{}'.format(next(self._ids)), kernelspec)
+            self.started.append(kernel)
+        return kernel
+
+    def shutdown_kernel(self, kernel):
+        with self._lock:
+            kernel.state = 'dead'
+            self.shutdown.append(kernel)
+        kernel._stopped.set()
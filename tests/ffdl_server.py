@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""Local HTTP server stand-in for the FfDL REST API."""
+
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FfDLServer:
+    """Accepts model submissions on /v1/models, recording the uploaded files of each request.
+
+    The next `failures` submissions are answered with 503, and the number of
+    connections and the highest number of concurrent requests are tracked.
+    Models report the training statuses listed in `statuses` (model id -> list),
+    one per poll, or COMPLETED when none are listed."""
+
+    def __init__(self, delay=0, failures=0, retry_after=None):
+        self.delay = delay
+        self.failures = failures
+        self.retry_after = retry_after
+        self.submissions = []
+        self.statuses = {}
+        self.polls = 0
+        self.requests = 0
+        self.connections = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                server._handle_get(self)
+
+            def do_POST(self):
+                with server._lock:
+                    server.requests += 1
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    server._handle_post(self)
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:{}'.format(self.httpd.server_address[1])
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handle_get(self, request):
+        model_id = request.path.split('?')[0].rsplit('/', 1)[-1]
+        with self._lock:
+            self.polls += 1
+            known = 0 < len(self.submissions) and model_id.startswith('training-') and \
+                int(model_id[len('training-'):]) <= len(self.submissions)
+            statuses = self.statuses.get(model_id, ['COMPLETED'])
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+
+        if not known:
+            self._send(request, 404, dict(error='Model not found: {}'.format(model_id)))
+            return
+
+        training_status = dict(status=status)
+        if status == 'FAILED':
+            training_status['error_message'] = 'Learner exited with a non-zero code'
+        self._send(request, 200, dict(model_id=model_id, training=dict(training_status=training_status)))
+
+    def _handle_post(self, request):
+        body = request.rfile.read(int(request.headers['Content-Length']))
+        if self.delay:
+            time.sleep(self.delay)
+
+        if not request.path.startswith('/v1/models'):
+            self._send(request, 404, dict(error='Not found: {}'.format(request.path)))
+            return
+
+        with self._lock:
+            fail = self.failures > 0
+            self.failures -= fail
+        if fail:
+            headers = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+            self._send(request, 503, dict(error='Service unavailable'), headers)
+            return
+
+        message = BytesParser(policy=HTTP).parsebytes(
+            b'Content-Type: ' + request.headers['Content-Type'].encode('utf-8') + b'\r\n\r\n' + body)
+        files = {}
+        for part in message.iter_parts():
+            files[part.get_param('name', header='content-disposition')] = \
+                (part.get_filename(), part.get_payload(decode=True))
+
+        with self._lock:
+            self.submissions.append(dict(path=request.path, headers=dict(request.headers), files=files))
+            model_id = 'training-{}'.format(len(self.submissions))
+
+        self._send(request, 201, dict(model_id=model_id))
+
+    @staticmethod
+    def _send(request, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
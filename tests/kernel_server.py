@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Local websocket server stand-in for the kernel channels of Enterprise Gateway."""
+
+import asyncio
+import threading
+
+from tornado.escape import json_decode, json_encode
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+from tornado.web import Application
+from tornado.websocket import WebSocketHandler
+
+
+class KernelServer:
+    """Serves /api/kernels/<id>/channels on a random local port, executing requests by echoing their code.
+
+    Code containing fail_on reports an error, and every execution takes execution_time seconds."""
+
+    def __init__(self, execution_time=0, fail_on=None):
+        self.execution_time = execution_time
+        self.fail_on = fail_on
+        self.executed = []
+        self.connections = 0
+        self.loop = None
+        self._sockets = bind_sockets(0, '127.0.0.1')
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._serve)
+        self.thread.daemon = True
+
+    def url(self, kernel_id):
+        return 'ws://127.0.0.1:{}/api/kernels/{}/channels'.format(self._sockets[0].getsockname()[1], kernel_id)
+
+    def start(self):
+        self.thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self._stopped.set_result, None)
+        self.thread.join()
+
+    def _serve(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._run())
+        self.loop.close()
+
+    async def _run(self):
+        server = self
+
+        class ChannelsHandler(WebSocketHandler):
+            def open(self, kernel_id):
+                server.connections += 1
+
+            async def on_message(self, message):
+                await server._execute(self, json_decode(message))
+
+        self._stopped = self.loop.create_future()
+        http_server = HTTPServer(Application([(r'/api/kernels/([^/]+)/channels', ChannelsHandler)]))
+        http_server.add_sockets(self._sockets)
+        self._ready.set()
+        await self._stopped
+        http_server.stop()
+
+    async def _execute(self, handler, request):
+        msg_id = request['header']['msg_id']
+        code = request['content']['code']
+        self._send(handler, msg_id, 'status', dict(execution_state='busy'))
+        await asyncio.sleep(self.execution_time)
+        self.executed.append(code)
+        if self.fail_on and self.fail_on in code:
+            error = dict(ename='NameError', evalue=code, traceback=[])
+            self._send(handler, msg_id, 'error', error)
+            self._send(handler, msg_id, 'execute_reply', dict(error, status='error'))
+        else:
+            self._send(handler, msg_id, 'stream', dict(name='stdout', text='executed: {}'.format(code)))
+            self._send(handler, msg_id, 'execute_reply', dict(status='ok'))
+        self._send(handler, msg_id, 'status', dict(execution_state='idle'))
+
+    @staticmethod
+    def _send(handler, msg_id, msg_type, content):
+        handler.write_message(json_encode(dict(header=dict(msg_type=msg_type), msg_type=msg_type,
+                                               parent_header=dict(msg_id=msg_id), content=content)))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""Local HTTP server stand-in serving notebooks with ETag/Last-Modified headers."""
+
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LAST_MODIFIED = 'Wed, 01 May 2019 00:00:00 GMT'
+
+
+class NotebookServer:
+    """Serves notebooks registered in `notebooks` (path -> content) on a random local port"""
+
+    def __init__(self, delay=0, etag=True, last_modified=True, content_type='application/json'):
+        self.delay = delay
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.notebooks = {}
+        self.requests = 0
+        self.downloads = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    def url(self, path):
+        return 'http://127.0.0.1:{}{}'.format(self.httpd.server_address[1], path)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handle(self, request):
+        with self._lock:
+            self.requests += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+        content = self.notebooks.get(request.path)
+        if content is None:
+            request.send_response(404)
+            request.end_headers()
+            return
+
+        etag = '"{}"'.format(hashlib.md5(content.encode('utf-8')).hexdigest())
+        if (self.etag and request.headers.get('If-None-Match') == etag) or \
+                (not self.etag and self.last_modified and request.headers.get('If-Modified-Since') == LAST_MODIFIED):
+            request.send_response(304)
+            request.end_headers()
+            return
+
+        with self._lock:
+            self.downloads += 1
+        body = content.encode('utf-8')
+        request.send_response(200)
+        request.send_header('Content-Type', self.content_type)
+        request.send_header('Content-Length', str(len(body)))
+        if self.etag:
+            request.send_header('ETag', etag)
+        if self.last_modified:
+            request.send_header('Last-Modified', LAST_MODIFIED)
+        request.end_headers()
+        request.wfile.write(body)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.async_kernel` and the coroutine execution of `JupyterExecutor`."""
+
+import asyncio
+import time
+import unittest
+
+from enterprise_scheduler.async_kernel import AsyncKernelConnection
+from enterprise_scheduler.async_scheduler import AsyncScheduler
+from enterprise_scheduler.executor import TaskCancelled, TaskTimeout
+from enterprise_scheduler.jupyter_executor import CellExecutionError, JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from tests.fake_gateway import FakeGateway
+from tests.kernel_server import KernelServer
+from tests.test_timeouts import task
+
+
+class ChannelGateway(FakeGateway):
+    """Gateway stand-in whose kernels are only reachable over the channels of a `KernelServer`"""
+
+    def __init__(self, server, **options):
+        super().__init__(**options)
+        self.server = server
+
+    def start_kernel(self, kernelspec):
+        kernel = super().start_kernel(kernelspec)
+        kernel.kernel_ws_api_endpoint = self.server.url(kernel.kernel_id)
+        kernel.execute_async = None
+        return kernel
+
+
+class TestAsyncKernelConnection(unittest.TestCase):
+    """Tests for `AsyncKernelConnection`."""
+
+    def setUp(self):
+        self.server = KernelServer(fail_on='fail()').start()
+        self.addCleanup(self.server.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_cells_are_executed_over_the_kernel_channels(self):
+        async def execute():
+            connection = await AsyncKernelConnection(self.server.url('kernel-0')).connect()
+            try:
+                return [await connection.execute('x = 1'), await connection.execute('fail()')]
+            finally:
+                connection.close()
+
+        (text, has_error), (error, failed) = self.loop.run_until_complete(execute())
+        self.assertEqual(('executed: x = 1', False), (text, has_error))
+        self.assertTrue(failed)
+        self.assertIn('NameError', error)
+        self.assertEqual(['x = 1', 'fail()'], self.server.executed)
+
+    def test_pending_executions_fail_when_the_connection_closes(self):
+        self.server.execution_time = 5
+
+        async def execute():
+            connection = await AsyncKernelConnection(self.server.url('kernel-0')).connect()
+            execution = asyncio.ensure_future(connection.execute('x = 1'))
+            await asyncio.sleep(0.1)
+            connection.close()
+            await execution
+
+        with self.assertRaises(ConnectionError):
+            self.loop.run_until_complete(execute())
+
+
+class TestJupyterExecutorAsync(unittest.TestCase):
+    """Tests for `JupyterExecutor.execute_task_async`."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _executor(self, gateway, max_size=1):
+        pool = KernelPool(max_size=max_size, readiness_interval=0.01, launcher_factory=gateway)
+        executor = JupyterExecutor(kernel_pool=pool, interrupt_timeout=1)
+        self.addCleanup(executor.shutdown)
+        return executor
+
+    def _execute(self, executor, *tasks):
+        async def execute():
+            return await asyncio.gather(*[executor.execute_task_async(task) for task in tasks])
+        return self.loop.run_until_complete(execute())
+
+    def test_cells_are_executed_over_the_kernel_channels_without_threads(self):
+        server = KernelServer(execution_time=0.2, fail_on='fail()').start()
+        self.addCleanup(server.stop)
+        executor = self._executor(ChannelGateway(server), max_size=10)
+
+        started = time.monotonic()
+        results = self._execute(executor, *[task('x = {}'.format(i), 'y = 2') for i in range(10)])
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(['executed: x = 3', 'executed: y = 2'], [cell.outputs[0].text for cell in results[3].cells])
+        self.assertEqual(10, server.connections)
+        # no I/O thread waited for the cells
+        self.assertEqual(0, len(executor._io._threads))
+
+        with self.assertRaises(CellExecutionError):
+            self._execute(executor, task('fail()'))
+
+    def test_kernel_coroutines_are_awaited(self):
+        gateway = FakeGateway()
+        executor = self._executor(gateway)
+
+        result, = self._execute(executor, task('x = 1', parameters=dict(y=2)))
+        injected, cell = result.cells
+        self.assertIn('y = 2', injected.outputs[0].text)
+        self.assertEqual('executed: x = 1', cell.outputs[0].text)
+        self.assertEqual(0, len(executor._io._threads))
+
+    def test_cell_timeout_interrupts_and_recycles_the_kernel(self):
+        gateway = FakeGateway(hang_on='hang()')
+        executor = self._executor(gateway)
+
+        started = time.monotonic()
+        with self.assertRaises(TaskTimeout):
+            self._execute(executor, task('x = 1', 'hang()', cell_timeout=0.1))
+        self.assertLess(time.monotonic() - started, 1)
+
+        # the kernel is interrupted and reset in the background, then reused
+        result, = self._execute(executor, task('x = 1'))
+        self.assertEqual('executed: x = 1', result.cells[0].outputs[0].text)
+        self.assertEqual((1, 1), (len(gateway.started), gateway.started[0].interrupts))
+
+    def test_cancel_running_task(self):
+        executor = self._executor(FakeGateway(hang_on='hang()'))
+        self.loop.call_later(0.2, executor.cancel_task, 'task-0')
+
+        started = time.monotonic()
+        with self.assertRaises(TaskCancelled):
+            self._execute(executor, task('hang()', id='task-0'))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual({}, executor._controls)
+
+
+class TestAsyncSchedulerJupyter(unittest.TestCase):
+    """Tests for Jupyter tasks run by `AsyncScheduler`."""
+
+    def test_notebooks_run_on_the_event_loop(self):
+        gateway = FakeGateway(execution_time=0.1)
+        executor = JupyterExecutor(kernel_pool=KernelPool(max_size=20, readiness_interval=0.01,
+                                                          launcher_factory=gateway))
+        scheduler = AsyncScheduler(max_concurrency=20)
+        scheduler.executors[JupyterExecutor.TYPE] = executor
+        scheduler.start()
+
+        ids = [scheduler.schedule_task(task('x = 1', 'y = 2')) for i in range(20)]
+        scheduler.stop()
+
+        self.assertEqual(['succeeded'] * 20, [scheduler.task_store.get(id)['state'] for id in ids])
+        self.assertEqual(0, len(executor._io._threads))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.blob_store` module and spilled task payloads."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from enterprise_scheduler.blob_store import BlobStore
+from enterprise_scheduler.ffdl_archive import ArchiveBuilder
+from enterprise_scheduler.scheduler import Scheduler
+from tests.test_ffdl_archive import ffdl_task
+from tests.test_scheduler import RecordingExecutor
+
+
+def large_notebook(size=64 * 1024):
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+        dict(cell_type='code', source='x = 1', metadata={}, execution_count=None,
+             outputs=[dict(output_type='stream', name='stdout', text='x' * size)])])
+
+
+class TestBlobStore(unittest.TestCase):
+    """Tests for `BlobStore`."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.store = BlobStore(self.directory)
+        self.addCleanup(self.store.close)
+
+    def test_identical_content_is_stored_once(self):
+        key = self.store.put(b'payload')
+        self.assertEqual(hashlib.sha256(b'payload').hexdigest(), key)
+        self.assertEqual(key, self.store.put(b'payload'))
+        self.assertEqual(dict(blobs=1, bytes=7, writes=1, deduplicated=1), self.store.stats())
+        self.assertEqual(b'payload', self.store.get(key)[:])
+
+    def test_blobs_are_removed_once_unreferenced(self):
+        key = self.store.put(b'payload')
+        self.store.put(b'payload')
+        blob = self.store.get(key)
+
+        self.store.release(key)
+        self.assertEqual(b'payload', self.store.get(key)[:])
+        self.store.release(key)
+        with self.assertRaises(OSError):
+            self.store.get(key)
+        # mapped blobs stay readable
+        self.assertEqual(b'payload', blob[:])
+
+    def test_close_removes_the_blobs(self):
+        self.store.put(b'payload')
+        self.store.close()
+        self.assertEqual([], os.listdir(self.directory))
+        self.assertEqual(0, self.store.stats()['blobs'])
+
+
+class TestSpilledPayloads(unittest.TestCase):
+    """Tests that queued tasks only keep their metadata in memory."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.executor = RecordingExecutor()
+        self.scheduler = Scheduler(number_of_threads=1, blob_store=BlobStore(self.directory))
+        self.scheduler.executors[RecordingExecutor.TYPE] = self.executor
+        self.addCleanup(self.scheduler.stop, drain=False)
+
+    def _task(self, **properties):
+        task = dict(executor=RecordingExecutor.TYPE, endpoint='localhost:8888', kernelspec='python3',
+                    notebook=large_notebook())
+        task.update(properties)
+        return task
+
+    def _queued(self):
+        return list(self.scheduler.queue.queue)
+
+    def test_large_payloads_are_spilled_until_executed(self):
+        dependencies = {'small.txt': 'small', 'data.csv': 'a,b\n' * 8192}
+        self.scheduler.schedule_tasks([self._task(dependencies=dict(dependencies)) for i in range(3)])
+
+        for envelope in self._queued():
+            self.assertNotIn('notebook', envelope.task)
+            self.assertEqual({'small.txt': 'small'}, envelope.task['dependencies'])
+        # identical payloads are stored once
+        self.assertEqual(2, self.scheduler.blob_store.stats()['blobs'])
+
+        self.scheduler.start()
+        self.scheduler.queue.join()
+
+        self.assertEqual(3, len(self.executor.tasks))
+        for task in self.executor.tasks:
+            self.assertEqual(large_notebook(), task['notebook'])
+            self.assertEqual(['small.txt', 'data.csv'], list(task['dependencies']))
+            self.assertEqual(dependencies['data.csv'].encode('utf-8'), task['dependencies']['data.csv'][:])
+        self.assertEqual(0, self.scheduler.blob_store.stats()['blobs'])
+
+    def test_small_payloads_stay_in_memory(self):
+        self.scheduler.schedule_task(self._task(notebook={'cells': []}))
+        self.assertEqual({'cells': []}, self._queued()[0].task['notebook'])
+        self.assertEqual(0, self.scheduler.blob_store.stats()['writes'])
+
+    def test_expired_tasks_release_their_payloads(self):
+        self.scheduler.schedule_task(self._task(deadline=1))
+        self.scheduler.start()
+        self.scheduler.queue.join()
+
+        self.assertEqual([], self.executor.tasks)
+        self.assertEqual(0, self.scheduler.blob_store.stats()['blobs'])
+
+    def test_archives_of_spilled_dependencies_are_identical(self):
+        task = ffdl_task(dependencies={'data.csv': 'a,b\n' * 8192})
+        with ArchiveBuilder().build(task) as buffer:
+            expected = zipfile.ZipFile(buffer).read('data.csv')
+
+        key = self.scheduler.blob_store.put(task['dependencies']['data.csv'].encode('utf-8'))
+        task['dependencies'] = {'data.csv': self.scheduler.blob_store.get(key)}
+        with ArchiveBuilder().build(task) as buffer:
+            self.assertEqual(expected, zipfile.ZipFile(buffer).read('data.csv'))
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.cluster_scheduler` module and the shared task store."""
+
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import uuid
+from concurrent.futures import Future
+
+from enterprise_scheduler.cluster_scheduler import ClusterScheduler
+from enterprise_scheduler.executor import Executor
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.task import TaskEnvelope
+from enterprise_scheduler.task_store import SharedTaskStore
+from tests.fake_gateway import FakeGateway
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def task(source='x = 1', **properties):
+    notebook = dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+        dict(cell_type='code', source=source, metadata={}, outputs=[], execution_count=None)])
+    return dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook=notebook,
+                **properties)
+
+
+def envelopes(count, **properties):
+    return [TaskEnvelope.from_task(dict(task(**properties), id=uuid.uuid4())) for i in range(count)]
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.02)
+
+
+class TrainingExecutor(Executor):
+    """Executor stand-in running its tasks in the background, as FfDL trainings, until finish() is called"""
+    TYPE = 'training'
+
+    def __init__(self):
+        super().__init__()
+        self.trainings = []
+
+    def execute_task(self, task):
+        future = Future()
+        self.trainings.append(future)
+        return future
+
+    def finish(self):
+        for future in self.trainings:
+            future.set_result('trained')
+
+
+class ClusterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'tasks.db')
+
+    def store(self, node, lease_seconds=5, **kwargs):
+        store = SharedTaskStore(self.path, node=node, lease_seconds=lease_seconds, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+
+class TestSharedTaskStore(ClusterTestCase):
+    """Tests for the queue operations of `SharedTaskStore`."""
+
+    def test_tasks_are_claimed_once_by_priority(self):
+        a, b = self.store('a'), self.store('b')
+        low, high = envelopes(3), envelopes(2, priority=5)
+        a.add_many(low + high)
+
+        self.assertEqual([str(e.id) for e in high], [str(t['id']) for t in a.claim(2)])
+        self.assertEqual([str(e.id) for e in low], [str(t['id']) for t in b.claim(10)])
+        self.assertEqual([], a.claim(10))
+        self.assertEqual(('a', 'queued'), (b.get(high[0].id)['node'], b.get(high[0].id)['state']))
+
+    def test_expired_leases_are_queued_again(self):
+        a, b = self.store('a', lease_seconds=0.2, max_attempts=2), self.store('b', lease_seconds=0.2, max_attempts=2)
+        a.add_many(envelopes(2))
+        started, claimed = a.claim(2)
+        self.assertTrue(a.start(started['id']))
+
+        time.sleep(0.3)
+        held, requeued = b.heartbeat()
+        self.assertEqual(({}, 2), (held, requeued))
+        self.assertFalse(a.start(claimed['id']))
+        self.assertEqual(dict(state='queued', attempts=1, node=None),
+                         {key: b.get(started['id'])[key] for key in ('state', 'attempts', 'node')})
+
+        # a task losing its node max_attempts times fails
+        for task in b.claim(2):
+            b.start(task['id'])
+        time.sleep(0.3)
+        a.heartbeat()
+        self.assertEqual(('failed', 'queued'), (a.get(started['id'])['state'], a.get(claimed['id'])['state']))
+
+    def test_idle_node_steals_half_of_the_backlog(self):
+        a, b = self.store('a'), self.store('b')
+        backlog = envelopes(4)
+        a.add_many(backlog)
+        a.claim(4)
+
+        stolen = b.steal(10)
+        # the tasks a would have executed last
+        self.assertEqual([str(e.id) for e in reversed(backlog[2:])], [str(t['id']) for t in stolen])
+        self.assertFalse(a.start(stolen[0]['id']))
+        self.assertTrue(b.start(stolen[0]['id']))
+        self.assertEqual(set(str(e.id) for e in backlog[:2]), set(a.heartbeat()[0]))
+        self.assertEqual([], a.steal(10))
+
+    def test_tasks_cancelled_by_another_node(self):
+        a, b = self.store('a'), self.store('b')
+        a.add_many(envelopes(1))
+        task_id = str(a.claim(1)[0]['id'])
+
+        b.set_state(task_id, 'cancelled', 'cancelled')
+        self.assertEqual({task_id: 'cancelled'}, a.heartbeat()[0])
+        self.assertFalse(a.start(task_id))
+        a.set_state(task_id, 'cancelled', 'cancelled')
+        self.assertEqual({}, a.heartbeat()[0])
+
+
+class TestClusterScheduler(ClusterTestCase):
+    """Tests for nodes sharing a task store within the process."""
+
+    def node(self, name, execution_time=0.01, hang_on=None, **kwargs):
+        gateway = FakeGateway(execution_time=execution_time, hang_on=hang_on)
+        scheduler = ClusterScheduler(number_of_threads=2, task_store=self.store(name, lease_seconds=1),
+                                     pool_sizes={}, heartbeat_interval=0.1, poll_interval=0.02, **kwargs)
+        scheduler.register_executor(JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01,
+                                                                           launcher_factory=gateway)))
+        self.addCleanup(scheduler.stop, drain=False)
+        scheduler.gateway = gateway
+        return scheduler
+
+    def _states(self, scheduler, task_ids):
+        return [scheduler.task_store.get(task_id)['state'] for task_id in task_ids]
+
+    def _executed(self, node):
+        return sum(len(kernel.executed) + kernel.restarts for kernel in node.gateway.started)
+
+    def test_tasks_are_executed_once_across_nodes(self):
+        a, b = self.node('a'), self.node('b')
+        a.start()
+        b.start()
+        task_ids = a.schedule_tasks([task() for i in range(40)])
+
+        wait_for(lambda: self._states(b, task_ids) == ['succeeded'] * 40)
+        nodes = [b.task_store.get(task_id)['node'] for task_id in task_ids]
+        self.assertGreater(nodes.count('a'), 0)
+        self.assertGreater(nodes.count('b'), 0)
+        # every executed task restarts its kernel once released
+        self.assertEqual(40, self._executed(a) + self._executed(b))
+
+    def test_idle_node_steals_claimed_tasks(self):
+        a = self.node('a', execution_time=0.1, claim_ahead=20)
+        a.start()
+        task_ids = a.schedule_tasks([task() for i in range(20)])
+        wait_for(lambda: a.claimed == 20)
+
+        b = self.node('b', execution_time=0.05)
+        b.start()
+        wait_for(lambda: self._states(a, task_ids) == ['succeeded'] * 20)
+        self.assertGreater(b.stolen, 0)
+        self.assertIn('b', [a.task_store.get(task_id)['node'] for task_id in task_ids])
+
+    def test_tasks_of_a_lost_node_are_executed_by_another(self):
+        lost = self.store('lost', lease_seconds=0.3)
+        task_ids = self.node('client').schedule_tasks([task() for i in range(4)])
+        started = lost.claim(4)[0]['id']
+        lost.start(started)
+
+        b = self.node('b')
+        b.start()
+        wait_for(lambda: self._states(b, task_ids) == ['succeeded'] * 4)
+        self.assertEqual(1, b.task_store.get(started)['attempts'])
+
+    def test_cancel_task_running_on_another_node(self):
+        a = self.node('a', hang_on='hang()')
+        a.start()
+        task_id = a.schedule_task(task('hang()'))
+        wait_for(lambda: self._states(a, [task_id]) == ['running'])
+
+        b = self.node('b')
+        self.assertTrue(b.cancel_task(task_id))
+        wait_for(lambda: task_id not in a._held)
+        self.assertEqual('cancelled', a.task_store.get(task_id)['state'])
+        self.assertEqual(set(), b._cancelled)
+
+    def test_running_tasks_cancelled_on_another_node_are_signalled_once(self):
+        a = self.node('a', hang_on='hang()')
+        executor = a.executors['jupyter']
+        cancel_task, signals = executor.cancel_dispatched_task, []
+        # the executor takes a while to stop the task, the heartbeats keep reporting it cancelled
+        executor.cancel_dispatched_task = lambda task_id: signals.append(task_id) or True
+        a.start()
+        task_id = a.schedule_task(task('hang()'))
+        wait_for(lambda: self._states(a, [task_id]) == ['running'])
+
+        self.assertTrue(self.node('b').cancel_task(task_id))
+        wait_for(lambda: signals)
+        time.sleep(0.5)
+        self.assertEqual([str(task_id)], signals)
+
+        cancel_task(task_id)
+        wait_for(lambda: str(task_id) not in a._held)
+        self.assertEqual(set(), a._signalled)
+
+    def test_background_tasks_do_not_use_claim_slots(self):
+        a = self.node('a')
+        executor = TrainingExecutor()
+        a.register_executor(executor)
+        a.start()
+        trainings = a.schedule_tasks([dict(task(), executor='training') for i in range(a.capacity * 2)])
+        wait_for(lambda: len(executor.trainings) == len(trainings))
+
+        task_id = a.schedule_task(task())
+        wait_for(lambda: self._states(a, [task_id]) == ['succeeded'])
+        self.assertEqual(len(trainings), a.cluster_stats()['background'])
+
+        executor.finish()
+        wait_for(lambda: self._states(a, trainings) == ['succeeded'] * len(trainings))
+        self.assertEqual(dict(held=0, background=0),
+                         {key: a.cluster_stats()[key] for key in ('held', 'background')})
+
+    def test_stopped_node_releases_its_claims(self):
+        a = self.node('a', execution_time=1, claim_ahead=4)
+        a.start()
+        task_ids = a.schedule_tasks([task() for i in range(6)])
+        wait_for(lambda: a.claimed == 6)
+        a.stop(drain=False)
+
+        self.assertEqual(4, self._states(a, task_ids).count('queued'))
+        self.assertEqual([], a.task_store.nodes())
+
+
+class TestClusterProcesses(ClusterTestCase):
+    """Tests for scheduler nodes running in separate processes."""
+
+    def spawn(self, node, execution_time=0.01):
+        process = subprocess.Popen([sys.executable, '-m', 'tests.cluster_node', self.path, node, str(execution_time)],
+                                   cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+        self.addCleanup(self._terminate, process)
+        self.assertEqual('started', process.stdout.readline().strip())
+        return process
+
+    @staticmethod
+    def _terminate(process):
+        if process.poll() is None:
+            process.stdin.close()
+            process.wait(10)
+        process.stdout.close()
+
+    def test_nodes_share_the_queue_and_survive_a_lost_node(self):
+        client = ClusterScheduler(task_store=self.store('client'), heartbeat_interval=0.2)
+        victim = self.spawn('victim', execution_time=0.2)
+        task_ids = client.schedule_tasks([task() for i in range(20)])
+        wait_for(lambda: client.task_store.counts().get('running'))
+        victim.send_signal(signal.SIGKILL)
+        victim.wait()
+
+        self.spawn('node-1', execution_time=0.1)
+        self.spawn('node-2', execution_time=0.1)
+        wait_for(lambda: client.task_store.counts() == {'succeeded': 20}, timeout=30)
+
+        records = [client.task_store.get(task_id) for task_id in task_ids]
+        self.assertTrue({'node-1', 'node-2'}.issubset(record['node'] for record in records))
+        self.assertTrue(any(record['attempts'] for record in records))
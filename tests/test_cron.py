@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.cron` module."""
+
+import unittest
+from datetime import datetime, timezone
+
+from enterprise_scheduler.cron import CronTrigger, DateTrigger, IntervalTrigger
+
+
+def ts(value):
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+class TestCronTrigger(unittest.TestCase):
+    """Tests for `CronTrigger`."""
+
+    def assertNext(self, expected, expression, after):
+        self.assertEqual(ts(expected), CronTrigger(expression).next_after(ts(after)))
+
+    def test_fields(self):
+        self.assertNext('2024-01-01T11:00:00', '0 * * * *', '2024-01-01T10:30:00')
+        self.assertNext('2024-01-01T10:31:00', '* * * * *', '2024-01-01T10:30:00')
+        self.assertNext('2024-01-01T10:45:00', '*/15 * * * *', '2024-01-01T10:30:00')
+        self.assertNext('2024-01-01T12:05:00', '5,35 12-14 * * *', '2024-01-01T10:30:00')
+        self.assertNext('2024-07-01T00:00:00', '0 0 1 jul *', '2024-01-01T10:30:00')
+
+    def test_fire_times_are_strictly_after(self):
+        self.assertNext('2024-01-01T11:00:00', '0 * * * *', '2024-01-01T10:00:00')
+        self.assertNext('2024-01-01T11:00:00', '0 * * * *', '2024-01-01T10:59:59')
+
+    def test_days_of_week(self):
+        # Friday 17:50 -> Monday 09:00
+        self.assertNext('2024-01-08T09:00:00', '*/15 9-17 * * mon-fri', '2024-01-05T17:50:00')
+        self.assertNext('2024-01-07T00:00:00', '0 0 * * 7', '2024-01-05T00:00:00')
+
+    def test_restricted_days_of_month_and_week_match_either(self):
+        # the 1st of the month or any monday
+        self.assertNext('2024-01-08T02:30:00', '30 2 1 * 1', '2024-01-01T03:00:00')
+        self.assertNext('2024-02-01T02:30:00', '30 2 1 * 1', '2024-01-29T03:00:00')
+
+    def test_aliases(self):
+        self.assertNext('2025-01-01T00:00:00', '@daily', '2024-12-31T23:59:30')
+        self.assertNext('2024-01-01T11:00:00', '@hourly', '2024-01-01T10:00:00')
+
+    def test_rare_and_impossible_dates(self):
+        self.assertNext('2028-02-29T00:00:00', '0 0 29 2 *', '2024-03-01T00:00:00')
+        self.assertIsNone(CronTrigger('0 0 30 2 *').next_after(ts('2024-03-01T00:00:00')))
+
+    def test_last_fire_times_are_strictly_before(self):
+        trigger = CronTrigger('*/15 9-17 * * mon-fri')
+        # Monday 09:00 -> Friday 17:45
+        self.assertEqual(ts('2024-01-05T17:45:00'), trigger.last_before(ts('2024-01-08T09:00:00')))
+        self.assertEqual(ts('2024-01-08T09:00:00'), trigger.last_before(ts('2024-01-08T09:00:30')))
+        self.assertEqual(ts('2024-02-29T00:00:00'), CronTrigger('0 0 29 2 *').last_before(ts('2027-03-01T00:00:00')))
+        self.assertIsNone(CronTrigger('0 0 30 2 *').last_before(ts('2024-03-01T00:00:00')))
+
+    def test_invalid_expressions(self):
+        for expression in ('* * * *', '60 * * * *', '* 24 * * *', '*/0 * * * *', '5-1 * * * *', 'a * * * *'):
+            with self.assertRaises(ValueError):
+                CronTrigger(expression)
+
+
+class TestIntervalAndDateTriggers(unittest.TestCase):
+    """Tests for `IntervalTrigger` and `DateTrigger`."""
+
+    def test_intervals_are_anchored_on_start(self):
+        trigger = IntervalTrigger(60, start=1000)
+        self.assertEqual(1000, trigger.next_after(500))
+        self.assertEqual(1060, trigger.next_after(1000))
+        self.assertEqual(1120, trigger.next_after(1095.5))
+        self.assertIsNone(trigger.last_before(1000))
+        self.assertEqual(1000, trigger.last_before(1060))
+        self.assertEqual(1060, trigger.last_before(1095.5))
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            IntervalTrigger(0, start=0)
+
+    def test_dates_fire_once(self):
+        trigger = DateTrigger(1000)
+        self.assertEqual(1000, trigger.next_after(999))
+        self.assertIsNone(trigger.next_after(1000))
+        self.assertEqual(1000, trigger.last_before(1001))
+        self.assertIsNone(trigger.last_before(1000))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.dag` module."""
+
+import time
+import unittest
+
+from enterprise_scheduler.dag import analyze_cell, build_groups
+from enterprise_scheduler.jupyter_executor import CellExecutionError, JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from tests.fake_gateway import FakeGateway
+
+
+def _code(source, tags=None):
+    return dict(cell_type='code', source=source, metadata=dict(tags=tags or []), outputs=[],
+                execution_count=None)
+
+
+def _markdown(source):
+    return dict(cell_type='markdown', source=source, metadata={})
+
+
+class TestBuildGroups(unittest.TestCase):
+    """Tests for the notebook cells dependency analysis."""
+
+    def test_analyze_cell(self):
+        analysis = analyze_cell('import numpy as np\ndef f(x):\n    return np.sum(x) + y\nz = f([1])')
+        self.assertEqual({'np', 'f', 'z'}, analysis.defines)
+        self.assertIn('y', analysis.uses)
+        self.assertFalse(analysis.imports_only)
+
+    def test_independent_sections_are_separate_groups(self):
+        cells = [_code('a = load("a")'), _markdown('# b'), _code('b = load("b")'),
+                 _code('plot(a)'), _code('plot(b)')]
+        self.assertEqual([[0, 3], [2, 4]], build_groups(cells))
+
+    def test_augmented_assignments_use_the_name(self):
+        cells = [_code('x = 0'), _code('x += 1'), _code('print(x)')]
+        self.assertEqual([[0, 1, 2]], build_groups(cells))
+        cells = [_code('total = 0'), _code('y = 2'), _code('for i in range(3):\n    total += i')]
+        self.assertEqual([[0, 2], [1]], build_groups(cells))
+
+    def test_deletions_use_the_name(self):
+        cells = [_code('x = load()'), _code('y = 1'), _code('del x')]
+        self.assertEqual([[0, 2], [1]], build_groups(cells))
+
+    def test_import_cells_are_repeated_in_groups_using_them(self):
+        cells = [_code('import pandas as pd\nimport os'), _code('a = pd.read_csv("a")'),
+                 _code('b = pd.read_csv("b")'), _code('print(1)')]
+        self.assertEqual([[0, 1], [0, 2], [3]], build_groups(cells))
+
+    def test_unused_import_cells_still_run(self):
+        self.assertEqual([[0, 1]], build_groups([_code('import os'), _code('print(1)')]))
+
+    def test_group_tags_link_cells(self):
+        cells = [_code('open("f", "w").write("x")', ['group:io']), _code('print(open("f").read())', ['group:io'])]
+        self.assertEqual([[0, 1]], build_groups(cells))
+
+    def test_cells_that_cannot_be_analyzed_merge_all_groups(self):
+        cells = [_code('a = 1'), _code('%matplotlib inline'), _code('b = 2')]
+        self.assertEqual([[0, 1, 2]], build_groups(cells))
+
+
+class TestJupyterExecutorDag(unittest.TestCase):
+    """Tests for the 'dag' execution mode of `JupyterExecutor`."""
+
+    def test_independent_cells_run_concurrently(self):
+        gateway = FakeGateway(execution_time=0.2)
+        executor = JupyterExecutor(kernel_pool=KernelPool(max_size=4, readiness_interval=0.01,
+                                                          launcher_factory=gateway))
+        cells = [_code('import time')] + [_code('time.sleep(0.2)\nx{} = {}'.format(i, i)) for i in range(4)]
+        notebook = dict(nbformat=4, nbformat_minor=2, metadata={}, cells=cells)
+
+        start = time.monotonic()
+        result = executor.execute_task(dict(endpoint='localhost:8888', kernelspec='python3', notebook=notebook,
+                                            execution_mode='dag'))
+        elapsed = time.monotonic() - start
+        executor.shutdown()
+
+        # every group runs the import cell then its own cell: 2 cells of 0.2s instead of 8
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(4, len(gateway.started))
+        for index, cell in enumerate(result.cells):
+            self.assertEqual('executed: {}'.format(cells[index]['source']), cell.outputs[0].text)
+
+    def test_failing_cell_fails_the_task(self):
+        gateway = FakeGateway(fail_on='fail()')
+        executor = JupyterExecutor(kernel_pool=KernelPool(max_size=2, readiness_interval=0.01,
+                                                          launcher_factory=gateway))
+        events = []
+        executor._publish_output = lambda task, event: events.append(event)
+        cells = [_code('fail()\na = 1'), _code('print(a)'), _code('b = 2')]
+        notebook = dict(nbformat=4, nbformat_minor=2, metadata={}, cells=cells)
+
+        with self.assertRaises(CellExecutionError):
+            executor.execute_task(dict(id='task', endpoint='localhost:8888', kernelspec='python3',
+                                       notebook=notebook, execution_mode='dag'))
+        executor.shutdown()
+
+        # the output of the failing cell is recorded, its dependent cell never runs
+        self.assertIn(dict(cell=0, output=dict(output_type='stream', name='stderr', text='error: fail()\na = 1')),
+                      events)
+        self.assertNotIn(1, [event['cell'] for event in events])
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.executor` module."""
+
+import os
+import subprocess
+import sys
+import unittest
+
+from enterprise_scheduler.executor import ExecutorRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# dependencies only needed once a task of the corresponding executor runs, or a remote notebook is fetched
+HEAVY_MODULES = ('nbformat', 'yaml', 'ffdl', 'enterprise_gateway', 'pkg_resources', 'requests')
+
+
+class StubExecutor:
+    TYPE = 'stub'
+    created = 0
+
+    def __init__(self):
+        StubExecutor.created += 1
+
+
+class TestExecutorRegistry(unittest.TestCase):
+    """Tests for `ExecutorRegistry`."""
+
+    def setUp(self):
+        StubExecutor.created = 0
+        self.attached = []
+        self.registry = ExecutorRegistry(factories={'stub': 'tests.test_executor:StubExecutor'},
+                                         on_create=self.attached.append, entry_points=False)
+
+    def test_executors_are_created_once_on_first_use(self):
+        self.assertIn('stub', self.registry)
+        self.assertEqual({}, self.registry.loaded())
+        self.assertEqual(0, StubExecutor.created)
+
+        executor = self.registry['stub']
+        self.assertIs(executor, self.registry['stub'])
+        self.assertEqual(1, StubExecutor.created)
+        self.assertEqual([executor], self.attached)
+        self.assertEqual({'stub': executor}, self.registry.loaded())
+
+    def test_registered_factories_and_instances(self):
+        self.registry.register('other', StubExecutor)
+        instance = StubExecutor()
+        self.registry['instance'] = instance
+
+        self.assertEqual(['instance', 'other', 'stub'], self.registry.types())
+        self.assertIsInstance(self.registry['other'], StubExecutor)
+        self.assertIs(instance, self.registry['instance'])
+
+    def test_unknown_executor(self):
+        self.assertNotIn('unknown', self.registry)
+        with self.assertRaises(KeyError):
+            self.registry['unknown']
+
+    def test_builtin_executors(self):
+        registry = ExecutorRegistry(entry_points=False)
+        self.assertIn('jupyter', registry)
+        self.assertIn('ffdl', registry)
+
+
+class TestImportSideEffects(unittest.TestCase):
+    """Tests that the scheduler is cheap to import and create."""
+
+    def test_no_heavy_imports_nor_threads(self):
+        code = ('import sys, threading\n'
+                'from enterprise_scheduler import scheduler_application\n'
+                'from enterprise_scheduler.scheduler import Scheduler\n'
+                'Scheduler()\n'
+                'print(threading.active_count())\n'
+                'print(" ".join(sorted(set(name.split(".")[0] for name in sys.modules) & set({!r}))))\n'
+                .format(HEAVY_MODULES))
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, universal_newlines=True)
+
+        threads, heavy = output.split('\n')[:2]
+        self.assertEqual('1', threads)
+        self.assertEqual('', heavy)
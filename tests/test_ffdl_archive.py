@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.ffdl_archive` module and in-memory FfDL submissions."""
+
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import uuid
+import zipfile
+
+import requests
+import yaml
+
+from enterprise_scheduler.ffdl_executor import FfDLExecutor
+from enterprise_scheduler.ffdl_archive import ArchiveBuilder
+from enterprise_scheduler.ffdl_cache import ArchiveCache
+from enterprise_scheduler.ffdl_client import FfDLClientPool
+from tests.ffdl_server import FfDLServer
+
+NOTEBOOK = {'cells': [], 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 2}
+
+
+def ffdl_task(endpoint='http://127.0.0.1:1', **properties):
+    task = dict(id=uuid.uuid4(), executor='ffdl', framework='tensorflow', endpoint=endpoint,
+                kernelspec='python3', user='user', userinfo='bluemix-instance-id=test-user',
+                cpus=1, gpus=0, memory='1Gb', cos_endpoint='http://cos', cos_user='cos-user',
+                cos_password='cos-password', cos_bucket_in='in', cos_bucket_out='out',
+                env={'MODEL': 'resnet 50'}, notebook=NOTEBOOK)
+    task.update(properties)
+    return task
+
+
+class TestArchiveBuilder(unittest.TestCase):
+    """Tests for `ArchiveBuilder`."""
+
+    def test_archive_contents(self):
+        task = ffdl_task(dependencies={'data.csv': 'a,b\n1,2\n'})
+        with ArchiveBuilder().build(task) as buffer:
+            archive = zipfile.ZipFile(buffer)
+
+            self.assertEqual(['notebook.ipynb', 'data.csv', 'env.sh', 'start.sh', 'run_notebook.py'],
+                             archive.namelist())
+            self.assertEqual(NOTEBOOK, json.loads(archive.read('notebook.ipynb')))
+            self.assertEqual(b'a,b\n1,2\n', archive.read('data.csv'))
+            self.assertIn(b"export MODEL='resnet 50'", archive.read('env.sh'))
+            self.assertIn(b'./run_notebook.py', archive.read('start.sh'))
+            self.assertEqual(0o755, archive.getinfo('start.sh').external_attr >> 16)
+
+    def test_compressed_dependencies_are_stored(self):
+        task = ffdl_task(dependencies={'data.csv': 'x' * 10000, 'data.csv.gz': b'\x1f\x8b' + b'y' * 10000})
+        with ArchiveBuilder().build(task) as buffer:
+            archive = zipfile.ZipFile(buffer)
+
+            self.assertEqual(zipfile.ZIP_DEFLATED, archive.getinfo('data.csv').compress_type)
+            self.assertEqual(zipfile.ZIP_STORED, archive.getinfo('data.csv.gz').compress_type)
+            self.assertEqual(b'\x1f\x8b' + b'y' * 10000, archive.read('data.csv.gz'))
+
+    def test_compression_level_zero_stores_every_entry(self):
+        task = ffdl_task(dependencies={'data.csv': 'x' * 10000})
+        with ArchiveBuilder(compression_level=0).build(task) as buffer:
+            archive = zipfile.ZipFile(buffer)
+
+            self.assertEqual({zipfile.ZIP_STORED}, set(info.compress_type for info in archive.infolist()))
+
+    def test_archives_stay_in_memory(self):
+        with ArchiveBuilder().build(ffdl_task(dependencies={'data.csv': 'x' * 100000})) as buffer:
+            self.assertFalse(buffer._rolled)
+
+        with ArchiveBuilder(compression_level=0, spool_size=1024).build(
+                ffdl_task(dependencies={'data.csv': 'x' * 100000})) as buffer:
+            self.assertTrue(buffer._rolled)
+            self.assertEqual(b'x' * 100000, zipfile.ZipFile(buffer).read('data.csv'))
+
+    def test_runtime_files_are_read_once(self):
+        builder = ArchiveBuilder()
+        self.assertIs(builder.runtime_files(), builder.runtime_files())
+
+
+class TestFfDLSubmission(unittest.TestCase):
+    """Tests for `FfDLExecutor` submissions against a local FfDL server."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = FfDLServer().start()
+        self.executor = FfDLExecutor(archive_cache=ArchiveCache(self.directory),
+                                     client_pool=FfDLClientPool(backoff=0.01))
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_archive_and_manifest_are_uploaded(self):
+        task = ffdl_task(endpoint=self.server.endpoint, dependencies={'data.csv': 'a,b\n'})
+        client, result = self.executor.submit_training(task)
+
+        self.assertEqual('training-1', result['model_id'])
+        files = self.server.submissions[0]['files']
+
+        filename, content = files['model_definition']
+        self.assertEqual('ffdl-{}.zip'.format(str(task['id'])[:8]), filename)
+        self.assertEqual(b'a,b\n', zipfile.ZipFile(io.BytesIO(content)).read('data.csv'))
+
+        filename, content = files['manifest']
+        manifest = yaml.safe_load(content)
+        self.assertEqual('manifest-{}.yml'.format(str(task['id'])[:8]), filename)
+        self.assertEqual('in', manifest['data_stores'][0]['training_data']['container'])
+        self.assertEqual('tensorflow', manifest['framework']['name'])
+
+    def test_unreachable_server_fails_the_task(self):
+        with self.assertRaises(requests.ConnectionError):
+            self.executor.submit_training(ffdl_task(endpoint='http://127.0.0.1:1'))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.ffdl_cache` module."""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import zipfile
+
+from enterprise_scheduler.ffdl_executor import FfDLExecutor
+from enterprise_scheduler.ffdl_cache import ArchiveCache, archive_key
+from enterprise_scheduler.ffdl_client import FfDLClientPool
+from tests.ffdl_server import FfDLServer
+from tests.test_ffdl_archive import ffdl_task
+
+
+class TestArchiveCache(unittest.TestCase):
+    """Tests for `ArchiveCache`."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_archive_key_covers_task_contents(self):
+        task = ffdl_task(dependencies={'data.csv': 'a'})
+        key = archive_key(task, 6)
+
+        self.assertEqual(key, archive_key(ffdl_task(dependencies={'data.csv': 'a'}), 6))
+        self.assertNotEqual(key, archive_key(ffdl_task(dependencies={'data.csv': 'b'}), 6))
+        self.assertNotEqual(key, archive_key(ffdl_task(dependencies={'data.csv': 'a'}, env={'A': '1'}), 6))
+        self.assertNotEqual(key, archive_key(ffdl_task(dependencies={'data.csv': 'a'}, framework='pytorch'), 6))
+        self.assertNotEqual(key, archive_key(task, 0))
+
+    def test_archives_are_reused(self):
+        cache = ArchiveCache(self.directory)
+        self.assertIsNone(cache.open_archive('key'))
+
+        buffer = io.BytesIO(b'archive')
+        cache.put_archive('key', buffer)
+        self.assertEqual(0, buffer.tell())
+
+        with cache.open_archive('key') as archive:
+            self.assertEqual(b'archive', archive.read())
+        self.assertEqual(dict(entries=1, bytes=7, hits=1, misses=1, evictions=0,
+                              manifests=0, manifest_hits=0, manifest_misses=0), cache.stats())
+
+    def test_least_recently_used_archives_are_evicted(self):
+        cache = ArchiveCache(self.directory, max_bytes=20)
+        cache.put_archive('a', io.BytesIO(b'x' * 8))
+        cache.put_archive('b', io.BytesIO(b'x' * 8))
+        cache.open_archive('a').close()
+        cache.put_archive('c', io.BytesIO(b'x' * 8))
+
+        self.assertIsNone(cache.open_archive('b'))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'b.zip')))
+        self.assertEqual(1, cache.stats()['evictions'])
+        self.assertEqual(16, cache.stats()['bytes'])
+
+    def test_oversized_archives_are_not_cached(self):
+        cache = ArchiveCache(self.directory, max_bytes=4)
+        cache.put_archive('a', io.BytesIO(b'x' * 8))
+
+        self.assertEqual([], os.listdir(self.directory))
+        self.assertIsNone(cache.open_archive('a'))
+
+    def test_archives_survive_restarts(self):
+        ArchiveCache(self.directory).put_archive('a', io.BytesIO(b'archive'))
+
+        cache = ArchiveCache(self.directory)
+        self.assertEqual(7, cache.stats()['bytes'])
+        with cache.open_archive('a') as archive:
+            self.assertEqual(b'archive', archive.read())
+
+    def test_only_stale_partial_archives_are_removed(self):
+        stale, copying = os.path.join(self.directory, 'a.zip.1.tmp'), os.path.join(self.directory, 'b.zip.2.tmp')
+        for path in (stale, copying):
+            with open(path, 'wb') as f:
+                f.write(b'partial')
+        os.utime(stale, (time.time() - 7200, time.time() - 7200))
+
+        cache = ArchiveCache(self.directory)
+        self.assertEqual(['b.zip.2.tmp'], os.listdir(self.directory))
+        self.assertEqual(0, cache.stats()['entries'])
+
+    def test_manifests_are_bounded(self):
+        cache = ArchiveCache(self.directory, max_manifests=1)
+        cache.put_manifest('a', b'a')
+        cache.put_manifest('b', b'b')
+
+        self.assertIsNone(cache.get_manifest('a'))
+        self.assertEqual(b'b', cache.get_manifest('b'))
+
+
+class TestCachedSubmissions(unittest.TestCase):
+    """Tests for `FfDLExecutor` submissions of identical tasks."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = FfDLServer().start()
+        self.cache = ArchiveCache(self.directory)
+        self.executor = FfDLExecutor(archive_cache=self.cache, client_pool=FfDLClientPool(backoff=0.01))
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_identical_tasks_share_archives_and_manifests(self):
+        for i in range(3):
+            self.executor.submit_training(ffdl_task(endpoint=self.server.endpoint, dependencies={'data.csv': 'a,b\n'}))
+
+        stats = self.cache.stats()
+        self.assertEqual((1, 2, 1), (stats['misses'], stats['hits'], stats['entries']))
+        self.assertEqual((1, 2), (stats['manifest_misses'], stats['manifest_hits']))
+
+        archives = set(submission['files']['model_definition'][1] for submission in self.server.submissions)
+        manifests = set(submission['files']['manifest'][1] for submission in self.server.submissions)
+        self.assertEqual((1, 1), (len(archives), len(manifests)))
+        self.assertEqual(b'a,b\n', zipfile.ZipFile(io.BytesIO(archives.pop())).read('data.csv'))
+
+    def test_different_tasks_get_their_own_archives(self):
+        self.executor.submit_training(ffdl_task(endpoint=self.server.endpoint, dependencies={'data.csv': 'a'}))
+        self.executor.submit_training(ffdl_task(endpoint=self.server.endpoint, dependencies={'data.csv': 'b'}, cpus=2))
+
+        stats = self.cache.stats()
+        self.assertEqual((2, 0), (stats['misses'], stats['hits']))
+        self.assertEqual((2, 0), (stats['manifest_misses'], stats['manifest_hits']))
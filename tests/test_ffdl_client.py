@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.ffdl_client` module against a local FfDL server."""
+
+import io
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from enterprise_scheduler.ffdl_client import FfDLClientPool, FfDLSubmissionError, RateLimiter
+from tests.ffdl_server import FfDLServer
+
+USER_INFO = 'bluemix-instance-id=test-user'
+
+
+def files():
+    return {'model_definition': ('model.zip', io.BytesIO(b'archive')),
+            'manifest': ('manifest.yml', io.BytesIO(b'manifest'))}
+
+
+class TestFfDLClientPool(unittest.TestCase):
+    """Tests for `FfDLClientPool`."""
+
+    def setUp(self):
+        self.server = FfDLServer().start()
+        self.pool = FfDLClientPool(backoff=0.01)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+
+    def test_clients_are_shared_per_endpoint_and_user(self):
+        client = self.pool.client(self.server.endpoint, 'user', USER_INFO)
+
+        self.assertIs(client, self.pool.client(self.server.endpoint, 'user', USER_INFO))
+        self.assertIsNot(client, self.pool.client(self.server.endpoint, 'other', USER_INFO))
+        self.assertEqual(2, self.pool.stats()['clients'])
+
+    def test_connections_are_kept_alive(self):
+        client = self.pool.client(self.server.endpoint, 'user', USER_INFO)
+        for i in range(5):
+            self.assertIn('model_id', client.post('/models', **files()))
+
+        self.assertEqual(5, len(self.server.submissions))
+        self.assertEqual(1, self.server.connections)
+        self.assertEqual('Basic dXNlcjp0ZW1wb3Jhcnk=', self.server.submissions[0]['headers']['Authorization'])
+
+    def test_unavailable_server_is_retried(self):
+        self.server.failures = 2
+        client = self.pool.client(self.server.endpoint, 'user', USER_INFO)
+
+        self.assertEqual('training-1', client.post('/models', **files())['model_id'])
+        self.assertEqual(3, self.server.requests)
+        self.assertEqual((b'archive', b'manifest'), (self.server.submissions[0]['files']['model_definition'][1],
+                                                     self.server.submissions[0]['files']['manifest'][1]))
+        self.assertEqual(2, self.pool.stats()['retries'])
+
+    def test_retries_are_bounded(self):
+        self.server.failures = 10
+        pool = FfDLClientPool(max_retries=2, backoff=0.01)
+        with self.assertRaises(FfDLSubmissionError) as raised:
+            pool.client(self.server.endpoint, 'user', USER_INFO).post('/models', **files())
+
+        self.assertEqual(503, raised.exception.status)
+        self.assertIn('Service unavailable', raised.exception.body)
+        self.assertEqual(3, self.server.requests)
+        pool.close()
+
+    def test_retry_after_is_honored(self):
+        self.server.failures = 1
+        self.server.retry_after = 0.2
+        client = self.pool.client(self.server.endpoint, 'user', USER_INFO)
+
+        start = time.monotonic()
+        client.post('/models', **files())
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_connection_errors_are_retried(self):
+        pool = FfDLClientPool(max_retries=2, backoff=0.01)
+        with self.assertRaises(requests.ConnectionError):
+            pool.client('http://127.0.0.1:1', 'user', USER_INFO).post('/models', **files())
+        self.assertEqual(2, pool.stats()['retries'])
+        pool.close()
+
+    def test_concurrency_is_bounded_per_endpoint(self):
+        self.server.delay = 0.05
+        pool = FfDLClientPool(max_concurrency=2)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for i in range(8):
+                executor.submit(pool.client(self.server.endpoint, 'user-{}'.format(i % 2), USER_INFO).post,
+                                '/models', **files())
+
+        self.assertEqual(8, len(self.server.submissions))
+        self.assertEqual(2, self.server.max_in_flight)
+        pool.close()
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Tests for `RateLimiter`."""
+
+    def test_acquisitions_are_paced(self):
+        limiter = RateLimiter(50, burst=1)
+        start = time.monotonic()
+        for i in range(11):
+            limiter.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_bursts_are_not_delayed(self):
+        limiter = RateLimiter(1, burst=5)
+        start = time.monotonic()
+        for i in range(5):
+            limiter.acquire()
+
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_zero_rate_is_unlimited(self):
+        limiter = RateLimiter(0)
+        for i in range(1000):
+            limiter.acquire()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.ffdl_tracker` module against a local FfDL server."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import wait
+
+from enterprise_scheduler.ffdl_executor import FfDLExecutor
+from enterprise_scheduler.ffdl_cache import ArchiveCache
+from enterprise_scheduler.ffdl_client import FfDLClientPool
+from enterprise_scheduler.ffdl_tracker import TrainingFailed, TrainingTracker
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.task_store import RUNNING, SUCCEEDED, FAILED, SQLiteTaskStore
+from tests.cos_server import CosServer
+from tests.ffdl_server import FfDLServer
+from tests.test_ffdl_archive import ffdl_task
+
+USER_INFO = 'bluemix-instance-id=test-user'
+
+
+class FlakyClient:
+    """Client stand-in failing the first `failures` polls"""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def model(self, model_id):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('connection refused')
+        return dict(model_id=model_id, training=dict(training_status=dict(status='COMPLETED')))
+
+
+class TestTrainingTracker(unittest.TestCase):
+    """Tests for `TrainingTracker`."""
+
+    def setUp(self):
+        self.server = FfDLServer().start()
+        self.pool = FfDLClientPool()
+        self.client = self.pool.client(self.server.endpoint, 'user', USER_INFO)
+        self.statuses = []
+        self.tracker = TrainingTracker(min_interval=0.01, max_interval=0.05,
+                                       status_listener=lambda task, model_id, status: self.statuses.append(status))
+
+    def tearDown(self):
+        self.tracker.shutdown()
+        self.pool.close()
+        self.server.stop()
+
+    def _submit(self):
+        self.server.submissions.append({})
+        return 'training-{}'.format(len(self.server.submissions))
+
+    def test_trainings_are_followed_until_completed(self):
+        model_id = self._submit()
+        self.server.statuses[model_id] = ['PENDING', 'PROCESSING', 'PROCESSING', 'STORING', 'COMPLETED']
+
+        result = self.tracker.track(self.client, model_id).result(timeout=5)
+
+        self.assertEqual(model_id, result['model_id'])
+        self.assertEqual('COMPLETED', result['status'])
+        self.assertEqual(['PENDING', 'PROCESSING', 'STORING', 'COMPLETED'], self.statuses)
+        self.assertEqual(dict(tracking=0, polls=5, completed=1, failed=0), self.tracker.stats())
+
+    def test_failed_trainings_fail_their_future(self):
+        model_id = self._submit()
+        self.server.statuses[model_id] = ['PROCESSING', 'FAILED']
+
+        with self.assertRaises(TrainingFailed) as context:
+            self.tracker.track(self.client, model_id).result(timeout=5)
+        self.assertIn('non-zero code', str(context.exception))
+        self.assertEqual(1, self.tracker.stats()['failed'])
+
+    def test_polling_backs_off_while_status_is_unchanged(self):
+        tracker = TrainingTracker(min_interval=0.01, max_interval=10, backoff=2)
+        model_id = self._submit()
+        self.server.statuses[model_id] = ['PROCESSING'] * 100
+
+        tracker.track(self.client, model_id)
+        time.sleep(0.5)
+        tracker.shutdown()
+
+        # 0.01 + 0.02 + 0.04 + ... reaches 0.5s after ~6 polls, a fixed interval would poll 50 times
+        self.assertLess(self.server.polls, 10)
+
+    def test_transient_poll_errors_are_tolerated(self):
+        result = self.tracker.track(FlakyClient(failures=3), 'training-1').result(timeout=5)
+        self.assertEqual('COMPLETED', result['status'])
+
+    def test_persistent_poll_errors_fail_the_training(self):
+        tracker = TrainingTracker(min_interval=0.01, max_interval=0.01, max_errors=3)
+        with self.assertRaises(RuntimeError):
+            tracker.track(FlakyClient(failures=10), 'training-1').result(timeout=5)
+        tracker.shutdown()
+
+    def test_results_are_fetched_on_completion(self):
+        tracker = TrainingTracker(min_interval=0.01, result_fetcher=lambda task, model: ['model.h5'])
+        result = tracker.track(self.client, self._submit(), dict(id='task')).result(timeout=5)
+        tracker.shutdown()
+
+        self.assertEqual(['model.h5'], result['outputs'])
+
+    def test_trainings_complete_when_their_results_cannot_be_fetched(self):
+        def fetch(task, model):
+            raise RuntimeError('bucket not found')
+
+        tracker = TrainingTracker(min_interval=0.01, result_fetcher=fetch)
+        result = tracker.track(self.client, self._submit(), dict(id='task')).result(timeout=5)
+        tracker.shutdown()
+
+        self.assertEqual('COMPLETED', result['status'])
+        self.assertEqual(([], 'bucket not found'), (result['outputs'], result['outputs_error']))
+        self.assertEqual((1, 0), (tracker.stats()['completed'], tracker.stats()['failed']))
+
+    def test_many_trainings_are_tracked_concurrently(self):
+        futures = []
+        for i in range(500):
+            model_id = self._submit()
+            self.server.statuses[model_id] = ['PROCESSING', 'COMPLETED']
+            futures.append(self.tracker.track(self.client, model_id))
+
+        done, not_done = wait(futures, timeout=30)
+        self.assertEqual(500, len(done))
+        self.assertEqual(500, self.tracker.stats()['completed'])
+
+
+class TestFfDLTrainingTasks(unittest.TestCase):
+    """Tests for FfDL tasks being completed once their training ends."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = FfDLServer().start()
+        self.cos = CosServer().start()
+        self.scheduler = self._scheduler()
+
+    def tearDown(self):
+        self.scheduler.stop()
+        self.cos.stop()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _scheduler(self, task_store=None):
+        executor = FfDLExecutor(archive_cache=ArchiveCache(self.directory),
+                                client_pool=FfDLClientPool(max_concurrency=1, backoff=0.01),
+                                tracker=TrainingTracker(min_interval=0.05, max_interval=0.05))
+        scheduler = Scheduler(number_of_threads=1, task_store=task_store)
+        scheduler.register_executor(executor)
+        scheduler.start()
+        return scheduler
+
+    def _task(self):
+        task = ffdl_task(endpoint=self.server.endpoint, cos_endpoint=self.cos.endpoint)
+        task.pop('id')
+        return task
+
+    def _wait_for_state(self, id, states, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.scheduler.task_store.get(id)['state'] not in states:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        return self.scheduler.task_store.get(id)
+
+    def test_tasks_run_until_their_training_completes(self):
+        task = self._task()
+        self.server.statuses['training-1'] = ['PENDING'] * 5 + ['COMPLETED']
+        self.cos.objects[('out', 'training-1/learner-1/training-log.txt')] = b'done'
+
+        id = self.scheduler.schedule_task(task)
+
+        self._wait_for_state(id, (RUNNING,))
+        self.assertEqual(SUCCEEDED, self._wait_for_state(id, (SUCCEEDED, FAILED))['state'])
+        self.assertGreaterEqual(self.server.polls, 6)
+        result = self.scheduler.results.get(id)
+        self.assertEqual('training-1', result['model_id'])
+        self.assertEqual([dict(key='training-1/learner-1/training-log.txt', size=4, text='done')], result['outputs'])
+
+    def test_tasks_succeed_when_their_outputs_cannot_be_fetched(self):
+        task = dict(self._task(), cos_password='wrong')
+        self.server.statuses['training-1'] = ['COMPLETED']
+
+        id = self.scheduler.schedule_task(task)
+
+        self.assertEqual(SUCCEEDED, self._wait_for_state(id, (SUCCEEDED, FAILED))['state'])
+        result = self.scheduler.results.get(id)
+        self.assertEqual([], result['outputs'])
+        self.assertIn('403', result['outputs_error'])
+
+    def test_recovered_tasks_resume_tracking_their_training(self):
+        self.scheduler.stop()
+        store = SQLiteTaskStore(os.path.join(self.directory, 'tasks.db'))
+        self.scheduler = self._scheduler(store)
+        self.server.statuses['training-1'] = ['PROCESSING'] * 1000
+        id = self.scheduler.schedule_task(self._task())
+        while not self.server.polls:
+            time.sleep(0.01)
+        # the process stops while the training runs
+        self.scheduler.stop()
+        store.close()
+
+        store = SQLiteTaskStore(os.path.join(self.directory, 'tasks.db'))
+        self.server.statuses['training-1'] = ['COMPLETED']
+        self.scheduler = self._scheduler(store)
+        try:
+            self.assertEqual(SUCCEEDED, self._wait_for_state(id, (SUCCEEDED, FAILED))['state'])
+        finally:
+            self.scheduler.stop()
+            store.close()
+        self.assertEqual(1, len(self.server.submissions))
+
+    def test_tasks_fail_when_their_training_fails(self):
+        task = self._task()
+        self.server.statuses['training-1'] = ['FAILED']
+
+        id = self.scheduler.schedule_task(task)
+
+        record = self._wait_for_state(id, (SUCCEEDED, FAILED))
+        self.assertEqual(FAILED, record['state'])
+        self.assertIn('training-1 failed', str(record['error']))
+
+    def test_worker_threads_are_not_held_by_trainings(self):
+        self.server.statuses['training-1'] = ['PROCESSING'] * 1000
+        self.server.statuses['training-2'] = ['COMPLETED']
+        first = self._task()
+        second = self._task()
+
+        self.scheduler.schedule_task(first)
+        id = self.scheduler.schedule_task(second)
+
+        self.assertEqual(SUCCEEDED, self._wait_for_state(id, (SUCCEEDED, FAILED))['state'])
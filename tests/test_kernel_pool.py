@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.kernel_pool` module."""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from tests.fake_gateway import FakeGateway
+
+ENDPOINT = 'localhost:8888'
+KERNELSPEC = 'python3'
+
+
+class TestKernelPool(unittest.TestCase):
+    """Tests for `KernelPool` using a fake gateway."""
+
+    def setUp(self):
+        self.gateway = FakeGateway()
+        self.pool = KernelPool(max_size=2, readiness_interval=0.01, launcher_factory=self.gateway)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_acquire_waits_for_kernel_readiness(self):
+        pooled = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        self.assertEqual('idle', pooled.kernel.state)
+
+    def test_released_kernels_are_reset_and_reused(self):
+        pooled = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        self.pool.release(pooled)
+        reused = self.pool.acquire(ENDPOINT, KERNELSPEC)
+
+        self.assertIs(pooled, reused)
+        self.assertEqual(1, reused.kernel.restarts)
+        self.assertEqual(1, len(self.gateway.started))
+
+    def test_kernels_are_keyed_by_endpoint_and_kernelspec(self):
+        python = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        self.pool.release(python)
+        scala = self.pool.acquire(ENDPOINT, 'scala')
+
+        self.assertIsNot(python, scala)
+        self.assertEqual('scala', scala.kernel.kernelspec)
+
+    def test_acquire_blocks_when_max_size_is_reached(self):
+        first = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        self.pool.acquire(ENDPOINT, KERNELSPEC)
+
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire(ENDPOINT, KERNELSPEC, timeout=0.1)
+
+        threading.Timer(0.1, self.pool.release, args=(first,)).start()
+        self.assertIs(first, self.pool.acquire(ENDPOINT, KERNELSPEC, timeout=5))
+
+    def test_coroutines_wait_for_released_kernels(self):
+        first = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        self.pool.acquire(ENDPOINT, KERNELSPEC)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        with self.assertRaises(RuntimeError):
+            loop.run_until_complete(self.pool.acquire_async(ENDPOINT, KERNELSPEC, timeout=0.1))
+
+        threading.Timer(0.1, self.pool.release, args=(first,)).start()
+        self.assertIs(first, loop.run_until_complete(self.pool.acquire_async(ENDPOINT, KERNELSPEC, timeout=5)))
+        self.assertEqual({}, self.pool._async_waiters)
+
+    def test_discarded_kernels_are_shut_down(self):
+        pooled = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        self.pool.release(pooled, discard=True)
+
+        self.assertEqual([pooled.kernel], self.gateway.shutdown)
+        self.assertEqual(dict(size=0, idle=0), self.pool.stats()[(ENDPOINT, KERNELSPEC)])
+
+    def test_maintain_evicts_idle_and_dead_kernels(self):
+        self.pool.idle_timeout = 0
+        first = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        second = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        self.pool.release(first)
+        self.pool.release(second)
+        time.sleep(0.01)
+        self.pool.maintain()
+
+        self.assertEqual(dict(size=0, idle=0), self.pool.stats()[(ENDPOINT, KERNELSPEC)])
+        self.assertEqual(2, len(self.gateway.shutdown))
+
+    def test_maintain_replenishes_min_size(self):
+        self.pool.min_size = 1
+        self.pool.prewarm(ENDPOINT, KERNELSPEC)
+        pooled = self.pool.acquire(ENDPOINT, KERNELSPEC)
+        pooled.kernel.state = 'dead'
+        self.pool.release(pooled, discard=True)
+        self.pool.maintain()
+
+        self.assertEqual(dict(size=1, idle=1), self.pool.stats()[(ENDPOINT, KERNELSPEC)])
+
+
+class TestJupyterExecutorKernelPool(unittest.TestCase):
+    """Tests for `JupyterExecutor` running on a pool of fake kernels."""
+
+    def test_kernels_are_reused_across_tasks(self):
+        gateway = FakeGateway()
+        executor = JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01, launcher_factory=gateway))
+        notebook = dict(nbformat=4, nbformat_minor=2, metadata={},
+                        cells=[dict(cell_type='code', source='1 + 1', metadata={},
+                                    outputs=[], execution_count=None)])
+        for i in range(3):
+            executor.execute_task(dict(endpoint=ENDPOINT, kernelspec=KERNELSPEC, notebook=notebook))
+        # the kernel of the last task is reset in the background
+        deadline = time.monotonic() + 5
+        while executor.kernel_pool.stats()[(ENDPOINT, KERNELSPEC)]['idle'] != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        executor.shutdown()
+
+        self.assertEqual(1, len(gateway.started))
+        self.assertEqual(3, gateway.started[0].restarts)
+
+    def test_kernels_are_reset_after_the_task_completes(self):
+        gateway = FakeGateway(restart_time=0.5)
+        executor = JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01, launcher_factory=gateway))
+        self.addCleanup(executor.shutdown)
+        notebook = dict(nbformat=4, nbformat_minor=2, metadata={},
+                        cells=[dict(cell_type='code', source='1 + 1', metadata={},
+                                    outputs=[], execution_count=None)])
+        task = dict(endpoint=ENDPOINT, kernelspec=KERNELSPEC, notebook=notebook)
+
+        started = time.monotonic()
+        executor.execute_task(task)
+        self.assertLess(time.monotonic() - started, 0.3)
+
+        # the next task waits for the kernel being reset rather than starting another one
+        executor.execute_task(task)
+        self.assertEqual(1, len(gateway.started))
+        self.assertEqual(1, gateway.started[0].restarts)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.log` module."""
+
+import io
+import json
+import logging
+import queue
+import unittest
+
+from enterprise_scheduler.log import SafeQueueHandler, configure_logging, parse_levels, redact, shutdown_logging
+
+
+class TestRedaction(unittest.TestCase):
+    """Tests for the redaction of secrets and the level parsing."""
+
+    def test_secret_keys_are_redacted_in_nested_values(self):
+        task = dict(cos_user='user', cos_password='s3cret', headers=[dict(Authorization='Bearer abc')])
+        self.assertEqual(dict(cos_user='user', cos_password='***', headers=[dict(Authorization='***')]),
+                         redact(task))
+
+    def test_secrets_are_redacted_in_text(self):
+        text = redact("{'cos_user': 'user', 'cos_password': 's3cret'} token=abc")
+        self.assertNotIn('s3cret', text)
+        self.assertNotIn('abc', text)
+        self.assertIn("'cos_user': 'user'", text)
+
+    def test_parse_levels(self):
+        self.assertEqual({'enterprise_scheduler.executor': 'DEBUG', 'enterprise_scheduler.kernel_pool': 'WARNING'},
+                         parse_levels('executor=debug, kernel_pool=WARNING'))
+        with self.assertRaises(ValueError):
+            parse_levels('executor=loud')
+
+
+class TestConfigureLogging(unittest.TestCase):
+    """Tests for the queued handler configured by `configure_logging`."""
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger('enterprise_scheduler.tests')
+
+    def tearDown(self):
+        shutdown_logging()
+        logging.getLogger('enterprise_scheduler').setLevel(logging.NOTSET)
+        logging.getLogger('enterprise_scheduler.executor').setLevel(logging.NOTSET)
+
+    def test_messages_are_truncated_and_redacted(self):
+        configure_logging(level='INFO', levels='', max_length=100, stream=self.stream)
+        self.logger.info('task %s: %s', 'id', dict(cos_password='s3cret', source='x' * 1000))
+        shutdown_logging()
+
+        output = self.stream.getvalue()
+        self.assertNotIn('s3cret', output)
+        self.assertIn('more characters]', output)
+        self.assertLess(len(output), 300)
+
+    def test_subsystem_levels(self):
+        configure_logging(level='WARNING', levels='executor=DEBUG', stream=self.stream)
+        logging.getLogger('enterprise_scheduler.executor').debug('cell executed')
+        self.logger.info('hidden')
+        shutdown_logging()
+
+        self.assertIn('cell executed', self.stream.getvalue())
+        self.assertNotIn('hidden', self.stream.getvalue())
+
+    def test_json_format(self):
+        configure_logging(level='INFO', levels='', log_format='json', stream=self.stream)
+        self.logger.info('task started', extra=dict(task_id='1234'))
+        shutdown_logging()
+
+        entry = json.loads(self.stream.getvalue())
+        self.assertEqual(('INFO', 'task started', '1234'), (entry['level'], entry['message'], entry['task_id']))
+
+    def test_full_queue_drops_records(self):
+        handler = SafeQueueHandler(queue.Queue(1))
+        record = logging.LogRecord('enterprise_scheduler', logging.INFO, __file__, 1, 'message', None, None)
+        handler.handle(record)
+        handler.handle(record)
+
+        self.assertEqual(1, handler.dropped)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.metrics` module."""
+
+import json
+import os
+import unittest
+
+from enterprise_scheduler import metrics
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.scheduler import Scheduler
+from tests.fake_gateway import FakeGateway
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def sample(name, labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for the stage timings and the scheduler collector."""
+
+    def setUp(self):
+        self.gateway = FakeGateway()
+        self.scheduler = Scheduler(number_of_threads=1)
+        self.scheduler.register_executor(
+            JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01, launcher_factory=self.gateway)))
+
+    def tearDown(self):
+        self.scheduler.stop(drain=False)
+
+    def _task(self):
+        with open(os.path.join(RESOURCES, 'simple.ipynb')) as f:
+            return dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook=json.load(f))
+
+    def test_stages_of_executed_tasks_are_timed(self):
+        stages = (metrics.QUEUE_WAIT, metrics.TASK_EXECUTION, metrics.KERNEL_START, metrics.CELL_EXECUTION)
+        before = {stage: sample('egs_stage_duration_seconds_count', dict(stage=stage)) for stage in stages}
+        completed = sample('egs_tasks_completed_total', dict(executor='jupyter', state='succeeded'))
+
+        self.scheduler.start()
+        self.scheduler.schedule_task(self._task())
+        self.scheduler.queue.join()
+
+        for stage in stages:
+            self.assertLess(before[stage], sample('egs_stage_duration_seconds_count', dict(stage=stage)), stage)
+        self.assertEqual(completed + 1, sample('egs_tasks_completed_total', dict(executor='jupyter', state='succeeded')))
+
+    def test_render_exposes_scheduler_state(self):
+        self.scheduler.schedule_task(self._task())
+
+        data, content_type = metrics.render(self.scheduler)
+        body = data.decode('utf-8')
+
+        self.assertTrue(content_type.startswith('text/plain'))
+        self.assertIn('egs_tasks{state="queued"} 1.0', body)
+        self.assertIn('egs_pool_queue_depth{pool="default"} 1.0', body)
+        self.assertIn('egs_results{stat="results"}', body)
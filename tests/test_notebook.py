@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.notebook` module."""
+
+import json
+import pickle
+import unittest
+
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.notebook import Notebook, NotebookLoader, load_notebook, notebook_json
+from enterprise_scheduler.scheduler import Scheduler
+from tests.fake_gateway import FakeGateway
+
+
+def notebook():
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+        dict(cell_type='markdown', source=['# Title\n', 'text'], metadata={}),
+        dict(cell_type='code', source=['x = 1\n', 'print(x)'], metadata={}, execution_count=3,
+             outputs=[dict(output_type='display_data', data={'image/png': 'aW1hZ2U='}, metadata={})])])
+
+
+class TestLoadNotebook(unittest.TestCase):
+    """Tests for `load_notebook`."""
+
+    def test_dict_str_and_bytes_are_normalized_alike(self):
+        for content in (notebook(), json.dumps(notebook()), json.dumps(notebook()).encode('utf-8')):
+            loaded = load_notebook(content)
+            self.assertIsInstance(loaded, Notebook)
+            self.assertEqual(['# Title\ntext', 'x = 1\nprint(x)'], [cell['source'] for cell in loaded['cells']])
+            self.assertEqual(1, len(loaded['cells'][1]['outputs']))
+
+    def test_submitted_dicts_are_not_modified(self):
+        content = notebook()
+        load_notebook(content)
+        self.assertEqual(notebook(), content)
+
+    def test_normalized_notebooks_are_returned_as_is(self):
+        loaded = load_notebook(notebook())
+        self.assertIs(loaded, load_notebook(loaded))
+
+    def test_strip_outputs_leaves_the_loaded_notebook_untouched(self):
+        loaded = load_notebook(notebook())
+        stripped = load_notebook(loaded, strip_outputs=True)
+
+        self.assertEqual(([], None), (stripped['cells'][1]['outputs'], stripped['cells'][1]['execution_count']))
+        self.assertEqual((1, 3), (len(loaded['cells'][1]['outputs']), loaded['cells'][1]['execution_count']))
+
+    def test_invalid_notebooks(self):
+        for content in ('not json', '[]', {}, dict(cells={}), dict(cells=[dict(cell_type='other', source='')]),
+                        dict(cells=[dict(cell_type='code', source=1)])):
+            with self.assertRaises(ValueError, msg=content):
+                load_notebook(content, 'location')
+
+    def test_serialization_is_computed_once(self):
+        loaded = load_notebook(notebook())
+        self.assertIs(notebook_json(loaded), notebook_json(loaded))
+        self.assertEqual(loaded, json.loads(notebook_json(loaded).decode('utf-8')))
+        self.assertEqual(loaded, pickle.loads(pickle.dumps(loaded)))
+
+
+class TestNotebookLoader(unittest.TestCase):
+    """Tests for `NotebookLoader`."""
+
+    def test_same_content_is_loaded_once(self):
+        loader = NotebookLoader()
+        content = json.dumps(notebook())
+
+        first = loader.load(content, 'location')
+        self.assertIs(first, loader.load(content.encode('utf-8'), 'location'))
+        self.assertIsNot(first, loader.load(content, 'location', strip_outputs=True))
+        self.assertEqual(dict(entries=2, bytes=2 * len(content), hits=1, misses=2), loader.stats())
+
+    def test_least_recently_used_notebooks_are_evicted(self):
+        contents = [json.dumps(dict(notebook(), metadata=dict(index=i))) for i in range(3)]
+        loader = NotebookLoader(max_bytes=2 * len(contents[0]))
+        loaded = [loader.load(content) for content in contents]
+
+        self.assertEqual(2, loader.stats()['entries'])
+        self.assertIs(loaded[2], loader.load(contents[2]))
+        self.assertIsNot(loaded[0], loader.load(contents[0]))
+
+    def test_submitted_notebooks_are_loaded_once(self):
+        scheduler = Scheduler()
+        content = json.dumps(notebook())
+        tasks = [dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook=content)
+                 for i in range(2)]
+        scheduler.schedule_tasks(tasks)
+
+        self.assertIsInstance(tasks[0]['notebook'], Notebook)
+        self.assertIs(tasks[0]['notebook'], tasks[1]['notebook'])
+        with self.assertRaises(ValueError):
+            scheduler.schedule_task(dict(tasks[0], notebook='not json'))
+
+
+class TestNotebookExecution(unittest.TestCase):
+    """Tests that executions share the loaded notebook without modifying it."""
+
+    def test_executions_do_not_modify_the_notebook(self):
+        executor = JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01, launcher_factory=FakeGateway()))
+        self.addCleanup(executor.shutdown)
+        loaded = load_notebook(notebook())
+        before = json.dumps(loaded)
+
+        results = [executor.execute_task(dict(endpoint='localhost:8888', kernelspec='python3', notebook=loaded))
+                   for i in range(2)]
+
+        self.assertEqual(before, json.dumps(loaded))
+        for result in results:
+            self.assertEqual('executed: x = 1\nprint(x)', result.cells[1].outputs[0].text)
+            self.assertEqual(loaded['cells'][0], result.cells[0])
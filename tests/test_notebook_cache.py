@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.notebook_cache` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from enterprise_scheduler.notebook_cache import NotebookCache
+from tests.notebook_server import NotebookServer
+
+NOTEBOOK = '{"cells": [], "metadata": {}, "nbformat": 4, "nbformat_minor": 2}'
+
+
+class TestNotebookCache(unittest.TestCase):
+    """Tests for `NotebookCache` against a local notebook server."""
+
+    def setUp(self):
+        self.server = NotebookServer().start()
+        self.server.notebooks['/simple.ipynb'] = NOTEBOOK
+        self.url = self.server.url('/simple.ipynb')
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_fresh_entries_are_served_from_memory(self):
+        cache = NotebookCache(ttl=60)
+        for i in range(5):
+            self.assertEqual(NOTEBOOK, cache.get(self.url))
+
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(dict(entries=1, hits=4, misses=1, revalidations=0), cache.stats())
+
+    def test_stale_entries_are_revalidated_with_etag(self):
+        cache = NotebookCache(ttl=0)
+        cache.get(self.url)
+        cache.get(self.url)
+
+        self.assertEqual(2, self.server.requests)
+        self.assertEqual(1, self.server.downloads)
+        self.assertEqual(1, cache.stats()['revalidations'])
+
+    def test_stale_entries_are_revalidated_with_last_modified(self):
+        self.server.etag = False
+        cache = NotebookCache(ttl=0)
+        cache.get(self.url)
+        cache.get(self.url)
+
+        self.assertEqual(1, self.server.downloads)
+
+    def test_changed_notebooks_are_downloaded_again(self):
+        cache = NotebookCache(ttl=0)
+        cache.get(self.url)
+        self.server.notebooks['/simple.ipynb'] = NOTEBOOK.replace('2}', '3}')
+
+        self.assertIn('"nbformat_minor": 3', cache.get(self.url))
+        self.assertEqual(2, cache.stats()['misses'])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for name in ('a', 'b', 'c'):
+            self.server.notebooks['/{}.ipynb'.format(name)] = NOTEBOOK
+        cache = NotebookCache(max_entries=2)
+        for name in ('a', 'b', 'a', 'c'):
+            cache.get(self.server.url('/{}.ipynb'.format(name)))
+        cache.get(self.server.url('/b.ipynb'))
+
+        self.assertEqual(2, cache.stats()['entries'])
+        self.assertEqual(4, cache.stats()['misses'])
+
+    def test_entries_persisted_on_disk_are_revalidated(self):
+        directory = tempfile.mkdtemp()
+        try:
+            NotebookCache(cache_dir=directory).get(self.url)
+            cache = NotebookCache(cache_dir=directory)
+
+            self.assertEqual(NOTEBOOK, cache.get(self.url))
+            self.assertEqual(1, self.server.downloads)
+            self.assertEqual(1, cache.stats()['revalidations'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_notebooks_are_decoded_as_utf8(self):
+        # without a charset, text/plain responses would be decoded as ISO-8859-1
+        self.server.content_type = 'text/plain'
+        self.server.notebooks['/simple.ipynb'] = NOTEBOOK.replace('[]', '["café"]', 1)
+
+        self.assertIn('café', NotebookCache().get(self.url))
+
+    def test_persisted_entries_leave_no_temporary_files(self):
+        directory = tempfile.mkdtemp()
+        try:
+            NotebookCache(cache_dir=directory).get(self.url)
+            self.assertEqual(['.json'], [os.path.splitext(name)[1] for name in os.listdir(directory)])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_missing_notebook_raises(self):
+        with self.assertRaises(requests.HTTPError):
+            NotebookCache().get(self.server.url('/missing.ipynb'))
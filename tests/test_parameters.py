@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.parameters` module and parameterized notebook executions."""
+
+import unittest
+
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.parameters import injection_index, parameter_sets, parameters_source
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.task_store import FAILED, SUCCEEDED
+from tests.fake_gateway import FakeGateway
+
+
+def code_cell(source, tags=()):
+    return dict(cell_type='code', source=source, metadata=dict(tags=list(tags)), outputs=[], execution_count=None)
+
+
+def notebook(*cells):
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=list(cells))
+
+
+class TestParameters(unittest.TestCase):
+    """Tests for the parameter sets and injection."""
+
+    def test_grid_runs_every_combination(self):
+        self.assertEqual([dict(lr=0.1, epochs=1), dict(lr=0.1, epochs=2), dict(lr=0.01, epochs=1),
+                          dict(lr=0.01, epochs=2)],
+                         parameter_sets(dict(lr=[0.1, 0.01], epochs=[1, 2])))
+
+    def test_list_of_parameters(self):
+        self.assertEqual([dict(name='a'), dict(name='b')], parameter_sets([dict(name='a'), dict(name='b')]))
+
+    def test_invalid_sweeps(self):
+        for sweep in ([], 'lr', dict(lr=0.1), dict(lr=[]), [dict(lr=1), 3], [{'not valid': 1}]):
+            with self.assertRaises(ValueError, msg=sweep):
+                parameter_sets(sweep)
+        with self.assertRaises(ValueError):
+            parameter_sets(dict(a=list(range(10)), b=list(range(10))), max_runs=50)
+
+    def test_parameters_source_assigns_literals(self):
+        namespace = {}
+        exec(parameters_source(dict(name='x', rate=0.5, layers=[1, 2], flag=None)), namespace)
+        self.assertEqual(('x', 0.5, [1, 2], None),
+                         (namespace['name'], namespace['rate'], namespace['layers'], namespace['flag']))
+
+    def test_injection_follows_parameters_cell(self):
+        self.assertEqual(0, injection_index([code_cell('import os'), code_cell('x = 1')]))
+        self.assertEqual(2, injection_index([code_cell('import os'), code_cell('x = 1', tags=['parameters']),
+                                             code_cell('print(x)')]))
+
+
+class TestParameterizedExecution(unittest.TestCase):
+    """Tests for parameterized and sweep executions of `JupyterExecutor`."""
+
+    def setUp(self):
+        self.gateway = FakeGateway()
+        self.executor = JupyterExecutor(kernel_pool=KernelPool(max_size=3, readiness_interval=0.01,
+                                                               launcher_factory=self.gateway))
+        self.events = []
+        self.executor.output_listener = self
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def publish(self, task_id, event):
+        self.events.append(event)
+
+    def _task(self, **properties):
+        task = dict(id='task', endpoint='localhost:8888', kernelspec='python3',
+                    notebook=notebook(code_cell('import os'), code_cell('lr = 1', tags=['parameters']),
+                                      code_cell('print(lr)')))
+        task.update(properties)
+        return task
+
+    def test_parameters_cell_is_injected(self):
+        result = self.executor.execute_task(self._task(parameters=dict(lr=0.1)))
+
+        self.assertEqual(4, len(result.cells))
+        self.assertEqual(['injected-parameters'], result.cells[2].metadata.tags)
+        self.assertEqual(['import os', 'lr = 1', '# Parameters\nlr = 0.1\n', 'print(lr)'],
+                         [event['output'].text[len('executed: '):] for event in self.events])
+
+    def test_previously_injected_parameters_are_replaced(self):
+        task = self._task(parameters=dict(lr=0.1))
+        task['notebook']['cells'].insert(2, code_cell('# Parameters\nlr = 0.5\n', tags=['injected-parameters']))
+        result = self.executor.execute_task(task)
+
+        self.assertEqual(4, len(result.cells))
+        self.assertEqual(['import os', 'lr = 1', '# Parameters\nlr = 0.1\n', 'print(lr)'],
+                         [event['output'].text[len('executed: '):] for event in self.events])
+
+    def test_sweep_runs_on_pooled_kernels(self):
+        self.gateway.execution_time = 0.02
+        summary = self.executor.execute_task(self._task(sweep=dict(lr=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6]),
+                                                        sweep_parallelism=3))
+
+        self.assertEqual((6, 0), (summary['succeeded'], summary['failed']))
+        self.assertEqual([0.1, 0.2, 0.3, 0.4, 0.5, 0.6], [run['parameters']['lr'] for run in summary['runs']])
+        self.assertEqual([0, 1, 2], [output['cell'] for output in summary['runs'][0]['outputs']])
+        # kernels are reset and reused across runs
+        self.assertEqual(3, len(self.gateway.started))
+        self.assertEqual(6 * 3, len(self.events))
+        self.assertEqual(set(range(6)), set(event['run'] for event in self.events))
+
+    def test_failed_runs_are_reported(self):
+        execute = self.gateway.start_kernel
+
+        def start_kernel(kernelspec):
+            kernel = execute(kernelspec)
+            if len(self.gateway.started) == 1:
+                kernel.execute = lambda code, timeout=None: (_ for _ in ()).throw(RuntimeError('kernel died'))
+            return kernel
+
+        self.gateway.start_kernel = start_kernel
+        summary = self.executor.execute_task(self._task(sweep=[dict(lr=1), dict(lr=2)], sweep_parallelism=1))
+
+        self.assertEqual((1, 1), (summary['succeeded'], summary['failed']))
+        self.assertEqual('kernel died', summary['runs'][0]['error'])
+
+    def test_runs_with_failing_cells_are_failed(self):
+        self.gateway.fail_on = 'lr = 2'
+        summary = self.executor.execute_task(self._task(sweep=[dict(lr=1), dict(lr=2)]))
+
+        self.assertEqual([SUCCEEDED, FAILED], [run['state'] for run in summary['runs']])
+        self.assertIn('error: # Parameters\nlr = 2', summary['runs'][1]['error'])
+        # cells following the failing one are not executed
+        self.assertEqual(3 + 2, len(self.events))
+
+    def test_invalid_sweep_is_rejected_on_submission(self):
+        scheduler = Scheduler()
+        with self.assertRaises(ValueError):
+            scheduler.schedule_task(dict(self._task(sweep=dict(lr=0.1)), executor='jupyter'))
+
+    def test_invalid_parallelism_is_rejected_on_submission(self):
+        scheduler = Scheduler()
+        for properties in (dict(sweep_parallelism=0), dict(sweep_parallelism='3'), dict(max_kernels=True),
+                           dict(max_kernels=-1), dict(max_kernels=1.5)):
+            with self.assertRaises(ValueError, msg=properties):
+                scheduler.schedule_task(dict(self._task(sweep=dict(lr=[0.1]), **properties), executor='jupyter'))
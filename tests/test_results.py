@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.results` module."""
+
+import threading
+import unittest
+
+from enterprise_scheduler.results import OutputBroker, ResultStore
+
+
+def _notebook(text):
+    return dict(metadata={}, cells=[dict(cell_type='code', source='print()', outputs=[dict(text=text)])])
+
+
+class TestResultStore(unittest.TestCase):
+    """Tests for `ResultStore`."""
+
+    def test_results_round_trip(self):
+        store = ResultStore()
+        store.put('a', _notebook('hello'))
+        self.assertEqual(_notebook('hello'), store.get('a'))
+        self.assertIsNone(store.get('b'))
+
+    def test_least_recently_used_results_are_evicted(self):
+        store = ResultStore(max_total_bytes=400, compression_level=0)
+        store.put('a', _notebook('a' * 60))
+        store.put('b', _notebook('b' * 60))
+        store.get('a')
+        store.put('c', _notebook('c' * 60))
+
+        self.assertIsNotNone(store.get('a'))
+        self.assertIsNone(store.get('b'))
+        self.assertEqual(1, store.stats()['evictions'])
+
+    def test_outputs_of_large_results_are_dropped(self):
+        store = ResultStore(max_result_bytes=200, compression_level=0)
+        store.put('a', _notebook('x' * 500))
+
+        result = store.get('a')
+        self.assertEqual([], result['cells'][0]['outputs'])
+        self.assertTrue(result['metadata']['enterprise_scheduler']['outputs_truncated'])
+
+
+class TestOutputBroker(unittest.TestCase):
+    """Tests for `OutputBroker`."""
+
+    def test_subscribers_receive_buffered_and_live_outputs(self):
+        broker = OutputBroker()
+        broker.publish('a', 1)
+        events = broker.subscribe('a', keepalive=0.01)
+
+        def produce():
+            broker.publish('a', 2)
+            broker.close('a')
+
+        threading.Timer(0.05, produce).start()
+        self.assertEqual([1, 2], [event for event in events if event is not None])
+
+    def test_closed_outputs_cannot_be_subscribed(self):
+        broker = OutputBroker()
+        broker.publish('a', 1)
+        broker.close('a')
+        self.assertIsNone(broker.subscribe('a'))
+
+    def test_closed_outputs_are_not_reopened(self):
+        broker = OutputBroker()
+        broker.close('a')
+        broker.publish('a', 1)
+        self.assertIsNone(broker.subscribe('a'))
+        self.assertNotIn('a', broker._streams)
+
+    def test_slow_subscribers_skip_dropped_outputs(self):
+        broker = OutputBroker(max_events=2)
+        for i in range(5):
+            broker.publish('a', i)
+        events = broker.subscribe('a', keepalive=0.01)
+        broker.publish('a', 5)
+        broker.close('a')
+
+        self.assertEqual([4, 5], [event for event in events if event is not None])
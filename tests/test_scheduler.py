@@ -6,12 +6,15 @@
 import asyncio
 import os
 import json
+import threading
 import unittest
 import time
 from pprint import pprint
 
+from enterprise_scheduler.async_scheduler import AsyncScheduler
 from enterprise_scheduler.scheduler import Scheduler
 from enterprise_scheduler.util import fix_asyncio_event_loop_policy
+from tests.notebook_server import NotebookServer
 
 RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
 
@@ -82,3 +85,227 @@ class TestEnterpriseScheduler(unittest.TestCase):
         filename = os.path.join(RESOURCES, filename)
         with open(filename, 'r') as f:
             return json.load(f)
+
+
+class RecordingExecutor:
+    """Executor stand-in that records the tasks it receives"""
+    TYPE = 'recording'
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.tasks = []
+
+    def execute_task(self, task):
+        time.sleep(self.delay)
+        self.tasks.append(task)
+
+
+class TestSchedulerDispatch(unittest.TestCase):
+    """Tests for the blocking dispatch engine of `Scheduler`."""
+
+    def setUp(self):
+        self.executor = RecordingExecutor()
+        self.scheduler = Scheduler(number_of_threads=2)
+        self.scheduler.executors[RecordingExecutor.TYPE] = self.executor
+
+    def tearDown(self):
+        self.scheduler.stop(drain=False)
+
+    def _task(self):
+        return dict(executor=RecordingExecutor.TYPE,
+                    endpoint=DEFAULT_GATEWAY,
+                    kernelspec=DEFAULT_KERNELSPEC,
+                    notebook={'cells': []})
+
+    def test_start_creates_requested_number_of_threads(self):
+        self.scheduler.start()
+        self.assertEqual(2, len(self.scheduler.pools['default'].threads))
+
+    def test_idle_workers_do_not_consume_cpu(self):
+        self.scheduler.start()
+        cpu_start = time.process_time()
+        time.sleep(0.5)
+        self.assertLess(time.process_time() - cpu_start, 0.1)
+
+    def test_stop_drains_queued_tasks(self):
+        self.executor.delay = 0.01
+        self.scheduler.start()
+        for i in range(10):
+            self.scheduler.schedule_task(self._task())
+        self.scheduler.stop()
+
+        self.assertEqual(10, len(self.executor.tasks))
+        self.assertEqual([], self.scheduler.executor_threads)
+
+    def test_stop_without_drain_discards_queued_tasks(self):
+        self.executor.delay = 0.05
+        for i in range(10):
+            self.scheduler.schedule_task(self._task())
+        self.scheduler.start()
+        self.scheduler.stop(drain=False)
+
+        self.assertLess(len(self.executor.tasks), 10)
+        self.assertTrue(self.scheduler.queue.empty())
+
+    def test_higher_priority_tasks_run_first(self):
+        for priority in (0, 5, 0, 10):
+            task = self._task()
+            task['priority'] = priority
+            self.scheduler.schedule_task(task)
+        self.scheduler.number_of_threads = 1
+        self.scheduler.start()
+        self.scheduler.stop()
+
+        self.assertEqual([10, 5, 0, 0], [task['priority'] for task in self.executor.tasks])
+
+    def test_expired_tasks_are_not_executed(self):
+        task = self._task()
+        task['deadline'] = time.time() - 1
+        self.scheduler.schedule_task(task)
+        self.scheduler.start()
+        self.scheduler.stop()
+
+        self.assertEqual([], self.executor.tasks)
+
+    def test_invalid_priority_is_rejected(self):
+        task = self._task()
+        task['priority'] = 'high'
+        with self.assertRaises(ValueError):
+            self.scheduler.schedule_task(task)
+
+    def test_remote_notebooks_are_resolved_off_the_submission_path(self):
+        server = NotebookServer(delay=0.5).start()
+        server.notebooks['/simple.ipynb'] = json.dumps(self._read_notebook('simple.ipynb'))
+        try:
+            self.scheduler.start()
+            task = self._task()
+            del task['notebook']
+            task['notebook_location'] = server.url('/simple.ipynb')
+
+            start = time.monotonic()
+            id = self.scheduler.schedule_task(task)
+            self.assertLess(time.monotonic() - start, 0.25)
+            self.assertEqual('resolving', self.scheduler.task_store.get(id)['state'])
+
+            self.scheduler.stop()
+            self.assertEqual('succeeded', self.scheduler.task_store.get(id)['state'])
+            self.assertIn('cells', self.executor.tasks[0]['notebook'])
+        finally:
+            server.stop()
+
+    def test_invalid_remote_notebooks_fail_the_task(self):
+        server = NotebookServer().start()
+        server.notebooks['/invalid.ipynb'] = 'not a notebook'
+        try:
+            task = self._task()
+            del task['notebook']
+            task['notebook_location'] = server.url('/invalid.ipynb')
+            id = self.scheduler.schedule_task(task)
+            self.scheduler.stop()
+
+            self.assertEqual('failed', self.scheduler.task_store.get(id)['state'])
+            self.assertEqual([], self.executor.tasks)
+        finally:
+            server.stop()
+
+    def test_unknown_executor_is_rejected(self):
+        task = self._task()
+        task['executor'] = 'unknown'
+        with self.assertRaises(ValueError):
+            self.scheduler.schedule_task(task)
+
+    def _read_notebook(self, filename):
+        with open(os.path.join(RESOURCES, filename), 'r') as f:
+            return json.load(f)
+
+    def test_dispatch_latency_is_recorded(self):
+        self.scheduler.start()
+        self.scheduler.schedule_task(self._task())
+        self.scheduler.queue.join()
+
+        latency = self.scheduler.dispatch_latency()
+        self.assertEqual(1, latency['count'])
+        self.assertLess(latency['max'], 0.5)
+
+
+class AsyncRecordingExecutor(RecordingExecutor):
+    """Coroutine executor stand-in tracking its maximum concurrency"""
+    TYPE = 'async-recording'
+
+    def __init__(self, delay=0):
+        super().__init__(delay)
+        self.running = 0
+        self.max_running = 0
+
+    async def execute_task_async(self, task):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        self.tasks.append(task)
+
+
+class TestAsyncScheduler(unittest.TestCase):
+    """Tests for `AsyncScheduler`."""
+
+    def setUp(self):
+        self.scheduler = AsyncScheduler(max_concurrency=50)
+        self.executor = AsyncRecordingExecutor(delay=0.1)
+        self.scheduler.executors[AsyncRecordingExecutor.TYPE] = self.executor
+        self.scheduler.executors[RecordingExecutor.TYPE] = RecordingExecutor()
+
+    def tearDown(self):
+        self.scheduler.stop(drain=False)
+
+    def _task(self, executor=AsyncRecordingExecutor.TYPE):
+        return dict(executor=executor,
+                    endpoint=DEFAULT_GATEWAY,
+                    kernelspec=DEFAULT_KERNELSPEC,
+                    notebook={'cells': []})
+
+    def test_coroutine_tasks_run_concurrently_on_one_loop(self):
+        threads_before = threading.active_count()
+        self.scheduler.start()
+        for i in range(200):
+            self.scheduler.schedule_task(self._task())
+        self.scheduler.stop()
+
+        self.assertEqual(200, len(self.executor.tasks))
+        self.assertEqual(50, self.executor.max_running)
+        self.assertEqual(threads_before, threading.active_count())
+
+    def test_tasks_scheduled_before_start_are_executed(self):
+        self.scheduler.schedule_task(self._task())
+        self.scheduler.start()
+        self.scheduler.stop()
+
+        self.assertEqual(1, len(self.executor.tasks))
+
+    def test_blocking_executors_run_on_thread_pool(self):
+        self.scheduler.start()
+        self.scheduler.schedule_task(self._task(RecordingExecutor.TYPE))
+        self.scheduler.stop()
+
+        self.assertEqual(1, len(self.scheduler.executors[RecordingExecutor.TYPE].tasks))
+
+    def test_gateway_capacity_bounds_concurrency(self):
+        self.scheduler.gateway_capacity = 5
+        self.scheduler.start()
+        for i in range(20):
+            self.scheduler.schedule_task(self._task())
+        self.scheduler.stop()
+
+        self.assertEqual(5, self.executor.max_running)
+
+    def test_cancelled_tasks_leave_the_queue_at_once(self):
+        self.scheduler.stop()
+        self.scheduler = AsyncScheduler(max_concurrency=1)
+        self.scheduler.executors[AsyncRecordingExecutor.TYPE] = self.executor
+        self.scheduler.start()
+        running, cancelled, queued = [self.scheduler.schedule_task(self._task()) for i in range(3)]
+
+        self.assertTrue(self.scheduler.cancel_task(cancelled))
+        self.assertEqual(1, self.scheduler._async_queue.qsize())
+        self.assertEqual('cancelled', self.scheduler.task_store.get(cancelled)['state'])
+        self.scheduler.stop()
+        self.assertEqual([running, queued], [task['id'] for task in self.executor.tasks])
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the `enterprise_scheduler` REST API."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from enterprise_scheduler import scheduler_resource
+from enterprise_scheduler.cluster_scheduler import ClusterScheduler
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.scheduler_application import create_app
+from enterprise_scheduler.task import TaskEnvelope
+from enterprise_scheduler.task_store import SharedTaskStore
+from tests.fake_gateway import FakeGateway
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+_directory = None
+_environ = None
+
+
+def setUpModule():
+    global _directory, _environ
+    _directory = tempfile.mkdtemp()
+    _environ = mock.patch.dict(os.environ, EGS_TASK_STORE=os.path.join(_directory, 'tasks.db'))
+    _environ.start()
+    scheduler_resource.start_scheduler()
+
+
+def tearDownModule():
+    scheduler_resource.stop_scheduler()
+    _environ.stop()
+    shutil.rmtree(_directory)
+
+
+class TestSchedulerResource(unittest.TestCase):
+    """Tests for the task submission, status, result and outputs endpoints."""
+
+    def setUp(self):
+        self.gateway = FakeGateway()
+        self.scheduler = Scheduler(number_of_threads=1)
+        self.scheduler.register_executor(
+            JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01, launcher_factory=self.gateway)))
+        self.scheduler.start()
+
+        self.default_scheduler = scheduler_resource.scheduler
+        scheduler_resource.scheduler = self.scheduler
+        self.client = create_app('localhost:8888', 'python3').test_client()
+
+    def tearDown(self):
+        scheduler_resource.scheduler = self.default_scheduler
+        self.scheduler.stop()
+
+    def _submit(self):
+        with open(os.path.join(RESOURCES, 'simple.ipynb')) as f:
+            notebook = json.load(f)
+        response = self.client.post('/scheduler/tasks', data=json.dumps(dict(executor='jupyter', notebook=notebook)))
+        self.assertEqual(201, response.status_code)
+        return response.get_json()['id']
+
+    def test_submit_returns_task_id_and_status(self):
+        id = self._submit()
+        self.scheduler.queue.join()
+
+        status = self.client.get('/scheduler/tasks/{}'.format(id)).get_json()
+        self.assertEqual(id, status['id'])
+        self.assertEqual('succeeded', status['state'])
+
+    def test_result_contains_executed_notebook(self):
+        id = self._submit()
+        self.scheduler.queue.join()
+
+        notebook = self.client.get('/scheduler/tasks/{}/result'.format(id)).get_json()
+        outputs = [cell['outputs'] for cell in notebook['cells'] if cell['cell_type'] == 'code']
+        self.assertTrue(outputs)
+        self.assertTrue(all(output[0]['text'].startswith('executed: ') for output in outputs))
+
+    def test_outputs_are_streamed_as_server_sent_events(self):
+        self.gateway.execution_time = 0.05
+        id = self._submit()
+
+        body = self.client.get('/scheduler/tasks/{}/outputs'.format(id)).get_data(as_text=True)
+        events = [event for event in body.split('\n\n') if event.startswith('data: ')]
+        self.assertTrue(events)
+        self.assertIn('event: end', body)
+        self.assertIn('executed: ', json.loads(events[0][len('data: '):])['output']['text'])
+
+    def test_unknown_task_returns_not_found(self):
+        self.assertEqual(404, self.client.get('/scheduler/tasks/unknown').status_code)
+        self.assertEqual(404, self.client.get('/scheduler/tasks/unknown/result').status_code)
+
+    def test_cancel_running_task(self):
+        self.gateway.hang_on = 'hang()'
+        notebook = dict(cells=[dict(cell_type='code', source='hang()', metadata={}, outputs=[])])
+        id = self.client.post('/scheduler/tasks', data=json.dumps(dict(executor='jupyter', notebook=notebook))
+                              ).get_json()['id']
+        while self.client.get('/scheduler/tasks/{}'.format(id)).get_json()['state'] != 'running':
+            time.sleep(0.01)
+
+        response = self.client.delete('/scheduler/tasks/{}'.format(id))
+        self.assertEqual(202, response.status_code)
+        self.scheduler.queue.join()
+        self.assertEqual('cancelled', self.client.get('/scheduler/tasks/{}'.format(id)).get_json()['state'])
+        self.assertEqual(409, self.client.delete('/scheduler/tasks/{}'.format(id)).status_code)
+        self.assertEqual(404, self.client.delete('/scheduler/tasks/unknown').status_code)
+
+    def test_invalid_task_is_rejected(self):
+        response = self.client.post('/scheduler/tasks', data=json.dumps(dict(notebook={})))
+        self.assertEqual(400, response.status_code)
+        self.assertIn('message', response.get_json())
+
+        response = self.client.post('/scheduler/tasks', data=json.dumps('notebook.ipynb'))
+        self.assertEqual(400, response.status_code)
+        self.assertIn('JSON object', response.get_json()['message'])
+
+    def _batch(self, count):
+        return [dict(executor='jupyter', notebook={'cells': []}) for i in range(count)]
+
+    def test_submit_json_array(self):
+        response = self.client.post('/scheduler/tasks', data=json.dumps(self._batch(3)))
+
+        self.assertEqual(201, response.status_code)
+        ids = response.get_json()['ids']
+        self.assertEqual(3, len(set(ids)))
+        self.scheduler.queue.join()
+        self.assertEqual(['succeeded'] * 3, [self.scheduler.task_store.get(id)['state'] for id in ids])
+
+    def test_submit_ndjson(self):
+        body = '\n'.join(json.dumps(task) for task in self._batch(3)) + '\n'
+        response = self.client.post('/scheduler/tasks', data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(3, len(response.get_json()['ids']))
+
+    def test_invalid_batch_is_rejected_as_a_whole(self):
+        tasks = self._batch(3)
+        del tasks[1]['notebook']
+        tasks[2]['executor'] = 'unknown'
+        response = self.client.post('/scheduler/tasks', data=json.dumps(tasks))
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual([1, 2], [error['index'] for error in response.get_json()['errors']])
+        self.assertEqual(0, self.scheduler.queue.unfinished_tasks)
+
+
+class TestSchedulerBackpressure(unittest.TestCase):
+    """Tests for the rejection of submissions when the scheduler queue is full."""
+
+    def setUp(self):
+        self.scheduler = Scheduler(number_of_threads=1, max_queued=1)
+        self.default_scheduler = scheduler_resource.scheduler
+        scheduler_resource.scheduler = self.scheduler
+        self.client = create_app('localhost:8888', 'python3').test_client()
+
+    def tearDown(self):
+        scheduler_resource.scheduler = self.default_scheduler
+        self.scheduler.stop(drain=False)
+
+    def test_full_queue_returns_service_unavailable(self):
+        task = json.dumps(dict(executor='jupyter', notebook={'cells': []}))
+        self.assertEqual(201, self.client.post('/scheduler/tasks', data=task).status_code)
+
+        response = self.client.post('/scheduler/tasks', data=task)
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('1', response.headers['Retry-After'])
+
+        response = self.client.post('/scheduler/tasks', data='[{}, {}]'.format(task, task))
+        self.assertEqual(503, response.status_code)
+
+
+class TestClusterTaskResource(unittest.TestCase):
+    """Tests for the result and outputs endpoints of a cluster node."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        path = os.path.join(self.directory, 'tasks.db')
+        self.stores = [SharedTaskStore(path, node=node) for node in ('a', 'b')]
+        for store in self.stores:
+            self.addCleanup(store.close)
+
+        self.default_scheduler = scheduler_resource.scheduler
+        scheduler_resource.scheduler = ClusterScheduler(task_store=self.stores[1], heartbeat_interval=1)
+        self.client = create_app('localhost:8888', 'python3').test_client()
+
+    def tearDown(self):
+        scheduler_resource.scheduler = self.default_scheduler
+
+    def test_tasks_of_another_node_name_it(self):
+        envelope = TaskEnvelope.from_task(dict(id=uuid.uuid4(), executor='jupyter', notebook={'cells': []}))
+        self.stores[0].add_many([envelope])
+        self.stores[0].claim(1)
+        self.stores[0].start(envelope.id)
+        self.stores[0].set_state(envelope.id, 'succeeded')
+
+        for url in ('/scheduler/tasks/{}/result', '/scheduler/tasks/{}/outputs'):
+            response = self.client.get(url.format(envelope.id))
+            self.assertEqual(409, response.status_code)
+            self.assertEqual('a', response.get_json()['node'])
+            self.assertIn('node a', response.get_json()['message'])
+
+
+class TestSchedulesResource(unittest.TestCase):
+    """Tests for the schedule endpoints."""
+
+    def setUp(self):
+        self.client = create_app('localhost:8888', 'python3').test_client()
+
+    def test_create_get_and_delete_schedule(self):
+        response = self.client.post('/scheduler/schedules', data=json.dumps(
+            dict(cron='0 0 1 1 *', jitter=30, task=dict(executor='jupyter', notebook={'cells': []}))))
+        self.assertEqual(201, response.status_code)
+        schedule = response.get_json()
+        self.assertEqual('0 0 1 1 *', schedule['cron'])
+
+        url = '/scheduler/schedules/{}'.format(schedule['id'])
+        self.assertEqual(schedule['next_run'], self.client.get(url).get_json()['next_run'])
+        self.assertIn(schedule['id'], [item['id'] for item in self.client.get('/scheduler/schedules').get_json()])
+
+        self.assertEqual(204, self.client.delete(url).status_code)
+        self.assertEqual(404, self.client.get(url).status_code)
+        self.assertEqual(404, self.client.delete(url).status_code)
+
+    def test_invalid_schedule_is_rejected(self):
+        response = self.client.post('/scheduler/schedules', data=json.dumps(
+            dict(cron='not cron', task=dict(executor='jupyter', notebook={'cells': []}))))
+        self.assertEqual(400, response.status_code)
+
+
+class TestMetricsResource(unittest.TestCase):
+    """Tests for the metrics endpoint."""
+
+    def setUp(self):
+        self.client = create_app('localhost:8888', 'python3').test_client()
+
+    def test_metrics_are_exposed_in_prometheus_format(self):
+        response = self.client.get('/metrics')
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        self.assertIn('egs_pool_queue_depth{pool="default"}', body)
+        self.assertIn('egs_stage_duration_seconds', body)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.schedules` module."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from enterprise_scheduler.schedules import ScheduleManager, SQLiteScheduleStore
+
+
+class SubmissionRecorder:
+    """Scheduler stand-in recording submitted tasks"""
+
+    def __init__(self):
+        self.tasks = []
+        self.submitted = threading.Condition()
+
+    def validate_task(self, task):
+        if 'executor' not in task:
+            raise ValueError('Submitted task is missing [executor] information')
+
+    def schedule_task(self, task):
+        with self.submitted:
+            self.tasks.append(task)
+            self.submitted.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self.submitted:
+            self.submitted.wait_for(lambda: len(self.tasks) >= count, timeout)
+        return len(self.tasks)
+
+
+TASK = dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook={'cells': []})
+
+
+class TestScheduleManager(unittest.TestCase):
+    """Tests for `ScheduleManager`."""
+
+    def setUp(self):
+        self.scheduler = SubmissionRecorder()
+        self.manager = ScheduleManager(self.scheduler)
+        self.manager.start()
+
+    def tearDown(self):
+        self.manager.stop()
+
+    def test_intervals_fire_repeatedly(self):
+        schedule = self.manager.add(dict(task=TASK, interval=0.05, start=time.time()))
+
+        self.assertEqual(3, self.scheduler.wait_for(3))
+        self.assertEqual(schedule.id, self.scheduler.tasks[0]['schedule_id'])
+        self.assertIsNot(self.scheduler.tasks[0], self.scheduler.tasks[1])
+        self.assertGreaterEqual(self.manager.get(schedule.id)['runs'], 3)
+
+    def test_delayed_tasks_fire_once(self):
+        schedule = self.manager.add(dict(task=TASK, run_at=time.time() + 0.05))
+
+        self.assertEqual(1, self.scheduler.wait_for(1))
+        time.sleep(0.1)
+        self.assertEqual(1, len(self.scheduler.tasks))
+        self.assertIsNone(self.manager.get(schedule.id))
+
+    def test_past_run_at_fires_immediately(self):
+        self.manager.add(dict(task=TASK, run_at='2019-05-01T00:00:00Z'))
+        self.assertEqual(1, self.scheduler.wait_for(1))
+
+    def test_removed_schedules_stop_firing(self):
+        schedule = self.manager.add(dict(task=TASK, interval=0.05))
+        self.assertTrue(self.manager.remove(schedule.id))
+        self.assertFalse(self.manager.remove(schedule.id))
+
+        time.sleep(0.15)
+        self.assertEqual([], self.scheduler.tasks)
+
+    def test_jitter_delays_fires_within_bounds(self):
+        start = time.time()
+        for i in range(20):
+            self.manager.add(dict(task=TASK, run_at=start, jitter=0.2))
+
+        self.assertEqual(20, self.scheduler.wait_for(20))
+        self.assertLess(time.time() - start, 1)
+
+    def test_cron_schedules_report_their_next_run(self):
+        schedule = self.manager.add(dict(task=TASK, cron='0 0 1 1 *'))
+        next_run = self.manager.get(schedule.id)['next_run']
+
+        self.assertGreater(next_run, time.time())
+        self.assertEqual(0, next_run % 60)
+
+    def test_invalid_definitions_are_rejected(self):
+        for definition in (dict(cron='* * * * *'),
+                           dict(task=TASK),
+                           dict(task=TASK, cron='* * * * *', interval=5),
+                           dict(task=TASK, cron='61 * * * *'),
+                           dict(task=TASK, interval=-1),
+                           dict(task=TASK, run_at='tomorrow'),
+                           dict(task=TASK, interval=5, jitter=-1),
+                           dict(task=TASK, interval=5, misfire='later'),
+                           dict(task=dict(notebook={}), interval=5)):
+            with self.assertRaises(ValueError, msg=str(definition)):
+                self.manager.add(definition)
+
+    def test_many_schedules(self):
+        now = time.time()
+        for i in range(10000):
+            self.manager.add(dict(task=TASK, interval=3600, start=now + 1800 + i))
+        self.manager.add(dict(task=TASK, run_at=now))
+
+        self.assertEqual(1, self.scheduler.wait_for(1))
+        self.assertEqual(10000, self.manager.stats()['schedules'])
+
+
+class TestScheduleRecovery(unittest.TestCase):
+    """Tests for persisted schedules and their misfire policies."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tasks.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _restart_after_missing_runs(self, misfire, missed=3):
+        store = SQLiteScheduleStore(self.path)
+        manager = ScheduleManager(SubmissionRecorder(), store)
+        start = time.time() - 60 * missed + 30
+        schedule = manager.add(dict(task=TASK, interval=60, start=start, misfire=misfire))
+        # as if the process stopped right before the first run
+        schedule.next_run = start
+        store.save_many([schedule])
+        store.close()
+
+        scheduler = SubmissionRecorder()
+        store = SQLiteScheduleStore(self.path)
+        manager = ScheduleManager(scheduler, store)
+        manager.start()
+        manager.stop()
+        store.close()
+        return scheduler, manager, schedule
+
+    def test_skip_ignores_missed_runs(self):
+        scheduler, manager, schedule = self._restart_after_missing_runs('skip')
+
+        self.assertEqual([], scheduler.tasks)
+        self.assertEqual(3, manager.stats()['missed'])
+        self.assertGreater(manager.get(schedule.id)['next_run'], time.time())
+
+    def test_run_once_runs_missed_runs_once(self):
+        scheduler, manager, schedule = self._restart_after_missing_runs('run_once')
+        self.assertEqual(1, len(scheduler.tasks))
+
+    def test_run_once_runs_the_latest_missed_run(self):
+        scheduler, manager, schedule = self._restart_after_missing_runs('run_once', missed=500)
+
+        self.assertEqual(1, len(scheduler.tasks))
+        self.assertEqual(schedule.trigger.last_before(time.time()), manager.get(schedule.id)['last_run'])
+
+    def test_run_all_catches_up_every_missed_run(self):
+        scheduler, manager, schedule = self._restart_after_missing_runs('run_all')
+
+        self.assertEqual(3, len(scheduler.tasks))
+        self.assertEqual(3, manager.get(schedule.id)['runs'])
+
+    def test_catch_up_is_bounded(self):
+        scheduler, manager, schedule = self._restart_after_missing_runs('run_all', missed=500)
+        self.assertEqual(100, len(scheduler.tasks))
+
+    def test_removed_schedules_are_not_recovered(self):
+        store = SQLiteScheduleStore(self.path)
+        manager = ScheduleManager(SubmissionRecorder(), store)
+        schedule = manager.add(dict(task=TASK, interval=60))
+        manager.add(dict(task=TASK, interval=60))
+        manager.remove(schedule.id)
+        store.close()
+
+        store = SQLiteScheduleStore(self.path)
+        manager = ScheduleManager(SubmissionRecorder(), store)
+        manager.start()
+        manager.stop()
+        store.close()
+        self.assertEqual(1, manager.stats()['schedules'])
+        self.assertIsNone(manager.get(schedule.id))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.server` module."""
+
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from enterprise_scheduler import scheduler_resource
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.scheduler_application import create_app
+from enterprise_scheduler.server import SchedulerServer
+from tests.fake_gateway import FakeGateway
+
+TASK = dict(executor='jupyter', notebook=dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+    dict(cell_type='code', source='1 + 1', metadata={}, outputs=[], execution_count=None)]))
+
+
+class TestSchedulerServer(unittest.TestCase):
+    """Tests for the REST API served by `SchedulerServer`."""
+
+    def setUp(self):
+        self.gateway = FakeGateway()
+        self.scheduler = Scheduler(number_of_threads=2)
+        self.scheduler.register_executor(
+            JupyterExecutor(kernel_pool=KernelPool(readiness_interval=0.01, launcher_factory=self.gateway)))
+        self.scheduler.start()
+        self.default_scheduler = scheduler_resource.scheduler
+        scheduler_resource.scheduler = self.scheduler
+
+        self.server = SchedulerServer(create_app('localhost:8888', 'python3'), port=0, threads=4).start()
+
+    def tearDown(self):
+        self.server.stop()
+        scheduler_resource.scheduler = self.default_scheduler
+        self.scheduler.stop()
+
+    def _submit(self, session=requests, task=TASK):
+        response = session.post(self.server.url('/scheduler/tasks'), data=json.dumps(task))
+        self.assertEqual(201, response.status_code)
+        return response.json()['id']
+
+    def test_concurrent_submissions(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = list(pool.map(lambda i: self._submit(), range(40)))
+        self.scheduler.queue.join()
+
+        self.assertEqual(40, len(set(ids)))
+        states = [requests.get(self.server.url('/scheduler/tasks/{}'.format(id))).json()['state'] for id in ids]
+        self.assertEqual(['succeeded'] * 40, states)
+
+    def test_outputs_are_streamed(self):
+        self.gateway.execution_time = 0.2
+        cells = TASK['notebook']['cells'] * 2
+        id = self._submit(task=dict(TASK, notebook=dict(TASK['notebook'], cells=cells)))
+
+        with requests.get(self.server.url('/scheduler/tasks/{}/outputs'.format(id)), stream=True) as response:
+            # the first output arrives before the task completes
+            first = next(line for line in response.iter_lines() if line.startswith(b'data: '))
+            self.assertNotEqual('succeeded', self.scheduler.task_store.get(id)['state'])
+        self.assertIn('executed: ', json.loads(first[len(b'data: '):].decode('utf-8'))['output']['text'])
+
+    def test_invalid_thread_count_is_rejected(self):
+        with self.assertRaises(ValueError):
+            SchedulerServer(create_app('localhost:8888', 'python3'), port=0, threads=0)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.task` module."""
+
+import heapq
+import unittest
+
+from enterprise_scheduler.task import TaskEnvelope
+
+
+class TestTaskEnvelope(unittest.TestCase):
+    """Tests for the ordering of `TaskEnvelope`."""
+
+    def test_envelopes_with_same_priority_are_fifo(self):
+        envelopes = [TaskEnvelope({'id': i}) for i in range(100)]
+        heap = []
+        for envelope in reversed(envelopes):
+            heapq.heappush(heap, envelope)
+
+        ordered = [heapq.heappop(heap).id for i in range(len(heap))]
+        self.assertEqual(list(range(100)), ordered)
+
+    def test_higher_priority_orders_first(self):
+        low = TaskEnvelope({'id': 'low'}, priority=-1)
+        normal = TaskEnvelope({'id': 'normal'})
+        high = TaskEnvelope({'id': 'high'}, priority=10)
+
+        self.assertEqual(['high', 'normal', 'low'],
+                         [envelope.id for envelope in sorted([low, normal, high])])
+
+    def test_earlier_deadline_orders_first(self):
+        none = TaskEnvelope({'id': 'none'})
+        late = TaskEnvelope({'id': 'late'}, deadline=200)
+        early = TaskEnvelope({'id': 'early'}, deadline=100)
+
+        self.assertEqual(['early', 'late', 'none'],
+                         [envelope.id for envelope in sorted([none, late, early])])
+
+    def test_expired(self):
+        self.assertFalse(TaskEnvelope({}).expired())
+        self.assertTrue(TaskEnvelope({}, deadline=100).expired(now=101))
+        self.assertFalse(TaskEnvelope({}, deadline=100).expired(now=99))
+
+    def test_from_task_validates_priority_and_deadline(self):
+        self.assertEqual(3, TaskEnvelope.from_task({'priority': 3}).priority)
+        with self.assertRaises(ValueError):
+            TaskEnvelope.from_task({'priority': 1.5})
+        with self.assertRaises(ValueError):
+            TaskEnvelope.from_task({'deadline': 'tomorrow'})
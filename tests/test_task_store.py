@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.task_store` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+from enterprise_scheduler.notebook import load_notebook
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.task import TaskEnvelope
+from enterprise_scheduler.task_store import SQLiteTaskStore, TaskStore, FAILED, QUEUED, RUNNING, SUCCEEDED
+from tests.test_scheduler import RecordingExecutor
+
+
+def _envelope():
+    return TaskEnvelope(dict(id=uuid.uuid4(), executor='jupyter', notebook={'cells': []}))
+
+
+class TestTaskStore(unittest.TestCase):
+    """Tests for the in-memory `TaskStore`."""
+
+    def test_state_transitions(self):
+        store = TaskStore()
+        envelope = _envelope()
+        store.add(envelope)
+        self.assertEqual(QUEUED, store.get(envelope.id)['state'])
+
+        store.set_state(envelope.id, FAILED, 'boom')
+        self.assertEqual(FAILED, store.get(envelope.id)['state'])
+        self.assertEqual('boom', store.get(envelope.id)['error'])
+        self.assertEqual([], store.pending())
+
+    def test_oldest_tasks_are_forgotten(self):
+        store = TaskStore(max_tasks=2)
+        envelopes = [_envelope() for i in range(3)]
+        store.add_many(envelopes)
+
+        self.assertIsNone(store.get(envelopes[0].id))
+        self.assertIsNotNone(store.get(envelopes[2].id))
+
+
+class TestSQLiteTaskStore(unittest.TestCase):
+    """Tests for `SQLiteTaskStore`."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tasks.db')
+        self.store = SQLiteTaskStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_database_uses_wal_journal(self):
+        self.assertEqual('wal', self.store._connection.execute('PRAGMA journal_mode').fetchone()[0])
+
+    def test_pending_tasks_survive_reopening(self):
+        queued, running, done = _envelope(), _envelope(), _envelope()
+        self.store.add_many([queued, running, done])
+        self.store.set_state(running.id, RUNNING)
+        self.store.set_state(done.id, SUCCEEDED)
+        self.store.close()
+
+        self.store = SQLiteTaskStore(self.path)
+        pending = self.store.pending()
+
+        self.assertEqual([queued.id, running.id], [task['id'] for task in pending])
+        self.assertEqual({'cells': []}, pending[0]['notebook'])
+        self.assertEqual(SUCCEEDED, self.store.get(done.id)['state'])
+
+    def test_payloads_reuse_the_notebook_serialization(self):
+        notebook = load_notebook(dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[]))
+        # reused as is rather than serialized again
+        notebook._json = json.dumps(dict(notebook, metadata=dict(cached=True))).encode('utf-8')
+        envelope = _envelope()
+        envelope.task.update(notebook=notebook, parameters=dict(lr=0.1))
+        self.store.add_many([envelope, _envelope()])
+
+        task, other = self.store.pending()
+        self.assertEqual(dict(cached=True), task['notebook']['metadata'])
+        self.assertEqual(dict(lr=0.1), task['parameters'])
+        self.assertEqual(envelope.id, task['id'])
+        self.assertEqual({'cells': []}, other['notebook'])
+
+    def test_prune_keeps_the_most_recent_completed_tasks(self):
+        self.store.close()
+        self.store = SQLiteTaskStore(self.path, max_completed=2)
+        queued, *done = [_envelope() for i in range(5)]
+        self.store.add_many([queued] + done)
+        for envelope in done:
+            self.store.set_state(envelope.id, SUCCEEDED)
+            self.store.flush()
+
+        self.assertEqual(2, self.store.prune())
+        self.assertEqual([None, None], [self.store.get(envelope.id) for envelope in done[:2]])
+        self.assertEqual({QUEUED: 1, SUCCEEDED: 2}, self.store.counts())
+
+    def test_prune_deletes_expired_completed_tasks(self):
+        self.store.close()
+        self.store = SQLiteTaskStore(self.path, retention=0)
+        queued, running, failed = _envelope(), _envelope(), _envelope()
+        self.store.add_many([queued, running, failed])
+        self.store.set_state(running.id, RUNNING)
+        self.store.set_state(failed.id, FAILED)
+
+        self.assertEqual(1, self.store.prune())
+        self.assertEqual({QUEUED: 1, RUNNING: 1}, self.store.counts())
+
+    def test_scheduler_recovers_pending_tasks(self):
+        scheduler = Scheduler(number_of_threads=1, task_store=self.store)
+        scheduler.executors[RecordingExecutor.TYPE] = RecordingExecutor()
+        ids = [scheduler.schedule_task(dict(executor=RecordingExecutor.TYPE, endpoint='localhost:8888',
+                                            kernelspec='python3', notebook={'cells': []}))
+               for i in range(3)]
+        # simulate a crash: the scheduler is never started
+        self.store.close()
+
+        self.store = SQLiteTaskStore(self.path)
+        executor = RecordingExecutor()
+        scheduler = Scheduler(number_of_threads=1, task_store=self.store)
+        scheduler.executors[RecordingExecutor.TYPE] = executor
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual(ids, [task['id'] for task in executor.tasks])
+        self.assertEqual([SUCCEEDED] * 3, [self.store.get(id)['state'] for id in ids])
+        self.assertEqual([], self.store.pending())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for cell and task timeouts and for the cancellation of tasks."""
+
+import threading
+import time
+import unittest
+
+from enterprise_scheduler import metrics
+from enterprise_scheduler.executor import TaskCancelled, TaskTimeout
+from enterprise_scheduler.jupyter_executor import JupyterExecutor
+from enterprise_scheduler.kernel_pool import KernelPool
+from enterprise_scheduler.scheduler import Scheduler
+from tests.fake_gateway import FakeGateway
+
+
+def notebook(*sources):
+    return dict(nbformat=4, nbformat_minor=2, metadata={}, cells=[
+        dict(cell_type='code', source=source, metadata={}, outputs=[], execution_count=None) for source in sources])
+
+
+def task(*sources, **properties):
+    return dict(executor='jupyter', endpoint='localhost:8888', kernelspec='python3', notebook=notebook(*sources),
+                **properties)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.01)
+
+
+class TestTimeouts(unittest.TestCase):
+    """Tests for the cell and task timeouts of `JupyterExecutor`."""
+
+    def setUp(self):
+        self.gateway = FakeGateway(hang_on='hang()')
+        self.pool = KernelPool(max_size=1, readiness_interval=0.01, launcher_factory=self.gateway)
+        self.executor = JupyterExecutor(kernel_pool=self.pool, interrupt_timeout=1)
+        self.addCleanup(self.executor.shutdown)
+
+    def _timeouts(self, kind):
+        return metrics.TIMEOUTS.labels(kind)._value.get()
+
+    def test_cell_timeout_interrupts_and_recycles_the_kernel(self):
+        before = self._timeouts('cell')
+        started = time.monotonic()
+        with self.assertRaises(TaskTimeout):
+            self.executor.execute_task(task('x = 1', 'hang()', 'y = 2', cell_timeout=0.1))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(before + 1, self._timeouts('cell'))
+
+        # the interrupted kernel is reset and reused by the next task
+        result = self.executor.execute_task(task('x = 1'))
+        self.assertEqual('executed: x = 1', result.cells[0].outputs[0].text)
+        kernel = self.gateway.started[0]
+        self.assertEqual((1, 1), (len(self.gateway.started), kernel.interrupts))
+        self.assertEqual(0, len(self.gateway.shutdown))
+
+    def test_task_timeout_bounds_the_whole_task(self):
+        self.gateway.execution_time = 0.05
+        before = self._timeouts('task')
+        with self.assertRaises(TaskTimeout):
+            self.executor.execute_task(task(*['x = 1'] * 20, timeout=0.2))
+        self.assertEqual(before + 1, self._timeouts('task'))
+
+    def test_unresponsive_kernels_are_discarded(self):
+        self.gateway.interruptible = False
+        self.executor.interrupt_timeout = 0.1
+        with self.assertRaises(TaskTimeout):
+            self.executor.execute_task(task('hang()', cell_timeout=0.1))
+
+        self.executor.execute_task(task('x = 1'))
+        self.assertEqual(2, len(self.gateway.started))
+        wait_for(lambda: self.gateway.started[0] in self.gateway.shutdown)
+
+    def test_kernels_are_recovered_when_hung_cells_hold_every_io_thread(self):
+        self.executor.shutdown()
+        self.pool = KernelPool(max_size=2, readiness_interval=0.01, launcher_factory=self.gateway)
+        self.executor = JupyterExecutor(kernel_pool=self.pool, interrupt_timeout=1, io_threads=2)
+        self.addCleanup(self.executor.shutdown)
+
+        errors = []
+
+        def execute():
+            try:
+                self.executor.execute_task(task('hang()', cell_timeout=0.1))
+            except TaskTimeout as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=execute) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2, len(errors))
+
+        started = time.monotonic()
+        result = self.executor.execute_task(task('x = 1', cell_timeout=2))
+        self.assertEqual('executed: x = 1', result.cells[0].outputs[0].text)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([1, 1], [kernel.interrupts for kernel in self.gateway.started])
+
+    def test_cancel_before_execution(self):
+        self.assertTrue(self.executor.cancel_dispatched_task('task-0'))
+        with self.assertRaises(TaskCancelled):
+            self.executor.execute_task(task('x = 1', id='task-0'))
+        self.assertEqual({}, self.executor._controls)
+
+    def test_unknown_and_finished_tasks_are_not_cancelled(self):
+        self.assertFalse(self.executor.cancel_task('unknown'))
+        self.executor.execute_task(task('x = 1', id='task-0'))
+        self.assertFalse(self.executor.cancel_task('task-0'))
+        self.assertFalse(self.executor.cancel_dispatched_task('task-0'))
+        self.assertEqual({}, self.executor._controls)
+
+    def test_cancel_running_task(self):
+        running = task('hang()', id='task-1')
+        errors = []
+        thread = threading.Thread(target=lambda: self._execute(running, errors))
+        thread.start()
+        wait_for(lambda: self.gateway.started and self.gateway.started[0].state == 'idle')
+        self.assertTrue(self.executor.cancel_task('task-1'))
+        thread.join(2)
+
+        self.assertFalse(thread.is_alive())
+        self.assertIsInstance(errors[0], TaskCancelled)
+
+    def _execute(self, running, errors):
+        try:
+            self.executor.execute_task(running)
+        except Exception as error:
+            errors.append(error)
+
+
+class TestCancellation(unittest.TestCase):
+    """Tests for `Scheduler.cancel_task`."""
+
+    def setUp(self):
+        self.gateway = FakeGateway(hang_on='hang()')
+        self.scheduler = Scheduler(number_of_threads=1)
+        self.scheduler.register_executor(JupyterExecutor(
+            kernel_pool=KernelPool(readiness_interval=0.01, launcher_factory=self.gateway)))
+        self.addCleanup(self.scheduler.stop, drain=False)
+
+    def _state(self, task_id):
+        return self.scheduler.task_store.get(task_id)['state']
+
+    def test_cancel_queued_task(self):
+        first, second = self.scheduler.schedule_tasks([task('x = 1'), task('y = 2')])
+
+        self.assertTrue(self.scheduler.cancel_task(first))
+        self.assertEqual('cancelled', self._state(first))
+        self.assertEqual(1, self.scheduler.queue.qsize())
+        self.assertFalse(self.scheduler.cancel_task(first))
+
+        self.scheduler.start()
+        self.scheduler.queue.join()
+        self.assertEqual(('cancelled', 'succeeded'), (self._state(first), self._state(second)))
+
+    def test_cancel_running_task_frees_its_worker(self):
+        running = self.scheduler.schedule_task(task('hang()'))
+        queued = self.scheduler.schedule_task(task('x = 1'))
+        self.scheduler.start()
+        wait_for(lambda: self._state(running) == 'running' and self.scheduler.cancel_task(running))
+
+        self.scheduler.queue.join()
+        self.assertEqual(('cancelled', 'succeeded'), (self._state(running), self._state(queued)))
+        self.assertFalse(self.scheduler.cancel_task(running))
+
+    def test_timed_out_task_fails(self):
+        self.scheduler.start()
+        task_id = self.scheduler.schedule_task(task('hang()', cell_timeout=0.1))
+        self.scheduler.queue.join()
+        record = self.scheduler.task_store.get(task_id)
+        self.assertEqual('failed', record['state'])
+        self.assertIn('longer than', str(record['error']))
+
+    def test_invalid_timeouts_are_rejected(self):
+        for timeout in (0, -1, 'soon', True):
+            with self.assertRaises(ValueError):
+                self.scheduler.schedule_task(task('x = 1', timeout=timeout))
+            with self.assertRaises(ValueError):
+                self.scheduler.schedule_task(task('x = 1', cell_timeout=timeout))
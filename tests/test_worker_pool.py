@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `enterprise_scheduler.worker_pool` module and the scheduler pools."""
+
+import threading
+import time
+import unittest
+
+from enterprise_scheduler.scheduler import Scheduler
+from enterprise_scheduler.worker_pool import EndpointLimiter, SchedulerBusy, parse_pool_sizes
+
+
+class BlockingExecutor:
+    """Executor stand-in blocking until released, tracking concurrency per endpoint"""
+
+    def __init__(self, type):
+        self.TYPE = type
+        self.release = threading.Event()
+        self.tasks = []
+        self.running = {}
+        self.max_running = {}
+        self._lock = threading.Lock()
+
+    def execute_task(self, task):
+        endpoint = task['endpoint']
+        with self._lock:
+            self.running[endpoint] = self.running.get(endpoint, 0) + 1
+            self.max_running[endpoint] = max(self.max_running.get(endpoint, 0), self.running[endpoint])
+        self.release.wait()
+        with self._lock:
+            self.running[endpoint] -= 1
+            self.tasks.append(task)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not met within {}s'.format(timeout))
+        time.sleep(0.01)
+
+
+class TestSchedulerPools(unittest.TestCase):
+    """Tests for the per executor pools, endpoint limits and backpressure of `Scheduler`."""
+
+    def setUp(self):
+        self.slow = BlockingExecutor('slow')
+        self.fast = BlockingExecutor('fast')
+        self.fast.release.set()
+
+    def _scheduler(self, **kwargs):
+        scheduler = Scheduler(**kwargs)
+        scheduler.register_executor(self.slow)
+        scheduler.register_executor(self.fast)
+        self.addCleanup(scheduler.stop, drain=False)
+        self.addCleanup(self.slow.release.set)
+        return scheduler
+
+    @staticmethod
+    def _task(executor, endpoint='localhost:8888'):
+        return dict(executor=executor, endpoint=endpoint, kernelspec='python3', notebook={'cells': []})
+
+    def test_busy_executors_do_not_starve_others(self):
+        scheduler = self._scheduler(number_of_threads=2, pool_sizes={'fast': 1})
+        scheduler.start()
+        for i in range(4):
+            scheduler.schedule_task(self._task('slow'))
+        for i in range(3):
+            scheduler.schedule_task(self._task('fast'))
+
+        wait_for(lambda: len(self.fast.tasks) == 3)
+        self.assertEqual([], self.slow.tasks)
+
+        stats = scheduler.pool_stats()['pools']
+        self.assertEqual(dict(threads=2, queued=2, busy=2), {key: stats['default'][key] for key in
+                                                             ('threads', 'queued', 'busy')})
+        self.assertEqual(3, stats['fast']['executed'])
+
+    def test_endpoint_concurrency_is_limited(self):
+        scheduler = self._scheduler(number_of_threads=4, pool_sizes={}, endpoint_concurrency=1)
+        scheduler.start()
+        for i in range(3):
+            scheduler.schedule_task(self._task('slow', 'gateway-a'))
+        scheduler.schedule_task(self._task('slow', 'gateway-b'))
+
+        wait_for(lambda: self.slow.running.get('gateway-b') == 1)
+        self.assertEqual(dict(running=1, parked=2), scheduler.pool_stats()['endpoints']['gateway-a'])
+
+        self.slow.release.set()
+        wait_for(lambda: len(self.slow.tasks) == 4)
+        self.assertEqual(1, self.slow.max_running['gateway-a'])
+
+    def test_full_pools_reject_submissions(self):
+        scheduler = self._scheduler(pool_sizes={'fast': 1}, max_queued=2)
+        scheduler.schedule_task(self._task('slow'))
+        scheduler.schedule_task(self._task('slow'))
+
+        with self.assertRaises(SchedulerBusy):
+            scheduler.schedule_task(self._task('slow'))
+        with self.assertRaises(SchedulerBusy):
+            scheduler.schedule_tasks([self._task('fast'), self._task('fast'), self._task('fast')])
+
+        # pools are bounded independently
+        scheduler.schedule_task(self._task('fast'))
+
+    def test_parked_tasks_count_towards_the_queue_limit(self):
+        scheduler = self._scheduler(number_of_threads=3, pool_sizes={}, endpoint_concurrency=1, max_queued=2)
+        scheduler.start()
+        for i in range(2):
+            scheduler.schedule_task(self._task('slow'))
+            wait_for(lambda: scheduler.queue.qsize() == 0)
+        wait_for(lambda: scheduler.pool_stats()['endpoints']['localhost:8888'] == dict(running=1, parked=1))
+        scheduler.schedule_task(self._task('slow'))
+        wait_for(lambda: scheduler.pool_stats()['endpoints']['localhost:8888']['parked'] == 2)
+
+        with self.assertRaises(SchedulerBusy):
+            scheduler.schedule_task(self._task('slow'))
+
+    def test_concurrent_submissions_respect_the_queue_limit(self):
+        scheduler = self._scheduler(pool_sizes={}, max_queued=10)
+        accepted = []
+
+        def submit():
+            for i in range(5):
+                try:
+                    accepted.append(scheduler.schedule_task(self._task('slow')))
+                except SchedulerBusy:
+                    pass
+
+        threads = [threading.Thread(target=submit) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(10, len(accepted))
+        self.assertEqual(10, scheduler.queue.qsize())
+
+    def test_stop_drains_tasks_parked_by_another_pool(self):
+        scheduler = self._scheduler(number_of_threads=1, pool_sizes={'fast': 1}, endpoint_concurrency=1)
+        scheduler.start()
+        scheduler.schedule_task(self._task('slow'))
+        wait_for(lambda: self.slow.running.get('localhost:8888') == 1)
+        scheduler.schedule_task(self._task('fast'))
+        wait_for(lambda: scheduler.pool_stats()['endpoints']['localhost:8888']['parked'] == 1)
+
+        # the fast task is resumed by the slow pool thread, once the fast pool is being stopped
+        threading.Timer(0.2, self.slow.release.set).start()
+        scheduler.stop()
+
+        self.assertEqual(1, len(self.fast.tasks))
+
+    def test_utilization_is_reported(self):
+        scheduler = self._scheduler(number_of_threads=1, pool_sizes={})
+        scheduler.start()
+        scheduler.schedule_task(self._task('slow'))
+        wait_for(lambda: scheduler.pool_stats()['pools']['default']['busy'] == 1)
+        time.sleep(0.1)
+        self.slow.release.set()
+        wait_for(lambda: len(self.slow.tasks) == 1)
+
+        self.assertGreater(scheduler.pool_stats()['pools']['default']['utilization'], 0.3)
+
+
+class TestWorkerPoolHelpers(unittest.TestCase):
+    """Tests for `parse_pool_sizes` and `EndpointLimiter`."""
+
+    def test_parse_pool_sizes(self):
+        self.assertEqual({'jupyter': 8, 'ffdl': 2}, parse_pool_sizes('jupyter=8, FfDL=2'))
+        self.assertEqual({}, parse_pool_sizes(''))
+        for value in ('jupyter', 'jupyter=0', 'jupyter=many'):
+            with self.assertRaises(ValueError):
+                parse_pool_sizes(value)
+
+    def test_unlimited_endpoints_are_not_tracked(self):
+        limiter = EndpointLimiter(0)
+        self.assertTrue(limiter.acquire('gateway', None, None))
+        self.assertIsNone(limiter.release('gateway'))
+        self.assertEqual({}, limiter.stats())